@@ -0,0 +1,111 @@
+"""
+死信队列管理 API 路由模块
+
+提供死信消息的查看、批量重放和清除功能
+"""
+import logging
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query
+from app.models.task import DeadLetterRequest
+from app.db.async_mongo import amongo
+from app.services.queue_service import queue_service
+from app.services.metrics_service import metrics_service
+from app.core.auth import get_current_admin
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/dead-letters", tags=["Dead Letters"])
+
+
+@router.get("/")
+async def list_dead_letters(
+    limit: int = Query(50, ge=1, le=500),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    查看死信队列
+
+    Args:
+        limit: 返回的最大消息数量
+
+    Returns:
+        dict: 死信总数、近一小时死信速率以及消息列表
+    """
+    try:
+        total = await queue_service.get_dead_letter_count()
+        items = await queue_service.inspect_dead_letters(limit)
+    except Exception as e:
+        logger.error(f"Failed to inspect dead letters: {e}")
+        raise HTTPException(status_code=503, detail=f"Failed to inspect dead-letter queue: {e}")
+
+    return {
+        "total": total,
+        "rate": await metrics_service.get_rate("dead_lettered"),
+        "items": items
+    }
+
+
+@router.post("/replay")
+async def replay_dead_letters(request: DeadLetterRequest, current_admin: dict = Depends(get_current_admin)):
+    """
+    批量重放死信任务
+
+    将死信消息重新投递到原任务队列，并把对应任务重置为 pending。
+
+    Args:
+        request: 可选的任务 ID 列表及扫描上限
+
+    Returns:
+        dict: 重放结果
+    """
+    try:
+        replayed = await queue_service.replay_dead_letters(request.task_ids, request.limit)
+    except Exception as e:
+        logger.error(f"Failed to replay dead letters: {e}")
+        raise HTTPException(status_code=503, detail=f"Failed to replay dead letters: {e}")
+
+    task_ids = [task["task_id"] for task in replayed if isinstance(task, dict) and task.get("task_id")]
+    if task_ids:
+        await amongo.tasks.update_many(
+            {"task_id": {"$in": task_ids}},
+            {"$set": {
+                "status": "pending",
+                "error": None,
+                "node_id": None,
+                "completed_at": None,
+                "updated_at": datetime.now()
+            }}
+        )
+
+    return {
+        "status": "success",
+        "message": f"Replayed {len(replayed)} dead-lettered tasks",
+        "replayed_count": len(replayed),
+        "task_ids": task_ids
+    }
+
+
+@router.post("/purge")
+async def purge_dead_letters(request: DeadLetterRequest, current_admin: dict = Depends(get_current_admin)):
+    """
+    清除死信消息
+
+    未指定任务 ID 时清空整个死信队列。
+
+    Args:
+        request: 可选的任务 ID 列表及扫描上限
+
+    Returns:
+        dict: 清除结果
+    """
+    try:
+        purged = await queue_service.purge_dead_letters(request.task_ids, request.limit)
+    except Exception as e:
+        logger.error(f"Failed to purge dead letters: {e}")
+        raise HTTPException(status_code=503, detail=f"Failed to purge dead letters: {e}")
+
+    return {
+        "status": "success",
+        "message": f"Purged {purged} dead-lettered messages",
+        "purged_count": purged
+    }
@@ -0,0 +1,91 @@
+"""
+批量导入作业查询 API
+"""
+
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.models.job import JobResponse, JobListResponse
+from app.core.auth import get_current_user
+from app.db.async_mongo import amongo
+from app.services.export_service import export_service, parse_fields, MEDIA_TYPES
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["Jobs"])
+
+
+@router.get("", response_model=JobListResponse)
+async def list_jobs(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    获取批量导入作业列表，按创建时间倒序
+    """
+    cursor = amongo.jobs.find({}, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit)
+    items = await cursor.to_list(None)
+    total = await amongo.jobs.count_documents({})
+    return JobListResponse(items=items, total=total)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    获取批量导入作业详情
+
+    progress 为作业内任务按当前状态统计的数量，由 batch_id 索引聚合得到。
+
+    Args:
+        job_id: 作业 ID
+
+    Returns:
+        JobResponse: 作业信息
+    """
+    job = await amongo.jobs.find_one({"job_id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    pipeline = [
+        {"$match": {"batch_id": job_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]
+    job["progress"] = {item["_id"]: item["count"] for item in await amongo.tasks.aggregate(pipeline).to_list(None)}
+    return JobResponse(**job)
+
+
+@router.get("/{job_id}/export")
+async def export_job(
+    job_id: str,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv|parquet)$"),
+    fields: Optional[str] = None,
+    include_html: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    流式导出作业内任务的结果
+
+    按 batch_id 索引从数据库游标边读边输出；只读取请求的字段，默认不含 HTML 和截图。
+
+    Args:
+        job_id: 作业 ID
+        fmt: 导出格式，ndjson、csv 或 parquet（需要安装 pyarrow）
+        fields: 逗号分隔的字段路径，为空时导出元数据、识别结果和拦截接口
+        include_html: 是否附带 result.html
+
+    Returns:
+        StreamingResponse: 导出文件
+    """
+    if not await amongo.jobs.find_one({"job_id": job_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        content = export_service.export({"batch_id": job_id}, parse_fields(fields, include_html), fmt)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="job-{job_id}.{fmt}"'}
+    )
@@ -18,7 +18,7 @@ from app.models.llm import (
     LLMTestResponse,
 )
 from app.core.auth import get_current_active_user, get_current_admin
-from app.db.mongo import mongo
+from app.db.async_mongo import amongo
 
 router = APIRouter(prefix="/api/v1/llm", tags=["LLM Models"])
 
@@ -49,9 +49,9 @@ async def list_models(
     if is_enabled is not None:
         query["is_enabled"] = is_enabled
 
-    cursor = mongo.llm_models.find(query).skip(skip).limit(limit).sort("created_at", -1)
-    items = [serialize_model(doc) for doc in cursor]
-    total = mongo.llm_models.count_documents(query)
+    cursor = amongo.llm_models.find(query).skip(skip).limit(limit).sort("created_at", -1)
+    items = [serialize_model(doc) for doc in await cursor.to_list(None)]
+    total = await amongo.llm_models.count_documents(query)
 
     return LLMModelListResponse(items=items, total=total)
 
@@ -64,7 +64,7 @@ async def get_model(
     获取单个 LLM 模型详情
     """
     try:
-        doc = mongo.llm_models.find_one({"_id": ObjectId(model_id)})
+        doc = await amongo.llm_models.find_one({"_id": ObjectId(model_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid model ID format")
 
@@ -85,13 +85,13 @@ async def create_model(
 
     # 如果设置为默认模型，先取消其他默认
     if data.is_default:
-        mongo.llm_models.update_many(
+        await amongo.llm_models.update_many(
             {"is_default": True}, {"$set": {"is_default": False, "updated_at": now}}
         )
 
     doc = {**data.model_dump(), "created_at": now, "updated_at": now}
 
-    result = mongo.llm_models.insert_one(doc)
+    result = await amongo.llm_models.insert_one(doc)
     doc["_id"] = str(result.inserted_id)
 
     return doc
@@ -109,7 +109,7 @@ async def update_model(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid model ID format")
 
-    existing = mongo.llm_models.find_one({"_id": oid})
+    existing = await amongo.llm_models.find_one({"_id": oid})
     if not existing:
         raise HTTPException(status_code=404, detail="Model not found")
 
@@ -118,16 +118,16 @@ async def update_model(
 
     # 如果设置为默认模型，先取消其他默认
     if update_data.get("is_default"):
-        mongo.llm_models.update_many(
+        await amongo.llm_models.update_many(
             {"is_default": True, "_id": {"$ne": oid}},
             {"$set": {"is_default": False, "updated_at": now}},
         )
 
     update_data["updated_at"] = now
 
-    mongo.llm_models.update_one({"_id": oid}, {"$set": update_data})
+    await amongo.llm_models.update_one({"_id": oid}, {"$set": update_data})
 
-    updated = mongo.llm_models.find_one({"_id": oid})
+    updated = await amongo.llm_models.find_one({"_id": oid})
     return serialize_model(updated)
 
 
@@ -141,7 +141,7 @@ async def delete_model(model_id: str, current_user: dict = Depends(get_current_a
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid model ID format")
 
-    result = mongo.llm_models.delete_one({"_id": oid})
+    result = await amongo.llm_models.delete_one({"_id": oid})
 
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Model not found")
@@ -167,7 +167,7 @@ async def test_model(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid model ID format")
 
-    model_config = mongo.llm_models.find_one({"_id": oid})
+    model_config = await amongo.llm_models.find_one({"_id": oid})
     if not model_config:
         raise HTTPException(status_code=404, detail="Model not found")
 
@@ -17,7 +17,7 @@ from app.models.prompt_template import (
     PromptTemplateListResponse,
 )
 from app.core.auth import get_current_active_user
-from app.db.mongo import mongo
+from app.db.async_mongo import amongo
 
 logger = logging.getLogger(__name__)
 
@@ -52,13 +52,13 @@ async def list_templates(
         ]
 
     cursor = (
-        mongo.prompt_templates.find(query)
+        amongo.prompt_templates.find(query)
         .skip(skip)
         .limit(limit)
         .sort("created_at", -1)
     )
-    items = [serialize_template(doc) for doc in cursor]
-    total = mongo.prompt_templates.count_documents(query)
+    items = [serialize_template(doc) for doc in await cursor.to_list(None)]
+    total = await amongo.prompt_templates.count_documents(query)
 
     return PromptTemplateListResponse(items=items, total=total)
 
@@ -71,7 +71,7 @@ async def get_template(
     获取单个提示词模板详情
     """
     try:
-        doc = mongo.prompt_templates.find_one({"_id": ObjectId(template_id)})
+        doc = await amongo.prompt_templates.find_one({"_id": ObjectId(template_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="无效的模板 ID")
 
@@ -97,7 +97,7 @@ async def create_template(
         "updated_at": now,
     }
 
-    result = mongo.prompt_templates.insert_one(doc)
+    result = await amongo.prompt_templates.insert_one(doc)
     doc["_id"] = str(result.inserted_id)
 
     logger.info(f"User {current_user.get('username')} created template: {data.name}")
@@ -114,7 +114,7 @@ async def update_template(
     更新提示词模板（仅创建者或管理员可操作）
     """
     try:
-        doc = mongo.prompt_templates.find_one({"_id": ObjectId(template_id)})
+        doc = await amongo.prompt_templates.find_one({"_id": ObjectId(template_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="无效的模板 ID")
 
@@ -131,11 +131,11 @@ async def update_template(
     update_data = {k: v for k, v in data.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
 
-    mongo.prompt_templates.update_one(
+    await amongo.prompt_templates.update_one(
         {"_id": ObjectId(template_id)}, {"$set": update_data}
     )
 
-    updated_doc = mongo.prompt_templates.find_one({"_id": ObjectId(template_id)})
+    updated_doc = await amongo.prompt_templates.find_one({"_id": ObjectId(template_id)})
     return serialize_template(updated_doc)
 
 
@@ -147,7 +147,7 @@ async def delete_template(
     删除提示词模板（仅创建者或管理员可操作）
     """
     try:
-        doc = mongo.prompt_templates.find_one({"_id": ObjectId(template_id)})
+        doc = await amongo.prompt_templates.find_one({"_id": ObjectId(template_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="无效的模板 ID")
 
@@ -161,7 +161,7 @@ async def delete_template(
     ):
         raise HTTPException(status_code=403, detail="无权删除此模板")
 
-    mongo.prompt_templates.delete_one({"_id": ObjectId(template_id)})
+    await amongo.prompt_templates.delete_one({"_id": ObjectId(template_id)})
 
     logger.info(f"User {current_user.get('username')} deleted template: {template_id}")
     return {"message": "模板已删除"}
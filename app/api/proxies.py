@@ -16,7 +16,7 @@ from app.models.proxy import (
     ProxyListResponse,
 )
 from app.core.auth import get_current_active_user
-from app.db.mongo import mongo
+from app.db.async_mongo import amongo
 from app.core.scraper import scraper
 from app.core.config import settings
 
@@ -52,13 +52,13 @@ async def list_proxies(
         ]
 
     cursor = (
-        mongo.proxies.find(query)
+        amongo.proxies.find(query)
         .skip(skip)
         .limit(limit)
         .sort("created_at", -1)
     )
-    items = [serialize_proxy(doc) for doc in cursor]
-    total = mongo.proxies.count_documents(query)
+    items = [serialize_proxy(doc) for doc in await cursor.to_list(None)]
+    total = await amongo.proxies.count_documents(query)
 
     return ProxyListResponse(items=items, total=total)
 
@@ -77,7 +77,7 @@ async def create_proxy(
         "updated_at": now,
     }
 
-    result = mongo.proxies.insert_one(doc)
+    result = await amongo.proxies.insert_one(doc)
     doc["_id"] = str(result.inserted_id)
 
     logger.info(f"User {current_user.get('username')} created proxy: {data.name}")
@@ -94,7 +94,7 @@ async def update_proxy(
     更新代理配置
     """
     try:
-        doc = mongo.proxies.find_one({"_id": ObjectId(proxy_id)})
+        doc = await amongo.proxies.find_one({"_id": ObjectId(proxy_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="无效的代理 ID")
 
@@ -104,11 +104,11 @@ async def update_proxy(
     update_data = {k: v for k, v in data.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
 
-    mongo.proxies.update_one(
+    await amongo.proxies.update_one(
         {"_id": ObjectId(proxy_id)}, {"$set": update_data}
     )
 
-    updated_doc = mongo.proxies.find_one({"_id": ObjectId(proxy_id)})
+    updated_doc = await amongo.proxies.find_one({"_id": ObjectId(proxy_id)})
     return serialize_proxy(updated_doc)
 
 
@@ -120,7 +120,7 @@ async def delete_proxy(
     删除代理配置
     """
     try:
-        result = mongo.proxies.delete_one({"_id": ObjectId(proxy_id)})
+        result = await amongo.proxies.delete_one({"_id": ObjectId(proxy_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="无效的代理 ID")
 
@@ -139,7 +139,7 @@ async def test_stored_proxy(
     测试存储的代理是否可用
     """
     try:
-        doc = mongo.proxies.find_one({"_id": ObjectId(proxy_id)})
+        doc = await amongo.proxies.find_one({"_id": ObjectId(proxy_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="无效的代理 ID")
 
@@ -0,0 +1,184 @@
+"""
+定时抓取计划管理 API
+"""
+
+import logging
+from datetime import datetime
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Depends, Query
+
+from app.models.schedule import (
+    ScheduleCreate,
+    ScheduleUpdate,
+    ScheduleResponse,
+    ScheduleListResponse,
+)
+from app.core.auth import get_current_active_user
+from app.db.async_mongo import amongo
+from app.services.scheduler_service import scheduler_service, compute_next_run
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/schedules", tags=["Schedules"])
+
+
+def serialize_schedule(doc: dict) -> dict:
+    """序列化计划文档"""
+    if doc and "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+
+async def _find_schedule(schedule_id: str) -> dict:
+    """按 ID 获取计划文档，不存在时抛出 HTTP 异常"""
+    try:
+        doc = await amongo.schedules.find_one({"_id": ObjectId(schedule_id)})
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的计划 ID")
+
+    if not doc:
+        raise HTTPException(status_code=404, detail="计划不存在")
+    return doc
+
+
+def _check_period(doc: dict):
+    """cron 与 interval_seconds 必须且只能设置一个"""
+    if bool(doc.get("cron")) == bool(doc.get("interval_seconds")):
+        raise HTTPException(status_code=400, detail="cron 与 interval_seconds 必须且只能设置一个")
+
+
+def _next_run(doc: dict, now: datetime) -> datetime:
+    """计算下一次执行时间，表达式无法触发时返回 400"""
+    try:
+        return compute_next_run(doc, now)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"无效的执行周期: {e}")
+
+
+@router.get("", response_model=ScheduleListResponse)
+async def list_schedules(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    search: str = None,
+    current_user: dict = Depends(get_current_active_user),
+):
+    """
+    获取定时抓取计划列表，支持按名称模糊搜索
+    """
+    query = {}
+    if search:
+        query["name"] = {"$regex": search, "$options": "i"}
+
+    cursor = (
+        amongo.schedules.find(query)
+        .skip(skip)
+        .limit(limit)
+        .sort("created_at", -1)
+    )
+    items = [serialize_schedule(doc) for doc in await cursor.to_list(None)]
+    total = await amongo.schedules.count_documents(query)
+
+    return ScheduleListResponse(items=items, total=total)
+
+
+@router.post("", response_model=ScheduleResponse)
+async def create_schedule(
+    data: ScheduleCreate, current_user: dict = Depends(get_current_active_user)
+):
+    """
+    创建定时抓取计划，首次执行时间按周期从当前时间起计算
+    """
+    now = datetime.now()
+    doc = {
+        **data.model_dump(mode="json"),
+        "last_run_at": None,
+        "last_run_task_count": 0,
+        "skipped_runs": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    _check_period(doc)
+    doc["next_run_at"] = _next_run(doc, now)
+
+    result = await amongo.schedules.insert_one(doc)
+    doc["_id"] = str(result.inserted_id)
+
+    logger.info(f"User {current_user.get('username')} created schedule: {data.name}")
+    return doc
+
+
+@router.get("/{schedule_id}", response_model=ScheduleResponse)
+async def get_schedule(
+    schedule_id: str, current_user: dict = Depends(get_current_active_user)
+):
+    """
+    获取定时抓取计划详情
+    """
+    return serialize_schedule(await _find_schedule(schedule_id))
+
+
+@router.put("/{schedule_id}", response_model=ScheduleResponse)
+async def update_schedule(
+    schedule_id: str,
+    data: ScheduleUpdate,
+    current_user: dict = Depends(get_current_active_user),
+):
+    """
+    更新定时抓取计划
+
+    显式传入 null 可清除 cron 或 interval_seconds，以便切换周期类型；
+    修改周期或重新启用时从当前时间重新计算下次执行时间。
+    """
+    doc = await _find_schedule(schedule_id)
+
+    update_data = data.model_dump(mode="json", exclude_unset=True)
+    merged = {**doc, **update_data}
+    _check_period(merged)
+
+    now = datetime.now()
+    period_fields = {"cron", "interval_seconds", "jitter_seconds"}
+    if period_fields & update_data.keys() or (update_data.get("is_enabled") and not doc.get("is_enabled")):
+        update_data["next_run_at"] = _next_run(merged, now)
+    update_data["updated_at"] = now
+
+    await amongo.schedules.update_one({"_id": doc["_id"]}, {"$set": update_data})
+
+    updated_doc = await amongo.schedules.find_one({"_id": doc["_id"]})
+    return serialize_schedule(updated_doc)
+
+
+@router.delete("/{schedule_id}")
+async def delete_schedule(
+    schedule_id: str, current_user: dict = Depends(get_current_active_user)
+):
+    """
+    删除定时抓取计划，已入队的任务不受影响
+    """
+    try:
+        result = await amongo.schedules.delete_one({"_id": ObjectId(schedule_id)})
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的计划 ID")
+
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="计划不存在")
+
+    logger.info(f"User {current_user.get('username')} deleted schedule: {schedule_id}")
+    return {"message": "计划已删除"}
+
+
+@router.post("/{schedule_id}/run")
+async def run_schedule(
+    schedule_id: str, current_user: dict = Depends(get_current_active_user)
+):
+    """
+    立即执行一次计划，不影响下次执行时间
+
+    上一次执行仍有未完成的任务时返回 409。
+    """
+    doc = await _find_schedule(schedule_id)
+    if await scheduler_service.has_inflight(schedule_id):
+        raise HTTPException(status_code=409, detail="计划的上一次执行仍未完成")
+
+    task_ids = await scheduler_service.enqueue_run(doc)
+    logger.info(f"User {current_user.get('username')} triggered schedule {schedule_id}: {len(task_ids)} tasks")
+    return {"task_ids": task_ids}
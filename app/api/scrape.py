@@ -3,9 +3,10 @@
 
 提供同步/异步/批量抓取网页的 API 接口
 """
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from app.models.task import (
     ScrapeRequest,
     TaskResponse,
@@ -13,26 +14,120 @@ from app.models.task import (
     BatchScrapeResponse,
     ProxyTestRequest
 )
-from app.services.queue_service import rabbitmq_service
+from app.models.job import JobResponse
+from app.services.bulk_ingest_service import bulk_ingest_service
+from app.services.queue_base import build_queue_task
+from app.services.queue_service import queue_service
 from app.services.cache_service import cache_service
-from app.db.mongo import mongo
+from app.services.singleflight_service import singleflight_service
+from app.services.task_event_service import task_event_service
+from app.db.async_mongo import amongo
 from app.core.config import settings
+from app.core.urls import url_search_fields
 from app.core.auth import get_current_user
 from app.core.scraper import scraper
 import asyncio
+import logging
 import time
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/scrape", tags=["Scrape"])
 
 
+async def _submit_task(
+    request: ScrapeRequest,
+    url: str,
+    params: dict,
+    task_id: str,
+    cache_key: str,
+    expires_at: Optional[datetime] = None
+) -> Tuple[dict, bool]:
+    """
+    创建任务记录并提交到队列
+
+    启用缓存时，相同 cache_key 的任务正在执行则不再重复入队，而是作为跟随任务挂到
+    领导任务上，领导任务结束时由 Worker 将结果复制过来。
+
+    Args:
+        request: 抓取请求
+        url: 目标 URL
+        params: 抓取参数
+        task_id: 任务 ID
+        cache_key: 缓存键
+        expires_at: 过期时间，超过后仍未开始执行的任务不再处理
+
+    Returns:
+        tuple: (任务数据, 是否成功提交)
+    """
+    leader_task_id = None
+    if request.cache.enabled:
+        leader_task_id = await singleflight_service.acquire(cache_key, task_id)
+
+    # 构建任务数据
+    task_data = {
+        "task_id": task_id,
+        "url": url,
+        **url_search_fields(url),
+        "status": "pending",
+        "priority": request.priority,
+        "params": params,
+        "cache": request.cache.model_dump(),
+        "cache_key": cache_key,
+        "cached": False,
+        "html_cached": False,
+        "agent_cached": False,
+        "leader_task_id": leader_task_id,
+        "expires_at": expires_at,
+        "callback_url": str(request.callback_url) if request.callback_url else None,
+        "callback_pending": bool(request.callback_url),
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
+    }
+
+    # 保存任务到数据库
+    await amongo.tasks.insert_one(task_data)
+
+    # 合并到正在执行的相同任务
+    if leader_task_id:
+        try:
+            await singleflight_service.join(leader_task_id, task_id)
+            logger.info(f"Task {task_id} coalesced into in-flight task {leader_task_id}")
+            return task_data, True
+        except Exception as e:
+            logger.error(f"Failed to coalesce task {task_id} into {leader_task_id}, queueing it instead: {e}")
+            task_data["leader_task_id"] = None
+            await amongo.tasks.update_one({"task_id": task_id}, {"$set": {"leader_task_id": None}})
+
+    # 发布任务到队列
+    if await queue_service.publish_task(build_queue_task(task_data)):
+        return task_data, True
+
+    await amongo.tasks.update_one(
+        {"task_id": task_id},
+        {"$set": {
+            "status": "failed",
+            "error": {"message": "Failed to queue task: queue connection issue"},
+            "updated_at": datetime.now()
+        }}
+    )
+    # 释放租约，已挂载的跟随任务一并失败
+    if request.cache.enabled:
+        await singleflight_service.complete(cache_key, task_id)
+    return task_data, False
+
+
 @router.post("/", response_model=TaskResponse)
 async def scrape(request: ScrapeRequest, current_user: dict = Depends(get_current_user)):
     """
     同步抓取网页
 
     1. 优先检查缓存：若缓存命中，直接返回缓存结果，并在数据库中记录一条“已缓存”任务记录，方便用户查看历史。
-    2. 缓存未命中：创建新任务并提交到 RabbitMQ，随后轮询数据库等待任务完成（默认超时 30 秒）。
+    2. 缓存未命中：创建新任务并提交到任务队列，随后等待 Worker 发布的任务完成事件（默认超时 30 秒）。
+       相同任务正在执行时不重复入队，而是等待并复用其结果。
     3. 任务完成或失败后，立即返回最终状态及结果；超时则抛出 504 异常。
+       任务的过期时间为等待超时和 deadline 中较早者，调用方放弃等待后仍未开始执行的任务不再处理。
 
     Args:
         request: 抓取请求，包含目标 URL、参数、优先级、缓存策略等。
@@ -55,6 +150,7 @@ async def scrape(request: ScrapeRequest, current_user: dict = Depends(get_curren
             task_data = {
                 "task_id": task_id,
                 "url": url,
+                **url_search_fields(url),
                 "status": cached.get("status", "success"),
                 "priority": request.priority,
                 "params": params,
@@ -63,11 +159,13 @@ async def scrape(request: ScrapeRequest, current_user: dict = Depends(get_curren
                 "cached": True,
                 "html_cached": cached.get("html_cached", True),
                 "agent_cached": cached.get("agent_cached", True),
+                "callback_url": str(request.callback_url) if request.callback_url else None,
+                "callback_pending": bool(request.callback_url),
                 "created_at": datetime.now(),
                 "updated_at": datetime.now(),
                 "completed_at": cached.get("completed_at") or datetime.now()
             }
-            mongo.tasks.insert_one(task_data)
+            await amongo.tasks.insert_one(task_data)
 
             return TaskResponse(
                 task_id=task_id,
@@ -80,59 +178,25 @@ async def scrape(request: ScrapeRequest, current_user: dict = Depends(get_curren
                 completed_at=task_data["completed_at"]
             )
 
-    # 构建任务数据
-    task_data = {
-        "task_id": task_id,
-        "url": url,
-        "status": "pending",
-        "priority": request.priority,
-        "params": params,
-        "cache": request.cache.model_dump(),
-        "cache_key": cache_key,
-        "cached": False,
-        "html_cached": False,
-        "agent_cached": False,
-        "created_at": datetime.now(),
-        "updated_at": datetime.now()
-    }
-
-    # 保存任务到数据库
-    mongo.tasks.insert_one(task_data)
-
-    # 构建队列任务
-    queue_task = {
-        "task_id": task_id,
-        "url": url,
-        "params": params,
-        "cache": request.cache.model_dump(),
-        "priority": request.priority
-    }
-
-    # 发布任务到队列
-    if not rabbitmq_service.publish_task(queue_task):
-        mongo.tasks.update_one(
-            {"task_id": task_id},
-            {"$set": {
-                "status": "failed",
-                "error": {"message": "Failed to queue task: RabbitMQ connection issue"},
-                "updated_at": datetime.now()
-            }}
-        )
-        raise HTTPException(status_code=500, detail="Failed to queue task")
-    
     # 设置超时时间（默认 30 秒，或使用请求参数中的超时）
     timeout = request.params.timeout / 1000 if request.params.timeout else 30
     start_time = datetime.now()
-    
-    # 轮询检查间隔
-    check_interval = 1
-    
+    expires_at = start_time + timedelta(seconds=min(timeout, request.deadline or timeout))
+
+    # 先登记等待再提交，避免任务在登记前完成而错过完成事件
+    done = task_event_service.subscribe(task_id)
+
     try:
-        while (datetime.now() - start_time).total_seconds() < timeout:
+        # 创建任务并提交到队列（相同任务正在执行时合并到领导任务）
+        task_data, queued = await _submit_task(request, url, params, task_id, cache_key, expires_at)
+        if not queued:
+            raise HTTPException(status_code=500, detail="Failed to queue task")
+
+        while True:
             # 检查任务状态
-            task = mongo.tasks.find_one({"task_id": task_id})
+            task = await amongo.tasks.find_one({"task_id": task_id})
             
-            if task and task["status"] in ["success", "failed"]:
+            if task and task["status"] in ["success", "failed", "expired", "cancelled"]:
                 return TaskResponse(
                     task_id=task_id,
                     url=url,
@@ -142,21 +206,34 @@ async def scrape(request: ScrapeRequest, current_user: dict = Depends(get_curren
                     cached=task.get("cached", False),
                     html_cached=task.get("html_cached", False),
                     agent_cached=task.get("agent_cached", False),
+                    leader_task_id=task.get("leader_task_id"),
+                    expires_at=task.get("expires_at"),
                     created_at=task["created_at"],
                     updated_at=task["updated_at"],
                     completed_at=task.get("completed_at")
                 )
-            
-            # 等待下一次检查
-            await asyncio.sleep(check_interval)
-            
+
+            remaining = timeout - (datetime.now() - start_time).total_seconds()
+            if remaining <= 0:
+                break
+
+            # 等待任务完成事件，事件丢失时按兜底间隔重新查询
+            if done.done():
+                done = task_event_service.subscribe(task_id)
+            try:
+                await asyncio.wait_for(asyncio.shield(done), min(remaining, settings.sync_result_poll_interval))
+            except asyncio.TimeoutError:
+                pass
+
         # 超时处理
         raise HTTPException(status_code=504, detail="Task execution timed out")
-        
+
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(status_code=500, detail=f"Error waiting for task result: {str(e)}")
+    finally:
+        task_event_service.unsubscribe(task_id, done)
 
 
 @router.post("/async", response_model=TaskResponse)
@@ -187,6 +264,7 @@ async def scrape_async(request: ScrapeRequest, current_user: dict = Depends(get_
             task_data = {
                 "task_id": task_id,
                 "url": url,
+                **url_search_fields(url),
                 "status": cached.get("status", "success"),
                 "priority": request.priority,
                 "params": params,
@@ -199,7 +277,7 @@ async def scrape_async(request: ScrapeRequest, current_user: dict = Depends(get_
                 "updated_at": datetime.now(),
                 "completed_at": cached.get("completed_at") or datetime.now()
             }
-            mongo.tasks.insert_one(task_data)
+            await amongo.tasks.insert_one(task_data)
 
             return TaskResponse(
                 task_id=task_id,
@@ -212,44 +290,9 @@ async def scrape_async(request: ScrapeRequest, current_user: dict = Depends(get_
                 completed_at=task_data["completed_at"]
             )
 
-    # 构建任务数据
-    task_data = {
-        "task_id": task_id,
-        "url": url,
-        "status": "pending",
-        "priority": request.priority,
-        "params": params,
-        "cache": request.cache.model_dump(),
-        "cache_key": cache_key,
-        "cached": False,
-        "html_cached": False,
-        "agent_cached": False,
-        "created_at": datetime.now(),
-        "updated_at": datetime.now()
-    }
-
-    # 保存任务到数据库
-    mongo.tasks.insert_one(task_data)
-
-    # 构建队列任务
-    queue_task = {
-        "task_id": task_id,
-        "url": url,
-        "params": params,
-        "cache": request.cache.model_dump(),
-        "priority": request.priority
-    }
-
-    # 发布任务到队列
-    if not rabbitmq_service.publish_task(queue_task):
-        mongo.tasks.update_one(
-            {"task_id": task_id},
-            {"$set": {
-                "status": "failed",
-                "error": {"message": "Failed to queue task: RabbitMQ connection issue"},
-                "updated_at": datetime.now()
-            }}
-        )
+    # 创建任务并提交到队列（相同任务正在执行时合并到领导任务）
+    expires_at = datetime.now() + timedelta(seconds=request.deadline) if request.deadline else None
+    task_data, _ = await _submit_task(request, url, params, task_id, cache_key, expires_at)
 
     # 返回任务信息
     return TaskResponse(
@@ -257,6 +300,8 @@ async def scrape_async(request: ScrapeRequest, current_user: dict = Depends(get_
         url=url,
         status="pending",
         cached=False,
+        leader_task_id=task_data["leader_task_id"],
+        expires_at=task_data["expires_at"],
         created_at=task_data["created_at"],
         updated_at=task_data["updated_at"]
     )
@@ -276,58 +321,106 @@ async def scrape_batch(request: BatchScrapeRequest, current_user: dict = Depends
     Returns:
         BatchScrapeResponse: 批量任务响应信息
     """
-    task_ids = []
+    now = datetime.now()
+    batch_id = str(ObjectId())
+    task_docs = []
+    queue_tasks = []
 
-    # 遍历每个任务
+    # 构建所有任务数据
     for req in request.tasks:
         url = str(req.url)
         params = req.params.model_dump()
         task_id = str(ObjectId())
         cache_key = cache_service.generate_cache_key(url, params)
+        callback_url = req.callback_url or request.callback_url
 
-        # 构建任务数据
-        task_data = {
+        task_doc = {
             "task_id": task_id,
             "url": url,
+            **url_search_fields(url),
             "status": "pending",
             "priority": req.priority,
             "params": params,
             "cache": req.cache.model_dump(),
-            "html_cached": False,
-            "agent_cached": False,
             "cache_key": cache_key,
             "cached": False,
             "html_cached": False,
             "agent_cached": False,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
+            "expires_at": now + timedelta(seconds=req.deadline) if req.deadline else None,
+            "batch_id": batch_id,
+            "callback_url": str(callback_url) if callback_url else None,
+            "callback_pending": bool(callback_url),
+            "created_at": now,
+            "updated_at": now
         }
+        task_docs.append(task_doc)
+        queue_tasks.append(build_queue_task(task_doc))
 
-        # 保存任务到数据库
-        mongo.tasks.insert_one(task_data)
+    if not task_docs:
+        return BatchScrapeResponse(task_ids=[])
 
-        # 构建队列任务
-        queue_task = {
-            "task_id": task_id,
-            "url": url,
-            "params": params,
-            "cache": req.cache.model_dump(),
-            "priority": req.priority
-        }
+    # 一次性批量保存任务到数据库，无序写入时单条失败不影响其余任务
+    try:
+        await amongo.tasks.insert_many(task_docs, ordered=False)
+    except BulkWriteError as e:
+        failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+        logger.error(f"Failed to insert {len(failed_indexes)} batch tasks: {e.details.get('writeErrors', [])[:3]}")
+        queue_tasks = [task for i, task in enumerate(queue_tasks) if i not in failed_indexes]
+
+    # 按块发布任务到队列，发布失败的任务一次性标记为失败
+    failed_ids = await queue_service.publish_tasks(queue_tasks)
+    if failed_ids:
+        await amongo.tasks.update_many(
+            {"task_id": {"$in": failed_ids}},
+            {"$set": {
+                "status": "failed",
+                "error": {"message": "Failed to queue task: queue connection issue"},
+                "updated_at": datetime.now()
+            }}
+        )
 
-        # 发布任务到队列
-        if not rabbitmq_service.publish_task(queue_task):
-            mongo.tasks.update_one(
-                {"task_id": task_id},
-                {"$set": {
-                    "status": "failed",
-                    "error": {"message": "Failed to queue task: RabbitMQ connection issue"},
-                    "updated_at": datetime.now()
-                }}
-            )
-        task_ids.append(task_id)
+    task_ids = [task["task_id"] for task in queue_tasks]
+    return BatchScrapeResponse(task_ids=task_ids, batch_id=batch_id)
+
+
+@router.post("/bulk", response_model=JobResponse)
+async def scrape_bulk(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$"),
+    priority: int = Query(1, ge=1, le=10),
+    deadline: Optional[float] = Query(None, gt=0),
+    callback_url: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    流式批量导入抓取任务
+
+    请求体为 NDJSON（每行一个 ScrapeRequest 对象或 URL 字符串）或 CSV（url 列，可选 priority、deadline 列），
+    边接收边解析，URL 规范化并去重后按块写入和入队，内存占用与导入总量无关。
+    未指定 format 时根据 Content-Type 判断，含 csv 的视为 CSV，否则视为 NDJSON。
+    查询参数 priority、deadline、callback_url 作为记录未指定时的默认值。
+
+    Args:
+        request: 原始请求，用于读取流式请求体
+        fmt: 上传格式，ndjson 或 csv
+        priority: 默认优先级
+        deadline: 默认截止时间（秒）
+        callback_url: 默认回调地址
+
+    Returns:
+        JobResponse: 作业信息，job_id 即作业内任务的 batch_id
+    """
+    if fmt is None:
+        fmt = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+    defaults = {"priority": priority}
+    if deadline:
+        defaults["deadline"] = deadline
+    if callback_url:
+        defaults["callback_url"] = callback_url
 
-    return BatchScrapeResponse(task_ids=task_ids)
+    job = await bulk_ingest_service.ingest(request.stream(), fmt, defaults, current_user.get("username"))
+    return JobResponse(**job)
 
 
 @router.post("/test-proxy")
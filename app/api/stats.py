@@ -6,8 +6,9 @@
 from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timedelta
 from app.models.task import StatsResponse
-from app.db.mongo import mongo
+from app.db.async_mongo import amongo
 from app.core.auth import get_current_user
+from app.services.metrics_service import metrics_service
 
 router = APIRouter(prefix="/api/v1/stats", tags=["Stats"])
 
@@ -44,7 +45,7 @@ async def get_stats(current_user: dict = Depends(get_current_user)):
             }
         }
     ]
-    today_data = list(mongo.tasks.aggregate(pipeline_today))
+    today_data = await amongo.tasks.aggregate(pipeline_today).to_list(None)
     
     # 2. 获取昨日统计（用于计算趋势）
     pipeline_yesterday = [
@@ -64,7 +65,7 @@ async def get_stats(current_user: dict = Depends(get_current_user)):
             }
         }
     ]
-    yesterday_data = list(mongo.tasks.aggregate(pipeline_yesterday))
+    yesterday_data = await amongo.tasks.aggregate(pipeline_yesterday).to_list(None)
 
     def process_stats(data_list):
         if not data_list:
@@ -97,13 +98,14 @@ async def get_stats(current_user: dict = Depends(get_current_user)):
         "avg_duration": calculate_trend(today_stats["avg_duration"], yesterday_stats["avg_duration"])
     }
 
-    # 3. 统计各状态任务数量 (实时队列)
-    queue_stats = {
-        "pending": mongo.tasks.count_documents({"status": "pending"}),
-        "processing": mongo.tasks.count_documents({"status": "processing"}),
-        "success": mongo.tasks.count_documents({"status": "success"}),
-        "failed": mongo.tasks.count_documents({"status": "failed"})
-    }
+    # 3. 统计各状态任务数量 (实时队列)，一次按状态分组的聚合完成所有计数
+    statuses = ("pending", "processing", "success", "failed", "expired", "cancelled")
+    status_counts = await amongo.tasks.aggregate([
+        {"$match": {"status": {"$in": list(statuses)}}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    queue_stats = dict.fromkeys(statuses, 0)
+    queue_stats.update({item["_id"]: item["count"] for item in status_counts})
 
     # 4. 获取历史统计 (最近 7 天，用于图表)
     history_pipeline = [
@@ -122,12 +124,15 @@ async def get_stats(current_user: dict = Depends(get_current_user)):
         },
         {"$sort": {"_id": 1}}
     ]
-    history_data = list(mongo.tasks.aggregate(history_pipeline))
+    history_data = await amongo.tasks.aggregate(history_pipeline).to_list(None)
 
     return StatsResponse(
         today=today_stats,
         yesterday=yesterday_stats,
         trends=trends,
         queue=queue_stats,
-        history=history_data
+        history=history_data,
+        dead_letters=await metrics_service.get_rate("dead_lettered"),
+        reaped=await metrics_service.get_rate("reaped"),
+        expired=await metrics_service.get_rate("expired")
     )
@@ -3,17 +3,37 @@
 
 提供任务查询、列表、删除等功能
 """
+import asyncio
+import base64
+import hashlib
+import json
+import re
 from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse, Response
 from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
 from app.models.task import TaskResponse, BatchDeleteRequest
-from app.db.mongo import mongo
-from app.services.queue_service import rabbitmq_service
+from app.db.async_mongo import amongo
+from app.db.redis import redis_client
+from app.core.urls import reverse_host, tokenize
+from app.core.projection import split_fields, build_projection, remove_path
+from app.core.responses import FastJSONResponse
+from app.services.queue_service import queue_service
 from app.services.cache_service import cache_service
+from app.services.cancel_service import cancel_service
+from app.services.singleflight_service import singleflight_service
+from app.services.task_event_service import task_event_service, FINAL_STATUSES
+from app.services.export_service import export_service, parse_fields, MEDIA_TYPES
 from app.core.auth import get_current_user
+from app.core.config import settings
 
 router = APIRouter(prefix="/api/v1/tasks", tags=["Tasks"])
 
+# 部分任务 ID（ObjectId 的十六进制前缀）
+TASK_ID_PREFIX = re.compile(r"[0-9a-f]{4,23}")
+
 
 @router.delete("/batch")
 async def batch_delete_tasks(request: BatchDeleteRequest, current_user: dict = Depends(get_current_user)):
@@ -26,7 +46,7 @@ async def batch_delete_tasks(request: BatchDeleteRequest, current_user: dict = D
     Returns:
         dict: 删除结果
     """
-    result = mongo.tasks.delete_many({"task_id": {"$in": request.task_ids}})
+    result = await amongo.tasks.delete_many({"task_id": {"$in": request.task_ids}})
     return {
         "status": "success",
         "message": f"Successfully deleted {result.deleted_count} tasks",
@@ -34,33 +54,288 @@ async def batch_delete_tasks(request: BatchDeleteRequest, current_user: dict = D
     }
 
 
+def _format_sse(event: str, data: dict) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+
+def _event_payload(task_id: str, status: str, doc: Optional[dict], include_result: bool) -> dict:
+    """构建任务事件数据，结束的任务附带错误信息及（可选的）抓取结果"""
+    data = {"task_id": task_id, "status": status}
+    if doc and status in FINAL_STATUSES:
+        data["error"] = doc.get("error")
+        if include_result:
+            data["result"] = doc.get("result")
+    return data
+
+
+@router.get("/stream")
+async def stream_tasks(
+    request: Request,
+    task_ids: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    status: Optional[str] = None,
+    include_result: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    以 Server-Sent Events 实时推送任务状态变化
+
+    指定 task_ids 或 batch_id 时先推送这些任务的当前状态，之后推送每次状态变化，全部任务结束后发送 end 事件并关闭；
+    只指定 status 或不指定过滤条件时持续推送匹配的事件。事件来自 Redis pub/sub 广播，不再查询数据库列表。
+    客户端消费过慢时同一任务只保留最新状态，积压超过上限时丢弃最早的事件并发送 overflow 事件；
+    按任务订阅时随后从数据库重新读取未结束任务的状态并推送已结束的任务，其余情况客户端应重新拉取任务状态。
+
+    Args:
+        task_ids: 逗号分隔的任务 ID 列表（可选）
+        batch_id: 批次 ID（可选）
+        status: 只推送该状态的事件（可选）
+        include_result: 任务结束时是否附带抓取结果
+
+    Returns:
+        StreamingResponse: text/event-stream 响应，事件类型为 status、overflow、end
+    """
+    watched = None
+    if task_ids or batch_id:
+        watched = {task_id.strip() for task_id in (task_ids or "").split(",") if task_id.strip()}
+        if batch_id:
+            batch_tasks = await amongo.tasks.find({"batch_id": batch_id}, {"task_id": 1}).to_list(None)
+            watched.update(doc["task_id"] for doc in batch_tasks)
+        if not watched:
+            raise HTTPException(status_code=404, detail="No tasks found")
+
+    # 先订阅再读取当前状态，避免错过两者之间的状态变化；按任务订阅时需要收到全部事件以判断是否结束
+    stream = task_event_service.open_stream(
+        watched, status if watched is None else None, settings.task_stream_max_pending
+    )
+    projection = {"task_id": 1, "status": 1, "error": 1}
+    if include_result:
+        projection["result"] = 1
+
+    async def load(ids) -> Dict[str, dict]:
+        docs = await amongo.tasks.find({"task_id": {"$in": list(ids)}}, projection).to_list(None)
+        return {doc["task_id"]: doc for doc in docs}
+
+    async def event_generator():
+        try:
+            remaining = None
+            if watched is not None:
+                snapshot = await load(watched)
+                remaining = set(snapshot)
+                for task_id, doc in snapshot.items():
+                    if status is None or doc["status"] == status:
+                        yield _format_sse("status", _event_payload(task_id, doc["status"], doc, include_result))
+                    if doc["status"] in FINAL_STATUSES:
+                        remaining.discard(task_id)
+
+            while remaining is None or remaining:
+                if await request.is_disconnected():
+                    return
+                events = await stream.get(settings.task_stream_keepalive)
+                if stream.dropped:
+                    yield _format_sse("overflow", {"dropped": stream.dropped})
+                    stream.dropped = 0
+                    if remaining is not None:
+                        # 丢弃的事件中可能有结束事件，从数据库重新读取仍在等待的任务，推送已结束任务的最终状态
+                        snapshot = await load(remaining)
+                        for task_id in list(remaining):
+                            doc = snapshot.get(task_id)
+                            if doc is None:
+                                # 任务已被删除，不会再有事件
+                                remaining.discard(task_id)
+                            elif doc["status"] in FINAL_STATUSES:
+                                if status is None or doc["status"] == status:
+                                    yield _format_sse("status", _event_payload(task_id, doc["status"], doc, include_result))
+                                remaining.discard(task_id)
+                        if not remaining:
+                            break
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+
+                finished = [event["task_id"] for event in events if event["status"] in FINAL_STATUSES]
+                details = await load(finished) if finished else {}
+                for event in events:
+                    task_id = event["task_id"]
+                    if status is None or event["status"] == status:
+                        yield _format_sse(
+                            "status", _event_payload(task_id, event["status"], details.get(task_id), include_result)
+                        )
+                    if remaining is not None and event["status"] in FINAL_STATUSES:
+                        remaining.discard(task_id)
+
+            yield _format_sse("end", {})
+        finally:
+            task_event_service.close_stream(stream)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/export")
+async def export_tasks(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv|parquet)$"),
+    fields: Optional[str] = None,
+    include_html: bool = False,
+    status: str = None,
+    url: str = None,
+    cached: bool = None,
+    schedule_id: str = None,
+    batch_id: str = None,
+    host: str = None,
+    host_suffix: str = None,
+    path_prefix: str = None,
+    q: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    按过滤条件流式导出任务结果
+
+    直接从数据库游标边读边输出，不整体加载结果；只读取请求的字段，默认不含 HTML 和截图。
+
+    Args:
+        fmt: 导出格式，ndjson、csv 或 parquet（需要安装 pyarrow）
+        fields: 逗号分隔的字段路径（如 task_id,url,result.metadata.title），为空时导出元数据、识别结果和拦截接口
+        include_html: 是否附带 result.html
+        status: 任务状态过滤（可选）
+        url: 目标 URL 或任务 ID 搜索（可选）
+        cached: 是否命中缓存过滤（可选）
+        schedule_id: 定时计划 ID 过滤（可选）
+        batch_id: 批次 ID 过滤（可选）
+        host: 主机名精确匹配（可选）
+        host_suffix: 域名及其子域名匹配（可选）
+        path_prefix: URL 路径前缀匹配（可选）
+        q: URL 关键词，多个关键词需全部包含（可选）
+
+    Returns:
+        StreamingResponse: 导出文件
+    """
+    query = _build_task_query(
+        status, url, cached, schedule_id, batch_id, host, host_suffix, path_prefix, q
+    )
+    try:
+        content = export_service.export(query, parse_fields(fields, include_html), fmt)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{fmt}"'}
+    )
+
+
+def _mask_params(params: Optional[dict]) -> Optional[dict]:
+    """对参数进行脱敏处理（仅脱敏代理密码，保留用户名可见）"""
+    params = (params or {}).copy()
+    if params and "proxy" in params and params["proxy"]:
+        proxy = params["proxy"].copy()
+        # 用户名通常包含重要信息（如归属地/IP），不再隐藏
+        if "password" in proxy:
+            proxy["password"] = "****"
+        params["proxy"] = proxy
+    return params
+
+
+async def _get_task_field(task_id: str, path: str) -> Any:
+    """
+    只从数据库读取任务的单个字段
+
+    Raises:
+        HTTPException: 任务不存在或该字段为空时返回 404
+    """
+    task = await amongo.tasks.find_one({"task_id": task_id}, {path: 1, "_id": 0})
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    value = task
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    if value is None:
+        raise HTTPException(status_code=404, detail=f"Task has no {path}")
+    return value
+
+
+@router.get("/{task_id}/html")
+async def get_task_html(task_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    获取任务抓取到的 HTML
+
+    以沙箱方式返回，页面中的脚本不会在本站点下执行。
+    """
+    html = await _get_task_field(task_id, "result.html")
+    return Response(
+        content=html,
+        media_type="text/html; charset=utf-8",
+        headers={"Content-Security-Policy": "sandbox", "X-Content-Type-Options": "nosniff"}
+    )
+
+
+@router.get("/{task_id}/screenshot")
+async def get_task_screenshot(task_id: str, current_user: dict = Depends(get_current_user)):
+    """获取任务截图（PNG 图片）"""
+    screenshot = await _get_task_field(task_id, "result.screenshot")
+    return Response(content=base64.b64decode(screenshot), media_type="image/png")
+
+
+@router.get("/{task_id}/visual-content")
+async def get_task_visual_content(task_id: str, current_user: dict = Depends(get_current_user)):
+    """获取任务的网页视觉块状内容"""
+    return Response(content=await _get_task_field(task_id, "result.visual_content"), media_type="text/plain; charset=utf-8")
+
+
+@router.get("/{task_id}/agent-result")
+async def get_task_agent_result(task_id: str, current_user: dict = Depends(get_current_user)):
+    """获取任务的 AI 识别结果（含提示词和 LLM 原始响应）"""
+    return FastJSONResponse(await _get_task_field(task_id, "result.agent_result"))
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: str, current_user: dict = Depends(get_current_user)):
+async def get_task(
+    task_id: str,
+    include: Optional[str] = None,
+    exclude: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     """
     获取单个任务详情
 
+    指定 include 或 exclude 时只从数据库读取需要的字段，返回的对象只包含这些字段（task_id 总是返回）。
+    例如轮询状态时使用 include=status,error；需要识别结果时使用 include=status,result.agent_result.extracted_items。
+    HTML、截图、视觉内容和 AI 识别结果也可以通过 /html、/screenshot、/visual-content、/agent-result 子资源单独获取。
+
     Args:
         task_id: 任务 ID
+        include: 逗号分隔的字段路径，只返回这些字段（可选）
+        exclude: 逗号分隔的字段路径，不返回这些字段，如 result.html,result.screenshot（可选）
 
     Returns:
-        TaskResponse: 任务详细信息
+        TaskResponse: 任务详细信息；指定 include / exclude 时为只包含所选字段的对象
 
     Raises:
         HTTPException: 任务不存在时返回 404
     """
-    task = mongo.tasks.find_one({"task_id": task_id})
+    if include or exclude:
+        projection, strip = build_projection(split_fields(include), split_fields(exclude), always=("task_id",))
+        task = await amongo.tasks.find_one({"task_id": task_id}, projection)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        for path in strip:
+            remove_path(task, path)
+        # 只返回任务详情模型中的字段，不暴露检索字段等内部字段
+        task = {key: value for key, value in task.items() if key in TaskResponse.model_fields}
+        if isinstance(task.get("params"), dict):
+            task["params"] = _mask_params(task["params"])
+        return FastJSONResponse(task)
+
+    task = await amongo.tasks.find_one({"task_id": task_id})
 
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # 对参数进行脱敏处理（仅脱敏代理密码，保留用户名可见）
-    params = task.get("params", {}).copy()
-    if params and "proxy" in params and params["proxy"]:
-        proxy = params["proxy"].copy()
-        # 用户名通常包含重要信息（如归属地/IP），不再隐藏
-        if "password" in proxy:
-            proxy["password"] = "****"
-        params["proxy"] = proxy
+    params = _mask_params(task.get("params"))
 
     return TaskResponse(
         task_id=task["task_id"],
@@ -71,45 +346,183 @@ async def get_task(task_id: str, current_user: dict = Depends(get_current_user))
         result=task.get("result"),
         error=task.get("error"),
         cached=task.get("cached", False),
+        attempts=task.get("attempts", 0),
+        next_retry_at=task.get("next_retry_at"),
+        leader_task_id=task.get("leader_task_id"),
+        expires_at=task.get("expires_at"),
+        schedule_id=task.get("schedule_id"),
+        batch_id=task.get("batch_id"),
+        callback_url=task.get("callback_url"),
         created_at=task["created_at"],
         updated_at=task["updated_at"],
         completed_at=task.get("completed_at")
     )
 
 
+def _build_task_query(
+    status: Optional[str] = None,
+    url: Optional[str] = None,
+    cached: Optional[bool] = None,
+    schedule_id: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    host: Optional[str] = None,
+    host_suffix: Optional[str] = None,
+    path_prefix: Optional[str] = None,
+    q: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    根据列表和导出接口的过滤参数构建查询条件
+
+    所有 URL 条件都落在任务写入时保存的检索字段上：
+    - url 为完整任务 ID 时按 task_id 精确匹配，以 http:// 或 https:// 开头时按 url 前缀匹配，其余文本按关键词匹配：
+      最后一个关键词按前缀匹配（边输入边搜索，如 exam 匹配 example），十六进制文本同时按任务 ID 前缀匹配
+    - host 精确匹配主机名；host_suffix 匹配该域名及其子域名，转为 host_rev 的前缀匹配
+    - path_prefix 按路径前缀匹配；q 要求 URL 包含全部关键词（url_tokens 多键索引）
+    只有文本中没有可用关键词时，才退回对 URL 和任务 ID 的模糊匹配。
+    """
+    query = {}
+    if status:
+        query["status"] = status
+
+    tokens = tokenize(q) if q else []
+    if tokens:
+        query["url_tokens"] = {"$all": tokens}
+    if url:
+        url = url.strip()
+        if ObjectId.is_valid(url):
+            query["task_id"] = url
+        elif url.lower().startswith(("http://", "https://")):
+            query["url"] = {"$regex": f"^{re.escape(url)}"}
+        else:
+            alternatives = []
+            url_tokens = tokenize(url)
+            if url_tokens:
+                # 前面的关键词精确匹配，最后一个关键词按前缀匹配（锚定的正则仍可使用 url_tokens 索引）
+                condition = {"$regex": f"^{re.escape(url_tokens[-1])}"}
+                if url_tokens[:-1]:
+                    condition["$all"] = url_tokens[:-1]
+                alternatives.append({"url_tokens": condition})
+            if TASK_ID_PREFIX.fullmatch(url.lower()):
+                alternatives.append({"task_id": {"$regex": f"^{url.lower()}"}})
+
+            if len(alternatives) == 1 and not alternatives[0].keys() & query.keys():
+                query.update(alternatives[0])
+            elif alternatives:
+                query["$or"] = alternatives
+            else:
+                query["$or"] = [
+                    {"url": {"$regex": re.escape(url), "$options": "i"}},
+                    {"task_id": {"$regex": re.escape(url), "$options": "i"}}
+                ]
+    if host:
+        query["host"] = host.strip().lower().rstrip(".")
+    if host_suffix:
+        host_rev = reverse_host(host_suffix.strip().lower().strip("."))
+        query["host_rev"] = {"$regex": f"^{re.escape(host_rev)}(\\.|$)"}
+    if path_prefix:
+        query["path"] = {"$regex": f"^{re.escape(path_prefix)}"}
+    if cached is not None:
+        query["cached"] = cached
+    if schedule_id:
+        query["schedule_id"] = schedule_id
+    if batch_id:
+        query["batch_id"] = batch_id
+    return query
+
+
+def _encode_cursor(task: Dict[str, Any]) -> str:
+    """将列表最后一条任务的 (created_at, _id) 编码为翻页游标"""
+    raw = f"{task['created_at'].isoformat()}|{task['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    将翻页游标解码为查询条件
+
+    Raises:
+        HTTPException: 游标格式无效
+    """
+    try:
+        created_at, _id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        created_at, _id = datetime.fromisoformat(created_at), ObjectId(_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": _id}}
+    ]}
+
+
+async def _count_tasks(query: Dict[str, Any]) -> int:
+    """
+    统计任务数量
+
+    无过滤条件时使用集合元数据估算；有过滤条件时精确统计并在 Redis 中缓存 TASK_COUNT_CACHE_TTL 秒，
+    翻页和刷新列表不会每次都扫描匹配的全部任务。
+    """
+    if not query:
+        return await amongo.tasks.estimated_document_count()
+
+    key = "tasks:count:" + hashlib.md5(json.dumps(query, sort_keys=True, default=str).encode()).hexdigest()
+    try:
+        cached_count = await asyncio.to_thread(redis_client.cache.get, key)
+        if cached_count is not None:
+            return int(cached_count)
+    except Exception:
+        pass
+
+    total = await amongo.tasks.count_documents(query)
+    try:
+        await asyncio.to_thread(redis_client.cache.setex, key, settings.task_count_cache_ttl, total)
+    except Exception:
+        pass
+    return total
+
+
 @router.get("/")
 async def list_tasks(
     status: str = None,
     url: str = None,
     cached: bool = None,
+    schedule_id: str = None,
+    batch_id: str = None,
+    host: str = None,
+    host_suffix: str = None,
+    path_prefix: str = None,
+    q: str = None,
     skip: int = 0,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """
     获取任务列表
 
+    按 (created_at, _id) 倒序返回。传入上一页返回的 next_cursor 时从该位置继续翻页（忽略 skip），
+    翻页耗时与页码无关；skip 仅适合浅层翻页。
+
     Args:
         status: 任务状态过滤（可选）
-        url: 目标 URL 搜索（可选，模糊匹配）
+        url: 目标 URL 或任务 ID 搜索（可选）
         cached: 是否命中缓存过滤（可选）
+        schedule_id: 定时计划 ID 过滤（可选）
+        batch_id: 批次 ID 过滤（可选）
+        host: 主机名精确匹配（可选）
+        host_suffix: 域名及其子域名匹配（可选）
+        path_prefix: URL 路径前缀匹配（可选）
+        q: URL 关键词，多个关键词需全部包含（可选）
         skip: 跳过的记录数
         limit: 返回的记录数
+        cursor: 翻页游标（可选）
 
     Returns:
-        dict: 包含总数和任务列表的字典
+        dict: 包含总数、任务列表和下一页游标（没有更多任务时为 None）的字典
     """
-    # 构建查询条件
-    query = {}
-    if status:
-        query["status"] = status
-    if url:
-        query["$or"] = [
-            {"url": {"$regex": url, "$options": "i"}},
-            {"task_id": {"$regex": url, "$options": "i"}}
-        ]
-    if cached is not None:
-        query["cached"] = cached
+    query = _build_task_query(
+        status, url, cached, schedule_id, batch_id, host, host_suffix, path_prefix, q
+    )
+    page_query = {"$and": [query, _decode_cursor(cursor)]} if cursor else query
 
     # 查询任务列表，只返回指定字段
     projection = {
@@ -127,10 +540,14 @@ async def list_tasks(
         "params.agent_enabled": 1,
         "params.agent_model_id": 1
     }
-    tasks = mongo.tasks.find(query, projection).sort("created_at", -1).skip(skip).limit(limit)
+    tasks = amongo.tasks.find(page_query, projection).sort([("created_at", -1), ("_id", -1)])
+    if not cursor:
+        tasks = tasks.skip(skip)
+    tasks = await tasks.limit(limit).to_list(None)
 
     return {
-        "total": mongo.tasks.count_documents(query),
+        "total": await _count_tasks(query),
+        "next_cursor": _encode_cursor(tasks[-1]) if len(tasks) == limit else None,
         "tasks": [
             {
                 "task_id": task["task_id"],
@@ -165,12 +582,62 @@ async def delete_task(task_id: str):
     Raises:
         HTTPException: 任务不存在时返回 404
     """
-    result = mongo.tasks.delete_one({"task_id": task_id})
-    if result.deleted_count == 0:
+    task = await amongo.tasks.find_one_and_delete(
+        {"task_id": task_id}, projection={"status": 1, "cache_key": 1, "leader_task_id": 1}
+    )
+    if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    # 处理中的任务同时中止 Worker 上的渲染
+    if task.get("status") == "processing":
+        cancel_service.request_cancel(task_id)
+    # 删除领导任务时释放租约，合并到它的跟随任务不再一直等待
+    if task.get("cache_key") and not task.get("leader_task_id"):
+        await singleflight_service.complete(task["cache_key"], task_id)
     return {"status": "success", "message": "Task deleted"}
 
 
+@router.post("/{task_id}/cancel", response_model=TaskResponse)
+async def cancel_task(task_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    取消任务
+
+    等待中的任务在出队时直接跳过；处理中的任务通过 Redis pub/sub 通知所属 Worker，
+    Worker 立即关闭页面和上下文并释放并发许可。合并到该任务的相同请求由仍在等待的任务接替执行。
+
+    Args:
+        task_id: 任务 ID
+
+    Returns:
+        TaskResponse: 取消后的任务信息
+
+    Raises:
+        HTTPException: 任务不存在时返回 404，任务已结束时返回 409
+    """
+    now = datetime.now()
+    task = await amongo.tasks.find_one_and_update(
+        {"task_id": task_id, "status": {"$in": ["pending", "processing"]}},
+        {"$set": {
+            "status": "cancelled",
+            "error": {"message": "Task cancelled by user", "type": "TaskCancelled"},
+            "next_retry_at": None,
+            "updated_at": now,
+            "completed_at": now
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+    if not task:
+        existing = await amongo.tasks.find_one({"task_id": task_id}, {"status": 1})
+        if not existing:
+            raise HTTPException(status_code=404, detail="Task not found")
+        raise HTTPException(status_code=409, detail=f"Task already {existing['status']}")
+
+    cancel_service.request_cancel(task_id)
+    task_event_service.publish("cancelled", task_id)
+    if task.get("cache_key") and not task.get("leader_task_id"):
+        await singleflight_service.complete(task["cache_key"], task_id)
+    return await get_task(task_id, current_user=current_user)
+
+
 @router.post("/{task_id}/retry", response_model=TaskResponse)
 async def retry_task(
     task_id: str, 
@@ -194,7 +661,7 @@ async def retry_task(
         HTTPException: 任务不存在或重入队失败
     """
     # 1. 查找现有任务
-    task = mongo.tasks.find_one({"task_id": task_id})
+    task = await amongo.tasks.find_one({"task_id": task_id})
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
@@ -229,7 +696,7 @@ async def retry_task(
                 "updated_at": now,
                 "completed_at": cached_result.get("completed_at") or now
             }
-            mongo.tasks.update_one({"task_id": task_id}, {"$set": update_data})
+            await amongo.tasks.update_one({"task_id": task_id}, {"$set": update_data})
             
             return TaskResponse(
                 task_id=task_id,
@@ -257,10 +724,15 @@ async def retry_task(
         "agent_cached": False,
         "updated_at": now,
         "completed_at": None,
-        "node_id": None
+        "node_id": None,
+        "attempts": 0,
+        "next_retry_at": None,
+        "leader_task_id": None,
+        "expires_at": None,
+        "callback_pending": bool(task.get("callback_url"))
     }
 
-    mongo.tasks.update_one({"task_id": task_id}, {"$set": update_data})
+    await amongo.tasks.update_one({"task_id": task_id}, {"$set": update_data})
 
     # 4. 重新提交到队列
     queue_task = {
@@ -271,9 +743,9 @@ async def retry_task(
         "priority": task.get("priority", 1)
     }
 
-    if not rabbitmq_service.publish_task(queue_task):
+    if not await queue_service.publish_task(queue_task):
         # 如果发布失败，尝试将状态改回失败（但不抛出异常，因为状态更新本身可能失败）
-        mongo.tasks.update_one(
+        await amongo.tasks.update_one(
             {"task_id": task_id},
             {"$set": {"status": "failed", "error": {"message": "Failed to re-queue task"}}}
         )
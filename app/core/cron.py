@@ -0,0 +1,124 @@
+"""
+Cron 表达式解析模块
+
+支持标准的 5 段 cron 表达式（分 时 日 月 周），每段可使用 *、数字、范围 a-b、步长 */n 或 a-b/n 以及逗号分隔的列表。
+周字段中 0 和 7 均表示周日。与常见 cron 实现一致，日和周字段都受限时满足其一即可。
+"""
+from datetime import datetime, timedelta
+from typing import Set
+
+# 各字段的取值范围 (最小值, 最大值)
+FIELD_RANGES = (
+    (0, 59),  # 分
+    (0, 23),  # 时
+    (1, 31),  # 日
+    (1, 12),  # 月
+    (0, 7),  # 周（0 和 7 均为周日）
+)
+
+# 查找下一次执行时间时最多向后搜索的天数
+MAX_SEARCH_DAYS = 366 * 5
+
+
+def _parse_field(field: str, minimum: int, maximum: int) -> Set[int]:
+    """
+    解析单个 cron 字段
+
+    Args:
+        field: 字段文本
+        minimum: 最小值
+        maximum: 最大值
+
+    Returns:
+        Set[int]: 允许的取值集合
+    """
+    values = set()
+    for part in field.split(","):
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Invalid step in cron field: {field}")
+        else:
+            step = 1
+
+        if part == "*":
+            start, end = minimum, maximum
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = maximum
+
+        if start < minimum or end > maximum or start > end:
+            raise ValueError(f"Cron field out of range [{minimum}-{maximum}]: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """Cron 表达式"""
+
+    def __init__(self, expression: str):
+        """
+        Args:
+            expression: 5 段 cron 表达式，如 "*/15 * * * *"
+
+        Raises:
+            ValueError: 表达式格式错误
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression}")
+        try:
+            parsed = [_parse_field(field, *bounds) for field, bounds in zip(fields, FIELD_RANGES)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression '{expression}': {e}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # 统一为 Python 的 weekday（周一为 0）
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        self._day_restricted = fields[2] != "*"
+        self._weekday_restricted = fields[4] != "*"
+
+    def _match_day(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        weekday_match = moment.weekday() in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        计算严格晚于指定时间的下一次执行时间
+
+        Args:
+            moment: 起始时间
+
+        Returns:
+            datetime: 下一次执行时间（精确到分钟）
+
+        Raises:
+            ValueError: 表达式在搜索范围内没有可执行的时间（如 2 月 30 日）
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=MAX_SEARCH_DAYS)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                # 跳到下个月的第一天
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._match_day(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Cron expression never fires: {self.expression}")
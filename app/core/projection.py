@@ -0,0 +1,66 @@
+"""
+字段投影模块
+
+将接口的 include / exclude 字段参数转换为数据库投影，只从数据库读取需要的字段。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def split_fields(fields: Optional[str]) -> List[str]:
+    """
+    解析逗号分隔的字段路径
+
+    同时出现父字段和子字段时只保留父字段，避免数据库投影路径冲突。
+
+    Args:
+        fields: 逗号分隔的点号路径，如 "status,result.metadata"
+
+    Returns:
+        List[str]: 去重后的字段路径，保持原顺序
+    """
+    requested = [field.strip() for field in (fields or "").split(",")]
+    result = []
+    for field in requested:
+        if not field or field == "_id" or field in result:
+            continue
+        if any(field.startswith(f"{other}.") for other in requested if other and other != field):
+            continue
+        result.append(field)
+    return result
+
+
+def build_projection(include: Iterable[str], exclude: Iterable[str],
+                     always: Iterable[str] = ()) -> Tuple[Dict[str, int], List[str]]:
+    """
+    根据 include / exclude 构建数据库投影
+
+    数据库投影不能同时包含和排除字段：同时指定时按 include 读取，再由调用方用 remove_path 去掉 exclude 中的子字段。
+
+    Args:
+        include: 只返回的字段路径
+        exclude: 不返回的字段路径
+        always: 指定 include 时总是返回的字段
+
+    Returns:
+        tuple: (数据库投影, 读取后仍需去掉的字段路径)
+    """
+    include, exclude = list(include), list(exclude)
+    if include:
+        projection = {field: 1 for field in split_fields(",".join([*always, *include]))}
+        projection["_id"] = 0
+        return projection, exclude
+
+    projection = {field: 0 for field in exclude}
+    projection["_id"] = 0
+    return projection, []
+
+
+def remove_path(doc: Dict[str, Any], path: str):
+    """按点号路径删除嵌套字段（原地修改，字段不存在时忽略）"""
+    *parents, last = path.split(".")
+    for key in parents:
+        doc = doc.get(key) if isinstance(doc, dict) else None
+        if doc is None:
+            return
+    if isinstance(doc, dict):
+        doc.pop(last, None)
@@ -0,0 +1,187 @@
+"""
+响应编码模块
+
+- FastJSONResponse：安装了可选依赖 orjson 时用 orjson 序列化，否则使用标准库 json
+- CompressionMiddleware：按 Accept-Encoding 协商压缩响应，支持 zstd（需要 zstandard）、br（需要 brotli）和 gzip，
+  流式响应逐块压缩并刷新，不会等待全部内容
+"""
+import json
+import re
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 不压缩的响应类型：事件流需要立即送达，图片和 Parquet 本身已经压缩
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "image/", "application/vnd.apache.parquet", "application/zip")
+
+
+def _default(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON 响应，datetime 转换为 ISO 格式，ObjectId 等其他类型转换为字符串"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class _GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+
+def available_encodings() -> Dict[str, type]:
+    """按服务端优先顺序返回可用的压缩编码"""
+    encodings = {}
+    if zstandard is not None:
+        encodings["zstd"] = _ZstdEncoder
+    if brotli is not None:
+        encodings["br"] = _BrotliEncoder
+    encodings["gzip"] = _GzipEncoder
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择压缩编码
+
+    Args:
+        accept_encoding: 请求的 Accept-Encoding 头
+        encodings: 服务端可用的编码，按优先顺序排列
+
+    Returns:
+        Optional[str]: 选中的编码，客户端不接受任何可用编码时返回 None
+    """
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        match = re.search(r"q=([0-9.]+)", params)
+        try:
+            weights[name.strip()] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            continue
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 协商压缩响应的 ASGI 中间件"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        """
+        Args:
+            app: 下游 ASGI 应用
+            minimum_size: 小于该字节数的非流式响应不压缩
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), list(self.encodings))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "").lower()
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 206, 304)
+                    or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+                )
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not passthrough:
+                    headers.add_vary_header("Accept-Encoding")
+                if passthrough or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                else:
+                    encoder = self.encodings[encoding]()
+                    headers["Content-Encoding"] = encoding
+                    if "content-length" in headers:
+                        del headers["Content-Length"]
+                    body = encoder.compress(body, final=not more_body)
+                    if not more_body:
+                        headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+            elif encoder is not None:
+                body = encoder.compress(body, final=not more_body)
+
+            if not passthrough:
+                message["body"] = body
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -182,7 +182,7 @@ class Scraper:
                     # 交互完成后再次等待网络空闲，确保内容加载完毕
                     try:
                         await page.wait_for_load_state("networkidle", timeout=5000)
-                    except:
+                    except Exception:
                         pass
 
                 # 获取页面 HTML
@@ -202,7 +202,7 @@ class Scraper:
                     else:
                         # 如果 response 为空（超时），尝试从 main_frame 获取
                         status_code = 200  # 默认为 200，因为我们能拿到内容
-                except:
+                except Exception:
                     pass
 
                 # 可选：截图
@@ -213,7 +213,7 @@ class Scraper:
                         is_fullscreen = params.get("is_fullscreen", False)
                         screenshot_bytes = await page.screenshot(full_page=is_fullscreen)
                         screenshot = base64.b64encode(screenshot_bytes).decode()
-                    except:
+                    except Exception:
                         pass
                 
                 # 提取视觉块状内容 (用于 AI 识别和缓存)
@@ -404,7 +404,7 @@ class Scraper:
                             temp_agent = await get_llm_agent(used_model_id)
                             if temp_agent:
                                 used_model_name = temp_agent.model_name or used_model_id
-                        except:
+                        except Exception:
                             pass
                     
                     agent_result = {
@@ -550,7 +550,7 @@ class Scraper:
                         try:
                             json_data = await response.json()
                             response_data["body"] = json_data
-                        except:
+                        except Exception:
                             response_data["body"] = await response.text()
                     else:
                         # 非 JSON 响应，存储文本内容
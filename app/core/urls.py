@@ -0,0 +1,121 @@
+"""
+URL 规范化模块
+
+将等价的 URL 统一为同一形式，用于批量导入时去重：协议和主机名小写、去掉默认端口和片段、空路径补为 "/"。
+查询参数保持原顺序，参数顺序不同的 URL 视为不同页面。
+
+同时提供任务的 URL 检索字段：主机名、按标签反转的主机名（把后缀匹配转为可走索引的前缀匹配）、路径和关键词。
+"""
+import hashlib
+import re
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlsplit, urlunsplit
+
+# 各协议的默认端口
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    规范化 URL
+
+    Args:
+        url: 原始 URL
+
+    Returns:
+        Optional[str]: 规范化后的 URL；不是有效的 http/https 地址时返回 None
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except (ValueError, AttributeError):
+        return None
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if scheme not in DEFAULT_PORTS or not host:
+        return None
+
+    netloc = f"[{host}]" if ":" in host else host
+    if parts.username is not None:
+        userinfo = parts.username + (f":{parts.password}" if parts.password is not None else "")
+        netloc = f"{userinfo}@{netloc}"
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def url_fingerprint(url: str) -> str:
+    """
+    计算规范化 URL 的短指纹，用于大批量去重时节省内存
+
+    Args:
+        url: 规范化后的 URL
+
+    Returns:
+        str: 16 位十六进制指纹
+    """
+    return hashlib.blake2b(url.encode(), digest_size=8).hexdigest()
+
+
+# 关键词的最大数量，避免超长 URL 产生过大的多键索引条目
+MAX_URL_TOKENS = 64
+
+# 不作为关键词的常见片段
+IGNORED_TOKENS = {"http", "https", "www"}
+
+
+def reverse_host(host: str) -> str:
+    """
+    按标签反转主机名，如 www.example.com -> com.example.www
+
+    Args:
+        host: 小写主机名
+
+    Returns:
+        str: 反转后的主机名
+    """
+    return ".".join(reversed(host.split(".")))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将 URL 或搜索文本拆分为小写关键词（字母和数字组成的片段）
+
+    Args:
+        text: URL 或搜索文本
+
+    Returns:
+        List[str]: 去重后的关键词，保持出现顺序
+    """
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(token) > 1 and token not in IGNORED_TOKENS and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def url_search_fields(url: str) -> Dict[str, Any]:
+    """
+    生成任务的 URL 检索字段，在任务写入数据库时一并保存
+
+    Args:
+        url: 任务 URL
+
+    Returns:
+        dict: host、host_rev、path、url_tokens 字段；URL 无法解析时为空字典
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except (ValueError, AttributeError):
+        return {}
+    host = (parts.hostname or "").rstrip(".")
+    if not host:
+        return {}
+    return {
+        "host": host,
+        "host_rev": reverse_host(host),
+        "path": parts.path or "/",
+        "url_tokens": tokenize(f"{host} {parts.path} {parts.query}")[:MAX_URL_TOKENS],
+    }
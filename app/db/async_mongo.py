@@ -0,0 +1,189 @@
+"""
+MongoDB 异步连接管理模块
+
+API 路由在事件循环中运行，通过本模块访问数据库，查询期间不会阻塞其他请求：
+
+- 连接 MongoDB 时使用 motor（AsyncIOMotorClient），连接池大小由 MONGO_MAX_POOL_SIZE 等配置控制
+- 单机模式下将 SQLite 文档存储的调用放到线程中执行，对外提供与 motor 相同的协程接口
+
+集合接口与 motor 一致：find / aggregate 返回游标，通过 await cursor.to_list(None) 读取结果，其余方法均需 await。
+"""
+import asyncio
+import functools
+from typing import Any, Callable, List, Optional
+
+from app.core.config import settings
+
+
+class _ThreadedCursor:
+    """文档存储游标的异步包装，排序和分页在读取时一并在线程中执行"""
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._operations = []
+
+    def sort(self, *args, **kwargs) -> "_ThreadedCursor":
+        self._operations.append(("sort", args, kwargs))
+        return self
+
+    def skip(self, *args, **kwargs) -> "_ThreadedCursor":
+        self._operations.append(("skip", args, kwargs))
+        return self
+
+    def limit(self, *args, **kwargs) -> "_ThreadedCursor":
+        self._operations.append(("limit", args, kwargs))
+        return self
+
+    def _evaluate(self, length: Optional[int]) -> List[dict]:
+        cursor = self._factory()
+        for name, args, kwargs in self._operations:
+            cursor = getattr(cursor, name)(*args, **kwargs)
+        return cursor.to_list(length)
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        return await asyncio.to_thread(self._evaluate, length)
+
+
+class _ThreadedCollection:
+    """文档存储集合的异步包装"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs) -> _ThreadedCursor:
+        return _ThreadedCursor(functools.partial(self._collection.find, *args, **kwargs))
+
+    def aggregate(self, *args, **kwargs) -> _ThreadedCursor:
+        return _ThreadedCursor(functools.partial(self._collection.aggregate, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+class _ThreadedDatabase:
+    """文档存储的异步包装"""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, name: str) -> _ThreadedCollection:
+        return _ThreadedCollection(self._store[name])
+
+    def __getattr__(self, name: str) -> _ThreadedCollection:
+        return self[name]
+
+
+class AsyncMongoDB:
+    """MongoDB 异步单例连接管理类"""
+
+    _instance = None  # 单例实例
+    _client = None  # motor 客户端
+    _db = None  # 异步数据库实例
+
+    def __new__(cls):
+        """实现单例模式"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def connect(self):
+        """
+        连接到 MongoDB（需在事件循环中调用，motor 客户端绑定到当前事件循环）
+
+        Returns:
+            异步数据库实例
+        """
+        if self._db is None:
+            if settings.standalone_mode:
+                from app.db.mongo import mongo
+                self._db = _ThreadedDatabase(mongo.db)
+            else:
+                from motor.motor_asyncio import AsyncIOMotorClient
+                self._client = AsyncIOMotorClient(
+                    settings.mongo_uri,
+                    maxPoolSize=settings.mongo_max_pool_size,
+                    minPoolSize=settings.mongo_min_pool_size,
+                    maxIdleTimeMS=settings.mongo_max_idle_time_ms,
+                    waitQueueTimeoutMS=settings.mongo_wait_queue_timeout_ms,
+                    serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+                )
+                self._db = self._client[settings.mongo_db]
+        return self._db
+
+    def close(self):
+        """关闭 MongoDB 连接"""
+        if self._client:
+            self._client.close()
+            self._client = None
+        self._db = None
+
+    @property
+    def db(self):
+        """获取异步数据库实例，如果未连接则自动连接"""
+        if self._db is None:
+            self.connect()
+        return self._db
+
+    @property
+    def tasks(self):
+        """tasks 集合"""
+        return self.db.tasks
+
+    @property
+    def task_stats(self):
+        """task_stats 集合"""
+        return self.db.task_stats
+
+    @property
+    def nodes(self):
+        """nodes 集合"""
+        return self.db.nodes
+
+    @property
+    def llm_models(self):
+        """llm_models 集合"""
+        return self.db.llm_models
+
+    @property
+    def prompt_templates(self):
+        """prompt_templates 集合"""
+        return self.db.prompt_templates
+
+    @property
+    def proxies(self):
+        """proxies 集合"""
+        return self.db.proxies
+
+    @property
+    def schedules(self):
+        """schedules 集合"""
+        return self.db.schedules
+
+    @property
+    def jobs(self):
+        """jobs 集合"""
+        return self.db.jobs
+
+    @property
+    def skills(self):
+        """skills 集合"""
+        return self.db.skills
+
+    @property
+    def skill_bundles(self):
+        """skill_bundles 集合"""
+        return self.db.skill_bundles
+
+    @property
+    def webhook_deliveries(self):
+        """webhook_deliveries 集合"""
+        return self.db.webhook_deliveries
+
+
+# 全局 MongoDB 异步实例
+amongo = AsyncMongoDB()
@@ -0,0 +1,817 @@
+"""
+SQLite 文档存储模块
+
+单机模式下替代 MongoDB：每个集合对应一张 SQLite 表，文档以 BSON 保存，
+实现本项目用到的 pymongo 集合接口子集（查询、更新、批量写入、投影、排序分页、计数和常用聚合阶段）。
+
+查询条件在 Python 中求值，仅对 _id 和各集合的业务主键（如 tasks.task_id）的等值 / $in 条件走索引，
+适用于单机开发、性能分析和小规模部署。
+"""
+import re
+import sqlite3
+import threading
+from copy import deepcopy
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import bson
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+# 各集合的业务主键，对其等值查询会使用索引列
+KEY_FIELDS = {
+    "tasks": "task_id",
+    "nodes": "node_id",
+    "jobs": "job_id",
+}
+
+_MISSING = object()
+
+
+def _get_path(doc: Any, path: str) -> Any:
+    """按点号路径取值，不存在时返回 _MISSING"""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _set_path(doc: dict, path: str, value: Any):
+    """按点号路径赋值，自动创建中间的子文档"""
+    parts = path.split(".")
+    target = doc
+    for part in parts[:-1]:
+        child = target.get(part)
+        if not isinstance(child, dict):
+            child = {}
+            target[part] = child
+        target = child
+    target[parts[-1]] = value
+
+
+def _unset_path(doc: dict, path: str):
+    """按点号路径删除字段"""
+    parts = path.split(".")
+    target = doc
+    for part in parts[:-1]:
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return
+    target.pop(parts[-1], None)
+
+
+def _equals(value: Any, target: Any) -> bool:
+    """Mongo 等值语义：缺失字段等于 None，数组字段包含目标值即视为相等"""
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return target in value
+    return value == target
+
+
+def _compare(value: Any, target: Any, op) -> bool:
+    if value is _MISSING or value is None or target is None:
+        return False
+    try:
+        return op(value, target)
+    except TypeError:
+        return False
+
+
+def _regex_flags(options: str) -> int:
+    flags = 0
+    for option, flag in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE)):
+        if option in (options or ""):
+            flags |= flag
+    return flags
+
+
+def _match_operators(value: Any, condition: dict) -> bool:
+    """对字段值求值操作符条件，如 {"$gte": 1, "$lt": 5}"""
+    for op, arg in condition.items():
+        if op == "$eq":
+            matched = _equals(value, arg)
+        elif op == "$ne":
+            matched = not _equals(value, arg)
+        elif op == "$gt":
+            matched = _compare(value, arg, lambda a, b: a > b)
+        elif op == "$gte":
+            matched = _compare(value, arg, lambda a, b: a >= b)
+        elif op == "$lt":
+            matched = _compare(value, arg, lambda a, b: a < b)
+        elif op == "$lte":
+            matched = _compare(value, arg, lambda a, b: a <= b)
+        elif op == "$in":
+            matched = any(_equals(value, item) for item in arg)
+        elif op == "$nin":
+            matched = not any(_equals(value, item) for item in arg)
+        elif op == "$all":
+            matched = all(_equals(value, item) for item in arg)
+        elif op == "$exists":
+            matched = (value is not _MISSING) == bool(arg)
+        elif op == "$regex":
+            pattern = arg if isinstance(arg, re.Pattern) else re.compile(arg, _regex_flags(condition.get("$options")))
+            # 数组字段任一元素匹配即可（与 Mongo 语义一致）
+            matched = any(
+                isinstance(item, str) and pattern.search(item) is not None
+                for item in (value if isinstance(value, list) else [value])
+            )
+        elif op == "$options":
+            continue
+        elif op == "$not":
+            matched = not _match_value(value, arg)
+        elif op == "$size":
+            matched = isinstance(value, list) and len(value) == arg
+        else:
+            raise NotImplementedError(f"Unsupported query operator: {op}")
+        if not matched:
+            return False
+    return True
+
+
+def _match_value(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        return _match_operators(value, condition)
+    if isinstance(condition, re.Pattern):
+        return isinstance(value, str) and condition.search(value) is not None
+    return _equals(value, condition)
+
+
+def match_document(doc: dict, query: Optional[dict]) -> bool:
+    """
+    判断文档是否满足 Mongo 风格的查询条件
+
+    Args:
+        doc: 文档
+        query: 查询条件
+
+    Returns:
+        bool: 是否匹配
+    """
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(match_document(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(match_document(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(match_document(doc, sub) for sub in condition):
+                return False
+        elif not _match_value(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def apply_update(doc: dict, update: dict, is_insert: bool = False) -> dict:
+    """
+    将 Mongo 风格的更新操作应用到文档上（原地修改）
+
+    Args:
+        doc: 文档
+        update: 更新操作，如 {"$set": {...}, "$inc": {...}}
+        is_insert: 是否为 upsert 新建的文档（决定 $setOnInsert 是否生效）
+
+    Returns:
+        dict: 修改后的文档
+    """
+    for op, fields in update.items():
+        if op == "$set":
+            for path, value in fields.items():
+                _set_path(doc, path, deepcopy(value))
+        elif op == "$unset":
+            for path in fields:
+                _unset_path(doc, path)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING or current is None else current) + amount)
+        elif op == "$setOnInsert":
+            if is_insert:
+                for path, value in fields.items():
+                    _set_path(doc, path, deepcopy(value))
+        elif op == "$push":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                if isinstance(value, dict) and "$each" in value:
+                    items.extend(deepcopy(value["$each"]))
+                else:
+                    items.append(deepcopy(value))
+                _set_path(doc, path, items)
+        elif op == "$addToSet":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                if value not in items:
+                    items.append(deepcopy(value))
+                _set_path(doc, path, items)
+        elif op == "$pull":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                if isinstance(current, list):
+                    _set_path(doc, path, [item for item in current if not _match_value(item, value)])
+        elif op == "$min" or op == "$max":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                if current is _MISSING or current is None or (value < current if op == "$min" else value > current):
+                    _set_path(doc, path, value)
+        else:
+            raise NotImplementedError(f"Unsupported update operator: {op}")
+    return doc
+
+
+def apply_projection(doc: dict, projection: Optional[Any]) -> dict:
+    """
+    按投影返回文档副本，支持包含 / 排除两种模式
+
+    Args:
+        doc: 文档
+        projection: 投影，dict 或字段名列表
+
+    Returns:
+        dict: 投影后的文档
+    """
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+
+    include_id = bool(projection.get("_id", 1))
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(fields.values()):
+        result = {}
+        for path in fields:
+            value = _get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+        if include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+
+    result = deepcopy(doc)
+    for path, value in fields.items():
+        if not value:
+            _unset_path(result, path)
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _sort_key(value: Any):
+    """Mongo 排序中缺失和 None 最小，其余按类型分组后比较"""
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (3, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (4, value)
+    if isinstance(value, ObjectId):
+        return (5, str(value))
+    return (6, str(value))
+
+
+def sort_documents(docs: List[dict], sort: List[Tuple[str, int]]) -> List[dict]:
+    """按多个字段稳定排序"""
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda doc: _sort_key(_get_path(doc, field)), reverse=direction < 0)
+    return docs
+
+
+def _normalize_sort(key_or_list, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(key, value) for key, value in key_or_list]
+
+
+# 聚合表达式
+
+
+def evaluate_expression(doc: dict, expr: Any) -> Any:
+    """
+    对文档求值聚合表达式，支持字段引用和常用操作符
+
+    Args:
+        doc: 文档
+        expr: 表达式
+
+    Returns:
+        Any: 求值结果
+    """
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get_path(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, list):
+        return [evaluate_expression(doc, item) for item in expr]
+    if not isinstance(expr, dict) or not expr:
+        return expr
+
+    op, arg = next(iter(expr.items()))
+    if not op.startswith("$"):
+        return {key: evaluate_expression(doc, value) for key, value in expr.items()}
+
+    if op == "$cond":
+        if isinstance(arg, dict):
+            condition, then, otherwise = arg["if"], arg["then"], arg["else"]
+        else:
+            condition, then, otherwise = arg
+        return evaluate_expression(doc, then if evaluate_expression(doc, condition) else otherwise)
+    if op == "$ifNull":
+        for item in arg:
+            value = evaluate_expression(doc, item)
+            if value is not None:
+                return value
+        return None
+    if op == "$dateToString":
+        date = evaluate_expression(doc, arg["date"])
+        return date.strftime(arg.get("format", "%Y-%m-%dT%H:%M:%S.%LZ").replace("%L", "000")) if date else None
+    if op == "$literal":
+        return arg
+
+    values = [evaluate_expression(doc, item) for item in (arg if isinstance(arg, list) else [arg])]
+    if op == "$eq":
+        return values[0] == values[1]
+    if op == "$ne":
+        return values[0] != values[1]
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        compare = {"$gt": lambda a, b: a > b, "$gte": lambda a, b: a >= b,
+                   "$lt": lambda a, b: a < b, "$lte": lambda a, b: a <= b}[op]
+        return _compare(values[0], values[1], compare)
+    if op == "$in":
+        return values[0] in (values[1] or [])
+    if op == "$and":
+        return all(values)
+    if op == "$or":
+        return any(values)
+    if op == "$not":
+        return not values[0]
+    if op == "$add":
+        return sum(value or 0 for value in values)
+    if op == "$subtract":
+        return (values[0] or 0) - (values[1] or 0)
+    if op == "$multiply":
+        result = 1
+        for value in values:
+            result *= value or 0
+        return result
+    if op == "$divide":
+        return values[0] / values[1] if values[1] else None
+    if op == "$size":
+        return len(values[0] or [])
+    if op == "$toString":
+        return None if values[0] is None else str(values[0])
+    raise NotImplementedError(f"Unsupported aggregation operator: {op}")
+
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    """执行 $group 阶段"""
+    groups: Dict[Any, dict] = {}
+    order = []
+    for doc in docs:
+        group_id = evaluate_expression(doc, spec["_id"])
+        key = bson.encode({"k": group_id}) if isinstance(group_id, dict) else group_id
+        if key not in groups:
+            groups[key] = {"_id": group_id, "__count": {}}
+            order.append(key)
+        group = groups[key]
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op, expr = next(iter(accumulator.items()))
+            value = evaluate_expression(doc, expr)
+            current = group.get(field)
+            if op == "$sum":
+                group[field] = (current or 0) + (value if isinstance(value, (int, float)) else 0)
+            elif op == "$avg":
+                if isinstance(value, (int, float)):
+                    count = group["__count"].get(field, 0)
+                    group[field] = ((current or 0) * count + value) / (count + 1)
+                    group["__count"][field] = count + 1
+            elif op == "$min":
+                if value is not None and (current is None or value < current):
+                    group[field] = value
+            elif op == "$max":
+                if value is not None and (current is None or value > current):
+                    group[field] = value
+            elif op == "$first":
+                group.setdefault(field, value)
+            elif op == "$last":
+                group[field] = value
+            elif op == "$push":
+                group.setdefault(field, []).append(value)
+            elif op == "$addToSet":
+                items = group.setdefault(field, [])
+                if value not in items:
+                    items.append(value)
+            else:
+                raise NotImplementedError(f"Unsupported group accumulator: {op}")
+    results = []
+    for key in order:
+        group = groups[key]
+        group.pop("__count")
+        results.append(group)
+    return results
+
+
+class DocumentCursor:
+    """查询游标，支持 sort / skip / limit 和迭代"""
+
+    def __init__(self, collection: "DocumentCollection", query: Optional[dict], projection: Any = None):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[dict]] = None
+
+    def sort(self, key_or_list, direction: Optional[int] = None) -> "DocumentCursor":
+        self._sort.extend(_normalize_sort(key_or_list, direction))
+        return self
+
+    def skip(self, skip: int) -> "DocumentCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "DocumentCursor":
+        self._limit = limit
+        return self
+
+    def _evaluate(self) -> List[dict]:
+        if self._results is None:
+            docs = self._collection._find_documents(self._query)
+            if self._sort:
+                sort_documents(docs, self._sort)
+            docs = docs[self._skip:]
+            if self._limit:
+                docs = docs[:self._limit]
+            self._results = [apply_projection(doc, self._projection) for doc in docs]
+        return self._results
+
+    def __iter__(self):
+        return iter(self._evaluate())
+
+    def to_list(self, length: Optional[int] = None) -> List[dict]:
+        results = self._evaluate()
+        return list(results if length is None else results[:length])
+
+    def close(self):
+        self._results = []
+
+
+class DocumentCollection:
+    """SQLite 表对应的集合，接口与 pymongo Collection 的常用子集一致"""
+
+    def __init__(self, store: "DocumentStore", name: str):
+        self._store = store
+        self.name = name
+        self._key_field = KEY_FIELDS.get(name)
+        self._ensure_table()
+
+    def _ensure_table(self):
+        with self._store._lock:
+            self._store._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.name}" (_id TEXT PRIMARY KEY, key TEXT, doc BLOB NOT NULL)'
+            )
+            self._store._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{self.name}_key" ON "{self.name}" (key)'
+            )
+
+    # 内部读写
+
+    def _key_of(self, doc: dict) -> Optional[str]:
+        if not self._key_field:
+            return None
+        value = doc.get(self._key_field)
+        return None if value is None else str(value)
+
+    def _candidate_rows(self, query: Optional[dict]) -> Iterable[Tuple[bytes]]:
+        """根据 _id 或业务主键的等值 / $in 条件缩小扫描范围"""
+        conn = self._store._conn
+        for field, column in (("_id", "_id"), (self._key_field, "key")):
+            if not field or not query or field not in query:
+                continue
+            condition = query[field]
+            if isinstance(condition, dict) and set(condition) == {"$in"}:
+                values = [str(value) for value in condition["$in"]]
+                if not values:
+                    return []
+                placeholders = ",".join("?" * len(values))
+                return conn.execute(f'SELECT doc FROM "{self.name}" WHERE {column} IN ({placeholders})', values)
+            if not isinstance(condition, dict) and condition is not None:
+                return conn.execute(f'SELECT doc FROM "{self.name}" WHERE {column} = ?', (str(condition),))
+        return conn.execute(f'SELECT doc FROM "{self.name}" ORDER BY rowid')
+
+    def _find_documents(self, query: Optional[dict]) -> List[dict]:
+        with self._store._lock:
+            rows = list(self._candidate_rows(query))
+        docs = (bson.decode(row[0]) for row in rows)
+        return [doc for doc in docs if match_document(doc, query)]
+
+    def _write(self, doc: dict):
+        self._store._conn.execute(
+            f'INSERT INTO "{self.name}" (_id, key, doc) VALUES (?, ?, ?) '
+            f'ON CONFLICT(_id) DO UPDATE SET key = excluded.key, doc = excluded.doc',
+            (str(doc["_id"]), self._key_of(doc), bson.encode(doc))
+        )
+
+    def _delete(self, doc: dict):
+        self._store._conn.execute(f'DELETE FROM "{self.name}" WHERE _id = ?', (str(doc["_id"]),))
+
+    # 查询
+
+    def find(self, filter: Optional[dict] = None, projection: Any = None, **kwargs) -> DocumentCursor:
+        cursor = DocumentCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("skip"):
+            cursor.skip(kwargs["skip"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    def find_one(self, filter: Optional[dict] = None, projection: Any = None, **kwargs) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        results = self.find(filter, projection, **kwargs).limit(1).to_list()
+        return results[0] if results else None
+
+    def count_documents(self, filter: Optional[dict] = None, **kwargs) -> int:
+        return len(self._find_documents(filter))
+
+    def estimated_document_count(self) -> int:
+        with self._store._lock:
+            return self._store._conn.execute(f'SELECT COUNT(*) FROM "{self.name}"').fetchone()[0]
+
+    def distinct(self, key: str, filter: Optional[dict] = None) -> List[Any]:
+        values = []
+        for doc in self._find_documents(filter):
+            value = _get_path(doc, key)
+            for item in (value if isinstance(value, list) else [value]):
+                if item is not _MISSING and item not in values:
+                    values.append(item)
+        return values
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> DocumentCursor:
+        """执行聚合管道，支持 $match / $group / $sort / $skip / $limit / $project / $count"""
+        docs = self._find_documents(pipeline[0]["$match"] if pipeline and "$match" in pipeline[0] else None)
+        for index, stage in enumerate(pipeline):
+            op, spec = next(iter(stage.items()))
+            if op == "$match":
+                if index > 0:
+                    docs = [doc for doc in docs if match_document(doc, spec)]
+            elif op == "$group":
+                docs = _group(docs, spec)
+            elif op == "$sort":
+                docs = sort_documents(docs, _normalize_sort(spec))
+            elif op == "$skip":
+                docs = docs[spec:]
+            elif op == "$limit":
+                docs = docs[:spec]
+            elif op == "$project":
+                if all(value in (0, 1, True, False) for value in spec.values()):
+                    docs = [apply_projection(doc, spec) for doc in docs]
+                else:
+                    docs = [
+                        {
+                            **({"_id": doc.get("_id")} if spec.get("_id", 1) else {}),
+                            **{
+                                field: (_get_path(doc, field) if expr in (1, True) else evaluate_expression(doc, expr))
+                                for field, expr in spec.items() if field != "_id"
+                            }
+                        }
+                        for doc in docs
+                    ]
+            elif op == "$count":
+                docs = [{spec: len(docs)}]
+            else:
+                raise NotImplementedError(f"Unsupported aggregation stage: {op}")
+        cursor = DocumentCursor(self, None)
+        cursor._results = docs
+        return cursor
+
+    # 写入
+
+    def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        with self._store._lock, self._store._conn:
+            if self._store._conn.execute(
+                f'SELECT 1 FROM "{self.name}" WHERE _id = ?', (str(document["_id"]),)
+            ).fetchone():
+                raise sqlite3.IntegrityError(f"Duplicate _id in {self.name}: {document['_id']}")
+            self._write(document)
+        return InsertOneResult(document["_id"], True)
+
+    def insert_many(self, documents: List[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        with self._store._lock, self._store._conn:
+            for document in documents:
+                document.setdefault("_id", ObjectId())
+                self._write(document)
+        return InsertManyResult([document["_id"] for document in documents], True)
+
+    def _update(self, filter: dict, update: dict, upsert: bool, multi: bool, replace: bool = False) -> Tuple[UpdateResult, Optional[dict], Optional[dict]]:
+        """执行更新，返回结果以及（单条更新时）更新前后的文档"""
+        with self._store._lock, self._store._conn:
+            docs = self._find_documents(filter)
+            if not multi:
+                docs = docs[:1]
+
+            before = after = None
+            for doc in docs:
+                before = deepcopy(doc)
+                if replace:
+                    doc = {**deepcopy(update), "_id": doc["_id"]}
+                else:
+                    apply_update(doc, update)
+                self._write(doc)
+                after = doc
+
+            upserted_id = None
+            if not docs and upsert:
+                doc = {
+                    key: deepcopy(value) for key, value in filter.items()
+                    if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value))
+                }
+                if replace:
+                    doc.update(deepcopy(update))
+                else:
+                    apply_update(doc, update, is_insert=True)
+                doc.setdefault("_id", ObjectId())
+                self._write(doc)
+                upserted_id, after = doc["_id"], doc
+
+        raw_result = {"n": len(docs) or (1 if upserted_id else 0), "nModified": len(docs), "ok": 1.0}
+        if upserted_id is not None:
+            raw_result["upserted"] = upserted_id
+        return UpdateResult(raw_result, True), before, after
+
+    def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, update, upsert, multi=False)[0]
+
+    def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, update, upsert, multi=True)[0]
+
+    def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, replacement, upsert, multi=False, replace=True)[0]
+
+    def find_one_and_update(
+        self,
+        filter: dict,
+        update: dict,
+        projection: Any = None,
+        sort: Any = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs
+    ) -> Optional[dict]:
+        if sort:
+            with self._store._lock:
+                target = self.find_one(filter, sort=_normalize_sort(sort))
+                if target is None and not upsert:
+                    return None
+                if target is not None:
+                    filter = {"_id": target["_id"]}
+                _, before, after = self._update(filter, update, upsert, multi=False)
+        else:
+            _, before, after = self._update(filter, update, upsert, multi=False)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return apply_projection(doc, projection) if doc is not None else None
+
+    def find_one_and_delete(self, filter: dict, projection: Any = None, sort: Any = None, **kwargs) -> Optional[dict]:
+        with self._store._lock, self._store._conn:
+            doc = self.find_one(filter, sort=_normalize_sort(sort) if sort else None)
+            if doc is not None:
+                self._delete(doc)
+        return apply_projection(doc, projection) if doc is not None else None
+
+    def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        with self._store._lock, self._store._conn:
+            docs = self._find_documents(filter)[:1]
+            for doc in docs:
+                self._delete(doc)
+        return DeleteResult({"n": len(docs), "ok": 1.0}, True)
+
+    def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        with self._store._lock, self._store._conn:
+            docs = self._find_documents(filter)
+            for doc in docs:
+                self._delete(doc)
+        return DeleteResult({"n": len(docs), "ok": 1.0}, True)
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        """
+        按顺序执行 pymongo 的 InsertOne / UpdateOne / UpdateMany / ReplaceOne / DeleteOne / DeleteMany 请求
+
+        与 MongoDB 一致：单条请求失败时记录到 writeErrors，ordered=True 时停止执行后续请求，
+        ordered=False 时继续执行，最后统一抛出 BulkWriteError。
+        """
+        raw_result = {
+            "writeErrors": [], "writeConcernErrors": [], "upserted": [],
+            "nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+        }
+        with self._store._lock:
+            for index, request in enumerate(requests):
+                if not isinstance(request, (InsertOne, DeleteOne, DeleteMany, ReplaceOne, UpdateOne, UpdateMany)):
+                    raise TypeError(f"Unsupported bulk write request: {type(request).__name__}")
+                try:
+                    self._bulk_write_one(index, request, raw_result)
+                except (sqlite3.IntegrityError, TypeError, ValueError) as e:
+                    raw_result["writeErrors"].append({"index": index, "code": 2, "errmsg": str(e)})
+                    if ordered:
+                        break
+        if raw_result["writeErrors"]:
+            raise BulkWriteError(raw_result)
+        return BulkWriteResult(raw_result, True)
+
+    def _bulk_write_one(self, index: int, request: Any, raw_result: dict):
+        """执行 bulk_write 中的单条请求并累加到 raw_result"""
+        if isinstance(request, InsertOne):
+            self.insert_one(request._doc)
+            raw_result["nInserted"] += 1
+            return
+        if isinstance(request, (DeleteOne, DeleteMany)):
+            delete = self.delete_one if isinstance(request, DeleteOne) else self.delete_many
+            raw_result["nRemoved"] += delete(request._filter).deleted_count
+            return
+        if isinstance(request, ReplaceOne):
+            result = self.replace_one(request._filter, request._doc, upsert=bool(request._upsert))
+        else:
+            update = self.update_one if isinstance(request, UpdateOne) else self.update_many
+            result = update(request._filter, request._doc, upsert=bool(request._upsert))
+        if result.upserted_id is not None:
+            raw_result["nUpserted"] += 1
+            raw_result["upserted"].append({"index": index, "_id": result.upserted_id})
+        else:
+            raw_result["nMatched"] += result.matched_count
+            raw_result["nModified"] += result.modified_count
+
+    # 索引（查询在 Python 中求值，索引声明仅为兼容）
+
+    def create_index(self, keys: Any, **kwargs) -> str:
+        return kwargs.get("name") or "_".join(f"{key}_{direction}" for key, direction in _normalize_sort(keys))
+
+    def create_indexes(self, indexes: List[Any], **kwargs) -> List[str]:
+        return [index.document.get("name", "") for index in indexes]
+
+    def drop(self):
+        with self._store._lock, self._store._conn:
+            self._store._conn.execute(f'DROP TABLE IF EXISTS "{self.name}"')
+        self._store._collections.pop(self.name, None)
+
+
+class DocumentStore:
+    """SQLite 文档数据库，接口与 pymongo Database 的常用子集一致"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite 数据库文件路径，":memory:" 为内存数据库
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._collections: Dict[str, DocumentCollection] = {}
+
+    def get_collection(self, name: str) -> DocumentCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = DocumentCollection(self, name)
+            return self._collections[name]
+
+    def __getitem__(self, name: str) -> DocumentCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> DocumentCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    def list_collection_names(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        return [row[0] for row in rows]
+
+    def command(self, command: Any, **kwargs) -> dict:
+        """兼容 ping 等健康检查命令"""
+        return {"ok": 1.0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
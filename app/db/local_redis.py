@@ -0,0 +1,240 @@
+"""
+进程内 Redis 替代模块
+
+单机模式下替代 Redis，实现本项目用到的命令子集（字符串、计数器、列表、集合、过期时间和管道），
+语义与 decode_responses=True 的 redis-py 客户端一致；可设置最大键数量，超出时按 LRU 淘汰
+"""
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class LocalPipeline:
+    """进程内管道：记录命令，execute 时在锁内依次执行"""
+
+    def __init__(self, client: "LocalRedis"):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+
+        def record(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+
+        return record
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        """
+        执行管道中的全部命令
+
+        Args:
+            raise_on_error: 是否在命令出错时抛出异常（否则在结果中返回异常对象）
+
+        Returns:
+            list: 各命令的结果
+        """
+        results = []
+        with self._client._lock:
+            for method, args, kwargs in self._commands:
+                try:
+                    results.append(method(*args, **kwargs))
+                except Exception as e:
+                    if raise_on_error:
+                        raise
+                    results.append(e)
+        self._commands = []
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._commands = []
+
+
+class LocalRedis:
+    """进程内 Redis 替代类（线程安全）"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: 最大键数量，为空时不限制
+        """
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _live(self, key: str) -> bool:
+        """判断键是否存在且未过期，过期则删除；访问会刷新 LRU 顺序"""
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+            return False
+        if key in self._data:
+            self._data.move_to_end(key)
+            return True
+        return False
+
+    def _store(self, key: str, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._data) > self.max_entries:
+                evicted, _ = self._data.popitem(last=False)
+                self._expires.pop(evicted, None)
+
+    # 字符串与计数器
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._data[key] if self._live(key) else None
+
+    def mget(self, keys, *args) -> List[Optional[str]]:
+        keys = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        keys.extend(args)
+        with self._lock:
+            return [self.get(key) for key in keys]
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, px: Optional[int] = None,
+            nx: bool = False, xx: bool = False) -> Optional[bool]:
+        with self._lock:
+            exists = self._live(key)
+            if (nx and exists) or (xx and not exists):
+                return None
+            self._store(key, str(value))
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            elif px is not None:
+                self._expires[key] = time.monotonic() + px / 1000
+            return True
+
+    def setex(self, key: str, time_seconds: int, value: Any) -> bool:
+        return self.set(key, value, ex=time_seconds)
+
+    def incrby(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._data[key]) + amount if self._live(key) else amount
+            self._store(key, str(value))
+            return value
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return self.incrby(key, amount)
+
+    # 通用键操作
+
+    def delete(self, *keys) -> int:
+        with self._lock:
+            count = 0
+            for key in keys:
+                if self._live(key):
+                    count += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return count
+
+    def exists(self, *keys) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._live(key))
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if not self._live(key):
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def ttl(self, key: str) -> int:
+        with self._lock:
+            if not self._live(key):
+                return -2
+            deadline = self._expires.get(key)
+            return -1 if deadline is None else max(0, int(deadline - time.monotonic()))
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        with self._lock:
+            return [key for key in list(self._data) if self._live(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    def scan_iter(self, match: str = "*", count: Optional[int] = None):
+        return iter(self.keys(match))
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            return True
+
+    def compare_and_delete(self, key: str, value: str) -> int:
+        """仅当键的值等于 value 时删除（对应 Redis 中常用的 Lua 比较删除脚本）"""
+        with self._lock:
+            if self.get(key) == value:
+                return self.delete(key)
+            return 0
+
+    def compare_and_expire(self, key: str, value: str, seconds: int) -> int:
+        """仅当键的值等于 value 时续期（对应 Redis 中常用的 Lua 比较续期脚本）"""
+        with self._lock:
+            if self.get(key) == value:
+                return int(self.expire(key, seconds))
+            return 0
+
+    # 列表
+
+    def rpush(self, key: str, *values) -> int:
+        with self._lock:
+            items = self._data[key] if self._live(key) else []
+            items.extend(str(value) for value in values)
+            self._store(key, items)
+            return len(items)
+
+    def lrange(self, key: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            if not self._live(key):
+                return []
+            items = self._data[key]
+            end = len(items) if end == -1 else end + 1
+            return list(items[start:end])
+
+    def llen(self, key: str) -> int:
+        with self._lock:
+            return len(self._data[key]) if self._live(key) else 0
+
+    # 集合
+
+    def sadd(self, key: str, *values) -> int:
+        with self._lock:
+            members = self._data[key] if self._live(key) else set()
+            before = len(members)
+            members.update(str(value) for value in values)
+            self._store(key, members)
+            return len(members) - before
+
+    def smembers(self, key: str) -> set:
+        with self._lock:
+            return set(self._data[key]) if self._live(key) else set()
+
+    def srem(self, key: str, *values) -> int:
+        with self._lock:
+            if not self._live(key):
+                return 0
+            members = self._data[key]
+            before = len(members)
+            members.difference_update(str(value) for value in values)
+            return before - len(members)
+
+    # 其他
+
+    def pipeline(self, transaction: bool = True) -> LocalPipeline:
+        return LocalPipeline(self)
+
+    def ping(self) -> bool:
+        return True
+
+    def close(self):
+        pass
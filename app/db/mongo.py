@@ -1,8 +1,10 @@
 """
 MongoDB 数据库连接管理模块
 
-提供 MongoDB 的单例连接管理，包含数据库连接、集合访问等功能
+提供 MongoDB 的单例连接管理，包含数据库连接、集合访问等功能；
+单机模式下使用 SQLite 文档存储替代
 """
+import os
 
 from pymongo import MongoClient
 from app.core.config import settings
@@ -29,8 +31,22 @@ class MongoDB:
             Database: MongoDB 数据库实例
         """
         if self._client is None:
-            self._client = MongoClient(settings.mongo_uri)
-            self._db = self._client[settings.mongo_db]
+            if settings.standalone_mode:
+                from app.db.docstore import DocumentStore
+                db_dir = os.path.dirname(settings.standalone_db_path)
+                if db_dir:
+                    os.makedirs(db_dir, exist_ok=True)
+                self._client = self._db = DocumentStore(settings.standalone_db_path)
+            else:
+                self._client = MongoClient(
+                    settings.mongo_uri,
+                    maxPoolSize=settings.mongo_max_pool_size,
+                    minPoolSize=settings.mongo_min_pool_size,
+                    maxIdleTimeMS=settings.mongo_max_idle_time_ms,
+                    waitQueueTimeoutMS=settings.mongo_wait_queue_timeout_ms,
+                    serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+                )
+                self._db = self._client[settings.mongo_db]
         return self._db
 
     def close(self):
@@ -142,6 +158,46 @@ class MongoDB:
         """
         return self.db.skill_bundles
 
+    @property
+    def schedules(self):
+        """
+        获取定时抓取计划集合
+
+        Returns:
+            Collection: schedules 集合
+        """
+        return self.db.schedules
+
+    @property
+    def webhook_deliveries(self):
+        """
+        获取回调投递队列集合
+
+        Returns:
+            Collection: webhook_deliveries 集合
+        """
+        return self.db.webhook_deliveries
+
+    @property
+    def dead_letters(self):
+        """
+        获取死信镜像集合（RabbitMQ 死信队列的只读副本，用于查看死信）
+
+        Returns:
+            Collection: dead_letters 集合
+        """
+        return self.db.dead_letters
+
+    @property
+    def jobs(self):
+        """
+        获取批量导入作业集合
+
+        Returns:
+            Collection: jobs 集合
+        """
+        return self.db.jobs
+
 
 # 全局 MongoDB 实例
 mongo = MongoDB()
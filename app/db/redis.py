@@ -1,10 +1,12 @@
 """
 Redis 连接管理模块
 
-提供 Redis 的单例连接管理，分别管理缓存和队列两个 Redis 实例
+提供 Redis 的单例连接管理，分别管理缓存和队列两个 Redis 实例；
+单机模式下使用进程内的 LocalRedis 替代
 """
 import redis
 from app.core.config import settings
+from app.db.local_redis import LocalRedis
 
 
 class RedisClient:
@@ -28,7 +30,10 @@ class RedisClient:
             Redis: Redis 客户端实例
         """
         if self._cache_client is None:
-            self._cache_client = redis.from_url(settings.redis_cache_url, decode_responses=True)
+            if settings.standalone_mode:
+                self._cache_client = LocalRedis(max_entries=settings.standalone_cache_max_entries)
+            else:
+                self._cache_client = redis.from_url(settings.redis_cache_url, decode_responses=True)
         return self._cache_client
 
     def connect_queue(self):
@@ -39,7 +44,10 @@ class RedisClient:
             Redis: Redis 客户端实例
         """
         if self._queue_client is None:
-            self._queue_client = redis.from_url(settings.redis_url, decode_responses=True)
+            if settings.standalone_mode:
+                self._queue_client = LocalRedis()
+            else:
+                self._queue_client = redis.from_url(settings.redis_url, decode_responses=True)
         return self._queue_client
 
     @property
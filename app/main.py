@@ -37,12 +37,21 @@ from app.api import (
     skills,
     skill_bundles,
     backup,
+    dead_letters,
+    schedules,
+    jobs,
 )
 from app.db.mongo import mongo
+from app.db.async_mongo import amongo
 from app.db.redis import redis_client
 from app.core.config import settings
 from app.core.logger import setup_logging
+from app.core.responses import CompressionMiddleware
 from app.services.node_manager import node_manager
+from app.services.reaper_service import reaper_service
+from app.services.scheduler_service import scheduler_service
+from app.services.webhook_service import webhook_service
+from app.services.queue_service import queue_service
 
 # 初始化日志
 setup_logging()
@@ -64,6 +73,10 @@ app.add_middleware(
     allow_headers=["*"],  # 允许所有请求头
 )
 
+# 添加响应压缩中间件（zstd / br / gzip 协商）
+if settings.response_compression_enabled:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.response_compression_min_size)
+
 
 # 添加请求日志中间件
 @app.middleware("http")
@@ -119,6 +132,9 @@ app.include_router(proxies.router)
 app.include_router(skills.router)
 app.include_router(skill_bundles.router)
 app.include_router(backup.router)
+app.include_router(dead_letters.router)
+app.include_router(schedules.router)
+app.include_router(jobs.router)
 
 
 @app.on_event("startup")
@@ -132,6 +148,7 @@ async def startup_event():
     settings.load_from_db()
 
     mongo.connect()
+    amongo.connect()
     redis_client.connect_cache()
     
     # 初始化默认管理员账号
@@ -151,10 +168,25 @@ async def startup_event():
     # 自动启动离线但状态为 running 的节点
     await node_manager.auto_start_nodes()
 
+    # 启动孤儿任务回收
+    reaper_service.start()
+
+    # 启动定时抓取调度
+    scheduler_service.start()
+
+    # 启动任务完成回调投递
+    webhook_service.start()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """应用关闭事件：清理数据库连接"""
+    """应用关闭事件：排空并停止本进程内的节点，清理数据库连接"""
+    await reaper_service.stop()
+    await scheduler_service.stop()
+    await webhook_service.stop()
+    await node_manager.shutdown()
+    await queue_service.close()
+    amongo.close()
     mongo.close()
     redis_client.close_all()
 
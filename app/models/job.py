@@ -0,0 +1,40 @@
+"""
+批量导入作业数据模型
+
+定义流式批量导入作业的状态和进度计数
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import Optional, List, Dict
+from pydantic import BaseModel, Field
+
+
+class JobStatus(str, Enum):
+    """作业状态枚举"""
+    INGESTING = "ingesting"  # 正在接收并入队
+    QUEUED = "queued"  # 全部任务已入队
+    FAILED = "failed"  # 导入中断
+
+
+class JobResponse(BaseModel):
+    """批量导入作业响应"""
+    job_id: str  # 作业 ID，同时也是作业内任务的 batch_id
+    status: JobStatus
+    format: str  # 上传格式：ndjson 或 csv
+    received: int = 0  # 已读取的记录数
+    accepted: int = 0  # 已入队的任务数
+    duplicates: int = 0  # 规范化后重复而跳过的记录数
+    invalid: int = 0  # 格式或 URL 无效而跳过的记录数
+    failed: int = 0  # 写入或入队失败的任务数
+    error: Optional[str] = None  # 导入中断的原因
+    progress: Optional[Dict[str, int]] = Field(None, description="作业内任务按状态的数量")
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+
+class JobListResponse(BaseModel):
+    """批量导入作业列表响应"""
+    items: List[JobResponse]
+    total: int
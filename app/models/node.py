@@ -4,15 +4,15 @@ from typing import Optional
 
 class NodeBase(BaseModel):
     node_id: str = Field(..., description="节点唯一ID")
-    queue_name: str = Field("task_queue", description="监听的任务队列")
-    max_concurrent: int = Field(1, description="最大并发数")
+    queue_name: str = Field("task_queue", description="监听的路由，逗号分隔；默认值表示只监听共享队列")
+    max_concurrent: int = Field(1, ge=1, description="最大并发数")
 
 class NodeCreate(NodeBase):
     pass
 
 class NodeUpdate(BaseModel):
     queue_name: Optional[str] = None
-    max_concurrent: Optional[int] = None
+    max_concurrent: Optional[int] = Field(None, ge=1)
     status: Optional[str] = None
 
 class NodeResponse(NodeBase):
@@ -0,0 +1,75 @@
+"""
+定时抓取计划数据模型
+
+定义周期性抓取计划的执行周期（cron 表达式或固定间隔）、目标 URL 列表及抓取参数
+"""
+
+from datetime import datetime
+from typing import Optional, List
+from pydantic import BaseModel, HttpUrl, Field, field_validator
+from app.core.cron import CronExpression
+from app.models.task import ScrapeParams, CacheConfig
+
+
+def _validate_cron(value: Optional[str]) -> Optional[str]:
+    if value is not None:
+        # 语法正确但永远不会触发的表达式（如 2 月 31 日）同样拒绝
+        CronExpression(value).next_after(datetime.now())
+    return value
+
+
+class ScheduleBase(BaseModel):
+    """定时抓取计划基础配置"""
+    name: str = Field(..., description="计划名称")
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=10000, description="每次执行时抓取的 URL 列表")
+    params: ScrapeParams = Field(default_factory=ScrapeParams)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    priority: int = 1
+    deadline: Optional[float] = Field(None, gt=0, description="任务期限（秒），超过后仍未开始执行的任务不再处理")
+    cron: Optional[str] = Field(None, description="5 段 cron 表达式，如 */30 * * * *，与 interval_seconds 二选一")
+    interval_seconds: Optional[int] = Field(None, ge=60, description="固定执行间隔（秒），与 cron 二选一")
+    jitter_seconds: int = Field(0, ge=0, le=3600, description="每次执行时间随机推迟的最大秒数，用于错开同一时刻到期的计划")
+    is_enabled: bool = True
+
+    _check_cron = field_validator("cron")(_validate_cron)
+
+
+class ScheduleCreate(ScheduleBase):
+    """创建定时抓取计划请求"""
+    pass
+
+
+class ScheduleUpdate(BaseModel):
+    """更新定时抓取计划请求"""
+    name: Optional[str] = None
+    urls: Optional[List[HttpUrl]] = Field(None, min_length=1, max_length=10000)
+    params: Optional[ScrapeParams] = None
+    cache: Optional[CacheConfig] = None
+    priority: Optional[int] = None
+    deadline: Optional[float] = Field(None, gt=0)
+    cron: Optional[str] = None
+    interval_seconds: Optional[int] = Field(None, ge=60)
+    jitter_seconds: Optional[int] = Field(None, ge=0, le=3600)
+    is_enabled: Optional[bool] = None
+
+    _check_cron = field_validator("cron")(_validate_cron)
+
+
+class ScheduleResponse(ScheduleBase):
+    """定时抓取计划响应"""
+    id: str = Field(alias="_id")
+    next_run_at: Optional[datetime] = None  # 下次执行时间
+    last_run_at: Optional[datetime] = None  # 上次入队时间
+    last_run_task_count: int = 0  # 上次入队的任务数量
+    skipped_runs: int = 0  # 因上次执行仍未完成而跳过的次数
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        populate_by_name = True
+
+
+class ScheduleListResponse(BaseModel):
+    """定时抓取计划列表响应"""
+    items: List[ScheduleResponse]
+    total: int
@@ -16,6 +16,7 @@ class ProxyConfig(BaseModel):
     server: str
     username: Optional[str] = None
     password: Optional[str] = None
+    region: Optional[str] = None  # 代理所在地区，用于将任务路由到同地区的节点
 
 
 class InteractionStep(BaseModel):
@@ -39,7 +40,8 @@ class ScrapeParams(BaseModel):
     viewport: Dict[str, int] = Field(
         default_factory=lambda: {"width": 1920, "height": 1080}
     )  # 视口大小
-    proxy: Optional[ProxyConfig] = None  # 代理配置 {server, username, password}
+    proxy: Optional[ProxyConfig] = None  # 代理配置 {server, username, password, region}
+    node_tags: Optional[List[str]] = None  # 指定处理该任务的节点标签（路由），按顺序尝试
     stealth: bool = True  # 是否启用反检测 (stealth)
     intercept_apis: Optional[List[str]] = None  # 要拦截的接口 URL 模式列表
     intercept_continue: bool = False  # 拦截接口后是否继续请求 (默认 False)
@@ -68,6 +70,8 @@ class ScrapeRequest(BaseModel):
     params: ScrapeParams = Field(default_factory=ScrapeParams)  # 抓取参数
     cache: CacheConfig = Field(default_factory=CacheConfig)  # 缓存配置
     priority: int = 1  # 任务优先级（数字越大优先级越高）
+    deadline: Optional[float] = Field(None, gt=0)  # 任务期限（秒），超过后仍未开始执行的任务不再处理
+    callback_url: Optional[HttpUrl] = None  # 任务结束后回调通知的地址
 
 
 class TaskMetadata(BaseModel):
@@ -108,6 +112,8 @@ class TaskStatus(str, Enum):
     PROCESSING = "processing"  # 处理中
     SUCCESS = "success"  # 成功
     FAILED = "failed"  # 失败
+    EXPIRED = "expired"  # 已过期（超过期限仍未开始执行）
+    CANCELLED = "cancelled"  # 已取消
 
 
 class TaskModel(BaseModel):
@@ -125,6 +131,13 @@ class TaskModel(BaseModel):
     html_cached: bool = False  # 是否命中网页抓取缓存
     agent_cached: bool = False  # 是否命中 AI 识别缓存
     node_id: Optional[str] = None  # 处理节点 ID
+    attempts: int = 0  # 已执行次数（含自动重试）
+    next_retry_at: Optional[datetime] = None  # 下次自动重试时间
+    leader_task_id: Optional[str] = None  # 合并到的领导任务 ID（相同任务执行中时不重复渲染）
+    expires_at: Optional[datetime] = None  # 过期时间，超过后仍未开始执行的任务不再处理
+    schedule_id: Optional[str] = None  # 创建该任务的定时计划 ID
+    batch_id: Optional[str] = None  # 所属批次 ID
+    callback_url: Optional[str] = None  # 任务结束后回调通知的地址
     created_at: datetime = Field(default_factory=datetime.now)  # 创建时间
     updated_at: datetime = Field(default_factory=datetime.now)  # 更新时间
     completed_at: Optional[datetime] = None  # 完成时间
@@ -143,6 +156,13 @@ class TaskResponse(BaseModel):
     cached: bool = False  # 是否来自缓存
     html_cached: bool = False  # 是否命中网页抓取缓存
     agent_cached: bool = False  # 是否命中 AI 识别缓存
+    attempts: int = 0  # 已执行次数（含自动重试）
+    next_retry_at: Optional[datetime] = None  # 下次自动重试时间
+    leader_task_id: Optional[str] = None  # 合并到的领导任务 ID（相同任务执行中时不重复渲染）
+    expires_at: Optional[datetime] = None  # 过期时间，超过后仍未开始执行的任务不再处理
+    schedule_id: Optional[str] = None  # 创建该任务的定时计划 ID
+    batch_id: Optional[str] = None  # 所属批次 ID
+    callback_url: Optional[str] = None  # 任务结束后回调通知的地址
     created_at: datetime  # 创建时间
     updated_at: datetime  # 更新时间
     completed_at: Optional[datetime] = None  # 完成时间
@@ -152,12 +172,14 @@ class BatchScrapeRequest(BaseModel):
     """批量抓取请求模型"""
 
     tasks: List[ScrapeRequest]  # 任务列表
+    callback_url: Optional[HttpUrl] = None  # 任务未单独指定时使用的回调地址
 
 
 class BatchScrapeResponse(BaseModel):
     """批量抓取响应模型"""
 
     task_ids: List[str]  # 任务 ID 列表
+    batch_id: Optional[str] = None  # 批次 ID，可用于按批次订阅任务事件流
 
 
 class BatchDeleteRequest(BaseModel):
@@ -166,6 +188,13 @@ class BatchDeleteRequest(BaseModel):
     task_ids: List[str]  # 要删除的任务 ID 列表
 
 
+class DeadLetterRequest(BaseModel):
+    """死信重放/清除请求模型"""
+
+    task_ids: Optional[List[str]] = None  # 指定任务 ID 列表，为空时处理全部
+    limit: int = Field(1000, ge=1, le=10000)  # 本次最多扫描的消息数量
+
+
 class ProxyTestRequest(BaseModel):
     """代理测试请求模型"""
     proxy: ProxyConfig
@@ -179,3 +208,6 @@ class StatsResponse(BaseModel):
     trends: Dict[str, float]  # 趋势百分比
     queue: Dict[str, Any]  # 队列统计数据
     history: List[Dict[str, Any]]  # 历史趋势数据
+    dead_letters: Dict[str, Any] = Field(default_factory=dict)  # 死信速率指标
+    reaped: Dict[str, Any] = Field(default_factory=dict)  # 孤儿任务回收速率指标
+    expired: Dict[str, Any] = Field(default_factory=dict)  # 过期跳过的任务速率指标
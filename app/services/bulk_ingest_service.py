@@ -0,0 +1,256 @@
+"""
+流式批量导入服务模块
+
+边接收上传内容边解析 NDJSON 或 CSV，逐条校验并规范化 URL，按块写入任务集合并发布到队列，
+内存占用只与块大小有关，与导入总量无关。
+
+- 去重基于规范化 URL 和抓取参数生成的缓存键，指纹保存在 Redis 集合中（导入结束后删除），不占用 API 进程内存
+- 作业内所有任务的 batch_id 即作业 ID，可通过任务事件流或作业接口跟踪进度
+"""
+import csv
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Any, List, Optional
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.core.urls import normalize_url, url_fingerprint, url_search_fields
+from app.db.async_mongo import amongo
+from app.db.redis import redis_client
+from app.models.task import ScrapeRequest
+from app.services.cache_service import cache_service
+from app.services.queue_base import build_queue_task
+from app.services.queue_service import queue_service
+
+logger = logging.getLogger(__name__)
+
+# 单行最大字节数，超过时视为格式错误并中断导入
+MAX_LINE_BYTES = 65536
+
+# 作业的进度计数字段
+COUNTER_FIELDS = ("received", "accepted", "duplicates", "invalid", "failed")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    将字节流按行切分
+
+    Args:
+        chunks: 上传内容的字节块
+
+    Yields:
+        str: 去掉换行符的行
+
+    Raises:
+        ValueError: 单行超过 MAX_LINE_BYTES
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"Line exceeds {MAX_LINE_BYTES} bytes")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    将上传内容逐条解析为抓取请求字段
+
+    NDJSON 每行为 ScrapeRequest 格式的对象或 URL 字符串；CSV 首行包含 url 列时作为表头，
+    其余列（如 priority、deadline）按列名传入，没有表头时取第一列为 URL。
+
+    Args:
+        chunks: 上传内容的字节块
+        fmt: 上传格式，ndjson 或 csv
+
+    Yields:
+        Optional[dict]: 抓取请求字段，无法解析的行为 None
+    """
+    header = None
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+
+        if fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            if isinstance(record, str):
+                record = {"url": record}
+            yield record if isinstance(record, dict) else None
+            continue
+
+        row = next(csv.reader([line]))
+        if header is None:
+            columns = [column.strip().lower() for column in row]
+            if "url" in columns:
+                header = columns
+                continue
+            header = ["url"]
+        yield {column: value for column, value in zip(header, row) if column and value != ""}
+
+
+class BulkIngestService:
+    """流式批量导入服务类"""
+
+    def _build_task(self, record: Optional[Dict[str, Any]], defaults: Dict[str, Any],
+                    job_id: str, now: datetime) -> Optional[Dict[str, Any]]:
+        """
+        校验单条记录并构建任务文档
+
+        Args:
+            record: 抓取请求字段
+            defaults: 记录未指定时使用的字段
+            job_id: 作业 ID
+            now: 创建时间
+
+        Returns:
+            Optional[dict]: 任务文档，记录无效时返回 None
+        """
+        if record is None:
+            return None
+        try:
+            req = ScrapeRequest(**{**defaults, **record})
+        except (ValidationError, TypeError):
+            return None
+        url = normalize_url(str(req.url))
+        if not url:
+            return None
+
+        params = req.params.model_dump()
+        return {
+            "task_id": str(ObjectId()),
+            "url": url,
+            **url_search_fields(url),
+            "status": "pending",
+            "priority": req.priority,
+            "params": params,
+            "cache": req.cache.model_dump(),
+            "cache_key": cache_service.generate_cache_key(url, params),
+            "cached": False,
+            "html_cached": False,
+            "agent_cached": False,
+            "expires_at": now + timedelta(seconds=req.deadline) if req.deadline else None,
+            "batch_id": job_id,
+            "callback_url": str(req.callback_url) if req.callback_url else None,
+            "callback_pending": bool(req.callback_url),
+            "created_at": now,
+            "updated_at": now
+        }
+
+    async def _flush(self, job_id: str, task_docs: List[Dict[str, Any]], counters: Dict[str, int]):
+        """
+        去重后写入一块任务并发布到队列，更新作业进度
+
+        Args:
+            job_id: 作业 ID
+            task_docs: 任务文档
+            counters: 作业进度计数（原地更新）
+        """
+        seen_key = f"bulk:seen:{job_id}"
+        pipe = redis_client.queue.pipeline()
+        for task_doc in task_docs:
+            pipe.sadd(seen_key, url_fingerprint(task_doc["cache_key"]))
+        pipe.expire(seen_key, settings.bulk_dedupe_ttl)
+        added = pipe.execute()[:-1]
+
+        fresh = [task_doc for task_doc, is_new in zip(task_docs, added) if is_new]
+        counters["duplicates"] += len(task_docs) - len(fresh)
+
+        if fresh:
+            queue_tasks = [build_queue_task(task_doc) for task_doc in fresh]
+            try:
+                await amongo.tasks.insert_many(fresh, ordered=False)
+            except BulkWriteError as e:
+                failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+                logger.error(f"Failed to insert {len(failed_indexes)} tasks for bulk job {job_id}")
+                queue_tasks = [task for i, task in enumerate(queue_tasks) if i not in failed_indexes]
+                counters["failed"] += len(failed_indexes)
+
+            failed_ids = await queue_service.publish_tasks(queue_tasks)
+            if failed_ids:
+                await amongo.tasks.update_many(
+                    {"task_id": {"$in": failed_ids}},
+                    {"$set": {
+                        "status": "failed",
+                        "error": {"message": "Failed to queue task: queue connection issue"},
+                        "updated_at": datetime.now()
+                    }}
+                )
+            counters["failed"] += len(failed_ids)
+            counters["accepted"] += len(queue_tasks) - len(failed_ids)
+
+        await amongo.jobs.update_one({"job_id": job_id}, {"$set": {**counters, "updated_at": datetime.now()}})
+
+    async def ingest(self, chunks: AsyncIterator[bytes], fmt: str, defaults: Dict[str, Any],
+                     created_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        流式导入一个批量作业
+
+        Args:
+            chunks: 上传内容的字节块
+            fmt: 上传格式，ndjson 或 csv
+            defaults: 记录未指定时使用的抓取请求字段（如 priority、deadline、callback_url）
+            created_by: 创建作业的用户名
+
+        Returns:
+            dict: 作业文档
+        """
+        now = datetime.now()
+        job_id = str(ObjectId())
+        counters = {field: 0 for field in COUNTER_FIELDS}
+        await amongo.jobs.insert_one({
+            "job_id": job_id,
+            "status": "ingesting",
+            "format": fmt,
+            **counters,
+            "error": None,
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now,
+            "completed_at": None
+        })
+
+        status, error = "queued", None
+        task_docs = []
+        try:
+            async for record in iter_records(chunks, fmt):
+                counters["received"] += 1
+                task_doc = self._build_task(record, defaults, job_id, datetime.now())
+                if task_doc is None:
+                    counters["invalid"] += 1
+                    continue
+                task_docs.append(task_doc)
+                if len(task_docs) >= settings.bulk_chunk_size:
+                    await self._flush(job_id, task_docs, counters)
+                    task_docs = []
+            if task_docs:
+                await self._flush(job_id, task_docs, counters)
+        except Exception as e:
+            status, error = "failed", str(e)
+            logger.error(f"Bulk job {job_id} aborted after {counters['received']} records: {e}")
+        finally:
+            try:
+                redis_client.queue.delete(f"bulk:seen:{job_id}")
+            except Exception as e:
+                logger.error(f"Failed to clean up dedupe set for bulk job {job_id}: {e}")
+
+        now = datetime.now()
+        await amongo.jobs.update_one(
+            {"job_id": job_id},
+            {"$set": {**counters, "status": status, "error": error, "updated_at": now, "completed_at": now}}
+        )
+        logger.info(f"Bulk job {job_id} {status}: {counters}")
+        return await amongo.jobs.find_one({"job_id": job_id}, {"_id": 0})
+
+
+# 全局流式批量导入服务实例
+bulk_ingest_service = BulkIngestService()
@@ -0,0 +1,125 @@
+"""
+任务取消服务模块
+
+API 将任务标记为 cancelled 后，通过 Redis pub/sub 广播任务 ID；每个运行 Worker 的进程订阅该频道，
+找到正在本进程中执行该任务的协程并取消它，抓取器在 finally 中立即关闭页面和上下文，释放并发许可。
+单机模式下 API 与 Worker 在同一进程内，直接取消本地协程。
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+from app.db.local_redis import LocalRedis
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 任务取消通知的 Redis 频道
+CANCEL_CHANNEL = "task_cancel"
+
+
+class TaskCancelService:
+    """任务取消服务类"""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Worker 线程与订阅线程共享的锁
+        self._running: Dict[str, Tuple[asyncio.Task, asyncio.AbstractEventLoop]] = {}  # 本进程中执行中的任务
+        self._cancelled = set()  # 已被取消、等待执行协程退出的任务 ID
+        self._listener = None  # 订阅线程
+
+    def register(self, task_id: str):
+        """
+        登记当前协程正在执行的任务（需在执行任务的协程中调用）
+
+        Args:
+            task_id: 任务 ID
+        """
+        with self._lock:
+            self._running[task_id] = (asyncio.current_task(), asyncio.get_running_loop())
+
+    def unregister(self, task_id: str):
+        """
+        任务执行结束后注销
+
+        Args:
+            task_id: 任务 ID
+        """
+        with self._lock:
+            self._running.pop(task_id, None)
+            self._cancelled.discard(task_id)
+
+    def was_cancelled(self, task_id: str) -> bool:
+        """
+        执行中的任务是否因取消请求而中断（用于区分节点停止时的排空取消）
+
+        Args:
+            task_id: 任务 ID
+
+        Returns:
+            bool: 任务被取消时返回 True
+        """
+        with self._lock:
+            return task_id in self._cancelled
+
+    def cancel_local(self, task_id: str) -> bool:
+        """
+        取消本进程中正在执行该任务的协程
+
+        Args:
+            task_id: 任务 ID
+
+        Returns:
+            bool: 任务在本进程中执行时返回 True
+        """
+        with self._lock:
+            entry = self._running.get(task_id)
+            if entry:
+                self._cancelled.add(task_id)
+        if not entry:
+            return False
+
+        task, loop = entry
+        loop.call_soon_threadsafe(task.cancel)
+        logger.info(f"Cancelling running task {task_id}")
+        return True
+
+    def request_cancel(self, task_id: str):
+        """
+        通知所有 Worker 进程取消该任务
+
+        Args:
+            task_id: 任务 ID
+        """
+        client = redis_client.queue
+        if isinstance(client, LocalRedis):
+            self.cancel_local(task_id)
+        else:
+            client.publish(CANCEL_CHANNEL, task_id)
+
+    def _listen(self):
+        """订阅取消频道，连接断开时自动重连"""
+        while True:
+            try:
+                pubsub = redis_client.queue.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CANCEL_CHANNEL)
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.cancel_local(message["data"])
+            except Exception as e:
+                logger.error(f"Task cancel listener error: {e}")
+                time.sleep(1)
+
+    def start_listener(self):
+        """启动本进程的取消订阅线程（每个进程只启动一次，单机模式下无需订阅）"""
+        if isinstance(redis_client.queue, LocalRedis):
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name="task-cancel-listener", daemon=True)
+            self._listener.start()
+
+
+# 全局任务取消服务实例
+cancel_service = TaskCancelService()
@@ -0,0 +1,227 @@
+"""
+任务结果导出服务模块
+
+从数据库游标逐批读取任务，按 NDJSON、CSV 或 Parquet 格式边读边输出，导出任意数量的任务都不会整体加载到内存。
+
+- 只读取请求的字段（默认不含 HTML 和截图），大字段不会经过网络和序列化
+- Parquet 依赖可选的 pyarrow（pip install "browser-cluster[export]"），每 export_row_group_size 行写出一个行组
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+from app.core.config import settings
+from app.core.projection import split_fields
+from app.db.mongo import mongo
+
+logger = logging.getLogger(__name__)
+
+# 未指定 fields 时导出的字段
+DEFAULT_FIELDS = (
+    "task_id", "url", "status", "batch_id", "schedule_id", "cached", "error.message",
+    "created_at", "completed_at", "result.metadata", "result.agent_result", "result.intercepted_apis",
+)
+
+# include_html 时追加的字段
+HTML_FIELD = "result.html"
+
+# 各导出格式的 Content-Type
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Parquet 中按时间戳和布尔类型存储的字段，其余字段按字符串存储（对象和数组为 JSON）
+TIMESTAMP_FIELDS = {"created_at", "updated_at", "completed_at", "expires_at", "next_retry_at", "result.metadata.timestamp"}
+BOOLEAN_FIELDS = {"cached", "html_cached", "agent_cached"}
+
+
+def parse_fields(fields: Optional[str], include_html: bool = False) -> List[str]:
+    """
+    解析要导出的字段列表
+
+    字段为逗号分隔的点号路径（如 result.metadata.title）；同时请求父字段和子字段时只保留父字段，
+    避免数据库投影路径冲突。
+
+    Args:
+        fields: 逗号分隔的字段路径，为空时使用 DEFAULT_FIELDS
+        include_html: 是否追加 result.html
+
+    Returns:
+        List[str]: 去重后的字段路径，保持请求顺序
+    """
+    requested = fields if fields else ",".join(DEFAULT_FIELDS)
+    if include_html:
+        requested += f",{HTML_FIELD}"
+    return split_fields(requested)
+
+
+def get_path(doc: Dict[str, Any], path: str) -> Any:
+    """按点号路径读取嵌套字段，不存在时返回 None"""
+    value = doc
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _to_text(value: Any) -> Optional[str]:
+    """将字段值转换为 CSV / Parquet 中的字符串"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return str(value)
+
+
+def require_pyarrow():
+    """
+    检查 Parquet 导出依赖
+
+    Raises:
+        RuntimeError: 未安装 pyarrow
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError('Parquet export requires pyarrow: pip install "browser-cluster[export]"')
+
+
+class _ChunkSink(io.RawIOBase):
+    """收集 Parquet 写入的字节，供生成器逐块取出"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ExportService:
+    """任务结果导出服务类"""
+
+    def iter_tasks(self, query: Dict[str, Any], fields: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        逐条读取匹配的任务
+
+        Args:
+            query: 任务查询条件
+            fields: 导出的字段路径
+
+        Yields:
+            dict: 只包含请求字段的任务文档
+        """
+        projection = {field: 1 for field in fields}
+        projection["_id"] = 0
+        cursor = mongo.tasks.find(query, projection, batch_size=settings.export_batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    def iter_ndjson(self, query: Dict[str, Any], fields: List[str]) -> Iterator[bytes]:
+        """按 NDJSON 格式导出，每行一个保留嵌套结构的任务对象"""
+        for doc in self.iter_tasks(query, fields):
+            yield json.dumps(doc, default=str, ensure_ascii=False).encode() + b"\n"
+
+    def iter_csv(self, query: Dict[str, Any], fields: List[str]) -> Iterator[bytes]:
+        """按 CSV 格式导出，每个字段路径一列，对象和数组字段为 JSON 字符串"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for doc in self.iter_tasks(query, fields):
+            writer.writerow([_to_text(get_path(doc, field)) for field in fields])
+            if buffer.tell() >= 65536:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    def iter_parquet(self, query: Dict[str, Any], fields: List[str]) -> Iterator[bytes]:
+        """按 Parquet 格式导出，每 export_row_group_size 行写出一个行组（调用前需通过 require_pyarrow 检查）"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        def column_type(field):
+            if field in TIMESTAMP_FIELDS:
+                return pa.timestamp("ms")
+            if field in BOOLEAN_FIELDS:
+                return pa.bool_()
+            return pa.string()
+
+        def column_value(field, value):
+            if field in TIMESTAMP_FIELDS:
+                return value if isinstance(value, datetime) else None
+            if field in BOOLEAN_FIELDS:
+                return value if isinstance(value, bool) else None
+            return _to_text(value)
+
+        schema = pa.schema([(field, column_type(field)) for field in fields])
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+        def write_rows(rows):
+            columns = [[column_value(field, get_path(doc, field)) for doc in rows] for field in fields]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)],
+                schema=schema
+            ))
+
+        rows = []
+        for doc in self.iter_tasks(query, fields):
+            rows.append(doc)
+            if len(rows) >= settings.export_row_group_size:
+                write_rows(rows)
+                rows = []
+                yield sink.drain()
+        if rows:
+            write_rows(rows)
+        writer.close()
+        yield sink.drain()
+
+    def export(self, query: Dict[str, Any], fields: List[str], fmt: str) -> Iterator[bytes]:
+        """
+        按指定格式导出任务
+
+        Args:
+            query: 任务查询条件
+            fields: 导出的字段路径
+            fmt: 导出格式，ndjson、csv 或 parquet
+
+        Returns:
+            Iterator[bytes]: 导出内容的字节块（同步生成器，由 StreamingResponse 在线程池中迭代）
+
+        Raises:
+            RuntimeError: 导出 Parquet 但未安装 pyarrow（在开始输出之前抛出）
+        """
+        if fmt == "csv":
+            return self.iter_csv(query, fields)
+        if fmt == "parquet":
+            require_pyarrow()
+            return self.iter_parquet(query, fields)
+        return self.iter_ndjson(query, fields)
+
+
+# 全局任务结果导出服务实例
+export_service = ExportService()
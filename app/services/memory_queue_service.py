@@ -0,0 +1,471 @@
+"""
+进程内任务队列服务模块
+
+单机模式下替代 RabbitMQ：API 和线程模式的 Worker 运行在同一进程中，任务保存在内存的优先级堆中。
+- 每个队列（共享队列和路由队列）对应一个堆，按优先级从高到低、同优先级先进先出出队
+- 路由有消费者监听时才视为已绑定，否则任务回退到共享队列；最后一个消费者离开时，路由队列中的任务转回共享队列
+- 处理失败的任务带重投计数重新入队，超过上限转入死信列表
+- 延迟任务保存在单独的堆中，到期后由消费者搬回目标队列
+
+队列内容不持久化，进程退出后未完成的任务会丢失（任务记录仍在存储中，可通过重试接口重新提交）。
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, Optional, List, Tuple
+
+from app.core.config import settings
+from app.services.queue_base import TaskQueueBackend, drain_handlers, resolve_routes, route_queue_name
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryQueueService(TaskQueueBackend):
+    """
+    进程内队列服务单例类
+
+    各 Worker 线程有独立的事件循环，因此队列数据用线程锁保护，
+    入队时通过 call_soon_threadsafe 唤醒等待中的消费者。
+    """
+
+    _instance = None  # 单例实例
+
+    def __new__(cls):
+        """实现单例模式"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._queues = {}  # 队列名 -> [(-优先级, 序号, 任务, 重投次数)]
+            cls._instance._delayed = []  # [(到期时间, 序号, 路由, 任务)]
+            cls._instance._dead_letters = []  # 死信信息列表
+            cls._instance._subscribers = {}  # 路由 -> 监听的消费者数量
+            cls._instance._waiters = set()  # (事件循环, asyncio.Event)
+            cls._instance._seq = itertools.count()
+            cls._instance._local = threading.local()
+        return cls._instance
+
+    def _queue_name(self, route: Optional[str] = None) -> str:
+        return route_queue_name(route) if route else settings.rabbitmq_queue
+
+    def _wakeup(self):
+        """唤醒所有等待任务的消费者"""
+        for loop, event in list(self._waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                self._waiters.discard((loop, event))
+
+    def _push(self, queue: str, task: Dict[str, Any], redeliveries: int = 0):
+        """在持有锁的情况下入队"""
+        heapq.heappush(
+            self._queues.setdefault(queue, []),
+            (-task.get("priority", 1), next(self._seq), task, redeliveries)
+        )
+
+    def _route_task(self, task: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        按候选路由选择目标队列，均无消费者监听时回退到共享队列
+
+        Args:
+            task: 任务数据字典
+
+        Returns:
+            tuple: (队列名, 写入 route 字段后的任务数据)
+        """
+        for route in resolve_routes(task):
+            if self._subscribers.get(route):
+                return self._queue_name(route), {**task, "route": route}
+        return self._queue_name(), {**task, "route": None}
+
+    async def publish_task(self, task: Dict[str, Any], retry: bool = True) -> bool:
+        """
+        发布任务到队列
+
+        Args:
+            task: 任务数据字典
+            retry: 与其他后端保持一致，进程内队列不会出现连接异常
+
+        Returns:
+            bool: 是否成功发布
+        """
+        with self._lock:
+            queue, routed_task = self._route_task(task)
+            self._push(queue, routed_task)
+            self._wakeup()
+        logger.info(f"Published task {task.get('task_id')} to {queue}")
+        return True
+
+    async def publish_tasks(self, tasks: List[Dict[str, Any]], chunk_size: int = None) -> List[str]:
+        """
+        批量发布任务
+
+        Args:
+            tasks: 任务数据字典列表
+            chunk_size: 与其他后端保持一致，进程内队列一次性入队
+
+        Returns:
+            List[str]: 发布失败的任务 ID 列表（始终为空）
+        """
+        with self._lock:
+            for task in tasks:
+                queue, routed_task = self._route_task(task)
+                self._push(queue, routed_task)
+            self._wakeup()
+        logger.info(f"Published {len(tasks)}/{len(tasks)} tasks to memory queue")
+        return []
+
+    async def delay_task(self, task: Dict[str, Any], delay: float, routing_key: Optional[str] = None) -> bool:
+        """
+        延迟投递任务，到期后由消费者搬回目标队列
+
+        Args:
+            task: 任务数据字典
+            delay: 延迟秒数
+            routing_key: 到期后投递的路由，默认为共享队列
+
+        Returns:
+            bool: 是否成功投递
+        """
+        with self._lock:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), routing_key, task))
+        logger.info(f"Delayed task {task.get('task_id')} by {delay:.1f}s")
+        return True
+
+    def _promote_delayed(self):
+        """在持有锁的情况下将到期的延迟任务搬回目标队列，路由已没有消费者时回退到共享队列"""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, route, task = heapq.heappop(self._delayed)
+            if route and not self._subscribers.get(route):
+                route, task = None, {**task, "route": None}
+            self._push(self._queue_name(route), task)
+
+    def _pop(self, queues: List[str]) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        """
+        在持有锁的情况下从监听的队列中取出优先级最高的任务
+
+        Args:
+            queues: 监听的队列名列表
+
+        Returns:
+            tuple: (队列名, 任务数据, 重投次数)，没有任务时返回 None
+        """
+        self._promote_delayed()
+        best = None
+        for queue in queues:
+            heap = self._queues.get(queue)
+            if heap and (best is None or heap[0] < self._queues[best][0]):
+                best = queue
+        if best is None:
+            return None
+        _, _, task, redeliveries = heapq.heappop(self._queues[best])
+        return best, task, redeliveries
+
+    async def consume_tasks(
+        self,
+        callback: Callable[[Dict[str, Any]], Awaitable[None]],
+        prefetch_count: int = 1,
+        should_stop: Callable[[], bool] = None,
+        on_dead_letter: Optional[Callable[[Optional[Dict[str, Any]], str], Awaitable[None]]] = None,
+        routes: Optional[List[str]] = None,
+        consumer_name: Optional[str] = None,
+        drain_timeout: float = 0
+    ):
+        """
+        开始消费队列中的任务
+
+        每条消息在独立的协程中处理，同时处理的消息数不超过 prefetch_count。
+
+        Args:
+            callback: 处理任务的异步回调函数
+            prefetch_count: 最大同时处理的消息数量
+            should_stop: 可选的停止判断函数
+            on_dead_letter: 可选的死信回调，参数为任务数据和原因
+            routes: 除共享队列外额外监听的路由列表
+            consumer_name: 与其他后端保持一致，进程内队列不使用
+            drain_timeout: 停止时等待处理中消息完成的最长时间（秒）
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        consumer = {
+            "prefetch": prefetch_count,
+            "routes": [],
+            "inflight": {},  # 处理协程 -> (队列名, 任务, 重投次数)
+        }
+        handlers = set()
+
+        async def handle(queue: str, task: Dict[str, Any], redeliveries: int):
+            """消息处理包装函数"""
+            try:
+                await callback(task)
+            except asyncio.CancelledError:
+                # 停止时未完成的任务原样放回队列，由其他消费者继续处理，不计入重投次数
+                with self._lock:
+                    self._push(queue, task, redeliveries)
+                    self._wakeup()
+                raise
+            except Exception as e:
+                logger.error(f"Error processing task: {e}")
+                await self._requeue_or_dead_letter(queue, task, redeliveries + 1, on_dead_letter)
+            finally:
+                consumer["inflight"].pop(asyncio.current_task(), None)
+                event.set()
+
+        with self._lock:
+            self._waiters.add((loop, event))
+        self._local.consumer = consumer
+        self._subscribe_routes(consumer, routes or [])
+        logger.info(f"Started consuming tasks from memory queue (routes: {', '.join(consumer['routes']) or 'none'})")
+
+        try:
+            while True:
+                if should_stop and should_stop():
+                    logger.info("Consumer loop: detected stop signal, draining...")
+                    break
+
+                dispatched = False
+                while len(consumer["inflight"]) < consumer["prefetch"]:
+                    with self._lock:
+                        queues = [self._queue_name()] + [self._queue_name(route) for route in consumer["routes"]]
+                        item = self._pop(queues)
+                    if item is None:
+                        break
+                    queue, task, redeliveries = item
+                    handler = asyncio.create_task(handle(queue, task, redeliveries))
+                    consumer["inflight"][handler] = item
+                    handlers.add(handler)
+                    handler.add_done_callback(handlers.discard)
+                    dispatched = True
+
+                if dispatched:
+                    continue
+                event.clear()
+                try:
+                    # 延迟任务没有入队通知，定期唤醒检查
+                    await asyncio.wait_for(event.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
+
+            # 不再取出新任务，等待处理中的任务完成
+            self._local.consumer = None
+            self._subscribe_routes(consumer, [])
+            await drain_handlers(handlers, drain_timeout)
+
+        except asyncio.CancelledError:
+            logger.info("Stopping consumer...")
+            raise
+        finally:
+            self._subscribe_routes(consumer, [])
+            with self._lock:
+                self._waiters.discard((loop, event))
+            # 取消未处理完的任务，由处理函数放回队列
+            for handler in list(consumer["inflight"]):
+                handler.cancel()
+            self._local.consumer = None
+
+    def _subscribe_routes(self, consumer: Dict[str, Any], routes: List[str]):
+        """
+        更新消费者监听的路由及各路由的监听计数
+
+        路由不再有消费者监听时，其队列中剩余的任务转回共享队列，避免无人消费。
+
+        Args:
+            consumer: 当前线程的消费者信息
+            routes: 新的路由列表
+        """
+        with self._lock:
+            for route in consumer["routes"]:
+                self._subscribers[route] -= 1
+            for route in routes:
+                self._subscribers[route] = self._subscribers.get(route, 0) + 1
+            for route in set(consumer["routes"]) - set(routes):
+                if self._subscribers.get(route):
+                    continue
+                backlog = self._queues.pop(self._queue_name(route), [])
+                for _, _, task, redeliveries in sorted(backlog):
+                    self._push(self._queue_name(), {**task, "route": None}, redeliveries)
+                if backlog:
+                    logger.info(f"Released route {route}: moved {len(backlog)} pending tasks to {self._queue_name()}")
+                    self._wakeup()
+            consumer["routes"] = list(routes)
+
+    async def _requeue_or_dead_letter(
+        self,
+        queue: str,
+        task: Dict[str, Any],
+        redeliveries: int,
+        on_dead_letter: Optional[Callable] = None
+    ):
+        """
+        带重投计数重新入队，超过上限时转入死信列表
+
+        Args:
+            queue: 任务所在的队列名
+            task: 任务数据字典
+            redeliveries: 新的重投次数
+            on_dead_letter: 可选的死信回调
+        """
+        if redeliveries <= settings.max_redeliveries:
+            with self._lock:
+                # 停止时放回的任务所属路由可能已没有消费者，此时回退到共享队列
+                route = task.get("route")
+                if route and not self._subscribers.get(route):
+                    queue, task = self._queue_name(), {**task, "route": None}
+                self._push(queue, task, redeliveries)
+                self._wakeup()
+            logger.warning(f"Requeued message on {queue} (redelivery {redeliveries}/{settings.max_redeliveries})")
+            return
+
+        reason = f"Exceeded max redeliveries ({settings.max_redeliveries})"
+        with self._lock:
+            self._dead_letters.append({
+                "task_id": task.get("task_id"),
+                "task": task,
+                "raw_body": None,
+                "reason": reason,
+                "redeliveries": redeliveries,
+                "routing_key": task.get("route"),
+                "dead_lettered_at": datetime.now().isoformat(),
+            })
+        logger.error(f"Dead-lettered message after {redeliveries} redeliveries: {reason}")
+
+        if on_dead_letter:
+            try:
+                await on_dead_letter(task, reason)
+            except Exception as e:
+                logger.error(f"Dead letter callback error: {e}")
+
+    async def set_prefetch(self, prefetch_count: int) -> bool:
+        """
+        运行时调整当前线程消费者的最大同时处理数量
+
+        Args:
+            prefetch_count: 新的预取数量
+
+        Returns:
+            bool: 是否已调整（当前线程没有正在运行的消费者时返回 False）
+        """
+        consumer = getattr(self._local, "consumer", None)
+        if consumer is None:
+            return False
+        consumer["prefetch"] = prefetch_count
+        logger.info(f"Consumer prefetch changed to {prefetch_count}")
+        return True
+
+    async def set_routes(self, routes: List[str]) -> bool:
+        """
+        运行时调整当前线程消费者监听的路由，共享队列始终保持监听
+
+        Args:
+            routes: 新的路由列表
+
+        Returns:
+            bool: 是否已调整（当前线程没有正在运行的消费者时返回 False）
+        """
+        consumer = getattr(self._local, "consumer", None)
+        if consumer is None:
+            return False
+        self._subscribe_routes(consumer, routes)
+        logger.info(f"Consumer now listening on routes: {', '.join(routes) or 'none'}")
+        return True
+
+    async def get_queue_depth(self, route: Optional[str] = None) -> int:
+        """
+        获取队列中等待处理的消息数量
+
+        Args:
+            route: 路由，为空时为共享队列
+
+        Returns:
+            int: 消息数量
+        """
+        with self._lock:
+            return len(self._queues.get(self._queue_name(route), []))
+
+    async def get_dead_letter_count(self) -> int:
+        """
+        获取死信列表中的消息数量
+
+        Returns:
+            int: 消息数量
+        """
+        return len(self._dead_letters)
+
+    async def inspect_dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        查看死信消息（不移除）
+
+        Args:
+            limit: 最大数量
+
+        Returns:
+            list: 死信信息列表
+        """
+        with self._lock:
+            return [dict(item) for item in self._dead_letters[:limit]]
+
+    async def replay_dead_letters(self, task_ids: Optional[List[str]] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        将死信消息重新投递到原队列，重投计数清零
+
+        Args:
+            task_ids: 仅重放这些任务（为空时重放全部）
+            limit: 本次最多扫描的消息数量
+
+        Returns:
+            list: 已重放的任务数据列表
+        """
+        replayed = []
+        with self._lock:
+            remaining = []
+            for index, item in enumerate(self._dead_letters):
+                if index < limit and (not task_ids or item["task_id"] in task_ids):
+                    # 原路由已没有消费者时回退到共享队列
+                    route, task = item["routing_key"], item["task"]
+                    if route and not self._subscribers.get(route):
+                        route, task = None, {**task, "route": None}
+                    self._push(self._queue_name(route), task)
+                    replayed.append(task)
+                else:
+                    remaining.append(item)
+            self._dead_letters = remaining
+            self._wakeup()
+        logger.info(f"Replayed {len(replayed)} dead-lettered tasks")
+        return replayed
+
+    async def purge_dead_letters(self, task_ids: Optional[List[str]] = None, limit: int = 1000) -> int:
+        """
+        清除死信消息
+
+        Args:
+            task_ids: 仅清除这些任务的死信（为空时清空整个死信列表）
+            limit: 按任务清除时最多扫描的消息数量
+
+        Returns:
+            int: 清除的消息数量
+        """
+        with self._lock:
+            if not task_ids:
+                count = len(self._dead_letters)
+                self._dead_letters = []
+                return count
+            remaining = [
+                item for index, item in enumerate(self._dead_letters)
+                if index >= limit or item["task_id"] not in task_ids
+            ]
+            count = len(self._dead_letters) - len(remaining)
+            self._dead_letters = remaining
+            return count
+
+    async def close(self):
+        """进程内队列无需关闭连接，队列内容保留到进程退出"""
+        pass
+
+
+# 全局进程内队列服务实例
+memory_queue_service = MemoryQueueService()
@@ -0,0 +1,73 @@
+"""
+运行指标服务模块
+
+基于 Redis 按分钟分桶记录计数类指标，用于统计总量和近期速率
+"""
+import logging
+import time
+from typing import Dict, Any
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsService:
+    """指标服务类"""
+
+    BUCKET_SECONDS = 60  # 分桶粒度（秒）
+    RETENTION_SECONDS = 86400  # 分桶保留时间（秒）
+
+    def _bucket_key(self, name: str, bucket: int) -> str:
+        return f"metrics:{name}:{bucket}"
+
+    def _total_key(self, name: str) -> str:
+        return f"metrics:{name}:total"
+
+    async def incr(self, name: str, amount: int = 1) -> None:
+        """
+        累加指标计数
+
+        Args:
+            name: 指标名称
+            amount: 增量
+        """
+        try:
+            bucket = int(time.time() // self.BUCKET_SECONDS)
+            bucket_key = self._bucket_key(name, bucket)
+            pipe = redis_client.queue.pipeline()
+            pipe.incrby(self._total_key(name), amount)
+            pipe.incrby(bucket_key, amount)
+            pipe.expire(bucket_key, self.RETENTION_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Metrics incr error for {name}: {e}")
+
+    async def get_rate(self, name: str, window_minutes: int = 60) -> Dict[str, Any]:
+        """
+        获取指标总量及近期速率
+
+        Args:
+            name: 指标名称
+            window_minutes: 统计窗口（分钟）
+
+        Returns:
+            dict: total（累计总量）、window_count（窗口内数量）、per_minute（每分钟平均）
+        """
+        try:
+            current = int(time.time() // self.BUCKET_SECONDS)
+            keys = [self._bucket_key(name, bucket) for bucket in range(current - window_minutes + 1, current + 1)]
+            values = redis_client.queue.mget(keys + [self._total_key(name)])
+            window_count = sum(int(value) for value in values[:-1] if value)
+            return {
+                "total": int(values[-1] or 0),
+                "window_minutes": window_minutes,
+                "window_count": window_count,
+                "per_minute": round(window_count / window_minutes, 2)
+            }
+        except Exception as e:
+            logger.error(f"Metrics get_rate error for {name}: {e}")
+            return {"total": 0, "window_minutes": window_minutes, "window_count": 0, "per_minute": 0}
+
+
+# 全局指标服务实例
+metrics_service = MetricsService()
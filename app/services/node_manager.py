@@ -2,21 +2,29 @@ import asyncio
 import logging
 import sys
 import threading
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 from app.core.config import settings
 from app.core.logger import setup_node_logger
 from app.services.worker import Worker
+from app.services.worker_process import WorkerProcessHandle
+from app.db.async_mongo import amongo
 from app.db.mongo import mongo
 
 logger = logging.getLogger(__name__)
 
 class NodeManager:
-    """节点管理器：负责管理 Worker 实例的生命周期和状态同步"""
+    """
+    节点管理器：负责管理 Worker 实例的生命周期和状态同步
+
+    除 Worker 线程内的收尾写入外，方法都运行在 API 的事件循环中，通过 amongo 访问数据库。
+    """
     
     def __init__(self):
-        self.active_workers: Dict[str, Worker] = {}
+        # 线程模式下为 Worker 实例，进程模式下为 WorkerProcessHandle
+        self.active_workers: Dict[str, Union[Worker, WorkerProcessHandle]] = {}
         self.worker_threads: Dict[str, threading.Thread] = {}
+        self.process_supervisors: Dict[str, asyncio.Task] = {}
 
     def _run_worker_thread(self, worker: Worker):
         """在独立线程中运行 Worker，并配置专用的事件循环"""
@@ -44,16 +52,25 @@ class NodeManager:
     async def get_all_nodes(self) -> List[dict]:
         """获取所有节点信息"""
         try:
-            # 确保连接已建立
-            mongo.connect()
             # 仅查询未被逻辑删除的节点
-            cursor = mongo.nodes.find({"is_deleted": {"$ne": True}})
+            docs = await amongo.nodes.find({"is_deleted": {"$ne": True}}).to_list(None)
             nodes = []
             now = datetime.now()
             heartbeat_timeout = settings.heartbeat_interval * 2
-            
-            # 将 cursor 转换为列表以避免在迭代时出现可能的阻塞或连接问题
-            for doc in list(cursor):
+
+            # 一次聚合统计各节点的任务数量
+            node_ids = [doc.get("node_id") for doc in docs if doc and doc.get("node_id")]
+            try:
+                counts = await amongo.tasks.aggregate([
+                    {"$match": {"node_id": {"$in": node_ids}}},
+                    {"$group": {"_id": "$node_id", "count": {"$sum": 1}}}
+                ]).to_list(None)
+                task_counts = {item["_id"]: item["count"] for item in counts}
+            except Exception as e:
+                logger.warning(f"Failed to count node tasks: {e}")
+                task_counts = {}
+
+            for doc in docs:
                 if not doc:
                     continue
                 doc['_id'] = str(doc['_id'])
@@ -85,12 +102,7 @@ class NodeManager:
                 
                 doc['status'] = status
                 
-                # 统计任务数量
-                try:
-                    task_count = mongo.tasks.count_documents({"node_id": node_id})
-                    doc['task_count'] = task_count
-                except:
-                    doc['task_count'] = 0
+                doc['task_count'] = task_counts.get(node_id, 0)
 
                 # 确保时间字段格式正确且存在
                 if 'created_at' not in doc:
@@ -110,7 +122,7 @@ class NodeManager:
     async def add_node(self, node_id: str, queue_name: str = "task_queue", max_concurrent: int = 1):
         """添加新节点配置"""
         # 检查是否存在同名且未删除的节点
-        existing = mongo.nodes.find_one({"node_id": node_id, "is_deleted": {"$ne": True}})
+        existing = await amongo.nodes.find_one({"node_id": node_id, "is_deleted": {"$ne": True}})
         if existing:
             raise ValueError(f"Node with ID '{node_id}' already exists.")
 
@@ -124,7 +136,7 @@ class NodeManager:
             "created_at": datetime.now(),
             "last_seen": None
         }
-        mongo.nodes.update_one(
+        await amongo.nodes.update_one(
             {"node_id": node_id},
             {"$set": node_data},
             upsert=True
@@ -133,33 +145,104 @@ class NodeManager:
 
     async def start_node(self, node_id: str) -> bool:
         """启动指定节点"""
-        doc = mongo.nodes.find_one({"node_id": node_id})
+        doc = await amongo.nodes.find_one({"node_id": node_id})
         if not doc:
             return False
         
         if node_id not in self.active_workers:
-            # 创建新的 Worker 实例
-            worker = Worker(node_id=node_id)
-            self.active_workers[node_id] = worker
-            
-            # 在独立线程中启动 Worker
-            thread = threading.Thread(
-                target=self._run_worker_thread,
-                args=(worker,),
-                name=f"WorkerThread-{node_id}",
-                daemon=True
-            )
-            self.worker_threads[node_id] = thread
-            thread.start()
-            
-            logger.info(f"Node {node_id} thread dispatched")
-        
-        mongo.nodes.update_one(
+            use_process = settings.node_execution_mode == "process"
+            if use_process and settings.standalone_mode:
+                # 单机模式的队列、缓存和存储都在 API 进程内，子进程无法共享
+                logger.warning(f"Standalone mode does not support process execution, starting node {node_id} as a thread")
+                use_process = False
+
+            if use_process:
+                # 在独立子进程中启动 Worker
+                self._start_worker_process(node_id)
+            else:
+                # 创建新的 Worker 实例
+                worker = Worker(node_id=node_id)
+                self.active_workers[node_id] = worker
+
+                # 在独立线程中启动 Worker
+                thread = threading.Thread(
+                    target=self._run_worker_thread,
+                    args=(worker,),
+                    name=f"WorkerThread-{node_id}",
+                    daemon=True
+                )
+                self.worker_threads[node_id] = thread
+                thread.start()
+
+                logger.info(f"Node {node_id} thread dispatched")
+
+        await amongo.nodes.update_one(
             {"node_id": node_id},
             {"$set": {"status": "running", "last_seen": datetime.now(), "retry_count": 0}}
         )
         return True
 
+    def _start_worker_process(self, node_id: str, restarts: int = 0):
+        """
+        以子进程方式启动 Worker，并创建对应的监督协程
+
+        Args:
+            node_id: 节点 ID
+            restarts: 该节点已因崩溃自动重启的次数
+        """
+        handle = WorkerProcessHandle(node_id, restarts=restarts)
+        handle.start()
+        self.active_workers[node_id] = handle
+        self.process_supervisors[node_id] = asyncio.create_task(self._supervise_process(handle))
+        logger.info(f"Node {node_id} process started (pid={handle.pid}, restarts={restarts})")
+
+    async def _supervise_process(self, handle: WorkerProcessHandle):
+        """
+        监督 Worker 子进程：接收健康上报，处理失联和崩溃
+
+        - 子进程长时间没有健康上报时视为卡死，强制结束
+        - 非主动停止的退出视为崩溃，在 max_node_auto_retries 次数内自动重启
+        """
+        node_id = handle.node_id
+        try:
+            while handle.process.is_alive():
+                handle.poll()
+                if not handle.stop_requested and not handle.is_healthy():
+                    logger.error(
+                        f"Worker process {node_id} sent no health report for "
+                        f"{settings.worker_process_health_timeout}s, terminating"
+                    )
+                    handle.terminate()
+                await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.error(f"Error supervising worker process {node_id}: {e}", exc_info=True)
+
+        exit_code = handle.process.exitcode
+        handle.close()
+        if self.active_workers.get(node_id) is handle:
+            self.active_workers.pop(node_id, None)
+            self.process_supervisors.pop(node_id, None)
+
+        if handle.stop_requested:
+            logger.info(f"Worker process {node_id} stopped (exit code {exit_code})")
+            return
+
+        if handle.restarts < settings.max_node_auto_retries:
+            logger.warning(
+                f"Worker process {node_id} exited unexpectedly (exit code {exit_code}), "
+                f"restarting ({handle.restarts + 1}/{settings.max_node_auto_retries})"
+            )
+            self._start_worker_process(node_id, restarts=handle.restarts + 1)
+            return
+
+        logger.error(f"Worker process {node_id} exceeded max restarts, marking as stopped")
+        await amongo.nodes.update_one(
+            {"node_id": node_id},
+            {"$set": {"status": "stopped"}}
+        )
+
     async def _run_worker_safe(self, worker: Worker):
         """安全运行 Worker，处理可能的异常"""
         try:
@@ -180,7 +263,7 @@ class NodeManager:
         
         # 无论内存中是否存在，都先尝试在数据库中标记停止，防止状态同步问题
         try:
-            mongo.nodes.update_one(
+            await amongo.nodes.update_one(
                 {"node_id": node_id},
                 {"$set": {"status": "stopped"}}
             )
@@ -211,34 +294,107 @@ class NodeManager:
         for node_id in node_ids:
             await self.stop_node(node_id)
         
-        # 等待一段时间让 worker 线程有时间清理资源
+        # 等待各 Worker 排空处理中的任务并退出
         if node_ids:
-            logger.info(f"Waiting for {len(node_ids)} workers to shut down...")
-            await asyncio.sleep(2)
+            logger.info(f"Waiting for {len(node_ids)} workers to drain and shut down...")
+            await asyncio.gather(*(self._wait_stopped(node_id) for node_id in node_ids))
+
+        # 子进程 Worker 在超时后仍未退出则强制结束
+        for node_id in node_ids:
+            handle = self.active_workers.get(node_id)
+            if isinstance(handle, WorkerProcessHandle):
+                logger.warning(f"Worker process {node_id} did not exit in time, terminating")
+                handle.terminate()
         
         return True
 
+    async def shutdown(self):
+        """应用关闭时排空并停止所有节点，保留其运行状态，下次启动时由 auto_start_nodes 恢复"""
+        node_ids = list(self.active_workers.keys())
+        await self.stop_all_nodes()
+        if node_ids:
+            await amongo.nodes.update_many(
+                {"node_id": {"$in": node_ids}, "is_deleted": {"$ne": True}},
+                {"$set": {"status": "running"}}
+            )
+
+    async def _wait_stopped(self, node_id: str) -> bool:
+        """
+        等待节点的 Worker 退出（排空期限加上额外的退出等待时间）
+
+        Args:
+            node_id: 节点 ID
+
+        Returns:
+            bool: Worker 是否已退出
+        """
+        deadline = settings.worker_drain_timeout + settings.worker_process_stop_timeout
+        start = datetime.now()
+        while node_id in self.active_workers:
+            if (datetime.now() - start).total_seconds() >= deadline:
+                return False
+            await asyncio.sleep(0.5)
+        return True
+
     async def delete_node(self, node_id: str) -> bool:
         """逻辑删除节点配置及实例"""
         await self.stop_node(node_id)
-        mongo.nodes.update_one(
+        await amongo.nodes.update_one(
             {"node_id": node_id},
             {"$set": {"is_deleted": True, "status": "stopped"}}
         )
         return True
 
+    def _apply_live(self, node_id: str, cmd: str, value) -> bool:
+        """
+        将配置变更下发给运行中的 Worker，无需重启节点
+
+        Args:
+            node_id: 节点 ID
+            cmd: Worker 上的调整方法名，如 set_concurrency、set_routes
+            value: 新的配置值
+
+        Returns:
+            bool: 是否已成功下发
+        """
+        worker = self.active_workers.get(node_id)
+        if isinstance(worker, WorkerProcessHandle):
+            return worker.send({"cmd": cmd, "value": value})
+        if worker is not None and worker.loop is not None and worker.loop.is_running():
+            asyncio.run_coroutine_threadsafe(getattr(worker, cmd)(value), worker.loop)
+            return True
+        return False
+
     async def update_node(self, node_id: str, update_data: dict) -> bool:
         """更新节点配置"""
-        # 如果节点正在运行，可能需要重启
         is_running = node_id in self.active_workers
+        previous = await amongo.nodes.find_one({"node_id": node_id}) or {}
         
-        mongo.nodes.update_one(
+        await amongo.nodes.update_one(
             {"node_id": node_id},
             {"$set": update_data}
         )
         
-        if is_running:
+        if not is_running:
+            return True
+
+        changed = {k for k, v in update_data.items() if previous.get(k) != v}
+
+        # 并发数和监听的路由可以在运行中直接调整，其余配置变更仍需重启节点
+        for field, cmd in (("max_concurrent", "set_concurrency"), ("queue_name", "set_routes")):
+            if field not in changed:
+                continue
+            if self._apply_live(node_id, cmd, update_data[field]):
+                changed.discard(field)
+            else:
+                logger.warning(f"Failed to apply {field} to worker {node_id} live, restarting")
+
+        if changed:
+            # 等待旧 Worker 排空处理中的任务并退出后再启动，否则 start_node 会因节点仍在运行而跳过
             await self.stop_node(node_id)
+            if not await self._wait_stopped(node_id):
+                logger.warning(f"Node {node_id} did not stop in time, skipping restart")
+                return True
             await self.start_node(node_id)
             
         return True
@@ -246,10 +402,8 @@ class NodeManager:
     async def auto_start_nodes(self):
         """系统启动时，自动启动数据库中状态为 running 的节点"""
         try:
-            mongo.connect()
             # 查找所有状态为 running 且未删除的节点
-            cursor = mongo.nodes.find({"status": "running", "is_deleted": {"$ne": True}})
-            nodes = list(cursor)
+            nodes = await amongo.nodes.find({"status": "running", "is_deleted": {"$ne": True}}).to_list(None)
             
             if not nodes:
                 logger.info("No nodes to auto-start.")
@@ -267,7 +421,7 @@ class NodeManager:
                     retry_count = doc.get("retry_count", 0)
                     if retry_count >= settings.max_node_auto_retries:
                         logger.warning(f"Node {node_id} exceeded max auto-start retries ({retry_count}). Marking as stopped.")
-                        mongo.nodes.update_one(
+                        await amongo.nodes.update_one(
                             {"node_id": node_id},
                             {"$set": {"status": "stopped", "retry_count": 0}}
                         )
@@ -276,7 +430,7 @@ class NodeManager:
                     logger.info(f"Auto-starting node: {node_id} (Retry count: {retry_count})")
                     
                     # 增加重试计数
-                    mongo.nodes.update_one(
+                    await amongo.nodes.update_one(
                         {"node_id": node_id},
                         {"$inc": {"retry_count": 1}}
                     )
@@ -0,0 +1,268 @@
+"""
+任务队列后端接口模块
+
+定义与具体消息中间件无关的任务队列接口，以及各后端共用的路由规则
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, Optional, List, Set
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 节点默认的 queue_name，表示只消费共享队列
+DEFAULT_NODE_QUEUE = "task_queue"
+
+
+def parse_routes(queue_name: Optional[str]) -> List[str]:
+    """
+    将节点配置的 queue_name 解析为路由列表
+
+    queue_name 可以用逗号分隔多个路由，如 "render.screenshot,region.us"；
+    为空或为默认值时只消费共享队列。
+
+    Args:
+        queue_name: 节点配置的队列名
+
+    Returns:
+        List[str]: 去重后的路由列表
+    """
+    routes = []
+    for route in (queue_name or "").split(","):
+        route = route.strip()
+        if route and route not in (DEFAULT_NODE_QUEUE, settings.rabbitmq_queue) and route not in routes:
+            routes.append(route)
+    return routes
+
+
+def resolve_routes(task: Dict[str, Any]) -> List[str]:
+    """
+    根据任务属性按优先级给出候选路由
+
+    优先级：显式指定的 params.node_tags > 代理地区 region.{地区} > 渲染模式 render.screenshot。
+    所有候选路由都没有节点监听时，任务回退到共享队列。
+
+    Args:
+        task: 任务数据字典
+
+    Returns:
+        List[str]: 候选路由列表（可能为空）
+    """
+    params = task.get("params") or {}
+    routes = list(params.get("node_tags") or [])
+    region = (params.get("proxy") or {}).get("region")
+    if region:
+        routes.append(f"region.{region}")
+    if params.get("screenshot"):
+        routes.append("render.screenshot")
+    return routes
+
+
+def route_queue_name(route: str) -> str:
+    """
+    获取路由对应的队列名称
+
+    Args:
+        route: 路由键
+
+    Returns:
+        str: 队列名称
+    """
+    return f"{settings.rabbitmq_queue}.{route}"
+
+
+def build_queue_task(task: Dict[str, Any], **overrides) -> Dict[str, Any]:
+    """
+    根据数据库中的任务记录构建队列消息
+
+    Args:
+        task: 任务记录
+        **overrides: 覆盖的消息字段，如 attempt
+
+    Returns:
+        dict: 队列任务数据
+    """
+    expires_at = task.get("expires_at")
+    queue_task = {
+        "task_id": task["task_id"],
+        "url": task["url"],
+        "params": task.get("params", {}),
+        "cache": task.get("cache", {"enabled": True, "ttl": 3600}),
+        "cache_key": task.get("cache_key"),
+        "priority": task.get("priority", 1),
+        "expires_at": expires_at.isoformat() if isinstance(expires_at, datetime) else expires_at
+    }
+    queue_task.update(overrides)
+    return queue_task
+
+
+def get_expiration(task: Dict[str, Any]) -> Optional[float]:
+    """
+    获取任务距过期的剩余秒数
+
+    Args:
+        task: 任务数据（expires_at 为 datetime 或 ISO 格式字符串）
+
+    Returns:
+        Optional[float]: 剩余秒数，已过期时小于等于 0；未设置期限时返回 None
+    """
+    expires_at = task.get("expires_at")
+    if not expires_at:
+        return None
+    if isinstance(expires_at, str):
+        expires_at = datetime.fromisoformat(expires_at)
+    return (expires_at - datetime.now()).total_seconds()
+
+
+async def drain_handlers(handlers: Set[asyncio.Task], timeout: float) -> int:
+    """
+    等待处理中的消息协程完成，超过期限后取消剩余的协程
+
+    被取消的协程由各后端的消息处理函数负责原样重新入队（不计入重投次数）。
+
+    Args:
+        handlers: 处理中的消息协程集合
+        timeout: 最长等待时间（秒），为 0 时立即取消
+
+    Returns:
+        int: 被取消的协程数量
+    """
+    pending = [handler for handler in handlers if not handler.done()]
+    if pending and timeout > 0:
+        logger.info(f"Draining {len(pending)} in-flight tasks (deadline {timeout}s)...")
+        _, pending = await asyncio.wait(pending, timeout=timeout)
+
+    for handler in pending:
+        handler.cancel()
+    if pending:
+        logger.warning(f"Drain deadline reached, requeueing {len(pending)} unfinished tasks")
+        await asyncio.gather(*pending, return_exceptions=True)
+    return len(pending)
+
+
+class TaskQueueBackend(ABC):
+    """
+    任务队列后端接口
+
+    消费采用回调模型：回调正常返回即确认（ack）消息；回调抛出异常则带重投计数重新投递（nack），
+    超过 max_redeliveries 或无法解析的消息转入死信队列。消费者崩溃后未确认的消息同样计为一次重投。
+    """
+
+    @abstractmethod
+    async def publish_task(self, task: Dict[str, Any], retry: bool = True) -> bool:
+        """
+        发布单个任务
+
+        Args:
+            task: 任务数据字典
+            retry: 连接异常时是否重试一次
+
+        Returns:
+            bool: 是否成功发布
+        """
+
+    @abstractmethod
+    async def publish_tasks(self, tasks: List[Dict[str, Any]], chunk_size: int = None) -> List[str]:
+        """
+        批量发布任务
+
+        Args:
+            tasks: 任务数据字典列表
+            chunk_size: 每块消息数量
+
+        Returns:
+            List[str]: 发布失败的任务 ID 列表
+        """
+
+    @abstractmethod
+    async def delay_task(self, task: Dict[str, Any], delay: float, routing_key: Optional[str] = None) -> bool:
+        """
+        延迟投递任务
+
+        Args:
+            task: 任务数据字典
+            delay: 延迟秒数
+            routing_key: 到期后投递的路由，默认为共享队列
+
+        Returns:
+            bool: 是否成功投递
+        """
+
+    @abstractmethod
+    async def consume_tasks(
+        self,
+        callback: Callable[[Dict[str, Any]], Awaitable[None]],
+        prefetch_count: int = 1,
+        should_stop: Callable[[], bool] = None,
+        on_dead_letter: Optional[Callable[[Optional[Dict[str, Any]], str], Awaitable[None]]] = None,
+        routes: Optional[List[str]] = None,
+        consumer_name: Optional[str] = None,
+        drain_timeout: float = 0
+    ):
+        """
+        开始消费任务，直到 should_stop 返回 True
+
+        停止时先不再接收新消息，等待处理中的消息在 drain_timeout 内完成并确认，
+        期限内未完成的消息被取消并原样重新入队。
+
+        Args:
+            callback: 处理任务的异步回调函数
+            prefetch_count: 最大未确认消息数量
+            should_stop: 可选的停止判断函数
+            on_dead_letter: 可选的死信回调，参数为任务数据（无法解析时为 None）和原因
+            routes: 除共享队列外额外监听的路由列表
+            consumer_name: 消费者名称（如节点 ID），部分后端用于认领崩溃消费者的消息
+            drain_timeout: 停止时等待处理中消息完成的最长时间（秒）
+        """
+
+    @abstractmethod
+    async def set_prefetch(self, prefetch_count: int) -> bool:
+        """
+        运行时调整当前线程消费者的最大未确认消息数量
+
+        Returns:
+            bool: 是否已调整
+        """
+
+    @abstractmethod
+    async def set_routes(self, routes: List[str]) -> bool:
+        """
+        运行时调整当前线程消费者监听的路由，共享队列始终保持监听
+
+        Returns:
+            bool: 是否已调整
+        """
+
+    @abstractmethod
+    async def get_queue_depth(self, route: Optional[str] = None) -> int:
+        """
+        获取队列中等待处理的消息数量
+
+        Args:
+            route: 路由，为空时为共享队列
+
+        Returns:
+            int: 消息数量
+        """
+
+    @abstractmethod
+    async def get_dead_letter_count(self) -> int:
+        """获取死信队列中的消息数量"""
+
+    @abstractmethod
+    async def inspect_dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """查看死信队列中的消息（不移除）"""
+
+    @abstractmethod
+    async def replay_dead_letters(self, task_ids: Optional[List[str]] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """将死信消息重新投递到原队列，返回已重放的任务数据列表"""
+
+    @abstractmethod
+    async def purge_dead_letters(self, task_ids: Optional[List[str]] = None, limit: int = 1000) -> int:
+        """清除死信消息，返回清除的数量"""
+
+    @abstractmethod
+    async def close(self):
+        """关闭当前线程的连接"""
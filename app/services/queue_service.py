@@ -1,20 +1,44 @@
 """
 RabbitMQ 消息队列服务模块
 
-提供任务发布和消费功能
+基于 aio-pika 提供异步的任务发布和消费功能，支持通道池、发布确认和自动重连。
+模块末尾的 queue_service 为按配置选择的任务队列后端，业务代码应通过它访问队列。
 """
-import pika
+import asyncio
 import json
 import logging
+import math
 import threading
-from typing import Dict, Any, Callable
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, Optional, List
+
+import aio_pika
+from aio_pika.pool import Pool
 from app.core.config import settings
+from app.services.queue_base import TaskQueueBackend, drain_handlers, get_expiration, resolve_routes, route_queue_name
 
 logger = logging.getLogger(__name__)
 
+# 消息头：累计重投次数（处理异常或消费者崩溃都会计数）
+REDELIVERY_HEADER = "x-redelivery-count"
+# 消息头：进入死信队列的原因
+DEATH_REASON_HEADER = "x-death-reason"
+# 消息头：原始路由键，用于死信重放
+ORIGINAL_ROUTING_KEY_HEADER = "x-original-routing-key"
+# 消息头：进入死信队列的时间
+DEAD_LETTERED_AT_HEADER = "x-dead-lettered-at"
+# 消息头：死信 ID，与 dead_letters 集合中的镜像记录对应
+DEAD_LETTER_ID_HEADER = "x-dead-letter-id"
+
+class RabbitMQService(TaskQueueBackend):
+    """
+    RabbitMQ 服务单例类
 
-class RabbitMQService:
-    """RabbitMQ 服务单例类"""
+    aio-pika 的连接和通道绑定在创建它们的事件循环上，而 API 进程和每个 Worker 线程
+    都运行各自独立的事件循环，因此连接状态按线程隔离保存。
+    """
 
     _instance = None  # 单例实例
 
@@ -26,7 +50,7 @@ class RabbitMQService:
         return cls._instance
 
     @property
-    def _connection(self):
+    def _connection(self) -> Optional[aio_pika.abc.AbstractRobustConnection]:
         return getattr(self._local, 'connection', None)
 
     @_connection.setter
@@ -34,59 +58,205 @@ class RabbitMQService:
         self._local.connection = value
 
     @property
-    def _channel(self):
-        return getattr(self._local, 'channel', None)
+    def _channel_pool(self) -> Optional[Pool]:
+        return getattr(self._local, 'channel_pool', None)
 
-    @_channel.setter
-    def _channel(self, value):
-        self._local.channel = value
+    @_channel_pool.setter
+    def _channel_pool(self, value):
+        self._local.channel_pool = value
 
-    def connect(self):
+    @property
+    def _lock(self) -> asyncio.Lock:
+        lock = getattr(self._local, 'lock', None)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._local.lock = lock
+        return lock
+
+    async def connect(self) -> aio_pika.abc.AbstractRobustConnection:
         """
         连接到 RabbitMQ 并初始化交换机和队列
 
+        使用 connect_robust 建立连接，网络中断后会自动重连并恢复通道、队列和消费者。
+
+        Returns:
+            AbstractRobustConnection: RabbitMQ 连接
+        """
+        async with self._lock:
+            if self._connection is None or self._connection.is_closed:
+                try:
+                    # 创建自动重连的连接
+                    self._connection = await aio_pika.connect_robust(settings.rabbitmq_url)
+
+                    # 发布通道池，每个通道都开启发布确认
+                    self._channel_pool = Pool(
+                        self._create_channel,
+                        max_size=settings.rabbitmq_channel_pool_size
+                    )
+
+                    # 声明交换机和队列
+                    async with self._channel_pool.acquire() as channel:
+                        await self._declare_topology(channel)
+
+                    logger.info("Successfully connected to RabbitMQ")
+                except Exception as e:
+                    logger.error(f"Failed to connect to RabbitMQ: {e}")
+                    self._connection = None
+                    self._channel_pool = None
+                    raise
+
+        return self._connection
+
+    async def _create_channel(self) -> aio_pika.abc.AbstractChannel:
+        """为通道池创建开启发布确认的新通道，无法路由的消息会以 PublishError 返回"""
+        return await self._connection.channel(publisher_confirms=True, on_return_raises=True)
+
+    async def _declare_topology(self, channel: aio_pika.abc.AbstractChannel):
+        """
+        声明交换机、队列并完成绑定
+
+        Args:
+            channel: RabbitMQ 通道
+
         Returns:
-            Channel: RabbitMQ 通道
+            tuple: (交换机, 队列)
+        """
+        # 声明交换机
+        exchange = await channel.declare_exchange(
+            settings.rabbitmq_exchange,
+            aio_pika.ExchangeType.DIRECT,
+            durable=True
+        )
+
+        # 声明队列
+        queue = await channel.declare_queue(
+            settings.rabbitmq_queue,
+            durable=True
+        )
+
+        # 绑定队列到交换机
+        await queue.bind(exchange, routing_key=settings.rabbitmq_queue)
+
+        # 声明死信交换机和死信队列，超过重投上限或无法解析的消息会被隔离到这里
+        dead_letter_exchange = await channel.declare_exchange(
+            settings.rabbitmq_dead_letter_exchange,
+            aio_pika.ExchangeType.FANOUT,
+            durable=True
+        )
+        dead_letter_queue = await channel.declare_queue(
+            settings.rabbitmq_dead_letter_queue,
+            durable=True
+        )
+        await dead_letter_queue.bind(dead_letter_exchange)
+        return exchange, queue
+
+    def _build_message(self, task: Dict[str, Any]) -> aio_pika.Message:
         """
-        if self._connection is None or self._connection.is_closed:
+        将任务数据封装为持久化消息
+
+        Args:
+            task: 任务数据字典
+
+        Returns:
+            Message: aio-pika 消息
+        """
+        # 设置了期限的任务带上消息过期时间，过期后由 Broker 直接丢弃，不再占用 Worker
+        remaining = get_expiration(task)
+        return aio_pika.Message(
+            body=json.dumps(task).encode(),
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,  # 持久化
+            priority=task.get('priority', 1),  # 优先级
+            expiration=max(remaining, 0) if remaining is not None else None
+        )
+
+    async def _publish_routed(self, exchange: aio_pika.abc.AbstractExchange, task: Dict[str, Any]) -> Optional[str]:
+        """
+        按候选路由依次发布任务，均无节点监听时回退到共享队列
+
+        跳过当前没有消费者的路由队列（节点崩溃后队列和绑定可能仍然存在）；
+        消息以 mandatory 方式发布，没有队列绑定的路由会被 Broker 退回。
+        实际使用的路由会写入任务的 route 字段，自动重试时沿用同一路由。
+
+        Args:
+            exchange: 任务交换机
+            task: 任务数据字典
+
+        Returns:
+            Optional[str]: 实际使用的路由，回退到共享队列时为 None
+        """
+        for route in resolve_routes(task):
+            if not await self._route_has_consumers(route):
+                logger.debug(f"No consumer on route {route}, trying next")
+                continue
             try:
-                # 创建连接
-                self._connection = pika.BlockingConnection(
-                    pika.URLParameters(settings.rabbitmq_url)
-                )
-                self._channel = self._connection.channel()
+                await exchange.publish(self._build_message({**task, "route": route}), routing_key=route)
+                return route
+            except aio_pika.exceptions.PublishError:
+                logger.debug(f"No node is bound to route {route}, trying next")
 
-                # 声明交换机
-                self._channel.exchange_declare(
-                    exchange=settings.rabbitmq_exchange,
-                    exchange_type='direct',
-                    durable=True
-                )
+        await exchange.publish(self._build_message({**task, "route": None}), routing_key=settings.rabbitmq_queue)
+        return None
 
-                # 声明队列
-                self._channel.queue_declare(
-                    queue=settings.rabbitmq_queue,
-                    durable=True
-                )
+    async def _count_route_consumers(self, route: str) -> int:
+        """
+        查询路由队列当前的消费者数量
 
-                # 绑定队列到交换机
-                self._channel.queue_bind(
-                    exchange=settings.rabbitmq_exchange,
-                    queue=settings.rabbitmq_queue,
-                    routing_key=settings.rabbitmq_queue
-                )
-                logger.info("Successfully connected to RabbitMQ")
-            except Exception as e:
-                logger.error(f"Failed to connect to RabbitMQ: {e}")
-                self._connection = None
-                self._channel = None
-                raise
+        Args:
+            route: 路由键
 
-        return self._channel
+        Returns:
+            int: 消费者数量，队列不存在时为 0
+        """
+        connection = await self.connect()
+        # 被动声明不存在的队列会关闭通道，因此使用独立通道
+        channel = await connection.channel()
+        try:
+            queue = await channel.declare_queue(route_queue_name(route), passive=True)
+            return queue.declaration_result.consumer_count
+        except aio_pika.exceptions.ChannelNotFoundEntity:
+            return 0
+        finally:
+            if not channel.is_closed:
+                await channel.close()
 
-    def publish_task(self, task: Dict[str, Any], retry: bool = True) -> bool:
+    async def _route_has_consumers(self, route: str) -> bool:
         """
-        发布任务到队列
+        判断路由队列是否有消费者，结果按线程缓存 rabbitmq_route_check_ttl 秒
+
+        同一路由并发的查询共用一次请求；查询失败时返回 True，交由 mandatory 发布判断。
+
+        Args:
+            route: 路由键
+
+        Returns:
+            bool: 是否有消费者
+        """
+        cache = getattr(self._local, "route_consumers", None)
+        if cache is None:
+            cache = self._local.route_consumers = {}
+        entry = cache.get(route)
+        if entry is None or time.monotonic() - entry[1] >= settings.rabbitmq_route_check_ttl:
+            entry = (asyncio.ensure_future(self._count_route_consumers(route)), time.monotonic())
+            cache[route] = entry
+        try:
+            return await asyncio.shield(entry[0]) > 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to check consumers on route {route}: {e}")
+            cache.pop(route, None)
+            return True
+
+    def _forget_route(self, route: str):
+        """清除当前线程缓存的路由消费者状态"""
+        cache = getattr(self._local, "route_consumers", None)
+        if cache is not None:
+            cache.pop(route, None)
+
+    async def publish_task(self, task: Dict[str, Any], retry: bool = True) -> bool:
+        """
+        发布任务到队列，并等待 Broker 的发布确认
 
         Args:
             task: 任务数据字典
@@ -96,116 +266,776 @@ class RabbitMQService:
             bool: 是否成功发布
         """
         try:
-            channel = self.connect()
-            channel.basic_publish(
-                exchange=settings.rabbitmq_exchange,
-                routing_key=settings.rabbitmq_queue,
-                body=json.dumps(task),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # 持久化
-                    priority=task.get('priority', 1)  # 优先级
-                )
-            )
-            logger.info(f"Published task {task.get('task_id')} to queue")
+            await self.connect()
+            async with self._channel_pool.acquire() as channel:
+                exchange = await channel.get_exchange(settings.rabbitmq_exchange, ensure=False)
+                route = await self._publish_routed(exchange, task)
+            logger.info(f"Published task {task.get('task_id')} to {route or settings.rabbitmq_queue}")
             return True
-        except (pika.exceptions.ConnectionClosed, pika.exceptions.StreamLostError, pika.exceptions.AMQPConnectionError) as e:
+        except (aio_pika.exceptions.AMQPConnectionError, aio_pika.exceptions.ChannelInvalidStateError, ConnectionError) as e:
             logger.warning(f"RabbitMQ connection lost during publish: {e}")
-            self._connection = None
-            self._channel = None
+            await self._reset_channel_pool()
             if retry:
                 logger.info("Retrying publish task...")
-                return self.publish_task(task, retry=False)
+                return await self.publish_task(task, retry=False)
             return False
         except Exception as e:
             logger.error(f"Failed to publish task due to unexpected error: {e}")
             return False
 
-    def consume_tasks(
+    async def publish_tasks(self, tasks: List[Dict[str, Any]], chunk_size: int = None) -> List[str]:
+        """
+        批量发布任务
+
+        按块发布：同一块内的消息在一个通道上连续发出，再统一等待发布确认，
+        避免逐条等待确认的往返延迟。
+
+        Args:
+            tasks: 任务数据字典列表
+            chunk_size: 每块消息数量，默认使用 rabbitmq_publish_batch_size
+
+        Returns:
+            List[str]: 发布失败的任务 ID 列表
+        """
+        chunk_size = chunk_size or settings.rabbitmq_publish_batch_size
+        failed_ids = []
+
+        try:
+            await self.connect()
+        except Exception as e:
+            logger.error(f"Failed to connect to RabbitMQ for batch publish: {e}")
+            return [task.get("task_id") for task in tasks]
+
+        for start in range(0, len(tasks), chunk_size):
+            chunk = tasks[start:start + chunk_size]
+            try:
+                async with self._channel_pool.acquire() as channel:
+                    exchange = await channel.get_exchange(settings.rabbitmq_exchange, ensure=False)
+                    results = await asyncio.gather(
+                        *[self._publish_routed(exchange, task) for task in chunk],
+                        return_exceptions=True
+                    )
+                for task, result in zip(chunk, results):
+                    if isinstance(result, BaseException):
+                        logger.warning(f"Failed to publish task {task.get('task_id')}: {result}")
+                        failed_ids.append(task.get("task_id"))
+            except Exception as e:
+                logger.error(f"Failed to publish task chunk: {e}")
+                failed_ids.extend(task.get("task_id") for task in chunk)
+
+        logger.info(f"Published {len(tasks) - len(failed_ids)}/{len(tasks)} tasks to queue")
+        return failed_ids
+
+    async def _declare_delay_queue(
+        self,
+        channel: aio_pika.abc.AbstractChannel,
+        delay_seconds: int,
+        target_queue: str
+    ) -> str:
+        """
+        声明指定延迟档位的延迟队列
+
+        延迟队列没有消费者，消息在队列级 TTL 到期后经死信机制转投回目标队列。
+        同一队列内所有消息 TTL 相同，不存在队头阻塞问题。
+
+        Args:
+            channel: RabbitMQ 通道
+            delay_seconds: 延迟秒数
+            target_queue: 到期后投递的目标队列（路由键）
+
+        Returns:
+            str: 延迟队列名称
+        """
+        queue_name = f"{target_queue}.retry.{delay_seconds}s"
+        ttl_ms = delay_seconds * 1000
+        await channel.declare_queue(
+            queue_name,
+            durable=True,
+            arguments={
+                "x-message-ttl": ttl_ms,
+                "x-dead-letter-exchange": settings.rabbitmq_exchange,
+                "x-dead-letter-routing-key": target_queue,
+                # 空闲一段时间后自动删除，重新声明会重置计时，因此不会早于消息到期
+                "x-expires": ttl_ms + 60000,
+            }
+        )
+        return queue_name
+
+    async def delay_task(
+        self,
+        task: Dict[str, Any],
+        delay: float,
+        routing_key: Optional[str] = None
+    ) -> bool:
+        """
+        延迟投递任务
+
+        Args:
+            task: 任务数据字典
+            delay: 延迟秒数（向上取整到秒，每个秒数对应一个延迟队列）
+            routing_key: 到期后投递的目标队列，默认为共享任务队列
+
+        Returns:
+            bool: 是否成功投递
+        """
+        delay_seconds = max(1, math.ceil(delay))
+        try:
+            await self.connect()
+            # 路由已没有消费者时改投共享队列，避免到期后被转投到无人消费（或已删除）的路由队列
+            if routing_key and not await self._route_has_consumers(routing_key):
+                routing_key = None
+                task = {**task, "route": None}
+            target_queue = routing_key or settings.rabbitmq_queue
+            async with self._channel_pool.acquire() as channel:
+                queue_name = await self._declare_delay_queue(channel, delay_seconds, target_queue)
+                await channel.default_exchange.publish(
+                    self._build_message(task),
+                    routing_key=queue_name
+                )
+            logger.info(f"Delayed task {task.get('task_id')} by {delay_seconds}s via {queue_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delay task {task.get('task_id')}: {e}")
+            return False
+
+    async def consume_tasks(
         self,
-        callback: Callable[[Dict[str, Any]], None],
+        callback: Callable[[Dict[str, Any]], Awaitable[None]],
         prefetch_count: int = 1,
-        should_stop: Callable[[], bool] = None
+        should_stop: Callable[[], bool] = None,
+        on_dead_letter: Optional[Callable[[Optional[Dict[str, Any]], str], Awaitable[None]]] = None,
+        routes: Optional[List[str]] = None,
+        consumer_name: Optional[str] = None,
+        drain_timeout: float = 0
     ):
         """
         开始消费队列中的任务
 
+        每条消息在独立的协程中处理，处理完成后才确认消息，
+        因此 prefetch_count 即为该消费者的最大并发数。
+        处理异常或消费者崩溃导致的重投会被计数，超过 max_redeliveries 的消息转入死信队列。
+
         Args:
-            callback: 处理任务的回调函数
+            callback: 处理任务的异步回调函数
             prefetch_count: 预取消息数量
             should_stop: 可选的停止判断函数
+            on_dead_letter: 可选的死信回调，参数为任务数据（无法解析时为 None）和原因
+            routes: 除共享队列外额外监听的路由列表
+            consumer_name: 未使用，消费者崩溃后由 Broker 自动重新投递未确认的消息
+            drain_timeout: 停止时等待处理中消息完成的最长时间（秒）
         """
         channel = None
+        consumer = None
+        handlers = set()  # 正在处理中的消息协程
+
+        async def handle(message: aio_pika.abc.AbstractIncomingMessage):
+            """消息处理包装函数"""
+            redeliveries = int((message.headers or {}).get(REDELIVERY_HEADER, 0))
+            try:
+                if message.redelivered:
+                    # 上次投递未被确认（消费者崩溃或连接中断），计数后重新投递一份副本，
+                    # 使计数能够随消息保存下来
+                    await self._requeue_or_dead_letter(message, redeliveries + 1, on_dead_letter)
+                    return
+
+                # 解析任务，无法解析的消息直接隔离，避免无限重试
+                try:
+                    task = json.loads(message.body)
+                except ValueError as e:
+                    logger.error(f"Received malformed task message: {e}")
+                    await self._dead_letter(message, f"Malformed message: {e}", redeliveries, on_dead_letter)
+                    return
+
+                # 调用回调函数处理任务
+                await callback(task)
+                # 确认消息已处理
+                await message.ack()
+            except asyncio.CancelledError:
+                # 停止时超过排空期限仍未完成，原样重新投递，不计入重投次数
+                try:
+                    await self._requeue_or_dead_letter(message, redeliveries, on_dead_letter)
+                except Exception as requeue_error:
+                    logger.warning(f"Failed to requeue unfinished message: {requeue_error}")
+                raise
+            except Exception as e:
+                logger.error(f"Error processing task: {e}")
+                try:
+                    # 重投次数加一后重新入队，超过上限则转入死信队列
+                    await self._requeue_or_dead_letter(message, redeliveries + 1, on_dead_letter)
+                except Exception as requeue_error:
+                    logger.warning(f"Failed to requeue message, falling back to nack: {requeue_error}")
+                    try:
+                        await message.nack(requeue=True)
+                    except Exception as nack_error:
+                        logger.warning(f"Failed to nack message: {nack_error}")
+
+        async def on_message(message: aio_pika.abc.AbstractIncomingMessage):
+            """将消息分派到独立协程，避免阻塞后续消息的投递"""
+            handler = asyncio.create_task(handle(message))
+            handlers.add(handler)
+            handler.add_done_callback(handlers.discard)
+
         try:
-            channel = self.connect()
+            connection = await self.connect()
+            channel = await connection.channel()
             # 设置预取数量，实现公平分发
-            channel.basic_qos(prefetch_count=prefetch_count)
+            await channel.set_qos(prefetch_count=prefetch_count)
+            exchange, queue = await self._declare_topology(channel)
 
-            def wrapper(ch, method, properties, body):
-                """消息处理包装函数"""
-                try:
-                    # 解析任务
-                    task = json.loads(body)
-                    # 调用回调函数处理任务
-                    callback(task)
-                    
-                    # 注意：由于 callback(task) 内部可能包含异步处理逻辑（如 asyncio.run_coroutine_threadsafe），
-                    # 这里立即确认消息可能存在风险（如果任务还没处理完进程就崩溃了）。
-                    # 但在当前的 worker.py 实现中，回调函数会将协程提交给事件循环。
-                    # 为了确保任务不会因为节点停止而“丢失”且保持 PROCESSING，
-                    # 我们在 worker.py 的 stop() 方法中已经添加了重置状态逻辑。
-                    
-                    # 确认消息已处理
-                    ch.basic_ack(delivery_tag=method.delivery_tag)
-                except Exception as e:
-                    logger.error(f"Error processing task: {e}")
-                    # 拒绝消息并重新入队，以便其他节点处理或稍后重试
-                    ch.basic_nack(
-                        delivery_tag=method.delivery_tag,
-                        requeue=True
-                    )
+            # 记录当前线程的消费者，以便运行时调整预取数量和监听的路由
+            consumer = {
+                "channel": channel,
+                "exchange": exchange,
+                "on_message": on_message,
+                "queues": {}  # 队列名 -> (队列, 消费者标签)
+            }
+            self._local.consumer = consumer
 
-            # 开始消费消息
-            channel.basic_consume(
-                queue=settings.rabbitmq_queue,
-                on_message_callback=wrapper
-            )
+            # 开始消费共享队列和路由队列
+            consumer["queues"][queue.name] = (queue, await queue.consume(on_message))
+            for route in routes or []:
+                await self._subscribe_route(consumer, route)
+            logger.info(f"Started consuming tasks from {', '.join(consumer['queues'])}")
 
-            logger.info("Started consuming tasks...")
-            
-            # 使用循环非阻塞方式消费，以便响应停止信号
+            # 周期性检查停止信号
             while True:
                 if should_stop and should_stop():
-                    logger.info("Consumer loop: detected stop signal, exiting...")
+                    logger.info("Consumer loop: detected stop signal, draining...")
                     break
-                
-                try:
-                    # 检查消息，超时时间设为 0.5 秒，更频繁地检查停止信号
-                    self._connection.process_data_events(time_limit=0.5)
-                except Exception as e:
-                    logger.error(f"Error in process_data_events: {e}")
-                    break
-                
-        except KeyboardInterrupt:
+                await asyncio.sleep(0.5)
+
+            # 先取消订阅不再接收新消息，处理中的消息完成后仍在原通道上确认
+            self._local.consumer = None
+            await self._cancel_consumer(consumer)
+            await drain_handlers(handlers, drain_timeout)
+
+        except asyncio.CancelledError:
             logger.info("Stopping consumer...")
+            raise
         except Exception as e:
             logger.error(f"Error in consumer: {e}")
         finally:
-            # 不要在这里关闭单例的连接，只需停止当前消费
-            if channel and not channel.is_closed:
+            # 取消消费并关闭消费通道，未确认的消息会由 Broker 重新投递
+            self._local.consumer = None
+            if consumer is not None:
+                await self._cancel_consumer(consumer)
+            if channel is not None and not channel.is_closed:
+                try:
+                    await channel.close()
+                except Exception:
+                    pass
+
+    async def _cancel_consumer(self, consumer: Dict[str, Any]):
+        """
+        取消消费者在所有队列上的订阅
+
+        Args:
+            consumer: 消费者信息
+        """
+        queues, consumer["queues"] = consumer["queues"], {}
+        for queue, consumer_tag in queues.values():
+            try:
+                await queue.cancel(consumer_tag)
+            except Exception:
+                pass
+        for name in queues:
+            if name != settings.rabbitmq_queue:
+                await self._release_route(name[len(settings.rabbitmq_queue) + 1:])
+
+    async def set_prefetch(self, prefetch_count: int) -> bool:
+        """
+        运行时调整当前线程消费者的预取数量
+
+        RabbitMQ 的 basic_qos 只对之后创建的消费者生效，因此在设置新值后重新订阅队列。
+        取消订阅不会归还已投递未确认的消息，正在处理的任务仍可在原通道上确认。
+
+        Args:
+            prefetch_count: 新的预取数量
+
+        Returns:
+            bool: 是否已调整（当前线程没有正在运行的消费者时返回 False）
+        """
+        consumer = getattr(self._local, "consumer", None)
+        if consumer is None:
+            return False
+
+        await consumer["channel"].set_qos(prefetch_count=prefetch_count)
+        for name, (queue, old_tag) in list(consumer["queues"].items()):
+            consumer["queues"][name] = (queue, await queue.consume(consumer["on_message"]))
+            await queue.cancel(old_tag)
+        logger.info(f"Consumer prefetch changed to {prefetch_count}")
+        return True
+
+    async def _subscribe_route(self, consumer: Dict[str, Any], route: str):
+        """
+        声明路由队列、绑定到任务交换机并开始消费
+
+        Args:
+            consumer: 当前线程的消费者信息
+            route: 路由键
+        """
+        queue = await consumer["channel"].declare_queue(route_queue_name(route), durable=True)
+        await queue.bind(consumer["exchange"], routing_key=route)
+        consumer["queues"][queue.name] = (queue, await queue.consume(consumer["on_message"]))
+        self._forget_route(route)
+
+    async def _release_route(self, route: str):
+        """
+        消费者离开路由后，如果路由队列已没有其他消费者，解除绑定、将积压的消息转回共享队列并删除队列
+
+        解除绑定后新的任务会被 Broker 退回并回退到共享队列，不会滞留在无人消费的队列中。
+        解除绑定期间有其他节点开始监听时恢复绑定，队列保留。
+
+        AMQP 无法在两个队列之间原子地移动消息：每条消息先确认写入共享队列再确认原消息，保证至少一次投递。
+        两步之间进程退出时原消息会被重新投递，共享队列中多出一份副本；副本只会让同一任务再执行一次，
+        终态写入以 Worker._active_filter 为条件，已取消或已过期的任务不会被覆盖。
+
+        Args:
+            route: 路由键
+        """
+        self._forget_route(route)
+        try:
+            connection = await self.connect()
+            # 被动声明不存在的队列会关闭通道，因此使用独立通道
+            channel = await connection.channel(publisher_confirms=True)
+        except Exception as e:
+            logger.warning(f"Failed to release route {route}: {e}")
+            return
+
+        try:
+            queue = await channel.declare_queue(route_queue_name(route), passive=True)
+            if queue.declaration_result.consumer_count:
+                return
+            exchange = await channel.get_exchange(settings.rabbitmq_exchange, ensure=False)
+            await queue.unbind(exchange, routing_key=route)
+
+            queue = await channel.declare_queue(route_queue_name(route), passive=True)
+            if queue.declaration_result.consumer_count:
+                await queue.bind(exchange, routing_key=route)
+                return
+
+            moved = 0
+            while True:
+                message = await queue.get(no_ack=False, fail=False)
+                if message is None:
+                    break
+                try:
+                    body = json.dumps({**json.loads(message.body), "route": None}).encode()
+                except (ValueError, TypeError):
+                    body = message.body
+                await exchange.publish(
+                    self._copy_message(message, dict(message.headers or {}), body=body),
+                    routing_key=settings.rabbitmq_queue
+                )
+                await message.ack()
+                moved += 1
+            await queue.delete(if_unused=True, if_empty=True)
+            logger.info(f"Released route {route}: moved {moved} pending tasks to {settings.rabbitmq_queue}")
+        except aio_pika.exceptions.ChannelNotFoundEntity:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to release route {route}: {e}")
+        finally:
+            if not channel.is_closed:
                 try:
-                    channel.stop_consuming()
-                except:
+                    await channel.close()
+                except Exception:
                     pass
 
-    def close(self):
-        """关闭 RabbitMQ 连接"""
-        if self._channel and not self._channel.is_closed:
-            self._channel.close()
-        if self._connection and not self._connection.is_closed:
-            self._connection.close()
-        self._channel = None
+    async def set_routes(self, routes: List[str]) -> bool:
+        """
+        运行时调整当前线程消费者监听的路由，共享队列始终保持监听
+
+        停止监听的路由如果已没有其他消费者，积压的消息转回共享队列，之后的任务也回退到共享队列。
+
+        Args:
+            routes: 新的路由列表
+
+        Returns:
+            bool: 是否已调整（当前线程没有正在运行的消费者时返回 False）
+        """
+        consumer = getattr(self._local, "consumer", None)
+        if consumer is None:
+            return False
+
+        wanted = {route_queue_name(route): route for route in routes}
+        for name, (queue, tag) in list(consumer["queues"].items()):
+            if name != settings.rabbitmq_queue and name not in wanted:
+                await queue.cancel(tag)
+                del consumer["queues"][name]
+                await self._release_route(name[len(settings.rabbitmq_queue) + 1:])
+        for name, route in wanted.items():
+            if name not in consumer["queues"]:
+                await self._subscribe_route(consumer, route)
+        logger.info(f"Consumer now listening on {', '.join(consumer['queues'])}")
+        return True
+
+    async def _requeue_or_dead_letter(
+        self,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        redeliveries: int,
+        on_dead_letter: Optional[Callable] = None
+    ):
+        """
+        带重投计数重新投递消息，超过上限时转入死信队列
+
+        先发布副本再确认原消息，保证至少一次投递。
+
+        Args:
+            message: 原始消息
+            redeliveries: 新的重投次数
+            on_dead_letter: 可选的死信回调
+        """
+        if redeliveries > settings.max_redeliveries:
+            await self._dead_letter(
+                message,
+                f"Exceeded max redeliveries ({settings.max_redeliveries})",
+                redeliveries,
+                on_dead_letter
+            )
+            return
+
+        routing_key = message.routing_key or settings.rabbitmq_queue
+        headers = dict(message.headers or {})
+        headers[REDELIVERY_HEADER] = redeliveries
+        async with self._channel_pool.acquire() as channel:
+            exchange = await channel.get_exchange(settings.rabbitmq_exchange, ensure=False)
+            await exchange.publish(
+                self._copy_message(message, headers),
+                routing_key=routing_key
+            )
+        await message.ack()
+        logger.warning(f"Requeued message on {routing_key} (redelivery {redeliveries}/{settings.max_redeliveries})")
+
+    async def _dead_letter(
+        self,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        reason: str,
+        redeliveries: int,
+        on_dead_letter: Optional[Callable] = None
+    ):
+        """
+        将消息转入死信队列并确认原消息
+
+        Args:
+            message: 原始消息
+            reason: 进入死信队列的原因
+            redeliveries: 已重投次数
+            on_dead_letter: 可选的死信回调
+        """
+        headers = dict(message.headers or {})
+        headers.update({
+            REDELIVERY_HEADER: redeliveries,
+            DEATH_REASON_HEADER: reason,
+            ORIGINAL_ROUTING_KEY_HEADER: message.routing_key or settings.rabbitmq_queue,
+            DEAD_LETTERED_AT_HEADER: datetime.now().isoformat(),
+            DEAD_LETTER_ID_HEADER: uuid.uuid4().hex,
+        })
+        dead_letter = self._copy_message(message, headers)
+        async with self._channel_pool.acquire() as channel:
+            exchange = await channel.get_exchange(settings.rabbitmq_dead_letter_exchange, ensure=False)
+            await exchange.publish(dead_letter, routing_key=settings.rabbitmq_dead_letter_queue)
+        await message.ack()
+        await self._mirror_dead_letter(dead_letter)
+        logger.error(f"Dead-lettered message after {redeliveries} redeliveries: {reason}")
+
+        if on_dead_letter:
+            try:
+                task = json.loads(message.body)
+            except ValueError:
+                task = None
+            try:
+                await on_dead_letter(task, reason)
+            except Exception as e:
+                logger.error(f"Dead letter callback error: {e}")
+
+    def _copy_message(
+        self,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        headers: Dict[str, Any],
+        body: Optional[bytes] = None
+    ) -> aio_pika.Message:
+        """
+        基于收到的消息构建一份新的持久化消息
+
+        Args:
+            message: 原始消息
+            headers: 新消息的消息头
+            body: 新消息的消息体，默认沿用原消息
+
+        Returns:
+            Message: aio-pika 消息
+        """
+        return aio_pika.Message(
+            body=message.body if body is None else body,
+            headers=headers,
+            content_type=message.content_type or "application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            priority=message.priority
+        )
+
+    async def _fetch_dead_letters(self, channel: aio_pika.abc.AbstractChannel, limit: int) -> list:
+        """
+        从死信队列中取出最多 limit 条消息（未确认）
+
+        在同一通道上未确认的消息不会被再次取出，调用方需逐条 ack 或 nack。
+
+        Args:
+            channel: 专用通道
+            limit: 最大数量
+
+        Returns:
+            list: 消息列表
+        """
+        queue = await channel.get_queue(settings.rabbitmq_dead_letter_queue, ensure=False)
+        messages = []
+        while len(messages) < limit:
+            message = await queue.get(no_ack=False, fail=False)
+            if message is None:
+                break
+            messages.append(message)
+        return messages
+
+    async def _mirror_dead_letter(self, message: aio_pika.abc.AbstractMessage):
+        """
+        将死信写入 dead_letters 集合的镜像记录，查看死信时读取镜像，不从队列中取出消息
+
+        镜像写入失败只记录日志，死信消息本身已经可靠地进入死信队列。
+
+        Args:
+            message: 已发布到死信队列的消息
+        """
+        from app.db.mongo import mongo
+        try:
+            await asyncio.to_thread(mongo.dead_letters.insert_one, self._describe_dead_letter(message))
+        except Exception as e:
+            logger.error(f"Failed to mirror dead letter: {e}")
+
+    async def _remove_dead_letter_mirrors(self, dead_letter_ids: Optional[List[str]] = None):
+        """
+        删除已重放或已清除的死信镜像记录
+
+        Args:
+            dead_letter_ids: 死信 ID 列表，为 None 时删除全部镜像
+        """
+        from app.db.mongo import mongo
+        if dead_letter_ids is not None and not dead_letter_ids:
+            return
+        query = {} if dead_letter_ids is None else {"dead_letter_id": {"$in": dead_letter_ids}}
+        try:
+            await asyncio.to_thread(mongo.dead_letters.delete_many, query)
+        except Exception as e:
+            logger.error(f"Failed to remove dead letter mirrors: {e}")
+
+    def _describe_dead_letter(self, message: aio_pika.abc.AbstractMessage) -> Dict[str, Any]:
+        """
+        将死信消息转换为便于展示的字典
+
+        Args:
+            message: 死信消息
+
+        Returns:
+            dict: 死信信息
+        """
+        headers = message.headers or {}
+        try:
+            task = json.loads(message.body)
+            raw_body = None
+        except ValueError:
+            task = None
+            raw_body = message.body.decode("utf-8", errors="replace")
+        return {
+            "dead_letter_id": headers.get(DEAD_LETTER_ID_HEADER),
+            "task_id": task.get("task_id") if isinstance(task, dict) else None,
+            "task": task,
+            "raw_body": raw_body,
+            "reason": headers.get(DEATH_REASON_HEADER),
+            "redeliveries": int(headers.get(REDELIVERY_HEADER, 0)),
+            "routing_key": headers.get(ORIGINAL_ROUTING_KEY_HEADER),
+            "dead_lettered_at": headers.get(DEAD_LETTERED_AT_HEADER),
+        }
+
+    async def get_queue_depth(self, route: Optional[str] = None) -> int:
+        """
+        获取队列中等待投递的消息数量（不含已投递未确认的消息）
+
+        Args:
+            route: 路由，为空时为共享队列
+
+        Returns:
+            int: 消息数量，队列不存在时为 0
+        """
+        connection = await self.connect()
+        # 被动声明不存在的队列会关闭通道，因此使用独立通道
+        channel = await connection.channel()
+        try:
+            queue = await channel.declare_queue(
+                route_queue_name(route) if route else settings.rabbitmq_queue,
+                passive=True
+            )
+            return queue.declaration_result.message_count
+        except aio_pika.exceptions.ChannelNotFoundEntity:
+            return 0
+        finally:
+            if not channel.is_closed:
+                await channel.close()
+
+    async def get_dead_letter_count(self) -> int:
+        """
+        获取死信队列中的消息数量
+
+        Returns:
+            int: 消息数量
+        """
+        await self.connect()
+        async with self._channel_pool.acquire() as channel:
+            queue = await channel.declare_queue(settings.rabbitmq_dead_letter_queue, passive=True)
+            return queue.declaration_result.message_count
+
+    async def inspect_dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        查看死信（按进入死信队列的先后顺序）
+
+        读取 dead_letters 集合中的镜像记录，不从死信队列中取出再退回消息，
+        查看不会打乱队列顺序，也不会改变消息的重投标记。
+
+        Args:
+            limit: 最大数量
+
+        Returns:
+            list: 死信信息列表
+        """
+        from app.db.mongo import mongo
+
+        def load() -> List[Dict[str, Any]]:
+            return list(mongo.dead_letters.find({}, {"_id": 0}).sort("dead_lettered_at", 1).limit(limit))
+
+        return await asyncio.to_thread(load)
+
+    async def replay_dead_letters(self, task_ids: Optional[List[str]] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        将死信消息重新投递到原任务队列，重投计数清零
+
+        Args:
+            task_ids: 仅重放这些任务（为空时重放全部）
+            limit: 本次最多扫描的消息数量
+
+        Returns:
+            list: 已重放的任务数据列表
+        """
+        connection = await self.connect()
+        channel = await connection.channel(publisher_confirms=True)
+        replayed = []
+        try:
+            messages = await self._fetch_dead_letters(channel, limit)
+            exchange = await channel.get_exchange(settings.rabbitmq_exchange, ensure=False)
+            replayed_ids = []
+            for message in messages:
+                info = self._describe_dead_letter(message)
+                if info["task"] is None or (task_ids and info["task_id"] not in task_ids):
+                    await message.nack(requeue=True)
+                    continue
+                await exchange.publish(
+                    self._copy_message(message, {REDELIVERY_HEADER: 0}),
+                    routing_key=info["routing_key"] or settings.rabbitmq_queue
+                )
+                await message.ack()
+                replayed.append(info["task"])
+                replayed_ids.append(info["dead_letter_id"])
+            await self._remove_dead_letter_mirrors([i for i in replayed_ids if i])
+            logger.info(f"Replayed {len(replayed)} dead-lettered tasks")
+            return replayed
+        finally:
+            await channel.close()
+
+    async def purge_dead_letters(self, task_ids: Optional[List[str]] = None, limit: int = 1000) -> int:
+        """
+        清除死信消息
+
+        Args:
+            task_ids: 仅清除这些任务的死信（为空时清空整个死信队列）
+            limit: 按任务清除时最多扫描的消息数量
+
+        Returns:
+            int: 清除的消息数量
+        """
+        connection = await self.connect()
+        channel = await connection.channel()
+        try:
+            if not task_ids:
+                queue = await channel.get_queue(settings.rabbitmq_dead_letter_queue, ensure=False)
+                result = await queue.purge()
+                await self._remove_dead_letter_mirrors()
+                return result.message_count
+
+            purged_ids = []
+            for message in await self._fetch_dead_letters(channel, limit):
+                info = self._describe_dead_letter(message)
+                if info["task_id"] in task_ids:
+                    await message.ack()
+                    purged_ids.append(info["dead_letter_id"])
+                else:
+                    await message.nack(requeue=True)
+            await self._remove_dead_letter_mirrors([i for i in purged_ids if i])
+            return len(purged_ids)
+        finally:
+            await channel.close()
+
+    async def _reset_channel_pool(self):
+        """
+        丢弃当前线程的发布通道池，下次发布时在原连接上重新创建通道
+
+        连接由 connect_robust 自动重连，不在这里关闭：同一线程的连接上还有 Worker 的消费通道。
+        """
+        async with self._lock:
+            pool = self._channel_pool
+            if pool is None or self._connection is None:
+                return
+            self._channel_pool = Pool(self._create_channel, max_size=settings.rabbitmq_channel_pool_size)
+        try:
+            await pool.close()
+        except Exception as e:
+            logger.warning(f"Error closing RabbitMQ channel pool: {e}")
+
+    async def close(self):
+        """关闭当前线程的 RabbitMQ 连接"""
+        pool = self._channel_pool
+        connection = self._connection
+        self._channel_pool = None
         self._connection = None
+        try:
+            if pool is not None:
+                await pool.close()
+            if connection is not None and not connection.is_closed:
+                await connection.close()
+        except Exception as e:
+            logger.warning(f"Error closing RabbitMQ connection: {e}")
 
 
 # 全局 RabbitMQ 服务实例
 rabbitmq_service = RabbitMQService()
+
+
+def get_queue_backend(backend: str) -> TaskQueueBackend:
+    """
+    获取指定名称的任务队列后端
+
+    Args:
+        backend: 后端名称，rabbitmq、redis 或 memory
+
+    Returns:
+        TaskQueueBackend: 任务队列后端实例
+    """
+    if backend == "redis":
+        from app.services.redis_queue_service import redis_queue_service
+        return redis_queue_service
+    if backend == "memory":
+        from app.services.memory_queue_service import memory_queue_service
+        return memory_queue_service
+    if backend != "rabbitmq":
+        raise ValueError(f"Unknown queue backend: {backend}")
+    return rabbitmq_service
+
+
+# 全局任务队列服务实例，由 QUEUE_BACKEND 决定使用的后端，单机模式下固定使用进程内队列
+queue_service = get_queue_backend("memory" if settings.standalone_mode else settings.queue_backend)
@@ -0,0 +1,197 @@
+"""
+孤儿任务回收服务模块
+
+节点进程异常退出后，其处理中的任务会一直停留在 processing 状态。
+回收服务在 API 进程中周期运行：找出所属节点心跳已超时（或节点记录已不存在）的 processing 任务，
+在重试次数内重新入队，否则标记为失败。
+
+同时清理超过期限仍在等待的任务：过期消息可能已被 Broker 丢弃，不会再到达 Worker。
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.db.async_mongo import amongo
+from app.services.metrics_service import metrics_service
+from app.services.queue_base import build_queue_task
+from app.services.queue_service import queue_service
+from app.services.singleflight_service import singleflight_service
+from app.services.task_event_service import task_event_service
+
+logger = logging.getLogger(__name__)
+
+
+class TaskReaperService:
+    """孤儿任务回收服务类"""
+
+    def __init__(self):
+        self._task = None  # 后台回收协程
+
+    async def _find_live_nodes(self, cutoff: datetime) -> List[str]:
+        """
+        获取心跳不早于截止时间的节点
+
+        Args:
+            cutoff: 心跳截止时间
+
+        Returns:
+            List[str]: 存活节点 ID 列表
+        """
+        docs = await amongo.nodes.find({"last_seen": {"$gte": cutoff}}, {"node_id": 1}).to_list(None)
+        return [doc["node_id"] for doc in docs if doc.get("node_id")]
+
+    async def reap_once(self) -> Dict[str, int]:
+        """
+        执行一轮回收
+
+        所属节点不在存活节点中的 processing 任务视为孤儿任务：包括心跳超时的节点，
+        以及节点记录已被删除或从未写入的情况。查询条件 (status, node_id, updated_at) 由复合索引覆盖；
+        每个任务通过带原状态条件的 find_one_and_update 认领，多个 API 进程同时回收时同一任务只会被处理一次。
+
+        Returns:
+            dict: requeued（重新入队数量）、failed（标记失败数量）
+        """
+        stats = {"requeued": 0, "failed": 0}
+        cutoff = datetime.now() - timedelta(seconds=settings.task_reaper_node_timeout)
+        live_nodes = await self._find_live_nodes(cutoff)
+
+        candidates = await amongo.tasks.find(
+            {"status": "processing", "node_id": {"$nin": live_nodes}, "updated_at": {"$lt": cutoff}},
+            {"task_id": 1, "node_id": 1}
+        ).limit(settings.task_reaper_batch_size).to_list(None)
+
+        for candidate in candidates:
+            try:
+                outcome = await self._reap_task(candidate["task_id"], candidate.get("node_id"), cutoff)
+                if outcome:
+                    stats[outcome] += 1
+            except Exception as e:
+                logger.error(f"Failed to reap task {candidate.get('task_id')}: {e}")
+
+        if stats["requeued"] or stats["failed"]:
+            await metrics_service.incr("reaped", stats["requeued"] + stats["failed"])
+            lost_nodes = sorted({str(candidate.get("node_id")) for candidate in candidates})
+            logger.warning(
+                f"Reaped orphaned tasks from lost nodes {lost_nodes}: "
+                f"{stats['requeued']} requeued, {stats['failed']} failed"
+            )
+        return stats
+
+    async def _reap_task(self, task_id: str, node_id: str, cutoff: datetime):
+        """
+        回收单个孤儿任务
+
+        Args:
+            task_id: 任务 ID
+            node_id: 任务所属的失联节点 ID（任务未记录节点时为 None）
+            cutoff: 心跳截止时间
+
+        Returns:
+            Optional[str]: "requeued"、"failed"，任务已被其他进程处理时返回 None
+        """
+        now = datetime.now()
+        error = {"message": f"Node {node_id} stopped sending heartbeats during processing", "type": "NodeLost"}
+        claim = {"task_id": task_id, "status": "processing", "node_id": node_id, "updated_at": {"$lt": cutoff}}
+
+        # 与 RetryService 一致：已执行次数不超过 max_retries 时重新执行
+        task = await amongo.tasks.find_one_and_update(
+            {**claim, "$or": [{"attempts": {"$lte": settings.max_retries}}, {"attempts": None}]},
+            {"$set": {"status": "pending", "node_id": None, "error": error, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if task:
+            queue_task = build_queue_task(task, attempt=(task.get("attempts") or 1) + 1)
+            if await queue_service.publish_task(queue_task):
+                task_event_service.publish("pending", task_id)
+                return "requeued"
+            logger.error(f"Failed to requeue orphaned task {task_id}, marking as failed")
+            claim = {"task_id": task_id, "status": "pending", "node_id": None}
+            error = {**error, "message": f"{error['message']}; failed to re-queue task"}
+
+        task = await amongo.tasks.find_one_and_update(
+            claim,
+            {"$set": {"status": "failed", "error": error, "updated_at": now, "completed_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not task:
+            return None
+        task_event_service.publish("failed", task_id)
+        if task.get("cache_key"):
+            await singleflight_service.complete(task["cache_key"], task_id)
+        return "failed"
+
+    async def expire_once(self) -> int:
+        """
+        将超过期限仍在等待的任务标记为过期
+
+        查询条件 (status, expires_at) 由复合索引覆盖。
+
+        Returns:
+            int: 标记为过期的任务数量
+        """
+        now = datetime.now()
+        candidates = await amongo.tasks.find(
+            {"status": "pending", "expires_at": {"$lt": now}},
+            {"task_id": 1, "cache_key": 1, "expires_at": 1}
+        ).limit(settings.task_reaper_batch_size).to_list(None)
+
+        expired = 0
+        for candidate in candidates:
+            task_id = candidate["task_id"]
+            overdue = (now - candidate["expires_at"]).total_seconds()
+            result = await amongo.tasks.update_one(
+                {"task_id": task_id, "status": "pending"},
+                {"$set": {
+                    "status": "expired",
+                    "error": {"message": f"Task expired {overdue:.1f}s before execution started", "type": "TaskExpired"},
+                    "updated_at": now,
+                    "completed_at": now
+                }}
+            )
+            if not result.modified_count:
+                continue
+            expired += 1
+            task_event_service.publish("expired", task_id)
+            # 释放租约，仍在等待的跟随任务接替执行
+            if candidate.get("cache_key"):
+                await singleflight_service.complete(candidate["cache_key"], task_id)
+
+        if expired:
+            await metrics_service.incr("expired", expired)
+            logger.info(f"Expired {expired} tasks that passed their deadline while queued")
+        return expired
+
+    async def _run(self):
+        """后台回收循环"""
+        logger.info(
+            f"Task reaper started (interval={settings.task_reaper_interval}s, "
+            f"node_timeout={settings.task_reaper_node_timeout}s)"
+        )
+        while True:
+            try:
+                await self.reap_once()
+                await self.expire_once()
+            except Exception as e:
+                logger.error(f"Task reaper error: {e}")
+            await asyncio.sleep(settings.task_reaper_interval)
+
+    def start(self):
+        """启动后台回收协程（需在事件循环中调用）"""
+        if settings.task_reaper_enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台回收协程"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 全局孤儿任务回收服务实例
+reaper_service = TaskReaperService()
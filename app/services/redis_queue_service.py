@@ -0,0 +1,803 @@
+"""
+Redis Streams 任务队列服务模块
+
+基于 Redis Streams 和消费者组实现任务队列，小规模部署可以不再依赖 RabbitMQ：
+- 每个队列（共享队列和路由队列）对应一个 Stream，所有 Worker 共用一个消费者组
+- 处理完成后 XACK 并 XDEL，Stream 长度即为积压量
+- 消费者崩溃后未确认的消息由其他消费者通过 XAUTOCLAIM 认领，并计为一次重投
+- 延迟任务保存在有序集合中，到期后由消费者搬运回目标 Stream
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, Optional, List, Set, Tuple
+
+import redis.asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError
+from app.core.config import settings
+from app.services.queue_base import TaskQueueBackend, drain_handlers, resolve_routes, route_queue_name
+
+logger = logging.getLogger(__name__)
+
+# 原子地将到期的延迟任务写回目标 Stream
+# KEYS[1] 为延迟任务有序集合，KEYS[i]（i >= 2）为第 i - 1 个任务的目标 Stream；
+# ARGV 依次为每个任务的 (有序集合成员, 任务 JSON)。只有成功移除成员的任务才写入，
+# 多个消费者同时搬运同一批任务时不会重复投递。
+PROMOTE_DELAYED_SCRIPT = """
+local promoted = 0
+for i = 2, #KEYS do
+    if redis.call('zrem', KEYS[1], ARGV[2 * i - 3]) == 1 then
+        redis.call('xadd', KEYS[i], '*', 'task', ARGV[2 * i - 2], 'redeliveries', '0')
+        promoted = promoted + 1
+    end
+end
+return promoted
+"""
+
+# 每次搬运的延迟任务数量上限
+PROMOTE_BATCH_SIZE = 100
+
+
+def parse_route_members(members: List[str]) -> Set[str]:
+    """
+    从路由登记成员（"路由|消费者"）中解析出路由
+
+    Args:
+        members: 有序集合成员
+
+    Returns:
+        Set[str]: 路由集合
+    """
+    return {member.rsplit("|", 1)[0] for member in members if "|" in member}
+
+
+class RedisStreamQueueService(TaskQueueBackend):
+    """
+    Redis Streams 队列服务单例类
+
+    redis.asyncio 的连接绑定在创建它的事件循环上，因此与 RabbitMQService 一样按线程隔离保存。
+    """
+
+    _instance = None  # 单例实例
+
+    def __new__(cls):
+        """实现单例模式"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._local = threading.local()
+        return cls._instance
+
+    def _key(self, name: str) -> str:
+        return f"{settings.redis_stream_prefix}:{name}"
+
+    def _stream_key(self, route: Optional[str] = None) -> str:
+        return self._key(route_queue_name(route) if route else settings.rabbitmq_queue)
+
+    @property
+    def _route_consumers_key(self) -> str:
+        # 有序集合：成员为 "路由|消费者"，分数为最近一次登记时间，用于判断路由是否有消费者
+        return self._key("route_consumers")
+
+    @property
+    def _delayed_key(self) -> str:
+        return self._key("delayed")
+
+    @property
+    def _dead_letter_key(self) -> str:
+        return self._key(settings.rabbitmq_dead_letter_queue)
+
+    async def connect(self) -> aioredis.Redis:
+        """
+        获取当前线程的 Redis 客户端
+
+        Returns:
+            Redis: 异步 Redis 客户端
+        """
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = aioredis.from_url(settings.redis_url, decode_responses=True)
+            self._local.client = client
+        return client
+
+    def _build_fields(self, task: Dict[str, Any], redeliveries: int = 0) -> Dict[str, Any]:
+        """
+        将任务数据封装为 Stream 条目字段
+
+        Args:
+            task: 任务数据字典
+            redeliveries: 已重投次数
+
+        Returns:
+            dict: 条目字段
+        """
+        return {"task": json.dumps(task), "redeliveries": redeliveries}
+
+    async def _live_routes(self, client: aioredis.Redis) -> Set[str]:
+        """
+        获取当前有消费者监听的路由（登记未超过 redis_stream_route_ttl 秒）
+
+        Args:
+            client: Redis 客户端
+
+        Returns:
+            Set[str]: 路由集合
+        """
+        members = await client.zrangebyscore(
+            self._route_consumers_key, time.time() - settings.redis_stream_route_ttl, "+inf"
+        )
+        return parse_route_members(members)
+
+    def _route_task(self, task: Dict[str, Any], bound_routes: Set[str]) -> Tuple[str, Dict[str, Any]]:
+        """
+        按候选路由选择目标 Stream，均无节点监听时回退到共享队列
+
+        Args:
+            task: 任务数据字典
+            bound_routes: 已有节点监听的路由集合
+
+        Returns:
+            tuple: (Stream 键, 写入 route 字段后的任务数据)
+        """
+        for route in resolve_routes(task):
+            if route in bound_routes:
+                return self._stream_key(route), {**task, "route": route}
+        return self._stream_key(), {**task, "route": None}
+
+    async def publish_task(self, task: Dict[str, Any], retry: bool = True) -> bool:
+        """
+        发布任务到队列
+
+        Args:
+            task: 任务数据字典
+            retry: 连接异常时是否重试一次
+
+        Returns:
+            bool: 是否成功发布
+        """
+        try:
+            client = await self.connect()
+            bound_routes = await self._live_routes(client) if resolve_routes(task) else set()
+            stream, routed_task = self._route_task(task, bound_routes)
+            await client.xadd(stream, self._build_fields(routed_task))
+            logger.info(f"Published task {task.get('task_id')} to {stream}")
+            return True
+        except RedisConnectionError as e:
+            logger.warning(f"Redis connection lost during publish: {e}")
+            await self.close()
+            if retry:
+                logger.info("Retrying publish task...")
+                return await self.publish_task(task, retry=False)
+            return False
+        except Exception as e:
+            logger.error(f"Failed to publish task due to unexpected error: {e}")
+            return False
+
+    async def publish_tasks(self, tasks: List[Dict[str, Any]], chunk_size: int = None) -> List[str]:
+        """
+        批量发布任务，每块在一个管道中写入
+
+        Args:
+            tasks: 任务数据字典列表
+            chunk_size: 每块消息数量，默认使用 rabbitmq_publish_batch_size
+
+        Returns:
+            List[str]: 发布失败的任务 ID 列表
+        """
+        chunk_size = chunk_size or settings.rabbitmq_publish_batch_size
+        failed_ids = []
+
+        try:
+            client = await self.connect()
+            bound_routes = await self._live_routes(client)
+        except Exception as e:
+            logger.error(f"Failed to connect to Redis for batch publish: {e}")
+            return [task.get("task_id") for task in tasks]
+
+        for start in range(0, len(tasks), chunk_size):
+            chunk = tasks[start:start + chunk_size]
+            try:
+                pipe = client.pipeline(transaction=False)
+                for task in chunk:
+                    stream, routed_task = self._route_task(task, bound_routes)
+                    pipe.xadd(stream, self._build_fields(routed_task))
+                results = await pipe.execute(raise_on_error=False)
+                for task, result in zip(chunk, results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"Failed to publish task {task.get('task_id')}: {result}")
+                        failed_ids.append(task.get("task_id"))
+            except Exception as e:
+                logger.error(f"Failed to publish task chunk: {e}")
+                failed_ids.extend(task.get("task_id") for task in chunk)
+
+        logger.info(f"Published {len(tasks) - len(failed_ids)}/{len(tasks)} tasks to Redis streams")
+        return failed_ids
+
+    async def delay_task(self, task: Dict[str, Any], delay: float, routing_key: Optional[str] = None) -> bool:
+        """
+        延迟投递任务：写入有序集合，到期后由消费者搬运回目标 Stream
+
+        Args:
+            task: 任务数据字典
+            delay: 延迟秒数
+            routing_key: 到期后投递的路由，默认为共享队列
+
+        Returns:
+            bool: 是否成功投递
+        """
+        try:
+            client = await self.connect()
+            # 路由已没有消费者时改投共享队列，避免到期后写入无人消费的路由 Stream
+            if routing_key and routing_key not in await self._live_routes(client):
+                routing_key = None
+                task = {**task, "route": None}
+            member = json.dumps({"route": routing_key, "task": json.dumps(task)})
+            await client.zadd(self._delayed_key, {member: time.time() + delay})
+            logger.info(f"Delayed task {task.get('task_id')} by {delay:.1f}s")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delay task {task.get('task_id')}: {e}")
+            return False
+
+    async def _promote_delayed(self, client: aioredis.Redis) -> int:
+        """
+        将到期的延迟任务搬运回目标 Stream，路由已没有消费者时回退到共享队列
+
+        目标 Stream 在这里计算并通过 KEYS 传给脚本，脚本不自行拼接键名。
+
+        Args:
+            client: Redis 客户端
+
+        Returns:
+            int: 搬运的任务数量
+        """
+        members = await client.zrangebyscore(self._delayed_key, "-inf", time.time(), start=0, num=PROMOTE_BATCH_SIZE)
+        if not members:
+            return 0
+
+        live_routes = await self._live_routes(client)
+        keys, args = [self._delayed_key], []
+        for member in members:
+            try:
+                entry = json.loads(member)
+                task_json = entry["task"]
+            except (KeyError, ValueError, TypeError):
+                # 无法解析的成员原样投递到共享队列，由消费者转入死信
+                keys.append(self._stream_key())
+                args += [member, member]
+                continue
+
+            route = entry.get("route")
+            if route is None and entry.get("stream", "").startswith(self._stream_key() + "."):
+                # 兼容旧格式：成员中保存的是目标 Stream 键
+                route = entry["stream"][len(self._stream_key()) + 1:]
+            if route and route not in live_routes:
+                try:
+                    task_json = json.dumps({**json.loads(task_json), "route": None})
+                except (ValueError, TypeError):
+                    pass
+                route = None
+            keys.append(self._stream_key(route))
+            args += [member, task_json]
+
+        return await client.eval(PROMOTE_DELAYED_SCRIPT, len(keys), *keys, *args)
+
+    async def _subscribe(self, client: aioredis.Redis, consumer: Dict[str, Any], route: Optional[str] = None):
+        """
+        确保 Stream 上存在消费者组，并加入当前消费者的监听列表
+
+        Args:
+            client: Redis 客户端
+            consumer: 当前线程的消费者信息
+            route: 路由，为空时为共享队列
+        """
+        stream = self._stream_key(route)
+        try:
+            # 从头开始消费，节点首次监听前已写入路由 Stream 的消息也会被处理
+            await client.xgroup_create(stream, settings.redis_stream_group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        if route:
+            await client.zadd(self._route_consumers_key, {f"{route}|{consumer['name']}": time.time()})
+        consumer["streams"][stream] = route
+
+    async def _renew_routes(self, client: aioredis.Redis, consumer: Dict[str, Any]):
+        """
+        续期当前消费者的路由登记，并清理超时（消费者已崩溃）的登记
+
+        Args:
+            client: Redis 客户端
+            consumer: 当前线程的消费者信息
+        """
+        now = time.time()
+        pipe = client.pipeline(transaction=False)
+        members = {f"{route}|{consumer['name']}": now for route in consumer["streams"].values() if route}
+        if members:
+            pipe.zadd(self._route_consumers_key, members)
+        pipe.zremrangebyscore(self._route_consumers_key, "-inf", now - settings.redis_stream_route_ttl)
+        await pipe.execute()
+
+    async def _release_route(self, client: aioredis.Redis, consumer: Dict[str, Any], route: str):
+        """
+        注销当前消费者的路由登记；路由已没有其他消费者时，将尚未投递的消息转回共享队列
+
+        Args:
+            client: Redis 客户端
+            consumer: 当前线程的消费者信息
+            route: 路由
+        """
+        try:
+            await client.zrem(self._route_consumers_key, f"{route}|{consumer['name']}")
+            if route in await self._live_routes(client):
+                return
+
+            stream, moved = self._stream_key(route), 0
+            while True:
+                response = await client.xreadgroup(
+                    settings.redis_stream_group, consumer["name"], {stream: ">"}, count=PROMOTE_BATCH_SIZE
+                )
+                entries = response[0][1] if response else []
+                if not entries:
+                    break
+                # 写入共享队列与确认、删除原消息在同一个 MULTI 事务中执行，不会出现两份副本或丢失消息
+                pipe = client.pipeline(transaction=True)
+                for entry_id, fields in entries:
+                    try:
+                        task_json = json.dumps({**json.loads(fields["task"]), "route": None})
+                    except (KeyError, ValueError, TypeError):
+                        task_json = fields.get("task", "")
+                    pipe.xadd(self._stream_key(), {**fields, "task": task_json})
+                    pipe.xack(stream, settings.redis_stream_group, entry_id)
+                    pipe.xdel(stream, entry_id)
+                await pipe.execute()
+                moved += len(entries)
+            logger.info(f"Released route {route}: moved {moved} pending tasks to {self._stream_key()}")
+        except Exception as e:
+            logger.warning(f"Failed to release route {route}: {e}")
+
+    async def consume_tasks(
+        self,
+        callback: Callable[[Dict[str, Any]], Awaitable[None]],
+        prefetch_count: int = 1,
+        should_stop: Callable[[], bool] = None,
+        on_dead_letter: Optional[Callable[[Optional[Dict[str, Any]], str], Awaitable[None]]] = None,
+        routes: Optional[List[str]] = None,
+        consumer_name: Optional[str] = None,
+        drain_timeout: float = 0
+    ):
+        """
+        开始消费队列中的任务
+
+        每条消息在独立的协程中处理，处理完成后才确认，未确认的消息数不超过 prefetch_count。
+
+        Args:
+            callback: 处理任务的异步回调函数
+            prefetch_count: 最大未确认消息数量
+            should_stop: 可选的停止判断函数
+            on_dead_letter: 可选的死信回调，参数为任务数据（无法解析时为 None）和原因
+            routes: 除共享队列外额外监听的路由列表
+            consumer_name: 消费者名称，默认为主机名和进程号
+            drain_timeout: 停止时等待处理中消息完成的最长时间（秒）
+        """
+        consumer = {
+            "name": consumer_name or f"{socket.gethostname()}-{os.getpid()}",
+            "prefetch": prefetch_count,
+            "streams": {},  # Stream 键 -> 路由（共享队列为 None）
+            "inflight": {},  # 条目 ID -> Stream 键
+        }
+        handlers = set()  # 正在处理中的消息协程
+
+        async def handle(client: aioredis.Redis, stream: str, entry_id: str, fields: Dict[str, str]):
+            """消息处理包装函数"""
+            redeliveries = int(fields.get("redeliveries", 0))
+            try:
+                # 解析任务，无法解析的消息直接隔离，避免无限重试
+                try:
+                    task = json.loads(fields["task"])
+                except (KeyError, ValueError) as e:
+                    logger.error(f"Received malformed task message: {e}")
+                    await self._dead_letter(client, stream, entry_id, fields, f"Malformed message: {e}", redeliveries, on_dead_letter)
+                    return
+
+                await callback(task)
+                await self._ack(client, stream, entry_id)
+            except asyncio.CancelledError:
+                # 停止时超过排空期限仍未完成，原样重新投递，不计入重投次数
+                try:
+                    await self._requeue_or_dead_letter(client, stream, entry_id, fields, redeliveries, on_dead_letter)
+                except Exception as requeue_error:
+                    logger.warning(f"Failed to requeue unfinished message {entry_id}: {requeue_error}")
+                raise
+            except Exception as e:
+                logger.error(f"Error processing task: {e}")
+                try:
+                    await self._requeue_or_dead_letter(client, stream, entry_id, fields, redeliveries + 1, on_dead_letter)
+                except Exception as requeue_error:
+                    # 消息仍在待确认列表中，稍后会被重新认领
+                    logger.warning(f"Failed to requeue message {entry_id}: {requeue_error}")
+            finally:
+                consumer["inflight"].pop(entry_id, None)
+
+        def dispatch(client: aioredis.Redis, stream: str, entry_id: str, fields: Dict[str, str]):
+            """将消息分派到独立协程，避免阻塞后续消息的读取"""
+            consumer["inflight"][entry_id] = stream
+            handler = asyncio.create_task(handle(client, stream, entry_id, fields))
+            handlers.add(handler)
+            handler.add_done_callback(handlers.discard)
+
+        try:
+            client = await self.connect()
+            await self._subscribe(client, consumer)
+            for route in routes or []:
+                await self._subscribe(client, consumer, route)
+            self._local.consumer = consumer
+            logger.info(f"Started consuming tasks from {', '.join(consumer['streams'])} as {consumer['name']}")
+
+            last_promote = last_reclaim = last_renew = 0.0
+            while True:
+                if should_stop and should_stop():
+                    logger.info("Consumer loop: detected stop signal, draining...")
+                    break
+
+                try:
+                    if time.monotonic() - last_promote >= 1:
+                        last_promote = time.monotonic()
+                        await self._promote_delayed(client)
+
+                    if time.monotonic() - last_renew >= settings.redis_stream_route_ttl / 3:
+                        last_renew = time.monotonic()
+                        await self._renew_routes(client, consumer)
+
+                    if time.monotonic() - last_reclaim >= settings.redis_stream_reclaim_interval:
+                        last_reclaim = time.monotonic()
+                        await self._reclaim(client, consumer, on_dead_letter)
+
+                    free = consumer["prefetch"] - len(consumer["inflight"])
+                    if free <= 0:
+                        await asyncio.sleep(0.1)
+                        continue
+
+                    response = await client.xreadgroup(
+                        settings.redis_stream_group,
+                        consumer["name"],
+                        {stream: ">" for stream in consumer["streams"]},
+                        count=free,
+                        block=500
+                    )
+                    for stream, entries in response or []:
+                        for entry_id, fields in entries:
+                            dispatch(client, stream, entry_id, fields)
+                except RedisConnectionError as e:
+                    logger.warning(f"Redis connection lost in consumer, retrying: {e}")
+                    await asyncio.sleep(1)
+
+            # 不再读取新消息，注销路由登记，等待处理中的消息完成
+            self._local.consumer = None
+            await self._release_routes(consumer)
+            await drain_handlers(handlers, drain_timeout)
+
+        except asyncio.CancelledError:
+            logger.info("Stopping consumer...")
+            raise
+        except Exception as e:
+            logger.error(f"Error in consumer: {e}")
+        finally:
+            # 未确认的消息留在待确认列表中，由其他消费者超时后认领
+            self._local.consumer = None
+            await self._release_routes(consumer)
+
+    async def _release_routes(self, consumer: Dict[str, Any]):
+        """停止消费时注销当前消费者的全部路由登记"""
+        routes = [route for route in consumer["streams"].values() if route]
+        consumer["streams"] = {stream: route for stream, route in consumer["streams"].items() if not route}
+        if not routes:
+            return
+        try:
+            client = await self.connect()
+        except Exception as e:
+            logger.warning(f"Failed to release routes {routes}: {e}")
+            return
+        for route in routes:
+            await self._release_route(client, consumer, route)
+
+    async def _reclaim(self, client: aioredis.Redis, consumer: Dict[str, Any], on_dead_letter: Optional[Callable]):
+        """
+        续约自己正在处理的消息，并认领空闲超时的消息（消费者崩溃或被强制停止）
+
+        被认领的消息计为一次重投，重新投递一份副本，超过上限则转入死信队列。
+
+        Args:
+            client: Redis 客户端
+            consumer: 当前线程的消费者信息
+            on_dead_letter: 可选的死信回调
+        """
+        min_idle_ms = settings.redis_stream_claim_idle * 1000
+
+        # 重置自己处理中消息的空闲时间，避免耗时任务被其他消费者认领
+        by_stream: Dict[str, List[str]] = {}
+        for entry_id, stream in list(consumer["inflight"].items()):
+            by_stream.setdefault(stream, []).append(entry_id)
+        for stream, entry_ids in by_stream.items():
+            await client.xclaim(stream, settings.redis_stream_group, consumer["name"], 0, entry_ids, justid=True)
+
+        for stream in list(consumer["streams"]):
+            start_id = "0-0"
+            while True:
+                result = await client.xautoclaim(
+                    stream, settings.redis_stream_group, consumer["name"],
+                    min_idle_ms, start_id=start_id, count=PROMOTE_BATCH_SIZE
+                )
+                start_id, entries = result[0], result[1]
+                for entry_id, fields in entries:
+                    if entry_id in consumer["inflight"]:
+                        continue
+                    if not fields:
+                        # 条目已被删除，仅清理待确认列表
+                        await client.xack(stream, settings.redis_stream_group, entry_id)
+                        continue
+                    redeliveries = int(fields.get("redeliveries", 0)) + 1
+                    logger.warning(f"Reclaimed stale message {entry_id} from {stream}")
+                    await self._requeue_or_dead_letter(client, stream, entry_id, fields, redeliveries, on_dead_letter)
+                if start_id == "0-0" or not entries:
+                    break
+
+    async def _ack(self, client: aioredis.Redis, stream: str, entry_id: str):
+        """确认并删除消息"""
+        pipe = client.pipeline(transaction=True)
+        pipe.xack(stream, settings.redis_stream_group, entry_id)
+        pipe.xdel(stream, entry_id)
+        await pipe.execute()
+
+    async def _requeue_or_dead_letter(
+        self,
+        client: aioredis.Redis,
+        stream: str,
+        entry_id: str,
+        fields: Dict[str, str],
+        redeliveries: int,
+        on_dead_letter: Optional[Callable] = None
+    ):
+        """
+        带重投计数重新投递消息，超过上限时转入死信队列
+
+        先写入副本再确认原消息，保证至少一次投递。
+
+        Args:
+            client: Redis 客户端
+            stream: 消息所在的 Stream
+            entry_id: 条目 ID
+            fields: 条目字段
+            redeliveries: 新的重投次数
+            on_dead_letter: 可选的死信回调
+        """
+        if redeliveries > settings.max_redeliveries:
+            await self._dead_letter(
+                client, stream, entry_id, fields,
+                f"Exceeded max redeliveries ({settings.max_redeliveries})",
+                redeliveries,
+                on_dead_letter
+            )
+            return
+
+        await client.xadd(stream, {**fields, "redeliveries": redeliveries})
+        await self._ack(client, stream, entry_id)
+        logger.warning(f"Requeued message on {stream} (redelivery {redeliveries}/{settings.max_redeliveries})")
+
+    async def _dead_letter(
+        self,
+        client: aioredis.Redis,
+        stream: str,
+        entry_id: str,
+        fields: Dict[str, str],
+        reason: str,
+        redeliveries: int,
+        on_dead_letter: Optional[Callable] = None
+    ):
+        """
+        将消息转入死信 Stream 并确认原消息
+
+        Args:
+            client: Redis 客户端
+            stream: 消息所在的 Stream
+            entry_id: 条目 ID
+            fields: 条目字段
+            reason: 进入死信队列的原因
+            redeliveries: 已重投次数
+            on_dead_letter: 可选的死信回调
+        """
+        await client.xadd(self._dead_letter_key, {
+            "task": fields.get("task", ""),
+            "stream": stream,
+            "reason": reason,
+            "redeliveries": redeliveries,
+            "dead_lettered_at": datetime.now().isoformat(),
+        })
+        await self._ack(client, stream, entry_id)
+        logger.error(f"Dead-lettered message after {redeliveries} redeliveries: {reason}")
+
+        if on_dead_letter:
+            try:
+                task = json.loads(fields.get("task", ""))
+            except ValueError:
+                task = None
+            try:
+                await on_dead_letter(task, reason)
+            except Exception as e:
+                logger.error(f"Dead letter callback error: {e}")
+
+    async def set_prefetch(self, prefetch_count: int) -> bool:
+        """
+        运行时调整当前线程消费者的最大未确认消息数量
+
+        Args:
+            prefetch_count: 新的预取数量
+
+        Returns:
+            bool: 是否已调整（当前线程没有正在运行的消费者时返回 False）
+        """
+        consumer = getattr(self._local, "consumer", None)
+        if consumer is None:
+            return False
+        consumer["prefetch"] = prefetch_count
+        logger.info(f"Consumer prefetch changed to {prefetch_count}")
+        return True
+
+    async def set_routes(self, routes: List[str]) -> bool:
+        """
+        运行时调整当前线程消费者监听的路由，共享队列始终保持监听
+
+        停止监听的 Stream 中自己未确认的消息会在空闲超时后被其他消费者认领；
+        路由已没有其他消费者时，尚未投递的消息转回共享队列，之后的任务也回退到共享队列。
+
+        Args:
+            routes: 新的路由列表
+
+        Returns:
+            bool: 是否已调整（当前线程没有正在运行的消费者时返回 False）
+        """
+        consumer = getattr(self._local, "consumer", None)
+        if consumer is None:
+            return False
+
+        client = await self.connect()
+        for stream, route in list(consumer["streams"].items()):
+            if route is not None and route not in routes:
+                del consumer["streams"][stream]
+                await self._release_route(client, consumer, route)
+        for route in routes:
+            if self._stream_key(route) not in consumer["streams"]:
+                await self._subscribe(client, consumer, route)
+        logger.info(f"Consumer now listening on {', '.join(consumer['streams'])}")
+        return True
+
+    async def get_queue_depth(self, route: Optional[str] = None) -> int:
+        """
+        获取队列中的消息数量（含已投递未确认的消息）
+
+        Args:
+            route: 路由，为空时为共享队列
+
+        Returns:
+            int: 消息数量
+        """
+        client = await self.connect()
+        return await client.xlen(self._stream_key(route))
+
+    def _describe_dead_letter(self, fields: Dict[str, str]) -> Dict[str, Any]:
+        """
+        将死信条目转换为便于展示的字典
+
+        Args:
+            fields: 死信条目字段
+
+        Returns:
+            dict: 死信信息
+        """
+        try:
+            task = json.loads(fields.get("task", ""))
+            raw_body = None
+        except ValueError:
+            task = None
+            raw_body = fields.get("task")
+        stream = fields.get("stream", "")
+        return {
+            "task_id": task.get("task_id") if isinstance(task, dict) else None,
+            "task": task,
+            "raw_body": raw_body,
+            "reason": fields.get("reason"),
+            "redeliveries": int(fields.get("redeliveries", 0)),
+            "routing_key": stream[len(settings.redis_stream_prefix) + 1:] or None,
+            "dead_lettered_at": fields.get("dead_lettered_at"),
+        }
+
+    async def get_dead_letter_count(self) -> int:
+        """
+        获取死信队列中的消息数量
+
+        Returns:
+            int: 消息数量
+        """
+        client = await self.connect()
+        return await client.xlen(self._dead_letter_key)
+
+    async def inspect_dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        查看死信队列中的消息（不移除）
+
+        Args:
+            limit: 最大数量
+
+        Returns:
+            list: 死信信息列表
+        """
+        client = await self.connect()
+        entries = await client.xrange(self._dead_letter_key, count=limit)
+        return [self._describe_dead_letter(fields) for _, fields in entries]
+
+    async def replay_dead_letters(self, task_ids: Optional[List[str]] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        将死信消息重新投递到原队列，重投计数清零
+
+        Args:
+            task_ids: 仅重放这些任务（为空时重放全部）
+            limit: 本次最多扫描的消息数量
+
+        Returns:
+            list: 已重放的任务数据列表
+        """
+        client = await self.connect()
+        replayed = []
+        for entry_id, fields in await client.xrange(self._dead_letter_key, count=limit):
+            info = self._describe_dead_letter(fields)
+            if info["task"] is None or (task_ids and info["task_id"] not in task_ids):
+                continue
+            await client.xadd(fields.get("stream") or self._stream_key(), {"task": fields["task"], "redeliveries": 0})
+            await client.xdel(self._dead_letter_key, entry_id)
+            replayed.append(info["task"])
+        logger.info(f"Replayed {len(replayed)} dead-lettered tasks")
+        return replayed
+
+    async def purge_dead_letters(self, task_ids: Optional[List[str]] = None, limit: int = 1000) -> int:
+        """
+        清除死信消息
+
+        Args:
+            task_ids: 仅清除这些任务的死信（为空时清空整个死信队列）
+            limit: 按任务清除时最多扫描的消息数量
+
+        Returns:
+            int: 清除的消息数量
+        """
+        client = await self.connect()
+        if not task_ids:
+            count = await client.xlen(self._dead_letter_key)
+            await client.delete(self._dead_letter_key)
+            return count
+
+        entry_ids = [
+            entry_id
+            for entry_id, fields in await client.xrange(self._dead_letter_key, count=limit)
+            if self._describe_dead_letter(fields)["task_id"] in task_ids
+        ]
+        if entry_ids:
+            await client.xdel(self._dead_letter_key, *entry_ids)
+        return len(entry_ids)
+
+    async def close(self):
+        """关闭当前线程的 Redis 连接"""
+        client = getattr(self._local, "client", None)
+        self._local.client = None
+        if client is not None:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing Redis connection: {e}")
+
+
+# 全局 Redis Streams 队列服务实例
+redis_queue_service = RedisStreamQueueService()
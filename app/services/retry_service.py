@@ -0,0 +1,131 @@
+"""
+任务自动重试服务模块
+
+识别可重试的错误类型，按指数退避加随机抖动计算延迟，并将任务重新投递到延迟队列
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.db.mongo import mongo
+from app.services.queue_service import queue_service
+from app.services.task_event_service import task_event_service
+
+logger = logging.getLogger(__name__)
+
+# 可重试的异常类型名称（对应 Scraper 返回的 error.type）
+RETRYABLE_ERROR_TYPES = {
+    "TimeoutError",  # Playwright 导航/等待超时
+    "TargetClosedError",  # 页面、上下文或浏览器被意外关闭
+}
+
+# 可重试的错误信息片段（代理、网络和浏览器崩溃类错误）
+RETRYABLE_ERROR_PATTERNS = (
+    "net::ERR_PROXY_CONNECTION_FAILED",
+    "net::ERR_TUNNEL_CONNECTION_FAILED",
+    "net::ERR_SOCKS_CONNECTION_FAILED",
+    "net::ERR_CONNECTION_RESET",
+    "net::ERR_CONNECTION_CLOSED",
+    "net::ERR_CONNECTION_TIMED_OUT",
+    "net::ERR_TIMED_OUT",
+    "net::ERR_EMPTY_RESPONSE",
+    "net::ERR_NETWORK_CHANGED",
+    "Target page, context or browser has been closed",
+    "Browser has been closed",
+    "Browser closed",
+    "Target crashed",
+)
+
+
+class RetryService:
+    """任务自动重试服务类"""
+
+    def is_retryable(self, error: Optional[Dict[str, Any]]) -> bool:
+        """
+        判断错误是否属于可自动重试的瞬时错误
+
+        Args:
+            error: 错误信息字典，包含 message 和可选的 type
+
+        Returns:
+            bool: 是否可重试
+        """
+        if not error:
+            return False
+        if error.get("type") in RETRYABLE_ERROR_TYPES:
+            return True
+        message = str(error.get("message") or "")
+        return any(pattern in message for pattern in RETRYABLE_ERROR_PATTERNS)
+
+    def compute_delay(self, attempt: int) -> float:
+        """
+        计算第 N 次执行失败后的重试延迟
+
+        延迟为 retry_delay * 2^(attempt-1)，上限为 retry_backoff_max，
+        并在 ±retry_jitter 比例内随机抖动，避免大量任务同时重试。
+
+        Args:
+            attempt: 已执行的次数（从 1 开始）
+
+        Returns:
+            float: 延迟秒数
+        """
+        base = min(settings.retry_delay * (2 ** max(attempt - 1, 0)), settings.retry_backoff_max)
+        jitter = base * settings.retry_jitter
+        return max(1.0, base + random.uniform(-jitter, jitter))
+
+    async def schedule_retry(self, task_data: Dict[str, Any], error: Dict[str, Any]) -> bool:
+        """
+        为失败的任务安排一次延迟重试
+
+        Args:
+            task_data: 队列中的任务数据
+            error: 本次执行的错误信息
+
+        Returns:
+            bool: 是否已安排重试（任务已被取消或过期时不再重试，同样返回 True）；
+                超过最大重试次数或投递失败时返回 False
+        """
+        task_id = task_data.get("task_id")
+        attempt = task_data.get("attempt", 1)
+        if attempt > settings.max_retries:
+            logger.info(f"Task {task_id} exhausted {settings.max_retries} retries")
+            return False
+
+        delay = self.compute_delay(attempt)
+        now = datetime.now()
+
+        # Worker 的事件循环上同时处理多个任务，同步写入放到线程中执行
+        result = await asyncio.to_thread(
+            mongo.tasks.update_one,
+            {"task_id": task_id, "status": {"$nin": ["cancelled", "expired"]}},
+            {
+                "$set": {
+                    "status": "pending",
+                    "error": error,
+                    "node_id": None,
+                    "next_retry_at": now + timedelta(seconds=delay),
+                    "updated_at": now
+                }
+            }
+        )
+        if not result.matched_count:
+            # 执行期间任务已被取消或过期，保持终态，不再重新投递
+            logger.info(f"Task {task_id} cancelled or expired, retry skipped")
+            return True
+
+        retry_task = {**task_data, "attempt": attempt + 1}
+        # 沿用首次投递时使用的路由，保证重试仍由同类节点处理
+        if not await queue_service.delay_task(retry_task, delay, routing_key=task_data.get("route")):
+            logger.error(f"Failed to schedule retry for task {task_id}")
+            return False
+
+        task_event_service.publish("pending", task_id)
+        logger.info(f"Task {task_id} scheduled for retry #{attempt} in {delay:.1f}s")
+        return True
+
+
+# 全局重试服务实例
+retry_service = RetryService()
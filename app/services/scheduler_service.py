@@ -0,0 +1,284 @@
+"""
+定时抓取调度服务模块
+
+调度器在每个 API 进程中运行，但只有持有 Redis 领导锁的进程会执行调度：
+周期性地找出到期的计划，将其 URL 列表批量写入任务集合并发布到队列。
+
+- 计划的上一次执行仍有等待中或处理中的任务时跳过本次执行，避免慢任务堆积
+- 下次执行时间叠加随机抖动，错开同一时刻到期的计划
+- 每个计划通过带原 next_run_at 条件的 find_one_and_update 认领，领导锁短暂失效时也不会重复执行
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.core.cron import CronExpression
+from app.core.urls import url_search_fields
+from app.db.local_redis import LocalRedis
+from app.db.async_mongo import amongo
+from app.db.redis import redis_client
+from app.services.cache_service import cache_service
+from app.services.queue_base import build_queue_task
+from app.services.queue_service import queue_service
+
+logger = logging.getLogger(__name__)
+
+# 调度器领导锁的 Redis 键
+LEADER_LOCK_KEY = "scheduler:leader"
+
+# 仅当锁仍属于本进程时才续期
+RENEW_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# 仅当锁仍属于本进程时才释放
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def compute_next_run(schedule: Dict[str, Any], after: datetime) -> datetime:
+    """
+    计算计划的下一次执行时间（含随机抖动）
+
+    Args:
+        schedule: 计划文档
+        after: 起始时间
+
+    Returns:
+        datetime: 下一次执行时间
+    """
+    if schedule.get("cron"):
+        next_run = CronExpression(schedule["cron"]).next_after(after)
+    else:
+        next_run = after + timedelta(seconds=schedule["interval_seconds"])
+    jitter = schedule.get("jitter_seconds") or 0
+    if jitter:
+        next_run += timedelta(seconds=random.uniform(0, jitter))
+    return next_run
+
+
+class SchedulerService:
+    """定时抓取调度服务类"""
+
+    def __init__(self):
+        self._task = None  # 后台调度协程
+        self._instance_id = str(ObjectId())  # 本进程的领导锁持有者标识
+        self.is_leader = False  # 本进程当前是否持有领导锁
+
+    def _acquire_leadership(self) -> bool:
+        """
+        获取或续期调度器领导锁
+
+        Returns:
+            bool: 本进程是否持有领导锁
+        """
+        client = redis_client.queue
+        ttl = settings.scheduler_lock_ttl
+        if self.is_leader:
+            if isinstance(client, LocalRedis):
+                renewed = client.compare_and_expire(LEADER_LOCK_KEY, self._instance_id, ttl)
+            else:
+                renewed = client.eval(RENEW_LOCK_SCRIPT, 1, LEADER_LOCK_KEY, self._instance_id, ttl)
+            if not renewed:
+                logger.warning("Scheduler lost leadership")
+            self.is_leader = bool(renewed)
+        if not self.is_leader:
+            self.is_leader = bool(client.set(LEADER_LOCK_KEY, self._instance_id, nx=True, ex=ttl))
+            if self.is_leader:
+                logger.info(f"Scheduler acquired leadership ({self._instance_id})")
+        return self.is_leader
+
+    def _release_leadership(self):
+        """释放调度器领导锁，其他进程可立即接管"""
+        if not self.is_leader:
+            return
+        try:
+            client = redis_client.queue
+            if isinstance(client, LocalRedis):
+                client.compare_and_delete(LEADER_LOCK_KEY, self._instance_id)
+            else:
+                client.eval(RELEASE_LOCK_SCRIPT, 1, LEADER_LOCK_KEY, self._instance_id)
+        except Exception as e:
+            logger.error(f"Failed to release scheduler leadership: {e}")
+        self.is_leader = False
+
+    async def has_inflight(self, schedule_id: str) -> bool:
+        """
+        计划是否仍有未完成的任务
+
+        查询条件 (schedule_id, status) 由复合索引覆盖。
+
+        Args:
+            schedule_id: 计划 ID
+
+        Returns:
+            bool: 存在等待中或处理中的任务时返回 True
+        """
+        return await amongo.tasks.find_one(
+            {"schedule_id": schedule_id, "status": {"$in": ["pending", "processing"]}},
+            {"task_id": 1}
+        ) is not None
+
+    async def enqueue_run(self, schedule: Dict[str, Any]) -> List[str]:
+        """
+        将计划的 URL 列表批量创建为任务并发布到队列
+
+        Args:
+            schedule: 计划文档
+
+        Returns:
+            List[str]: 成功入队的任务 ID 列表
+        """
+        now = datetime.now()
+        schedule_id = str(schedule["_id"])
+        params = schedule.get("params") or {}
+        deadline = schedule.get("deadline")
+        task_docs = []
+        queue_tasks = []
+
+        for url in schedule["urls"]:
+            task_doc = {
+                "task_id": str(ObjectId()),
+                "url": url,
+                **url_search_fields(url),
+                "status": "pending",
+                "priority": schedule.get("priority", 1),
+                "params": params,
+                "cache": schedule.get("cache") or {},
+                "cache_key": cache_service.generate_cache_key(url, params),
+                "cached": False,
+                "html_cached": False,
+                "agent_cached": False,
+                "schedule_id": schedule_id,
+                "expires_at": now + timedelta(seconds=deadline) if deadline else None,
+                "created_at": now,
+                "updated_at": now
+            }
+            task_docs.append(task_doc)
+            queue_tasks.append(build_queue_task(task_doc))
+
+        try:
+            await amongo.tasks.insert_many(task_docs, ordered=False)
+        except BulkWriteError as e:
+            failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+            logger.error(f"Failed to insert {len(failed_indexes)} tasks for schedule {schedule_id}")
+            queue_tasks = [task for i, task in enumerate(queue_tasks) if i not in failed_indexes]
+
+        failed_ids = await queue_service.publish_tasks(queue_tasks)
+        if failed_ids:
+            await amongo.tasks.update_many(
+                {"task_id": {"$in": failed_ids}},
+                {"$set": {
+                    "status": "failed",
+                    "error": {"message": "Failed to queue task: queue connection issue"},
+                    "updated_at": datetime.now()
+                }}
+            )
+
+        failed = set(failed_ids)
+        task_ids = [task["task_id"] for task in queue_tasks if task["task_id"] not in failed]
+        await amongo.schedules.update_one(
+            {"_id": schedule["_id"]},
+            {"$set": {"last_run_at": now, "last_run_task_count": len(task_ids), "updated_at": now}}
+        )
+        return task_ids
+
+    async def _run_schedule(self, schedule: Dict[str, Any], now: datetime) -> Optional[str]:
+        """
+        认领并执行单个到期计划
+
+        Args:
+            schedule: 计划文档
+            now: 本轮调度时间
+
+        Returns:
+            Optional[str]: "enqueued"、"skipped"，计划已被修改或认领时返回 None
+        """
+        next_run_at = compute_next_run(schedule, now)
+        claimed = await amongo.schedules.find_one_and_update(
+            {"_id": schedule["_id"], "is_enabled": True, "next_run_at": schedule["next_run_at"]},
+            {"$set": {"next_run_at": next_run_at}}
+        )
+        if not claimed:
+            return None
+
+        schedule_id = str(schedule["_id"])
+        if await self.has_inflight(schedule_id):
+            await amongo.schedules.update_one({"_id": schedule["_id"]}, {"$inc": {"skipped_runs": 1}})
+            logger.warning(f"Schedule {schedule_id} skipped: previous run is still in flight")
+            return "skipped"
+
+        task_ids = await self.enqueue_run(schedule)
+        logger.info(f"Schedule {schedule_id} enqueued {len(task_ids)} tasks, next run at {next_run_at}")
+        return "enqueued"
+
+    async def run_due(self) -> Dict[str, int]:
+        """
+        执行一轮调度：处理所有已到期的计划
+
+        查询条件 (is_enabled, next_run_at) 由复合索引覆盖。
+
+        Returns:
+            dict: enqueued（入队的计划数量）、skipped（跳过的计划数量）
+        """
+        stats = {"enqueued": 0, "skipped": 0}
+        now = datetime.now()
+        due = await (
+            amongo.schedules.find({"is_enabled": True, "next_run_at": {"$lte": now}})
+            .sort("next_run_at", 1)
+            .limit(settings.scheduler_batch_size)
+            .to_list(None)
+        )
+        for schedule in due:
+            try:
+                outcome = await self._run_schedule(schedule, now)
+                if outcome:
+                    stats[outcome] += 1
+            except Exception as e:
+                logger.error(f"Failed to run schedule {schedule.get('_id')}: {e}")
+        return stats
+
+    async def _run(self):
+        """后台调度循环"""
+        logger.info(f"Scheduler started (interval={settings.scheduler_interval}s, lock_ttl={settings.scheduler_lock_ttl}s)")
+        try:
+            while True:
+                try:
+                    # 领导锁使用同步 Redis 客户端，放到线程中执行，避免阻塞 API 的事件循环
+                    if await asyncio.to_thread(self._acquire_leadership):
+                        await self.run_due()
+                except Exception as e:
+                    logger.error(f"Scheduler error: {e}")
+                await asyncio.sleep(settings.scheduler_interval)
+        finally:
+            self._release_leadership()
+
+    def start(self):
+        """启动后台调度协程（需在事件循环中调用）"""
+        if settings.scheduler_enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台调度协程并释放领导锁"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 全局定时抓取调度服务实例
+scheduler_service = SchedulerService()
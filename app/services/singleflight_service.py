@@ -0,0 +1,236 @@
+"""
+请求合并（singleflight）服务模块
+
+相同 cache_key 的任务在执行期间只渲染一次：首个提交者通过 Redis 租约成为领导任务，
+其后相同的提交作为跟随任务挂到领导任务上，领导任务结束时将结果复制给所有跟随任务。
+领导任务因调用方放弃而过期或被取消时，由仍在等待的跟随任务接替成为新的领导任务。
+
+服务同时被 API 和各 Worker 的事件循环调用，同步的 Redis 和 MongoDB 调用都放到线程中执行。
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+from app.core.config import settings
+from app.db.mongo import mongo
+from app.db.local_redis import LocalRedis
+from app.db.redis import redis_client
+from app.services.queue_base import build_queue_task
+from app.services.queue_service import queue_service
+from app.services.task_event_service import task_event_service
+
+logger = logging.getLogger(__name__)
+
+# 仅当租约仍属于该领导任务时才释放，避免误删过期后被其他任务重新获取的租约
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# 跟随任务列表的保留时间（秒），领导任务结束时会主动删除
+FOLLOWERS_TTL = 86400
+
+# 领导任务结束后复制给跟随任务的字段
+RESULT_FIELDS = ("status", "result", "error", "html_cached", "agent_cached", "completed_at")
+
+
+class SingleflightService:
+    """请求合并服务类"""
+
+    def _lease_key(self, cache_key: str) -> str:
+        return f"inflight:{cache_key}"
+
+    def _followers_key(self, leader_task_id: str) -> str:
+        return f"inflight:followers:{leader_task_id}"
+
+    async def acquire(self, cache_key: str, task_id: str) -> Optional[str]:
+        """
+        尝试成为该 cache_key 的领导任务
+
+        Args:
+            cache_key: 任务缓存键
+            task_id: 当前任务 ID
+
+        Returns:
+            Optional[str]: 已有领导任务时返回其任务 ID；当前任务成为领导任务或未启用时返回 None
+        """
+        if not settings.singleflight_enabled:
+            return None
+
+        try:
+            return await asyncio.to_thread(self._acquire_lease, self._lease_key(cache_key), task_id)
+        except Exception as e:
+            # Redis 不可用时退化为不合并，保证任务照常提交
+            logger.error(f"Singleflight acquire error for {cache_key}: {e}")
+        return None
+
+    def _acquire_lease(self, lease_key: str, task_id: str) -> Optional[str]:
+        """获取租约（在线程中执行），已被其他任务持有时返回其任务 ID"""
+        # 租约可能在 SET 和 GET 之间恰好过期，重试一次
+        for _ in range(2):
+            if redis_client.queue.set(lease_key, task_id, nx=True, ex=settings.singleflight_lease_ttl):
+                return None
+            leader_task_id = redis_client.queue.get(lease_key)
+            if leader_task_id:
+                return leader_task_id
+        return None
+
+    async def join(self, leader_task_id: str, task_id: str):
+        """
+        将任务挂到领导任务上，领导任务结束时一并得到结果
+
+        Args:
+            leader_task_id: 领导任务 ID
+            task_id: 跟随任务 ID
+        """
+        await asyncio.to_thread(self._push_followers, leader_task_id, [task_id])
+
+        # 领导任务可能在挂载前已经结束，此时直接复制结果
+        leader = await asyncio.to_thread(mongo.tasks.find_one, {"task_id": leader_task_id}, {"status": 1})
+        if not leader or leader.get("status") in ("success", "failed", "expired", "cancelled"):
+            await self.resolve(leader_task_id)
+
+    async def complete(self, cache_key: str, leader_task_id: str):
+        """
+        领导任务结束（成功或最终失败）后调用：释放租约并将结果复制给跟随任务
+
+        必须在领导任务的最终状态写入数据库之后调用。
+
+        Args:
+            cache_key: 任务缓存键
+            leader_task_id: 领导任务 ID
+        """
+        try:
+            await asyncio.to_thread(self._release_lease, self._lease_key(cache_key), leader_task_id)
+            await self.resolve(leader_task_id)
+        except Exception as e:
+            logger.error(f"Singleflight complete error for task {leader_task_id}: {e}")
+
+    def _release_lease(self, lease_key: str, leader_task_id: str):
+        """释放仍属于该领导任务的租约（在线程中执行）"""
+        client = redis_client.queue
+        if isinstance(client, LocalRedis):
+            client.compare_and_delete(lease_key, leader_task_id)
+        else:
+            client.eval(RELEASE_LEASE_SCRIPT, 1, lease_key, leader_task_id)
+
+    def _push_followers(self, leader_task_id: str, task_ids: List[str]):
+        """将任务挂到领导任务的跟随列表（在线程中执行）"""
+        followers_key = self._followers_key(leader_task_id)
+        pipe = redis_client.queue.pipeline()
+        pipe.rpush(followers_key, *task_ids)
+        pipe.expire(followers_key, FOLLOWERS_TTL)
+        pipe.execute()
+
+    def _pop_followers(self, leader_task_id: str) -> List[str]:
+        """取出并删除领导任务的跟随列表（在线程中执行）"""
+        followers_key = self._followers_key(leader_task_id)
+        pipe = redis_client.queue.pipeline()
+        pipe.lrange(followers_key, 0, -1)
+        pipe.delete(followers_key)
+        follower_ids, _ = pipe.execute()
+        return follower_ids
+
+    async def resolve(self, leader_task_id: str) -> List[str]:
+        """
+        取出领导任务当前的所有跟随任务，并复制领导任务的最终结果
+
+        Args:
+            leader_task_id: 领导任务 ID
+
+        Returns:
+            List[str]: 已处理的跟随任务 ID 列表
+        """
+        follower_ids = await asyncio.to_thread(self._pop_followers, leader_task_id)
+        if not follower_ids:
+            return []
+
+        leader = await asyncio.to_thread(mongo.tasks.find_one, {"task_id": leader_task_id})
+        if leader and leader.get("status") in ("expired", "cancelled"):
+            await self._hand_over(leader, follower_ids)
+            return follower_ids
+
+        now = datetime.now()
+        if leader:
+            update_data = {field: leader.get(field) for field in RESULT_FIELDS}
+        else:
+            update_data = {
+                "status": "failed",
+                "error": {"message": f"Leader task {leader_task_id} no longer exists", "type": "CoalescedLeaderMissing"},
+                "completed_at": now
+            }
+        update_data["updated_at"] = now
+
+        # 已单独取消的跟随任务保持取消状态
+        await asyncio.to_thread(
+            mongo.tasks.update_many, {"task_id": {"$in": follower_ids}, "status": "pending"}, {"$set": update_data}
+        )
+        task_event_service.publish(update_data["status"], *follower_ids)
+        logger.info(f"Resolved {len(follower_ids)} coalesced tasks from leader {leader_task_id}")
+        return follower_ids
+
+    async def _hand_over(self, leader: dict, follower_ids: List[str]):
+        """
+        领导任务过期或被取消时，由第一个仍在等待的跟随任务接替成为新的领导任务并入队，其余跟随任务改挂到它上面
+
+        Args:
+            leader: 已过期或被取消的领导任务记录
+            follower_ids: 跟随任务 ID 列表
+        """
+        waiting = await asyncio.to_thread(self._waiting_followers, follower_ids)
+        if not waiting:
+            return
+
+        new_leader_id, rest = waiting[0], waiting[1:]
+        cache_key = leader.get("cache_key")
+        await asyncio.to_thread(self._transfer_lease, cache_key, new_leader_id, rest)
+
+        now = datetime.now()
+        await asyncio.to_thread(
+            mongo.tasks.update_many,
+            {"task_id": {"$in": rest}},
+            {"$set": {"leader_task_id": new_leader_id, "updated_at": now}}
+        )
+        new_leader = await asyncio.to_thread(
+            mongo.tasks.find_one_and_update,
+            {"task_id": new_leader_id},
+            {"$set": {"leader_task_id": None, "updated_at": now}}
+        )
+        if not new_leader:
+            return
+        logger.info(f"Leader task {leader['task_id']} {leader['status']}, handed over to {new_leader_id} with {len(rest)} followers")
+
+        if not await queue_service.publish_task(build_queue_task(new_leader)):
+            await asyncio.to_thread(
+                mongo.tasks.update_one,
+                {"task_id": new_leader_id},
+                {"$set": {
+                    "status": "failed",
+                    "error": {"message": "Failed to queue task: queue connection issue"},
+                    "updated_at": now,
+                    "completed_at": now
+                }}
+            )
+            if cache_key:
+                await self.complete(cache_key, new_leader_id)
+
+    def _waiting_followers(self, follower_ids: List[str]) -> List[str]:
+        """查询仍在等待的跟随任务（在线程中执行）"""
+        cursor = mongo.tasks.find({"task_id": {"$in": follower_ids}, "status": "pending"}, {"task_id": 1})
+        return [doc["task_id"] for doc in cursor]
+
+    def _transfer_lease(self, cache_key: Optional[str], new_leader_id: str, follower_ids: List[str]):
+        """将租约和剩余的跟随任务转给新的领导任务（在线程中执行）"""
+        pipe = redis_client.queue.pipeline()
+        if cache_key:
+            pipe.set(self._lease_key(cache_key), new_leader_id, ex=settings.singleflight_lease_ttl)
+        if follower_ids:
+            pipe.rpush(self._followers_key(new_leader_id), *follower_ids)
+            pipe.expire(self._followers_key(new_leader_id), FOLLOWERS_TTL)
+        pipe.execute()
+
+
+# 全局请求合并服务实例
+singleflight_service = SingleflightService()
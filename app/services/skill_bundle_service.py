@@ -8,7 +8,7 @@ import logging
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from bson import ObjectId
-from app.db.mongo import mongo
+from app.db.async_mongo import amongo
 from app.models.skill_bundle import SkillBundleModel, SkillBundleCreate, SkillBundleUpdate
 
 logger = logging.getLogger(__name__)
@@ -18,13 +18,12 @@ class SkillBundleService:
 
     async def list_bundles(self) -> List[Dict[str, Any]]:
         """获取技能包列表"""
-        bundles = mongo.skill_bundles.find().sort("created_at", -1)
-        return list(bundles)
+        return await amongo.skill_bundles.find().sort("created_at", -1).to_list(None)
 
     async def get_bundle(self, bundle_id: str) -> Optional[Dict[str, Any]]:
         """获取单个技能包详情"""
         try:
-            return mongo.skill_bundles.find_one({"_id": ObjectId(bundle_id)})
+            return await amongo.skill_bundles.find_one({"_id": ObjectId(bundle_id)})
         except:
             return None
 
@@ -34,7 +33,7 @@ class SkillBundleService:
         bundle_dict["created_at"] = datetime.now()
         bundle_dict["updated_at"] = datetime.now()
         
-        result = mongo.skill_bundles.insert_one(bundle_dict)
+        result = await amongo.skill_bundles.insert_one(bundle_dict)
         return str(result.inserted_id)
 
     async def update_bundle(self, bundle_id: str, data: SkillBundleUpdate) -> bool:
@@ -46,7 +45,7 @@ class SkillBundleService:
         update_data["updated_at"] = datetime.now()
         
         try:
-            result = mongo.skill_bundles.update_one(
+            result = await amongo.skill_bundles.update_one(
                 {"_id": ObjectId(bundle_id)},
                 {"$set": update_data}
             )
@@ -57,7 +56,7 @@ class SkillBundleService:
     async def delete_bundle(self, bundle_id: str) -> bool:
         """删除技能包"""
         try:
-            result = mongo.skill_bundles.delete_one({"_id": ObjectId(bundle_id)})
+            result = await amongo.skill_bundles.delete_one({"_id": ObjectId(bundle_id)})
             return result.deleted_count > 0
         except:
             return False
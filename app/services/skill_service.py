@@ -2,12 +2,17 @@
 技能管理服务模块
 
 提供技能的增删改查以及动态执行逻辑
+
+增删改查由 API 路由调用，使用异步 MongoDB 连接；get_skill_by_name 还会在 Worker 的事件循环中
+执行动态技能时调用，因此使用同步连接并放到线程中执行。
 """
 
+import asyncio
 import logging
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from bson import ObjectId
+from app.db.async_mongo import amongo
 from app.db.mongo import mongo
 from app.models.skill import SkillModel, SkillCreate, SkillUpdate, SkillType
 
@@ -22,15 +27,14 @@ class SkillService:
         if is_enabled is not None:
             query["is_enabled"] = is_enabled
         
-        skills = mongo.skills.find(query).sort("created_at", -1)
-        return list(skills)
+        return await amongo.skills.find(query).sort("created_at", -1).to_list(None)
 
     async def get_skill(self, skill_id: str) -> Optional[Dict[str, Any]]:
         """获取单个技能详情"""
         try:
-            return mongo.skills.find_one({"_id": ObjectId(skill_id)})
+            return await amongo.skills.find_one({"_id": ObjectId(skill_id)})
         except:
-            return mongo.skills.find_one({"name": skill_id})
+            return await amongo.skills.find_one({"name": skill_id})
 
     async def create_skill(self, data: SkillCreate) -> str:
         """创建新技能"""
@@ -38,7 +42,7 @@ class SkillService:
         skill_dict["created_at"] = datetime.now()
         skill_dict["updated_at"] = datetime.now()
         
-        result = mongo.skills.insert_one(skill_dict)
+        result = await amongo.skills.insert_one(skill_dict)
         return str(result.inserted_id)
 
     async def update_skill(self, skill_id: str, data: SkillUpdate) -> bool:
@@ -49,7 +53,7 @@ class SkillService:
             
         update_data["updated_at"] = datetime.now()
         
-        result = mongo.skills.update_one(
+        result = await amongo.skills.update_one(
             {"_id": ObjectId(skill_id)},
             {"$set": update_data}
         )
@@ -57,12 +61,12 @@ class SkillService:
 
     async def delete_skill(self, skill_id: str) -> bool:
         """删除技能"""
-        result = mongo.skills.delete_one({"_id": ObjectId(skill_id)})
+        result = await amongo.skills.delete_one({"_id": ObjectId(skill_id)})
         return result.deleted_count > 0
 
     async def get_skill_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """根据名称获取启用状态的技能"""
-        return mongo.skills.find_one({"name": name, "is_enabled": True})
+        return await asyncio.to_thread(mongo.skills.find_one, {"name": name, "is_enabled": True})
 
 # 全局技能服务实例
 skill_service = SkillService()
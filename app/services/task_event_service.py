@@ -0,0 +1,214 @@
+"""
+任务事件服务模块
+
+任务状态变化（开始处理、重试等待、最终结束）写入数据库后通过 Redis pub/sub 发布事件。每个 API 进程只有一个订阅线程，
+收到事件后唤醒本进程中等待该任务结束的同步请求，并分发给订阅了该任务的实时事件流，客户端无需再轮询数据库。
+pub/sub 不保证送达，同步等待方仍以较长间隔查询数据库兜底。单机模式下直接在进程内分发。
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from app.db.local_redis import LocalRedis
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 任务事件的 Redis 频道
+TASK_EVENTS_CHANNEL = "task_events"
+
+# 任务的最终状态
+FINAL_STATUSES = ("success", "failed", "expired", "cancelled")
+
+
+def _set_done(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class TaskEventStream:
+    """
+    单个客户端的任务事件流
+
+    待发送的事件按任务 ID 合并，同一任务只保留最新状态；客户端消费过慢、积压超过上限时丢弃最早的事件并计数，
+    并发送 overflow 事件（按任务订阅的流由接口从数据库补齐状态，其余由客户端自行重新拉取），
+    慢客户端不会拖慢订阅线程或占用无限内存。
+    """
+
+    def __init__(self, task_ids: Optional[Set[str]] = None, status: Optional[str] = None, max_pending: int = 1000):
+        """
+        Args:
+            task_ids: 只接收这些任务的事件，为空时不按任务过滤
+            status: 只接收该状态的事件
+            max_pending: 最多积压的事件数量
+        """
+        self.task_ids = task_ids
+        self.status = status
+        self.max_pending = max_pending
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0  # 因积压而丢弃的事件数量
+        self._pending: "OrderedDict[str, dict]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def matches(self, event: dict) -> bool:
+        if self.task_ids is not None and event["task_id"] not in self.task_ids:
+            return False
+        return self.status is None or event["status"] == self.status
+
+    def offer(self, event: dict):
+        """加入待发送事件（在流所在的事件循环中调用）"""
+        self._pending.pop(event["task_id"], None)
+        self._pending[event["task_id"]] = event
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._ready.set()
+
+    async def get(self, timeout: float) -> List[dict]:
+        """
+        取出所有待发送事件
+
+        Args:
+            timeout: 没有事件时最多等待的秒数
+
+        Returns:
+            List[dict]: 事件列表，超时时为空
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+
+class TaskEventService:
+    """任务事件服务类"""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # 各事件循环与订阅线程共享的锁
+        self._waiters: Dict[str, List[Tuple[asyncio.Future, asyncio.AbstractEventLoop]]] = {}  # 等待任务结束的请求
+        self._streams: Set[TaskEventStream] = set()  # 实时事件流
+        self._listener = None  # 订阅线程
+
+    def subscribe(self, task_id: str) -> asyncio.Future:
+        """
+        登记等待任务结束（需在等待方的事件循环中调用）
+
+        Args:
+            task_id: 任务 ID
+
+        Returns:
+            asyncio.Future: 收到任务结束事件时完成
+        """
+        self.start_listener()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiters.setdefault(task_id, []).append((future, loop))
+        return future
+
+    def unsubscribe(self, task_id: str, future: asyncio.Future):
+        """
+        取消等待
+
+        Args:
+            task_id: 任务 ID
+            future: subscribe 返回的 Future
+        """
+        with self._lock:
+            waiters = [item for item in self._waiters.get(task_id, []) if item[0] is not future]
+            if waiters:
+                self._waiters[task_id] = waiters
+            else:
+                self._waiters.pop(task_id, None)
+
+    def open_stream(self, task_ids: Optional[Set[str]] = None, status: Optional[str] = None,
+                    max_pending: int = 1000) -> TaskEventStream:
+        """
+        打开实时事件流（需在流所在的事件循环中调用）
+
+        Args:
+            task_ids: 只接收这些任务的事件，为空时不按任务过滤
+            status: 只接收该状态的事件
+            max_pending: 最多积压的事件数量
+
+        Returns:
+            TaskEventStream: 事件流
+        """
+        self.start_listener()
+        stream = TaskEventStream(task_ids, status, max_pending)
+        with self._lock:
+            self._streams.add(stream)
+        return stream
+
+    def close_stream(self, stream: TaskEventStream):
+        """关闭实时事件流"""
+        with self._lock:
+            self._streams.discard(stream)
+
+    def _dispatch(self, event: dict):
+        """将事件分发给本进程中的等待方和事件流"""
+        with self._lock:
+            waiters = self._waiters.pop(event["task_id"], []) if event["status"] in FINAL_STATUSES else []
+            streams = [stream for stream in self._streams if stream.matches(event)]
+        for future, loop in waiters:
+            loop.call_soon_threadsafe(_set_done, future)
+        for stream in streams:
+            stream.loop.call_soon_threadsafe(stream.offer, event)
+
+    def publish(self, status: str, *task_ids: str):
+        """
+        发布任务状态事件（必须在状态写入数据库之后调用）
+
+        Args:
+            status: 任务的新状态
+            task_ids: 任务 ID
+        """
+        if not task_ids:
+            return
+        events = [{"task_id": task_id, "status": status, "timestamp": time.time()} for task_id in task_ids]
+        try:
+            client = redis_client.queue
+            if isinstance(client, LocalRedis):
+                for event in events:
+                    self._dispatch(event)
+                return
+            pipe = client.pipeline(transaction=False)
+            for event in events:
+                pipe.publish(TASK_EVENTS_CHANNEL, json.dumps(event))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to publish {status} events for {list(task_ids)[:3]}: {e}")
+
+    def _listen(self):
+        """订阅任务事件频道，连接断开时自动重连"""
+        while True:
+            try:
+                pubsub = redis_client.queue.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(TASK_EVENTS_CHANNEL)
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._dispatch(json.loads(message["data"]))
+            except Exception as e:
+                logger.error(f"Task event listener error: {e}")
+                time.sleep(1)
+
+    def start_listener(self):
+        """启动本进程的订阅线程（每个进程只启动一次，单机模式下无需订阅）"""
+        if self._listener is not None or isinstance(redis_client.queue, LocalRedis):
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name="task-event-listener", daemon=True)
+            self._listener.start()
+
+
+# 全局任务事件服务实例
+task_event_service = TaskEventService()
@@ -0,0 +1,115 @@
+"""
+任务状态批量写入模块
+
+Worker 在同一个事件循环中并发处理多个任务。每次状态更新都同步调用 pymongo 会阻塞整个事件循环，
+所有页面都要等待这次数据库往返。TaskWriteBuffer 收集并发任务的状态更新，每 TASK_WRITE_INTERVAL 秒
+（或积累到 TASK_WRITE_BATCH_SIZE 条时）合并为一次无序 bulk_write，并在线程中执行。
+调用方等待自己的更新写入后再继续，因此写入之后的完成事件、结果复制等步骤仍能读到最新状态。
+
+缓冲区绑定到创建它的事件循环，每个 Worker 各自持有一个。
+"""
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.db.mongo import mongo
+
+logger = logging.getLogger(__name__)
+
+
+class TaskWriteBuffer:
+    """合并任务状态更新的写缓冲区"""
+
+    def __init__(self, interval: Optional[float] = None, batch_size: Optional[int] = None):
+        """
+        Args:
+            interval: 合并窗口（秒），默认使用 TASK_WRITE_INTERVAL
+            batch_size: 每次 bulk_write 的最大更新数量，默认使用 TASK_WRITE_BATCH_SIZE
+        """
+        self.interval = settings.task_write_interval if interval is None else interval
+        self.batch_size = batch_size or settings.task_write_batch_size
+        self._pending: List[Tuple[UpdateOne, asyncio.Future]] = []
+        self._wakeup = None  # 延迟创建，绑定到 Worker 所在的事件循环
+        self._task = None  # 后台写入协程
+        self._stopping = False  # 是否正在停止
+        self.flushes = 0  # 已执行的 bulk_write 次数
+
+    def _get_wakeup(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    async def update(self, filter: dict, update: dict):
+        """
+        提交一条任务更新并等待其写入数据库
+
+        未启动后台写入协程时（如 Worker 之外的调用）立即单独写入。
+
+        Args:
+            filter: 更新条件
+            update: 更新操作
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((UpdateOne(filter, update), future))
+        if self._task is None:
+            await self.flush()
+        else:
+            self._get_wakeup().set()
+        await future
+
+    async def flush(self):
+        """将缓冲的更新按 batch_size 分批写入数据库，并唤醒等待的调用方"""
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            errors, details = {}, {}
+            try:
+                await asyncio.to_thread(mongo.tasks.bulk_write, [op for op, _ in batch], ordered=False)
+                self.flushes += 1
+            except BulkWriteError as e:
+                # 无序写入中单条失败不影响其他更新，只让失败的调用方收到异常
+                self.flushes += 1
+                details = e.details
+                errors = {error["index"]: error for error in details.get("writeErrors", [])}
+                logger.error(f"Failed to write {len(errors)} of {len(batch)} task updates: {e}")
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} task updates: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for index, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if index in errors:
+                    future.set_exception(BulkWriteError({**details, "writeErrors": [errors[index]]}))
+                else:
+                    future.set_result(None)
+
+    async def _run(self):
+        """后台写入循环：收到第一条更新后等待一个合并窗口，再一次性写入"""
+        wakeup = self._get_wakeup()
+        while not self._stopping:
+            await wakeup.wait()
+            wakeup.clear()
+            if not self._stopping and len(self._pending) < self.batch_size and self.interval > 0:
+                await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        """启动后台写入协程（需在 Worker 的事件循环中调用）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台写入协程，并写入剩余的更新（不取消正在执行的写入，避免调用方一直等待）"""
+        if self._task is not None:
+            self._stopping = True
+            self._get_wakeup().set()
+            try:
+                await self._task
+            finally:
+                self._task = None
+                self._stopping = False
+        await self.flush()
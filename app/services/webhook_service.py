@@ -0,0 +1,283 @@
+"""
+任务完成回调（Webhook）服务模块
+
+请求中带有 callback_url 的任务在创建时标记 callback_pending。回调服务在 API 进程中周期运行：
+
+1. 收集已结束且待回调的任务，按 callback_url 写入投递队列（webhook_deliveries 集合）；
+   启用合并模式时同一地址在一个周期内结束的任务合并为一次投递
+2. 认领到期的投递，通过共享连接池的 httpx.AsyncClient 发送 POST，请求体带 HMAC 签名
+3. 投递失败时按指数退避安排下次重试，超过最大次数后标记为失败
+
+任务和投递都通过带条件的 find_one_and_update 认领，多个 API 进程同时运行也不会重复投递；
+任务的投递写入后才清除 callback_pending，进程中途退出不会丢失回调。
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+import httpx
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.db.async_mongo import amongo
+from app.services.task_event_service import FINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# 回调中包含的任务字段（不含抓取结果）
+TASK_FIELDS = ("task_id", "url", "status", "error", "cached", "batch_id", "created_at", "completed_at")
+
+# 投递被认领后，其他进程在该时间（秒）内不会重复认领
+DELIVERY_LEASE = 120
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """
+    计算回调请求的 HMAC-SHA256 签名
+
+    接收方使用相同的密钥对 "{timestamp}.{body}" 计算签名，并与 X-Webhook-Signature 请求头比较。
+
+    Args:
+        secret: 签名密钥
+        timestamp: X-Webhook-Timestamp 请求头的值
+        body: 请求体
+
+    Returns:
+        str: "sha256=<hex>" 格式的签名
+    """
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+class WebhookService:
+    """任务完成回调服务类"""
+
+    def __init__(self):
+        self._task = None  # 后台投递协程
+        self._client: Optional[httpx.AsyncClient] = None  # 共享连接池的 HTTP 客户端
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.webhook_timeout,
+                limits=httpx.Limits(max_connections=settings.webhook_max_connections),
+            )
+        return self._client
+
+    def compute_delay(self, attempts: int) -> float:
+        """
+        计算第 N 次投递失败后的重试延迟（指数退避，±20% 随机抖动）
+
+        Args:
+            attempts: 已投递的次数（从 1 开始）
+
+        Returns:
+            float: 延迟秒数
+        """
+        base = min(settings.webhook_retry_delay * (2 ** max(attempts - 1, 0)), settings.webhook_retry_backoff_max)
+        return base * random.uniform(0.8, 1.2)
+
+    async def collect_once(self) -> int:
+        """
+        将已结束且待回调的任务写入投递队列
+
+        查询条件 (callback_pending, status) 由复合索引覆盖。任务先以租约认领，写入投递后才清除 callback_pending；
+        进程在两步之间退出时，租约到期后由其他进程重新收集，已写入投递的任务不会重复写入。
+
+        Returns:
+            int: 写入投递队列的任务数量
+        """
+        now = datetime.now()
+        candidates = await amongo.tasks.find(
+            {"callback_pending": True, "status": {"$in": list(FINAL_STATUSES)}},
+            {"task_id": 1}
+        ).limit(settings.webhook_batch_size).to_list(None)
+
+        claimed: Dict[str, Dict[str, Any]] = {}  # 任务 ID -> 任务
+        for candidate in candidates:
+            task = await amongo.tasks.find_one_and_update(
+                {
+                    "task_id": candidate["task_id"],
+                    "callback_pending": True,
+                    "callback_claimed_until": {"$not": {"$gt": now}}
+                },
+                {"$set": {"callback_claimed_until": now + timedelta(seconds=DELIVERY_LEASE)}},
+                projection={"task_id": 1, "callback_url": 1, "completed_at": 1, "updated_at": 1}
+            )
+            if task:
+                claimed[task["task_id"]] = task
+
+        if not claimed:
+            return 0
+
+        # 投递按任务 ID 去重：跳过本次结束之后已写入投递队列的任务（重试后再次结束的任务会重新回调）
+        finished_at = {task_id: task.get("completed_at") or task.get("updated_at") or now for task_id, task in claimed.items()}
+        queued = set()
+        for delivery in await amongo.webhook_deliveries.find(
+            {"task_ids": {"$in": list(claimed)}, "created_at": {"$gte": min(finished_at.values())}},
+            {"task_ids": 1, "created_at": 1}
+        ).to_list(None):
+            queued.update(
+                task_id for task_id in delivery["task_ids"]
+                if task_id in finished_at and delivery["created_at"] >= finished_at[task_id]
+            )
+        by_url: Dict[str, List[str]] = {}
+        for task_id, task in claimed.items():
+            if task.get("callback_url") and task_id not in queued:
+                by_url.setdefault(task["callback_url"], []).append(task_id)
+
+        deliveries = []
+        for url, task_ids in by_url.items():
+            groups = [task_ids] if settings.webhook_batching else [[task_id] for task_id in task_ids]
+            for group in groups:
+                deliveries.append({
+                    "url": url,
+                    "task_ids": group,
+                    "status": "pending",
+                    "attempts": 0,
+                    "next_attempt_at": now,
+                    "last_error": None,
+                    "created_at": now,
+                    "updated_at": now
+                })
+        if deliveries:
+            await amongo.webhook_deliveries.insert_many(deliveries)
+
+        # 投递已写入，清除待回调标记
+        await amongo.tasks.update_many(
+            {"task_id": {"$in": list(claimed)}},
+            {"$set": {"callback_pending": False}, "$unset": {"callback_claimed_until": ""}}
+        )
+        return sum(len(task_ids) for task_ids in by_url.values())
+
+    async def _build_payload(self, delivery: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        构建回调请求体：默认只包含任务状态和结果查询地址，启用 webhook_include_result 时附带完整结果
+
+        Args:
+            delivery: 投递记录
+
+        Returns:
+            dict: 请求体
+        """
+        projection = {field: 1 for field in TASK_FIELDS}
+        if settings.webhook_include_result:
+            projection["result"] = 1
+
+        tasks = []
+        docs = await amongo.tasks.find({"task_id": {"$in": delivery["task_ids"]}}, projection).to_list(None)
+        for doc in docs:
+            doc.pop("_id", None)
+            if not settings.webhook_include_result:
+                doc["result_url"] = f"/api/v1/tasks/{doc['task_id']}"
+            tasks.append(doc)
+        return {"event": "task.completed", "delivery_id": str(delivery["_id"]), "tasks": tasks}
+
+    async def _deliver(self, delivery: Dict[str, Any]) -> bool:
+        """
+        发送一次投递并记录结果
+
+        Args:
+            delivery: 已认领的投递记录
+
+        Returns:
+            bool: 是否投递成功
+        """
+        error = None
+        try:
+            body = json.dumps(await self._build_payload(delivery), default=str, ensure_ascii=False).encode()
+            timestamp = str(int(time.time()))
+            headers = {
+                "Content-Type": "application/json",
+                "X-Webhook-Id": str(delivery["_id"]),
+                "X-Webhook-Timestamp": timestamp,
+            }
+            if settings.webhook_secret:
+                headers["X-Webhook-Signature"] = sign_payload(settings.webhook_secret, timestamp, body)
+
+            response = await self._get_client().post(delivery["url"], content=body, headers=headers)
+            if response.is_success:
+                await amongo.webhook_deliveries.update_one(
+                    {"_id": delivery["_id"]},
+                    {"$set": {"status": "delivered", "last_error": None, "updated_at": datetime.now()}}
+                )
+                return True
+            error = f"HTTP {response.status_code}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        now = datetime.now()
+        attempts = delivery["attempts"]
+        update = {"attempts": attempts, "last_error": error, "updated_at": now}
+        if attempts >= settings.webhook_max_attempts:
+            update["status"] = "failed"
+            logger.error(f"Webhook delivery {delivery['_id']} to {delivery['url']} failed after {attempts} attempts: {error}")
+        else:
+            delay = self.compute_delay(attempts)
+            update["next_attempt_at"] = now + timedelta(seconds=delay)
+            logger.warning(f"Webhook delivery {delivery['_id']} to {delivery['url']} failed ({error}), retry in {delay:.1f}s")
+        await amongo.webhook_deliveries.update_one({"_id": delivery["_id"]}, {"$set": update})
+        return False
+
+    async def send_once(self) -> Dict[str, int]:
+        """
+        认领并发送所有到期的投递
+
+        查询条件 (status, next_attempt_at) 由复合索引覆盖。
+
+        Returns:
+            dict: delivered（成功数量）、failed（本次失败数量）
+        """
+        now = datetime.now()
+        due = []
+        for _ in range(settings.webhook_max_connections):
+            delivery = await amongo.webhook_deliveries.find_one_and_update(
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"$set": {"next_attempt_at": now + timedelta(seconds=DELIVERY_LEASE)}, "$inc": {"attempts": 1}},
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if not delivery:
+                break
+            due.append(delivery)
+
+        results = await asyncio.gather(*(self._deliver(delivery) for delivery in due))
+        delivered = sum(1 for ok in results if ok)
+        return {"delivered": delivered, "failed": len(results) - delivered}
+
+    async def _run(self):
+        """后台投递循环"""
+        logger.info(f"Webhook service started (interval={settings.webhook_interval}s, batching={settings.webhook_batching})")
+        while True:
+            try:
+                await self.collect_once()
+                await self.send_once()
+            except Exception as e:
+                logger.error(f"Webhook service error: {e}")
+            await asyncio.sleep(settings.webhook_interval)
+
+    def start(self):
+        """启动后台投递协程（需在事件循环中调用）"""
+        if settings.webhook_enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台投递协程并关闭连接池"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# 全局任务完成回调服务实例
+webhook_service = WebhookService()
@@ -6,8 +6,16 @@ Worker 工作进程模块
 import asyncio
 import logging
 from datetime import datetime
-from app.services.queue_service import rabbitmq_service
+from pymongo import ReturnDocument
+from app.services.queue_base import get_expiration, parse_routes
+from app.services.queue_service import queue_service
 from app.services.cache_service import cache_service
+from app.services.retry_service import retry_service
+from app.services.metrics_service import metrics_service
+from app.services.singleflight_service import singleflight_service
+from app.services.cancel_service import cancel_service
+from app.services.task_event_service import task_event_service
+from app.services.task_write_service import TaskWriteBuffer
 from app.core.scraper import scraper
 from app.core.config import settings
 from app.db.mongo import mongo
@@ -17,6 +25,66 @@ from app.core.browser import browser_manager
 logger = logging.getLogger(__name__)
 
 
+class ConcurrencyLimiter:
+    """
+    可在运行时调整上限的并发限制器
+
+    与 asyncio.Semaphore 不同，上限可以随时调大或调小；调小时不会打断已经持有许可的任务，
+    只是在它们完成之前不再放行新的任务。
+    """
+
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self._active = 0
+        self._condition = None  # 延迟创建，绑定到 Worker 所在的事件循环
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        """等待并获取一个并发许可"""
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+
+    async def release(self):
+        """归还并发许可"""
+        condition = self._get_condition()
+        async with condition:
+            self._active -= 1
+            condition.notify()
+
+    async def resize(self, limit: int):
+        """
+        调整并发上限
+
+        Args:
+            limit: 新的并发上限
+        """
+        condition = self._get_condition()
+        async with condition:
+            self._limit = max(1, limit)
+            condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+
 class Worker:
     """Worker 工作进程类"""
 
@@ -30,6 +98,11 @@ class Worker:
         self.node_id = node_id or settings.node_id
         self.is_running = False  # 运行状态标志
         self.active_tasks = set()  # 当前正在处理的任务 ID 集合
+        self.max_concurrent = settings.worker_concurrency  # 最大并发数，启动时从节点配置加载
+        self.concurrency = ConcurrencyLimiter(self.max_concurrent)  # 并发限制器
+        self.routes = []  # 除共享队列外监听的路由，启动时从节点配置加载
+        self.loop = None  # Worker 所在的事件循环
+        self.writes = TaskWriteBuffer()  # 合并并发任务的状态更新
 
     async def process_task(self, task_data: dict):
         """
@@ -42,21 +115,59 @@ class Worker:
         task_id = task_data.get("task_id")
         url = task_data.get("url")
         params = task_data.get("params", {})
+        attempt = task_data.get("attempt", 1)
 
         if not task_id:
             return
 
         logger.info(f"Processing task {task_id}: {url}")
-        
-        # 检查任务是否仍然存在于数据库中（可能已被删除）
-        task = mongo.tasks.find_one({"task_id": task_id})
-        if not task:
-            logger.warning(f"Task {task_id} not found in database, it may have been deleted. Skipping.")
+
+        # 调用方已放弃的过期任务在获取并发许可和浏览器之前直接跳过；等待许可期间可能过期，获取后再检查一次。
+        # 任务是否仍存在、是否已取消由开始执行时带状态条件的 processing 更新一并判断
+        if await self._expire_if_overdue(task_data):
             return
 
+        async with self.concurrency:
+            if await self._expire_if_overdue(task_data):
+                return
+            await self._process_task(task_data, task_id, url, params, attempt)
+
+    async def _expire_if_overdue(self, task_data: dict) -> bool:
+        """
+        任务已超过期限时将其标记为过期
+
+        Args:
+            task_data: 任务数据字典
+
+        Returns:
+            bool: 任务已过期（不再执行）时返回 True
+        """
+        remaining = get_expiration(task_data)
+        if remaining is None or remaining > 0:
+            return False
+        await self._expire_task(task_data, -remaining)
+        return True
+
+    async def _process_task(self, task_data: dict, task_id: str, url: str, params: dict, attempt: int):
+        """
+        在持有并发许可的情况下执行任务
+
+        Args:
+            task_data: 任务数据字典
+            task_id: 任务 ID
+            url: 目标 URL
+            params: 抓取参数
+            attempt: 当前执行次数
+        """
         self.active_tasks.add(task_id)
+        cancel_service.register(task_id)
 
         try:
+            # 更新任务状态为处理中（已删除、已取消或已过期的任务不再执行）
+            if not await self._update_task_status(task_id, "processing", self.node_id, attempt):
+                logger.info(f"Task {task_id} deleted, cancelled or expired before start, skipping")
+                return
+
             # 检查是否启用缓存并命中
             cache_config = task_data.get("cache", {})
             if cache_config.get("enabled"):
@@ -75,24 +186,24 @@ class Worker:
                         "updated_at": datetime.now(),
                         "completed_at": datetime.now()
                     }
-                    mongo.tasks.update_one({"task_id": task_id}, {"$set": update_data})
+                    await self.writes.update(self._active_filter(task_id), {"$set": update_data})
+                    task_event_service.publish("success", task_id)
+                    await self._complete_singleflight(task_data)
                     return
 
-            # 更新任务状态为处理中
-            await self._update_task_status(task_id, "processing", self.node_id)
-
-            # 执行抓取
+            # 执行抓取（节点停止时处理中的任务会在排空期限内继续完成，结果照常保存）
             result = await scraper.scrape(url, params, self.node_id)
 
-            # 检查 Worker 是否在执行过程中被停止
-            if not self.is_running:
-                logger.warning(f"Worker stopped during task {task_id}, result will be ignored")
+            # 取消请求可能在抓取器吞掉中断之后才到达，此时丢弃结果，保持 cancelled 状态
+            if cancel_service.was_cancelled(task_id):
+                logger.info(f"Task {task_id} cancelled during processing, result discarded")
                 return
 
             # 处理抓取结果
             if result["status"] == "success":
-                # 更新任务状态为成功
+                # 更新任务状态为成功，并将结果复制给合并到该任务的相同请求
                 await self._update_task_success(task_id, result)
+                await self._complete_singleflight(task_data)
 
                 # 如果启用缓存，则保存结果到缓存
                 # 但需要检查 agent_result 是否失败，失败的结果不应缓存
@@ -116,48 +227,116 @@ class Worker:
 
                 logger.info(f"Task {task_id} completed successfully")
             else:
-                # 更新任务状态为失败
-                await self._update_task_failed(task_id, result["error"])
+                # 可重试的错误安排延迟重试，否则更新任务状态为失败
                 logger.error(f"Task {task_id} failed: {result['error']}")
+                await self._handle_task_failure(task_data, result["error"])
 
+        except asyncio.CancelledError:
+            if cancel_service.was_cancelled(task_id):
+                # 用户取消：抓取器已关闭页面和上下文，消息正常确认
+                logger.info(f"Task {task_id} cancelled during processing")
+                return
+            # 超过排空期限仍未完成，消息由队列原样重新投递，任务恢复为等待状态
+            logger.warning(f"Task {task_id} unfinished at drain deadline, requeued")
+            try:
+                await asyncio.to_thread(
+                    mongo.tasks.update_one,
+                    self._active_filter(task_id),
+                    {"$set": {"status": "pending", "node_id": None, "updated_at": datetime.now()}}
+                )
+            except Exception as e:
+                logger.warning(f"Failed to reset task {task_id} to pending: {e}")
+            raise
         except Exception as e:
             # 处理异常
-            if self.is_running:
-                await self._update_task_failed(task_id, {"message": str(e)})
             logger.error(f"Task {task_id} error: {e}", exc_info=True)
+            await self._handle_task_failure(task_data, {"message": str(e), "type": type(e).__name__})
         finally:
+            cancel_service.unregister(task_id)
             self.active_tasks.discard(task_id)
 
-    async def _update_task_status(self, task_id: str, status: str, node_id: str = None):
+    async def _update_task_status(self, task_id: str, status: str, node_id: str = None, attempt: int = None) -> bool:
         """
-        更新任务状态
+        更新任务状态，已取消或已过期的任务保持不变
+
+        需要根据匹配结果决定是否继续执行，因此不经过写缓冲区，在线程中单独执行。
 
         Args:
             task_id: 任务 ID
             status: 任务状态
             node_id: 处理节点 ID
+            attempt: 当前执行次数（可选）
+
+        Returns:
+            bool: 任务存在且未被取消或过期时返回 True
         """
-        mongo.tasks.update_one(
-            {"task_id": task_id},
-            {
-                "$set": {
-                    "status": status,
-                    "node_id": node_id,
-                    "updated_at": datetime.now()
-                }
-            }
+        update_data = {
+            "status": status,
+            "node_id": node_id,
+            "updated_at": datetime.now()
+        }
+        if attempt is not None:
+            update_data["attempts"] = attempt
+            update_data["next_retry_at"] = None
+
+        result = await asyncio.to_thread(
+            mongo.tasks.update_one,
+            self._active_filter(task_id),
+            {"$set": update_data}
         )
+        if not result.matched_count:
+            return False
+        task_event_service.publish(status, task_id)
+        return True
+
+    @staticmethod
+    def _active_filter(task_id: str) -> dict:
+        """
+        终态写入的更新条件：已取消或已过期的任务不会被执行结果覆盖
+
+        Args:
+            task_id: 任务 ID
+
+        Returns:
+            dict: 更新条件
+        """
+        return {"task_id": task_id, "status": {"$nin": ["cancelled", "expired"]}}
+
+    async def _handle_task_failure(self, task_data: dict, error: dict):
+        """
+        处理任务失败：瞬时错误自动安排延迟重试，其余错误或重试耗尽时标记为失败
+
+        Args:
+            task_data: 队列中的任务数据
+            error: 错误信息
+        """
+        task_id = task_data.get("task_id")
+        if retry_service.is_retryable(error) and await retry_service.schedule_retry(task_data, error):
+            return
+        await self._update_task_failed(task_id, error)
+        await self._complete_singleflight(task_data)
+
+    async def _complete_singleflight(self, task_data: dict):
+        """
+        任务结束后释放合并租约，并将结果复制给合并到该任务的相同请求
+
+        Args:
+            task_data: 队列中的任务数据
+        """
+        cache_key = task_data.get("cache_key")
+        if cache_key and task_data.get("cache", {}).get("enabled"):
+            await singleflight_service.complete(cache_key, task_data["task_id"])
 
     async def _update_task_success(self, task_id: str, result: dict):
         """
-        更新任务为成功状态
+        更新任务为成功状态（经写缓冲区与并发任务的更新合并写入）
 
         Args:
             task_id: 任务 ID
             result: 抓取结果
         """
-        mongo.tasks.update_one(
-            {"task_id": task_id},
+        await self.writes.update(
+            self._active_filter(task_id),
             {
                 "$set": {
                     "status": "success",
@@ -169,17 +348,18 @@ class Worker:
                 }
             }
         )
+        task_event_service.publish("success", task_id)
 
     async def _update_task_failed(self, task_id: str, error: dict):
         """
-        更新任务为失败状态
+        更新任务为失败状态（经写缓冲区与并发任务的更新合并写入）
 
         Args:
             task_id: 任务 ID
             error: 错误信息
         """
-        mongo.tasks.update_one(
-            {"task_id": task_id},
+        await self.writes.update(
+            self._active_filter(task_id),
             {
                 "$set": {
                     "status": "failed",
@@ -189,13 +369,115 @@ class Worker:
                 }
             }
         )
+        task_event_service.publish("failed", task_id)
+
+    async def _expire_task(self, task_data: dict, overdue: float):
+        """
+        将超过期限仍未开始执行的任务标记为过期
+
+        Args:
+            task_data: 队列中的任务数据
+            overdue: 已超过期限的秒数
+        """
+        task_id = task_data["task_id"]
+        now = datetime.now()
+        result = await asyncio.to_thread(
+            mongo.tasks.update_one,
+            {"task_id": task_id, "status": {"$in": ["pending", "processing"]}},
+            {"$set": {
+                "status": "expired",
+                "error": {"message": f"Task expired {overdue:.1f}s before execution started", "type": "TaskExpired"},
+                "node_id": self.node_id,
+                "updated_at": now,
+                "completed_at": now
+            }}
+        )
+        if result.modified_count:
+            logger.info(f"Task {task_id} expired {overdue:.1f}s ago, skipped")
+            task_event_service.publish("expired", task_id)
+            await metrics_service.incr("expired")
+            await self._complete_singleflight(task_data)
+
+    async def _on_task_dead_lettered(self, task_data: dict, reason: str):
+        """
+        消息被转入死信队列时的回调：记录指标并将任务标记为失败
+
+        Args:
+            task_data: 任务数据（消息无法解析时为 None）
+            reason: 进入死信队列的原因
+        """
+        await metrics_service.incr("dead_lettered")
+        task_id = task_data.get("task_id") if isinstance(task_data, dict) else None
+        if task_id:
+            await self._update_task_failed(
+                task_id,
+                {"message": f"Task moved to dead-letter queue: {reason}", "type": "DeadLettered"}
+            )
+            await self._complete_singleflight(task_data)
+
+    async def set_concurrency(self, max_concurrent: int):
+        """
+        运行时调整 Worker 的最大并发数，不影响正在处理的任务
+
+        必须在 Worker 所在的事件循环中调用。
+
+        Args:
+            max_concurrent: 新的最大并发数
+        """
+        max_concurrent = max(1, int(max_concurrent))
+        if max_concurrent == self.max_concurrent:
+            return
+
+        logger.info(f"Worker {self.node_id} concurrency: {self.max_concurrent} -> {max_concurrent}")
+        self.max_concurrent = max_concurrent
+        await self.concurrency.resize(max_concurrent)
+        try:
+            await queue_service.set_prefetch(max_concurrent)
+        except Exception as e:
+            logger.error(f"Failed to update prefetch for {self.node_id}: {e}")
+
+    async def set_routes(self, queue_name: str):
+        """
+        运行时调整 Worker 监听的路由，不影响正在处理的任务
+
+        必须在 Worker 所在的事件循环中调用。
+
+        Args:
+            queue_name: 节点配置的 queue_name（逗号分隔的路由）
+        """
+        routes = parse_routes(queue_name)
+        if routes == self.routes:
+            return
+
+        logger.info(f"Worker {self.node_id} routes: {self.routes} -> {routes}")
+        self.routes = routes
+        try:
+            await queue_service.set_routes(routes)
+        except Exception as e:
+            logger.error(f"Failed to update routes for {self.node_id}: {e}")
+
+    def _load_node_config(self):
+        """从节点配置中加载最大并发数和监听的路由，节点不存在时使用全局配置"""
+        try:
+            doc = mongo.nodes.find_one({"node_id": self.node_id}, {"max_concurrent": 1, "queue_name": 1})
+            if doc and doc.get("max_concurrent"):
+                self.max_concurrent = max(1, int(doc["max_concurrent"]))
+            if doc:
+                self.routes = parse_routes(doc.get("queue_name"))
+        except Exception as e:
+            logger.error(f"Failed to load node config for {self.node_id}: {e}")
+        self.concurrency = ConcurrencyLimiter(self.max_concurrent)
 
     async def run(self):
         """
         启动 Worker，开始消费任务
         """
         self.is_running = True
-        logger.info(f"Worker {self.node_id} started")
+        self.loop = asyncio.get_running_loop()
+        self._load_node_config()
+        self.writes.start()
+        cancel_service.start_listener()
+        logger.info(f"Worker {self.node_id} started (max_concurrent={self.max_concurrent}, routes={self.routes})")
 
         # 启动心跳循环
         heartbeat_task = asyncio.create_task(self._heartbeat_loop())
@@ -207,23 +489,15 @@ class Worker:
         await browser_manager.get_browser()
 
         try:
-            loop = asyncio.get_event_loop()
-
-            # 定义消息队列的回调函数
-            def callback(task_data):
-                asyncio.run_coroutine_threadsafe(
-                    self.process_task(task_data),
-                    loop
-                )
-
-            # 在线程池中运行阻塞式的消息队列消费
-            await loop.run_in_executor(
-                None,
-                lambda: rabbitmq_service.consume_tasks(
-                    callback,
-                    prefetch_count=settings.worker_concurrency,
-                    should_stop=lambda: not self.is_running
-                )
+            # 直接在当前事件循环中异步消费任务
+            await queue_service.consume_tasks(
+                self.process_task,
+                prefetch_count=self.max_concurrent,
+                should_stop=lambda: not self.is_running,
+                on_dead_letter=self._on_task_dead_lettered,
+                routes=self.routes,
+                consumer_name=self.node_id,
+                drain_timeout=settings.worker_drain_timeout
             )
 
         except KeyboardInterrupt:
@@ -260,10 +534,19 @@ class Worker:
                 if not self.is_running:
                     break
                     
-                mongo.nodes.update_one(
+                doc = await asyncio.to_thread(
+                    mongo.nodes.find_one_and_update,
                     {"node_id": self.node_id},
-                    {"$set": {"last_seen": datetime.now(), "status": "running"}}
+                    {"$set": {"last_seen": datetime.now(), "status": "running"}},
+                    projection={"max_concurrent": 1, "queue_name": 1},
+                    return_document=ReturnDocument.AFTER
                 )
+
+                # 同步节点配置中的并发数和路由（兜底无法直接通知到的 Worker，如独立部署的节点）
+                if doc and doc.get("max_concurrent"):
+                    await self.set_concurrency(doc["max_concurrent"])
+                if doc:
+                    await self.set_routes(doc.get("queue_name"))
             except Exception as e:
                 logger.error(f"Heartbeat error for {self.node_id}: {e}")
             
@@ -281,13 +564,21 @@ class Worker:
         self.is_running = False
         logger.info(f"Worker {self.node_id} stopping...")
 
-        # 处理正在执行的任务
+        # 写入缓冲区中剩余的状态更新
+        try:
+            await self.writes.stop()
+        except Exception as e:
+            logger.error(f"Error flushing task updates for {self.node_id}: {e}")
+
+        # 正常停止时处理中的任务已在消费者排空阶段完成或重新入队，
+        # 这里只兜底处理消费者异常退出时遗留的任务
         if self.active_tasks:
             task_ids = list(self.active_tasks)
             logger.info(f"Worker {self.node_id} has {len(task_ids)} active tasks. Resetting status...")
             try:
-                mongo.tasks.update_many(
-                    {"task_id": {"$in": task_ids}},
+                await asyncio.to_thread(
+                    mongo.tasks.update_many,
+                    {"task_id": {"$in": task_ids}, "status": {"$nin": ["cancelled", "expired"]}},
                     {
                         "$set": {
                             "status": "pending",
@@ -317,8 +608,10 @@ class Worker:
         except Exception as e:
             logger.error(f"Error updating stop status for {self.node_id}: {e}")
 
+        # 关闭本线程的队列连接（连接绑定在当前线程的事件循环上）
+        await queue_service.close()
+
         # 注意：在 API 服务器中运行时，不要关闭全局连接
-        # rabbitmq_service.close()
         # await browser_manager.close_browser()
         # mongo.close()
         # redis_client.close_all()
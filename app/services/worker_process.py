@@ -0,0 +1,244 @@
+"""
+Worker 子进程模块
+
+在独立进程中运行 Worker，通过管道与 API 进程中的 NodeManager 通信：
+父进程下发控制命令，子进程周期性上报健康状态
+"""
+import asyncio
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _listen_commands(conn, loop: asyncio.AbstractEventLoop, worker):
+    """
+    在后台线程中接收父进程下发的命令，并转交给 Worker 所在的事件循环
+
+    Args:
+        conn: 子进程端管道
+        loop: Worker 事件循环
+        worker: Worker 实例
+    """
+    while True:
+        try:
+            message = conn.recv()
+            pipe_closed = False
+        except (EOFError, OSError):
+            # 父进程已退出或管道关闭，停止 Worker，避免成为孤儿进程
+            message = {"cmd": "stop"}
+            pipe_closed = True
+
+        try:
+            cmd = message.get("cmd")
+            if cmd == "stop":
+                loop.call_soon_threadsafe(setattr, worker, "is_running", False)
+            elif cmd in ("set_concurrency", "set_routes"):
+                asyncio.run_coroutine_threadsafe(getattr(worker, cmd)(message["value"]), loop)
+        except RuntimeError:
+            # 事件循环已关闭
+            return
+
+        if pipe_closed:
+            return
+
+
+async def _report_health(conn, worker):
+    """
+    周期性通过管道向父进程上报健康状态
+
+    Args:
+        conn: 子进程端管道
+        worker: Worker 实例
+    """
+    while True:
+        try:
+            conn.send({
+                "type": "health",
+                "is_running": worker.is_running,
+                "active_tasks": list(worker.active_tasks),
+                "timestamp": time.time()
+            })
+        except (BrokenPipeError, OSError):
+            return
+        await asyncio.sleep(settings.worker_process_health_interval)
+
+
+def run_worker_process(node_id: str, conn):
+    """
+    Worker 子进程入口
+
+    Args:
+        node_id: 节点 ID
+        conn: 子进程端管道
+    """
+    # Windows 平台下，Playwright 需要使用 ProactorEventLoopPolicy 才能正常启动子进程
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    from app.core.logger import setup_logging, setup_node_logger
+    from app.services.worker import Worker
+
+    # 子进程不会继承父进程从数据库加载的动态配置，需要重新加载
+    settings.load_from_db()
+    setup_logging()
+    setup_node_logger(node_id)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    worker = Worker(node_id=node_id)
+
+    listener = threading.Thread(
+        target=_listen_commands,
+        args=(conn, loop, worker),
+        name=f"WorkerCommandListener-{node_id}",
+        daemon=True
+    )
+    listener.start()
+
+    async def main():
+        reporter = asyncio.create_task(_report_health(conn, worker))
+        try:
+            await worker.run()
+        finally:
+            reporter.cancel()
+
+    logger.info(f"Worker process for {node_id} started (pid={multiprocessing.current_process().pid})")
+    exit_code = 0
+    try:
+        loop.run_until_complete(main())
+    except Exception as e:
+        logger.error(f"Worker process {node_id} crashed with error: {e}", exc_info=True)
+        exit_code = 1
+    finally:
+        loop.close()
+        logger.info(f"Worker process for {node_id} exited")
+    sys.exit(exit_code)
+
+
+class WorkerProcessHandle:
+    """
+    子进程 Worker 句柄
+
+    对 NodeManager 暴露与 Worker 相同的 node_id / is_running / active_tasks 接口，
+    使节点的启动、停止和日志接口无需区分运行模式。
+    """
+
+    def __init__(self, node_id: str, restarts: int = 0):
+        """
+        初始化句柄并创建（尚未启动的）子进程
+
+        Args:
+            node_id: 节点 ID
+            restarts: 该节点因崩溃被自动重启的次数
+        """
+        self.node_id = node_id
+        self.restarts = restarts
+        self.stop_requested = False  # 是否为主动停止
+        self.last_health: dict = {}  # 最近一次健康上报
+        self.last_health_at: float = 0  # 最近一次健康上报时间
+
+        context = multiprocessing.get_context("spawn")
+        self.conn, self._child_conn = context.Pipe(duplex=True)
+        self.process = context.Process(
+            target=run_worker_process,
+            args=(node_id, self._child_conn),
+            name=f"WorkerProcess-{node_id}",
+            daemon=True
+        )
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    @property
+    def is_running(self) -> bool:
+        return self.process.is_alive() and not self.stop_requested
+
+    @is_running.setter
+    def is_running(self, value: bool):
+        if not value:
+            self.stop()
+
+    @property
+    def active_tasks(self) -> set:
+        return set(self.last_health.get("active_tasks", []))
+
+    def start(self):
+        """启动子进程"""
+        self.process.start()
+        # 父进程不使用子进程端管道
+        self._child_conn.close()
+        self.last_health_at = time.time()
+
+    def send(self, message: dict) -> bool:
+        """
+        向子进程发送命令
+
+        Args:
+            message: 命令字典
+
+        Returns:
+            bool: 是否发送成功
+        """
+        try:
+            self.conn.send(message)
+            return True
+        except (BrokenPipeError, OSError) as e:
+            logger.warning(f"Failed to send command to worker process {self.node_id}: {e}")
+            return False
+
+    def stop(self):
+        """请求子进程优雅退出"""
+        self.stop_requested = True
+        self.send({"cmd": "stop"})
+
+    def poll(self):
+        """读取子进程上报的所有消息（非阻塞）"""
+        try:
+            while self.conn.poll():
+                message = self.conn.recv()
+                if message.get("type") == "health":
+                    self.last_health = message
+                    self.last_health_at = time.time()
+        except (EOFError, OSError):
+            pass
+
+    def is_healthy(self) -> bool:
+        """最近是否收到过健康上报"""
+        return time.time() - self.last_health_at < settings.worker_process_health_timeout
+
+    def terminate(self):
+        """强制结束子进程"""
+        if self.process.is_alive():
+            self.process.terminate()
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        等待子进程退出
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 是否已退出
+        """
+        deadline = time.time() + timeout
+        while self.process.is_alive() and time.time() < deadline:
+            await asyncio.sleep(0.2)
+        return not self.process.is_alive()
+
+    def close(self):
+        """释放管道和进程资源"""
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if not self.process.is_alive():
+            self.process.close()
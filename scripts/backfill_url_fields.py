@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+任务 URL 检索字段回填脚本
+
+为新增检索字段之前创建的任务补写 host、host_rev、path、url_tokens，使按主机名、主机后缀、路径前缀和关键词的
+任务搜索也能覆盖历史任务。按 _id 顺序分批读取并批量写回，可以中断后重复执行。
+
+用法:
+    python scripts/backfill_url_fields.py --batch-size 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+from app.core.urls import url_search_fields
+from app.db.mongo import mongo
+
+
+def backfill(batch_size: int) -> int:
+    """
+    回填缺少检索字段的任务
+
+    Args:
+        batch_size: 每批读取和写回的任务数量
+
+    Returns:
+        int: 回填的任务数量
+    """
+    total = 0
+    last_id = None
+    started = time.time()
+    while True:
+        query = {"host_rev": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        tasks = list(mongo.tasks.find(query, {"url": 1}).sort("_id", 1).limit(batch_size))
+        if not tasks:
+            break
+
+        operations = []
+        for task in tasks:
+            fields = url_search_fields(task.get("url") or "")
+            if fields:
+                operations.append(UpdateOne({"_id": task["_id"]}, {"$set": fields}))
+        if operations:
+            mongo.tasks.bulk_write(operations, ordered=False)
+
+        total += len(operations)
+        last_id = tasks[-1]["_id"]
+        print(f"Backfilled {total} tasks ({total / max(time.time() - started, 1e-6):.0f}/s)")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回填任务 URL 检索字段")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批处理的任务数量")
+    args = parser.parse_args()
+
+    mongo.connect()
+    try:
+        count = backfill(args.batch_size)
+        print(f"Backfill completed: {count} tasks updated")
+    finally:
+        mongo.close()
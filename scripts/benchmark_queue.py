@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+任务队列后端基准测试脚本
+
+在独立的基准队列上，以相同的负载分别测试各队列后端的批量发布和消费吞吐量。
+消费回调不执行任何抓取，只统计消息数量，不会影响线上任务队列。
+
+用法:
+    python scripts/benchmark_queue.py --backend rabbitmq --tasks 10000 --prefetch 50
+    python scripts/benchmark_queue.py --backend redis --tasks 10000 --prefetch 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.logger import setup_logging
+
+
+async def run_benchmark(backend_name: str, total: int, prefetch: int, payload_size: int):
+    """
+    执行一轮发布 + 消费基准测试
+
+    Args:
+        backend_name: 队列后端名称
+        total: 任务数量
+        prefetch: 消费者预取数量
+        payload_size: 每个任务附带的填充数据大小（字节）
+    """
+    # 使用独立的队列，避免与 Worker 争抢任务
+    settings.rabbitmq_queue = f"{settings.rabbitmq_queue}.benchmark"
+    settings.rabbitmq_dead_letter_queue = f"{settings.rabbitmq_dead_letter_queue}.benchmark"
+    settings.rabbitmq_dead_letter_exchange = f"{settings.rabbitmq_dead_letter_exchange}.benchmark"
+
+    from app.services.queue_service import get_queue_backend
+    backend = get_queue_backend(backend_name)
+
+    padding = "x" * payload_size
+    tasks = [
+        {"task_id": f"benchmark-{i}", "url": "https://example.com", "params": {"padding": padding}, "priority": 1}
+        for i in range(total)
+    ]
+
+    start = time.perf_counter()
+    failed_ids = await backend.publish_tasks(tasks)
+    publish_seconds = time.perf_counter() - start
+
+    if len(failed_ids) == total:
+        print(f"All {total} tasks failed to publish, is {backend_name} reachable?")
+        return
+
+    received = 0
+    done = asyncio.Event()
+
+    async def on_task(task: dict):
+        nonlocal received
+        received += 1
+        if received >= total - len(failed_ids):
+            done.set()
+
+    start = time.perf_counter()
+    consumer = asyncio.create_task(backend.consume_tasks(
+        on_task,
+        prefetch_count=prefetch,
+        should_stop=done.is_set,
+        consumer_name="benchmark"
+    ))
+    await done.wait()
+    consume_seconds = time.perf_counter() - start
+    await consumer
+    await backend.close()
+
+    print(f"backend:  {backend_name}")
+    print(f"tasks:    {total} ({len(failed_ids)} failed to publish)")
+    print(f"publish:  {publish_seconds:.2f}s, {total / publish_seconds:.0f} msg/s")
+    print(f"consume:  {consume_seconds:.2f}s, {received / consume_seconds:.0f} msg/s (prefetch={prefetch})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="任务队列后端基准测试")
+    parser.add_argument("--backend", choices=["rabbitmq", "redis", "memory"], default=settings.queue_backend)
+    parser.add_argument("--tasks", type=int, default=10000, help="任务数量")
+    parser.add_argument("--prefetch", type=int, default=50, help="消费者预取数量")
+    parser.add_argument("--payload-size", type=int, default=512, help="每个任务的填充数据大小（字节）")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(run_benchmark(args.backend, args.tasks, args.prefetch, args.payload_size))
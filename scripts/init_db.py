@@ -28,7 +28,38 @@ if __name__ == "__main__":
     mongo.tasks.create_index("task_id", unique=True)  # 任务 ID 唯一索引
     mongo.tasks.create_index("status")  # 任务状态索引
     mongo.tasks.create_index("created_at")  # 创建时间索引
+    mongo.tasks.create_index([("created_at", -1), ("_id", -1)])  # 任务列表游标翻页索引
+    mongo.tasks.create_index([("status", 1), ("created_at", -1), ("_id", -1)])  # 按状态过滤的任务列表索引
+    mongo.tasks.create_index([("cached", 1), ("created_at", -1), ("_id", -1)])  # 按缓存命中过滤的任务列表索引
+    mongo.tasks.create_index("url")  # 任务列表 URL 前缀搜索索引
+    mongo.tasks.create_index([("host", 1), ("created_at", -1), ("_id", -1)])  # 按主机名过滤的任务列表索引
+    mongo.tasks.create_index([("host_rev", 1), ("path", 1)])  # 主机后缀 / 路径前缀搜索索引
+    mongo.tasks.create_index("path")  # 跨主机的路径前缀搜索索引
+    mongo.tasks.create_index("url_tokens")  # URL 关键词搜索多键索引
     mongo.tasks.create_index("cache_key")  # 缓存键索引
+    mongo.tasks.create_index([("status", 1), ("node_id", 1), ("updated_at", 1)])  # 孤儿任务回收查询索引
+    mongo.tasks.create_index([("status", 1), ("expires_at", 1)])  # 过期任务清理查询索引
+    mongo.tasks.create_index([("schedule_id", 1), ("status", 1)])  # 定时计划执行中任务查询索引
+    mongo.tasks.create_index("batch_id", sparse=True)  # 批次任务事件流查询索引
+    mongo.tasks.create_index(
+        [("callback_pending", 1), ("status", 1)],
+        partialFilterExpression={"callback_pending": True}
+    )  # 待回调任务查询索引
+
+    # 创建 schedules 集合索引
+    mongo.schedules.create_index([("is_enabled", 1), ("next_run_at", 1)])  # 到期计划查询索引
+
+    # 创建 webhook_deliveries 集合索引
+    mongo.webhook_deliveries.create_index([("status", 1), ("next_attempt_at", 1)])  # 到期投递查询索引
+    mongo.webhook_deliveries.create_index("task_ids")  # 收集回调时按任务 ID 去重
+
+    # 创建 dead_letters 集合索引
+    mongo.dead_letters.create_index("dead_letter_id", unique=True)  # 死信 ID 唯一索引
+    mongo.dead_letters.create_index("dead_lettered_at")  # 死信列表排序索引
+
+    # 创建 jobs 集合索引
+    mongo.jobs.create_index("job_id", unique=True)  # 作业 ID 唯一索引
+    mongo.jobs.create_index("created_at")  # 作业列表排序索引
 
     # 创建 task_stats 集合索引
     mongo.task_stats.create_index("date", unique=True)  # 日期唯一索引
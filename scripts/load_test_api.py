@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+API 并发压测脚本
+
+以固定并发向运行中的 API 服务混合发送任务列表、统计、异步抓取提交和健康检查请求，
+按接口输出请求数、错误数和 p50 / p95 / p99 延迟。数据访问阻塞事件循环时，/health 等轻量接口的尾延迟会明显升高。
+
+异步抓取提交会真实创建任务，请在测试环境中运行。
+
+用法:
+    python scripts/load_test_api.py --base-url http://localhost:8000 --username admin --password admin
+    python scripts/load_test_api.py --token <access_token> --concurrency 100 --duration 60
+    python scripts/load_test_api.py --token <access_token> --mix list=5,stats=2,scrape=2,health=1
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+# 接口名称 -> (方法, 路径)
+ENDPOINTS = {
+    "list": ("GET", "/api/v1/tasks/?limit=50"),
+    "stats": ("GET", "/api/v1/stats/"),
+    "scrape": ("POST", "/api/v1/scrape/async"),
+    "health": ("GET", "/health"),
+}
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """
+    解析请求配比
+
+    Args:
+        mix: 形如 "list=5,stats=2,scrape=2,health=1" 的配比
+
+    Returns:
+        dict: 接口名称 -> 权重
+    """
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """按最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    """登录获取访问令牌"""
+    response = await client.post("/api/v1/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_load_test(base_url: str, token: Optional[str], username: str, password: str,
+                        concurrency: int, duration: float, mix: Dict[str, int]):
+    """
+    执行一轮压测
+
+    Args:
+        base_url: API 服务地址
+        token: 访问令牌，为空时使用用户名密码登录
+        username: 登录用户名
+        password: 登录密码
+        concurrency: 并发请求数
+        duration: 压测时长（秒）
+        mix: 各接口的请求权重
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        if not token:
+            token = await login(client, username, password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        names, weights = list(mix), list(mix.values())
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        deadline = time.perf_counter() + duration
+
+        async def worker(worker_id: int):
+            sequence = 0
+            while time.perf_counter() < deadline:
+                name = random.choices(names, weights)[0]
+                method, path = ENDPOINTS[name]
+                body = None
+                if name == "scrape":
+                    sequence += 1
+                    body = {"url": f"https://example.com/load-test/{worker_id}/{sequence}", "cache": {"enabled": False}}
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    if response.status_code >= 400:
+                        errors[name] += 1
+                except httpx.HTTPError:
+                    errors[name] += 1
+                latencies[name].append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"concurrency: {concurrency}, duration: {elapsed:.1f}s, requests: {total} ({total / elapsed:.0f} req/s)")
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in names:
+        values = latencies[name]
+        print(f"{name:<10}{len(values):>10}{errors[name]:>8}"
+              f"{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}{percentile(values, 99):>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API 并发压测")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="API 服务地址")
+    parser.add_argument("--token", help="访问令牌，不指定时使用用户名密码登录")
+    parser.add_argument("--username", default="admin", help="登录用户名")
+    parser.add_argument("--password", default="admin", help="登录密码")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发请求数")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    parser.add_argument("--mix", default="list=5,stats=2,scrape=2,health=1", help="各接口的请求权重")
+    args = parser.parse_args()
+
+    asyncio.run(run_load_test(
+        args.base_url, args.token, args.username, args.password,
+        args.concurrency, args.duration, parse_mix(args.mix)
+    ))
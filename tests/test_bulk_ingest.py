@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.core.urls import normalize_url
+from app.services.bulk_ingest_service import iter_records
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def _collect(fmt, *parts):
+    return [record async for record in iter_records(_chunks(*parts), fmt)]
+
+
+def test_normalize_url_collapses_equivalent_forms():
+    assert normalize_url("HTTPS://Example.COM:443") == "https://example.com/"
+    assert normalize_url("http://example.com:80/a?x=1#top") == "http://example.com/a?x=1"
+    assert normalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+    assert normalize_url("http://[::1]:8000/") == "http://[::1]:8000/"
+    assert normalize_url("ftp://example.com/") is None
+    assert normalize_url("not a url") is None
+
+
+def test_records_split_across_chunks():
+    # 行被拆分在多个块中时仍按完整行解析
+    records = asyncio.run(_collect("ndjson", b'{"url": "http://a.com", "prio', b'rity": 3}\n"http://b.com"\r\n', b"oops\n[1]"))
+    assert records == [{"url": "http://a.com", "priority": 3}, {"url": "http://b.com"}, None, None]
+
+    records = asyncio.run(_collect("csv", b"URL,priority\nhttp://a.com,", b"5\nhttp://b.com,\n"))
+    assert records == [{"url": "http://a.com", "priority": "5"}, {"url": "http://b.com"}]
+
+    # 没有 url 表头时取第一列
+    records = asyncio.run(_collect("csv", b"http://a.com,x\nhttp://b.com\n"))
+    assert records == [{"url": "http://a.com"}, {"url": "http://b.com"}]
+
+
+if __name__ == "__main__":
+    test_normalize_url_collapses_equivalent_forms()
+    test_records_split_across_chunks()
+    print("All bulk ingest tests passed!")
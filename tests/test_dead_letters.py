@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sys
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.api import dead_letters as dead_letters_api
+from app.core.config import settings
+from app.db.async_mongo import amongo, _ThreadedDatabase
+from app.db.docstore import DocumentStore
+from app.db.local_redis import LocalRedis
+from app.db.redis import redis_client
+from app.models.task import DeadLetterRequest
+from app.services.memory_queue_service import MemoryQueueService
+from app.services.queue_base import route_queue_name
+
+
+def _with_memory_queue(test):
+    """将死信 API 使用的队列替换为独立的进程内队列，任务写入内存文档存储"""
+    def wrapper():
+        previous = (amongo._db, redis_client._queue_client, dead_letters_api.queue_service, MemoryQueueService._instance)
+        store = DocumentStore(":memory:")
+        MemoryQueueService._instance = None
+        queue = MemoryQueueService()
+        amongo._db = _ThreadedDatabase(store)
+        redis_client._queue_client = LocalRedis()
+        dead_letters_api.queue_service = queue
+        try:
+            test(queue, store)
+        finally:
+            (amongo._db, redis_client._queue_client, dead_letters_api.queue_service,
+             MemoryQueueService._instance) = previous
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+def _dead_letter(queue, task, queue_name=None):
+    """模拟超过重投上限的消息"""
+    dead_lettered = []
+
+    async def on_dead_letter(task, reason):
+        dead_lettered.append((task["task_id"], reason))
+
+    asyncio.run(queue._requeue_or_dead_letter(
+        queue_name or settings.rabbitmq_queue, task, settings.max_redeliveries + 1, on_dead_letter
+    ))
+    return dead_lettered
+
+
+@_with_memory_queue
+def test_exceeded_redeliveries_are_dead_lettered(queue, store):
+    # 未超过上限时重新入队
+    asyncio.run(queue._requeue_or_dead_letter(settings.rabbitmq_queue, {"task_id": "t0"}, 1))
+    assert len(queue._queues[settings.rabbitmq_queue]) == 1
+
+    assert _dead_letter(queue, {"task_id": "t1", "route": None}) == [
+        ("t1", f"Exceeded max redeliveries ({settings.max_redeliveries})")
+    ]
+    result = asyncio.run(dead_letters_api.list_dead_letters(limit=50, current_admin={}))
+    assert result["total"] == 1
+    assert [(item["task_id"], item["redeliveries"]) for item in result["items"]] == [("t1", settings.max_redeliveries + 1)]
+
+
+@_with_memory_queue
+def test_replay_requeues_and_resets_tasks(queue, store):
+    store.tasks.insert_many([
+        {"task_id": "t1", "status": "failed", "error": {"message": "dead"}, "node_id": "n1"},
+        {"task_id": "t2", "status": "failed", "error": {"message": "dead"}, "node_id": "n1"},
+    ])
+    _dead_letter(queue, {"task_id": "t1", "route": None})
+    # 原路由已没有消费者，重放时回退到共享队列
+    _dead_letter(queue, {"task_id": "t2", "route": "gpu"}, route_queue_name("gpu"))
+
+    result = asyncio.run(dead_letters_api.replay_dead_letters(DeadLetterRequest(task_ids=["t1"]), current_admin={}))
+    assert result["task_ids"] == ["t1"] and result["replayed_count"] == 1
+    task = store.tasks.find_one({"task_id": "t1"})
+    assert task["status"] == "pending" and task["error"] is None and task["node_id"] is None
+    assert store.tasks.find_one({"task_id": "t2"})["status"] == "failed"
+
+    asyncio.run(dead_letters_api.replay_dead_letters(DeadLetterRequest(), current_admin={}))
+    assert asyncio.run(queue.get_dead_letter_count()) == 0
+    shared = queue._queues[settings.rabbitmq_queue]
+    assert sorted(task["task_id"] for _, _, task, _ in shared) == ["t1", "t2"]
+    assert route_queue_name("gpu") not in queue._queues
+
+
+@_with_memory_queue
+def test_purge_removes_selected_or_all_dead_letters(queue, store):
+    for task_id in ("t1", "t2", "t3"):
+        _dead_letter(queue, {"task_id": task_id, "route": None})
+
+    result = asyncio.run(dead_letters_api.purge_dead_letters(DeadLetterRequest(task_ids=["t2"]), current_admin={}))
+    assert result["purged_count"] == 1
+    assert [item["task_id"] for item in asyncio.run(queue.inspect_dead_letters())] == ["t1", "t3"]
+
+    result = asyncio.run(dead_letters_api.purge_dead_letters(DeadLetterRequest(), current_admin={}))
+    assert result["purged_count"] == 2
+    assert asyncio.run(queue.get_dead_letter_count()) == 0
+
+
+if __name__ == "__main__":
+    test_exceeded_redeliveries_are_dead_lettered()
+    test_replay_requeues_and_resets_tasks()
+    test_purge_removes_selected_or_all_dead_letters()
+    print("All dead letter tests passed!")
@@ -0,0 +1,27 @@
+import os
+import sys
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.services.export_service import DEFAULT_FIELDS, HTML_FIELD, get_path, parse_fields
+
+
+def test_default_fields_exclude_html():
+    fields = parse_fields(None)
+    assert fields == list(DEFAULT_FIELDS)
+    assert HTML_FIELD not in fields and "result.screenshot" not in fields
+    assert parse_fields(None, include_html=True)[-1] == HTML_FIELD
+
+
+def test_fields_drop_duplicates_and_nested_paths():
+    # 同时请求父字段和子字段时只保留父字段，避免投影路径冲突
+    assert parse_fields("task_id, result.metadata.title,result.metadata,task_id,_id,") == ["task_id", "result.metadata"]
+    assert get_path({"result": {"metadata": {"title": "T"}}}, "result.metadata.title") == "T"
+    assert get_path({"result": None}, "result.metadata.title") is None
+
+
+if __name__ == "__main__":
+    test_default_fields_exclude_html()
+    test_fields_drop_duplicates_and_nested_paths()
+    print("All export service tests passed!")
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import sys
+import time
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.db.async_mongo import amongo, _ThreadedDatabase
+from app.db.docstore import DocumentStore
+from app.services import node_manager as node_manager_module
+from app.services.node_manager import NodeManager
+from app.services.worker_process import WorkerProcessHandle
+
+
+class FakeProcess:
+    """不启动真实子进程的进程对象"""
+
+    def __init__(self, alive: bool):
+        self.alive = alive
+        self.exitcode = None if alive else 1
+        self.pid = 4242
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def terminate(self):
+        self.alive, self.exitcode = False, -15
+
+
+class FakeHandle(WorkerProcessHandle):
+    """沿用句柄的健康检查和结束逻辑，子进程由 FakeProcess 模拟"""
+
+    behaviours = []  # 依次创建的句柄的行为：crash（立即退出）、hang（不再上报健康状态）
+    created = []
+
+    def __init__(self, node_id: str, restarts: int = 0):
+        self.node_id = node_id
+        self.restarts = restarts
+        self.stop_requested = False
+        self.last_health = {}
+        self.behaviour = self.behaviours.pop(0) if self.behaviours else "crash"
+        self.process = FakeProcess(alive=self.behaviour == "hang")
+        self.created.append(self)
+
+    def start(self):
+        # 卡死的子进程从启动起就没有健康上报
+        self.last_health_at = 0 if self.behaviour == "hang" else time.time()
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _supervise(behaviours, max_retries: int = 2):
+    """按给定行为启动子进程节点，等待监督协程全部结束"""
+    previous = (amongo._db, node_manager_module.WorkerProcessHandle, settings.max_node_auto_retries)
+    store = DocumentStore(":memory:")
+    store.nodes.insert_one({"node_id": "n1", "status": "running"})
+    amongo._db = _ThreadedDatabase(store)
+    node_manager_module.WorkerProcessHandle = FakeHandle
+    settings.max_node_auto_retries = max_retries
+    FakeHandle.behaviours, FakeHandle.created = list(behaviours), []
+    manager = NodeManager()
+
+    async def run():
+        manager._start_worker_process("n1")
+        while manager.process_supervisors:
+            await asyncio.gather(*list(manager.process_supervisors.values()))
+
+    try:
+        asyncio.run(asyncio.wait_for(run(), timeout=10))
+    finally:
+        amongo._db, node_manager_module.WorkerProcessHandle, settings.max_node_auto_retries = previous
+    return manager, store
+
+
+def test_crashed_process_restarts_until_limit():
+    manager, store = _supervise(["crash"] * 5, max_retries=2)
+
+    # 首次启动加两次自动重启，之后节点标记为停止
+    assert [handle.restarts for handle in FakeHandle.created] == [0, 1, 2]
+    assert manager.active_workers == {}
+    assert store.nodes.find_one({"node_id": "n1"})["status"] == "stopped"
+
+
+def test_hung_process_is_terminated_and_restarted():
+    manager, store = _supervise(["hang", "crash"], max_retries=1)
+
+    hung = FakeHandle.created[0]
+    assert hung.process.exitcode == -15
+    assert [handle.restarts for handle in FakeHandle.created] == [0, 1]
+    assert store.nodes.find_one({"node_id": "n1"})["status"] == "stopped"
+
+
+def test_requested_stop_is_not_restarted():
+    previous = amongo._db
+    amongo._db = _ThreadedDatabase(DocumentStore(":memory:"))
+    FakeHandle.behaviours = []
+    handle = FakeHandle("n1")
+    handle.stop_requested = True
+    FakeHandle.created = [handle]
+    manager = NodeManager()
+    manager.active_workers["n1"] = handle
+    try:
+        asyncio.run(manager._supervise_process(handle))
+    finally:
+        amongo._db = previous
+
+    assert manager.active_workers == {}
+    assert FakeHandle.created == [handle]
+
+
+if __name__ == "__main__":
+    test_crashed_process_restarts_until_limit()
+    test_hung_process_is_terminated_and_restarted()
+    test_requested_stop_is_not_restarted()
+    print("All node manager tests passed!")
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import sys
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.services.memory_queue_service import MemoryQueueService
+from app.services.queue_base import parse_routes, resolve_routes, route_queue_name
+from app.services.redis_queue_service import RedisStreamQueueService, parse_route_members
+
+
+def _memory_queue():
+    """创建独立的进程内队列实例（绕过单例，避免测试之间互相影响）"""
+    previous, MemoryQueueService._instance = MemoryQueueService._instance, None
+    try:
+        return MemoryQueueService()
+    finally:
+        MemoryQueueService._instance = previous
+
+
+def test_parse_routes():
+    assert parse_routes(None) == []
+    assert parse_routes("task_queue") == []
+    assert parse_routes(settings.rabbitmq_queue) == []
+    assert parse_routes(" render.screenshot, region.us ,render.screenshot,,task_queue") == [
+        "render.screenshot", "region.us"
+    ]
+
+
+def test_resolve_routes():
+    assert resolve_routes({"params": {}}) == []
+    assert resolve_routes({"params": {
+        "node_tags": ["gpu"],
+        "proxy": {"region": "us"},
+        "screenshot": True,
+    }}) == ["gpu", "region.us", "render.screenshot"]
+    assert resolve_routes({"params": {"proxy": {"server": "http://p:1"}}}) == []
+
+
+def test_redis_routes_fall_back_without_consumers():
+    service = RedisStreamQueueService()
+    task = {"task_id": "t1", "params": {"proxy": {"region": "us"}, "screenshot": True}}
+
+    stream, routed = service._route_task(task, set())
+    assert stream == service._stream_key() and routed["route"] is None
+
+    stream, routed = service._route_task(task, {"render.screenshot"})
+    assert stream == service._stream_key("render.screenshot") and routed["route"] == "render.screenshot"
+
+    # 只有带 "路由|消费者" 格式的登记才视为路由
+    assert parse_route_members(["region.us|host-1", "region.us|host-2", "gpu|a|b", "bad"]) == {"region.us", "gpu|a"}
+
+
+def test_redis_promote_passes_streams_in_keys():
+    service = RedisStreamQueueService()
+    members = [
+        json.dumps({"route": "gpu", "task": json.dumps({"task_id": "t1", "route": "gpu"})}),
+        json.dumps({"route": "region.us", "task": json.dumps({"task_id": "t2", "route": "region.us"})}),
+        json.dumps({"stream": service._stream_key(), "task": json.dumps({"task_id": "t3"})}),
+    ]
+
+    class Client:
+        """只记录脚本调用参数的 Redis 客户端"""
+        async def zrangebyscore(self, key, *args, **kwargs):
+            return members if key == service._delayed_key else ["gpu|host-1"]
+
+        async def eval(self, script, numkeys, *keys_and_args):
+            self.keys, self.args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+            return numkeys - 1
+
+    client = Client()
+    assert asyncio.run(service._promote_delayed(client)) == 3
+    assert client.keys == (
+        service._delayed_key, service._stream_key("gpu"), service._stream_key(), service._stream_key()
+    )
+    assert client.args[0::2] == tuple(members)
+    # 没有消费者的路由回退到共享队列
+    assert json.loads(client.args[3])["route"] is None
+
+
+def test_redis_release_route_moves_backlog_atomically():
+    service = RedisStreamQueueService()
+    stream = service._stream_key("gpu")
+    batches = [[(stream, [("1-0", {"task": json.dumps({"task_id": "t1", "route": "gpu"})}), ("2-0", {"task": "bad"})])], []]
+
+    class Pipeline:
+        def __init__(self, client, transaction):
+            self.client, self.transaction, self.ops = client, transaction, []
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: self.ops.append((name, args))
+
+        async def execute(self):
+            self.client.executed.append((self.transaction, self.ops))
+
+    class Client:
+        """记录事务内命令的 Redis 客户端，路由上已没有消费者"""
+        executed = []
+
+        async def zrem(self, *args):
+            return 1
+
+        async def zrangebyscore(self, *args, **kwargs):
+            return []
+
+        async def xreadgroup(self, *args, **kwargs):
+            return batches.pop(0)
+
+        async def xadd(self, *args, **kwargs):
+            raise AssertionError("xadd must run inside the transaction")
+
+        def pipeline(self, transaction=True):
+            return Pipeline(self, transaction)
+
+    client = Client()
+    asyncio.run(service._release_route(client, {"name": "host-1"}, "gpu"))
+    # 写入共享队列与确认、删除原消息在同一个 MULTI 事务中执行
+    assert len(client.executed) == 1
+    transaction, ops = client.executed[0]
+    assert transaction is True
+    assert [name for name, _ in ops] == ["xadd", "xack", "xdel", "xadd", "xack", "xdel"]
+    assert ops[0][1][0] == service._stream_key() and json.loads(ops[0][1][1]["task"])["route"] is None
+    assert ops[2][1] == (stream, "1-0") and ops[5][1] == (stream, "2-0")
+
+
+def test_memory_routes_fall_back_without_consumers():
+    queue = _memory_queue()
+    task = {"task_id": "t1", "params": {"screenshot": True}}
+
+    asyncio.run(queue.publish_task(task))
+    assert len(queue._queues[settings.rabbitmq_queue]) == 1
+
+    consumer = {"routes": []}
+    queue._subscribe_routes(consumer, ["render.screenshot"])
+    asyncio.run(queue.publish_task({**task, "task_id": "t2"}))
+    assert len(queue._queues[route_queue_name("render.screenshot")]) == 1
+
+
+def test_memory_publish_to_unconsumed_route_uses_shared_queue():
+    queue = _memory_queue()
+    queue._subscribe_routes({"routes": []}, ["region.us"])
+
+    # 任务的候选路由均无消费者监听时（单条、批量和延迟投递）回退到共享队列
+    asyncio.run(queue.publish_task({"task_id": "t1", "params": {"node_tags": ["gpu"], "screenshot": True}}))
+    asyncio.run(queue.publish_tasks([{"task_id": "t2", "params": {"node_tags": ["gpu"]}}]))
+    asyncio.run(queue.delay_task({"task_id": "t3", "route": "gpu"}, 0, "gpu"))
+    queue._promote_delayed()
+
+    assert route_queue_name("gpu") not in queue._queues
+    assert route_queue_name("render.screenshot") not in queue._queues
+    shared = queue._queues[settings.rabbitmq_queue]
+    assert sorted(task["task_id"] for _, _, task, _ in shared) == ["t1", "t2", "t3"]
+    assert all(task["route"] is None for _, _, task, _ in shared)
+
+
+def test_memory_route_backlog_moves_to_shared_queue():
+    queue = _memory_queue()
+    first, second = {"routes": []}, {"routes": []}
+    queue._subscribe_routes(first, ["render.screenshot"])
+    queue._subscribe_routes(second, ["render.screenshot"])
+    asyncio.run(queue.publish_task({"task_id": "t1", "params": {"screenshot": True}}))
+    asyncio.run(queue.delay_task({"task_id": "t2", "route": "render.screenshot"}, 0, "render.screenshot"))
+
+    # 仍有其他消费者监听时保留路由队列
+    queue._subscribe_routes(first, [])
+    assert len(queue._queues[route_queue_name("render.screenshot")]) == 1
+
+    # 最后一个消费者离开后，积压任务和到期的延迟任务都转回共享队列
+    queue._subscribe_routes(second, [])
+    queue._promote_delayed()
+    assert route_queue_name("render.screenshot") not in queue._queues
+    shared = queue._queues[settings.rabbitmq_queue]
+    assert sorted(task["task_id"] for _, _, task, _ in shared) == ["t1", "t2"]
+    assert all(task["route"] is None for _, _, task, _ in shared)
+
+
+if __name__ == "__main__":
+    test_parse_routes()
+    test_resolve_routes()
+    test_redis_routes_fall_back_without_consumers()
+    test_redis_promote_passes_streams_in_keys()
+    test_redis_release_route_moves_backlog_atomically()
+    test_memory_routes_fall_back_without_consumers()
+    test_memory_publish_to_unconsumed_route_uses_shared_queue()
+    test_memory_route_backlog_moves_to_shared_queue()
+    print("All queue routing tests passed!")
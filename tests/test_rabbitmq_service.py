@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.db.docstore import DocumentStore
+from app.db.mongo import mongo
+from app.services.queue_service import RabbitMQService, DEATH_REASON_HEADER, REDELIVERY_HEADER
+
+
+class FakeExchange:
+    """记录发布消息的交换机"""
+
+    def __init__(self, broker, name):
+        self.broker, self.name = broker, name
+
+    async def publish(self, message, routing_key):
+        self.broker.published.append((self.name, routing_key, message))
+
+
+class FakeQueue:
+    """记录订阅回调的队列"""
+
+    def __init__(self, broker, name):
+        self.broker, self.name = broker, name
+
+    async def bind(self, *args, **kwargs):
+        pass
+
+    async def consume(self, callback):
+        self.broker.consumers[self.name] = callback
+        return f"tag-{self.name}"
+
+    async def cancel(self, consumer_tag):
+        self.broker.consumers.pop(self.name, None)
+
+
+class FakeChannel:
+    """进程内的 RabbitMQ 通道"""
+
+    is_closed = False
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    async def set_qos(self, prefetch_count):
+        self.broker.prefetch = prefetch_count
+
+    async def declare_exchange(self, name, *args, **kwargs):
+        return FakeExchange(self.broker, name)
+
+    async def get_exchange(self, name, ensure=True):
+        return FakeExchange(self.broker, name)
+
+    async def declare_queue(self, name, *args, **kwargs):
+        return FakeQueue(self.broker, name)
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeConnection:
+    """进程内的 RabbitMQ 连接，channel_pool 与连接共用同一个通道"""
+
+    is_closed = False
+
+    def __init__(self):
+        self.published = []
+        self.consumers = {}
+        self.prefetch = None
+
+    async def channel(self, *args, **kwargs):
+        return FakeChannel(self)
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeChannel(self)
+
+
+class FakeMessage:
+    """收到的消息，记录确认结果"""
+
+    def __init__(self, body, headers=None, redelivered=False):
+        self.body = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.headers = headers or {}
+        self.redelivered = redelivered
+        self.routing_key = settings.rabbitmq_queue
+        self.content_type = "application/json"
+        self.priority = 1
+        self.acked = False
+
+    async def ack(self):
+        self.acked = True
+
+    async def nack(self, requeue=True):
+        raise AssertionError("message should be re-published, not nacked")
+
+
+def _with_broker(test):
+    """将 RabbitMQ 连接替换为进程内实现，死信镜像写入内存文档存储"""
+    def wrapper():
+        service = RabbitMQService()
+        broker = FakeConnection()
+        previous = (mongo._client, mongo._db, service._connection, service._channel_pool)
+        store = DocumentStore(":memory:")
+        mongo._client = mongo._db = store
+        service._connection, service._channel_pool = broker, broker
+        try:
+            test(service, broker, store)
+        finally:
+            mongo._client, mongo._db, service._connection, service._channel_pool = previous
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+def _consume(service, broker, messages, callback, on_dead_letter=None):
+    """启动消费者，投递消息并等待处理完成后停止"""
+    async def run():
+        stopped = asyncio.Event()
+        consumer = asyncio.create_task(service.consume_tasks(
+            callback, prefetch_count=3, should_stop=stopped.is_set, on_dead_letter=on_dead_letter
+        ))
+        while settings.rabbitmq_queue not in broker.consumers:
+            await asyncio.sleep(0.01)
+        for message in messages:
+            await broker.consumers[settings.rabbitmq_queue](message)
+        while not all(message.acked for message in messages):
+            await asyncio.sleep(0.01)
+        stopped.set()
+        await asyncio.wait_for(consumer, timeout=5)
+
+    asyncio.run(run())
+
+
+@_with_broker
+def test_consume_acks_processed_messages(service, broker, store):
+    received = []
+
+    async def callback(task):
+        await asyncio.sleep(0.05)
+        received.append(task["task_id"])
+
+    messages = [FakeMessage({"task_id": f"t{i}"}) for i in range(3)]
+    _consume(service, broker, messages, callback)
+    # 消息在独立协程中并发处理，处理完成后才确认
+    assert sorted(received) == ["t0", "t1", "t2"]
+    assert all(message.acked for message in messages)
+    assert broker.published == [] and broker.prefetch == 3
+    # 停止后取消订阅
+    assert broker.consumers == {}
+
+
+@_with_broker
+def test_consume_requeues_failed_messages_with_count(service, broker, store):
+    received = []
+
+    async def callback(task):
+        received.append(task["task_id"])
+        raise RuntimeError("boom")
+
+    failed = FakeMessage({"task_id": "t1"}, headers={REDELIVERY_HEADER: 1})
+    # 上次投递未被确认的消息不执行回调，计数后重新投递一份副本
+    redelivered = FakeMessage({"task_id": "t2"}, redelivered=True)
+    _consume(service, broker, [failed, redelivered], callback)
+
+    assert received == ["t1"]
+    assert failed.acked and redelivered.acked
+    requeued = {json.loads(message.body)["task_id"]: (exchange, routing_key, message.headers[REDELIVERY_HEADER])
+                for exchange, routing_key, message in broker.published}
+    assert requeued == {
+        "t1": (settings.rabbitmq_exchange, settings.rabbitmq_queue, 2),
+        "t2": (settings.rabbitmq_exchange, settings.rabbitmq_queue, 1),
+    }
+
+
+@_with_broker
+def test_consume_dead_letters_poison_messages(service, broker, store):
+    dead_lettered = []
+
+    async def callback(task):
+        raise RuntimeError("boom")
+
+    async def on_dead_letter(task, reason):
+        dead_lettered.append((task and task["task_id"], reason))
+
+    exhausted = FakeMessage({"task_id": "t1"}, headers={REDELIVERY_HEADER: settings.max_redeliveries})
+    malformed = FakeMessage(b"not json")
+    _consume(service, broker, [exhausted, malformed], callback, on_dead_letter)
+
+    # 超过重投上限和无法解析的消息都转入死信队列，并写入镜像记录
+    assert {exchange for exchange, _, _ in broker.published} == {settings.rabbitmq_dead_letter_exchange}
+    reasons = sorted(message.headers[DEATH_REASON_HEADER] for _, _, message in broker.published)
+    assert reasons[0] == f"Exceeded max redeliveries ({settings.max_redeliveries})"
+    assert reasons[1].startswith("Malformed message")
+    assert set(dead_lettered) == {("t1", reasons[0]), (None, reasons[1])}
+    assert store.dead_letters.count_documents({}) == 2
+    assert store.dead_letters.find_one({"task_id": "t1"})["redeliveries"] == settings.max_redeliveries + 1
+
+
+if __name__ == "__main__":
+    test_consume_acks_processed_messages()
+    test_consume_requeues_failed_messages_with_count()
+    test_consume_dead_letters_poison_messages()
+    print("All RabbitMQ service tests passed!")
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.db.async_mongo import amongo, _ThreadedDatabase
+from app.db.docstore import DocumentStore
+from app.db.local_redis import LocalRedis
+from app.db.mongo import mongo
+from app.db.redis import redis_client
+from app.services import reaper_service as reaper_module
+from app.services.reaper_service import TaskReaperService
+
+
+class RecordingQueue:
+    """记录投递任务的队列，publish_ok 为 False 时模拟投递失败"""
+
+    def __init__(self, publish_ok: bool = True):
+        self.publish_ok = publish_ok
+        self.published = []
+
+    async def publish_task(self, task_data: dict) -> bool:
+        self.published.append(task_data)
+        return self.publish_ok
+
+
+def _with_backends(publish_ok: bool = True):
+    """将 MongoDB、队列 Redis 和任务队列临时替换为进程内实现"""
+    def decorator(test):
+        def wrapper():
+            previous = (mongo._client, mongo._db, amongo._db, redis_client._queue_client, reaper_module.queue_service)
+            store = DocumentStore(":memory:")
+            queue = RecordingQueue(publish_ok)
+            mongo._client = mongo._db = store
+            amongo._db = _ThreadedDatabase(store)
+            redis_client._queue_client = LocalRedis()
+            reaper_module.queue_service = queue
+            try:
+                test(store, queue)
+            finally:
+                (mongo._client, mongo._db, amongo._db, redis_client._queue_client,
+                 reaper_module.queue_service) = previous
+        wrapper.__name__ = test.__name__
+        return wrapper
+    return decorator
+
+
+def _stale() -> datetime:
+    return datetime.now() - timedelta(seconds=settings.task_reaper_node_timeout + 60)
+
+
+def _insert_processing(store, task_id: str, node_id, attempts: int = 1, updated_at: datetime = None):
+    store.tasks.insert_one({
+        "task_id": task_id, "url": "http://example.com", "status": "processing", "node_id": node_id,
+        "attempts": attempts, "updated_at": updated_at or _stale()
+    })
+
+
+@_with_backends()
+def test_reap_requeues_tasks_of_lost_and_missing_nodes(store, queue):
+    store.nodes.insert_many([
+        {"node_id": "lost", "last_seen": _stale()},
+        {"node_id": "live", "last_seen": datetime.now()},
+    ])
+    _insert_processing(store, "t1", "lost")
+    _insert_processing(store, "t2", "deleted")  # 节点记录已被删除
+    _insert_processing(store, "t3", "live")  # 节点仍在发送心跳
+    _insert_processing(store, "t4", "lost", updated_at=datetime.now())  # 最近仍有更新
+
+    stats = asyncio.run(TaskReaperService().reap_once())
+    assert stats == {"requeued": 2, "failed": 0}
+    assert sorted(task["task_id"] for task in queue.published) == ["t1", "t2"]
+    assert all(task["attempt"] == 2 for task in queue.published)
+    for task_id in ("t1", "t2"):
+        task = store.tasks.find_one({"task_id": task_id})
+        assert task["status"] == "pending" and task["node_id"] is None and task["error"]["type"] == "NodeLost"
+    assert store.tasks.count_documents({"task_id": {"$in": ["t3", "t4"]}, "status": "processing"}) == 2
+
+
+@_with_backends()
+def test_reap_fails_tasks_over_retry_limit(store, queue):
+    _insert_processing(store, "t1", "lost", attempts=settings.max_retries + 1)
+
+    stats = asyncio.run(TaskReaperService().reap_once())
+    assert stats == {"requeued": 0, "failed": 1}
+    assert queue.published == []
+    task = store.tasks.find_one({"task_id": "t1"})
+    assert task["status"] == "failed" and task["error"]["type"] == "NodeLost" and task["completed_at"]
+
+
+@_with_backends(publish_ok=False)
+def test_reap_marks_failed_when_requeue_fails(store, queue):
+    _insert_processing(store, "t1", "lost")
+
+    assert asyncio.run(TaskReaperService()._reap_task("t1", "lost", datetime.now())) == "failed"
+    assert len(queue.published) == 1
+    task = store.tasks.find_one({"task_id": "t1"})
+    assert task["status"] == "failed" and "failed to re-queue" in task["error"]["message"]
+
+
+@_with_backends()
+def test_reap_skips_task_claimed_concurrently(store, queue):
+    _insert_processing(store, "t1", "lost")
+    # 其他 API 进程已经认领并重新入队
+    store.tasks.update_one({"task_id": "t1"}, {"$set": {"status": "pending", "node_id": None}})
+
+    assert asyncio.run(TaskReaperService()._reap_task("t1", "lost", datetime.now())) is None
+    assert queue.published == []
+    assert store.tasks.find_one({"task_id": "t1"})["status"] == "pending"
+
+
+@_with_backends()
+def test_expire_once_marks_overdue_pending_tasks(store, queue):
+    now = datetime.now()
+    store.tasks.insert_many([
+        {"task_id": "t1", "status": "pending", "expires_at": now - timedelta(seconds=5)},
+        {"task_id": "t2", "status": "pending", "expires_at": now + timedelta(minutes=5)},
+        {"task_id": "t3", "status": "processing", "expires_at": now - timedelta(seconds=5)},
+        {"task_id": "t4", "status": "pending"},
+    ])
+
+    assert asyncio.run(TaskReaperService().expire_once()) == 1
+    task = store.tasks.find_one({"task_id": "t1"})
+    assert task["status"] == "expired" and task["error"]["type"] == "TaskExpired" and task["completed_at"]
+    # 未到期限、已开始执行和未设置期限的任务不受影响
+    assert [t["task_id"] for t in store.tasks.find({"status": {"$ne": "expired"}})] == ["t2", "t3", "t4"]
+    assert asyncio.run(TaskReaperService().expire_once()) == 0
+
+
+if __name__ == "__main__":
+    test_reap_requeues_tasks_of_lost_and_missing_nodes()
+    test_reap_fails_tasks_over_retry_limit()
+    test_reap_marks_failed_when_requeue_fails()
+    test_reap_skips_task_claimed_concurrently()
+    test_expire_once_marks_overdue_pending_tasks()
+    print("All reaper tests passed!")
@@ -0,0 +1,48 @@
+import os
+import sys
+import zlib
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.core.projection import build_projection, remove_path, split_fields
+from app.core.responses import available_encodings, negotiate_encoding
+
+
+def test_encoding_negotiation_respects_quality_and_server_order():
+    assert negotiate_encoding("gzip, deflate", ["zstd", "br", "gzip"]) == "gzip"
+    assert negotiate_encoding("gzip, br, zstd", ["zstd", "br", "gzip"]) == "zstd"
+    assert negotiate_encoding("gzip;q=0.5, br;q=1.0", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate_encoding("*", ["zstd", "br", "gzip"]) == "zstd"
+    assert negotiate_encoding("gzip;q=0, identity", ["gzip"]) is None
+    assert negotiate_encoding("", ["gzip"]) is None
+
+
+def test_gzip_stream_decodes_across_flushes():
+    encoder = available_encodings()["gzip"]()
+    body = encoder.compress(b'{"a":', final=False) + encoder.compress(b"1}", final=True)
+    assert zlib.decompress(body, 16 + zlib.MAX_WBITS) == b'{"a":1}'
+
+
+def test_include_and_exclude_build_projection():
+    projection, strip = build_projection(split_fields("status,result.agent_result"), [], always=("task_id",))
+    assert projection == {"task_id": 1, "status": 1, "result.agent_result": 1, "_id": 0}
+    assert strip == []
+
+    # 数据库投影不能同时包含和排除字段，exclude 在读取后去掉
+    projection, strip = build_projection(["result"], ["result.html"], always=("task_id",))
+    assert projection == {"task_id": 1, "result": 1, "_id": 0}
+    doc = {"task_id": "t", "result": {"html": "<html>", "metadata": {}}}
+    for path in strip:
+        remove_path(doc, path)
+    assert doc == {"task_id": "t", "result": {"metadata": {}}}
+
+    projection, strip = build_projection([], ["result.html", "result.screenshot"])
+    assert projection == {"result.html": 0, "result.screenshot": 0, "_id": 0}
+
+
+if __name__ == "__main__":
+    test_encoding_negotiation_respects_quality_and_server_order()
+    test_gzip_stream_decodes_across_flushes()
+    test_include_and_exclude_build_projection()
+    print("All response encoding tests passed!")
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.db.docstore import DocumentStore
+from app.db.mongo import mongo
+from app.services.retry_service import RetryService
+
+
+def test_retryable_errors():
+    service = RetryService()
+
+    # Playwright 超时与浏览器崩溃
+    assert service.is_retryable({"message": "Timeout 30000ms exceeded.", "type": "TimeoutError"})
+    assert service.is_retryable({"message": "Target closed", "type": "TargetClosedError"})
+    # 代理错误
+    assert service.is_retryable({
+        "message": "Page.goto: net::ERR_PROXY_CONNECTION_FAILED at https://example.com/",
+        "type": "Error"
+    })
+    # 业务类错误不重试
+    assert not service.is_retryable({"message": "Model gpt-x not found or disabled", "type": "ValueError"})
+    assert not service.is_retryable({"message": "net::ERR_NAME_NOT_RESOLVED", "type": "Error"})
+    assert not service.is_retryable(None)
+
+
+def test_backoff_grows_and_is_capped():
+    service = RetryService()
+    jitter = settings.retry_jitter
+
+    for attempt in range(1, 6):
+        base = min(settings.retry_delay * 2 ** (attempt - 1), settings.retry_backoff_max)
+        delay = service.compute_delay(attempt)
+        assert base * (1 - jitter) - 1e-9 <= delay <= base * (1 + jitter) + 1e-9
+
+    assert service.compute_delay(50) <= settings.retry_backoff_max * (1 + jitter)
+
+
+def test_cancelled_task_is_not_retried():
+    previous = (mongo._client, mongo._db)
+    store = DocumentStore(":memory:")
+    mongo._client = mongo._db = store
+    try:
+        store.tasks.insert_one({"task_id": "t1", "status": "cancelled"})
+        error = {"message": "Timeout 30000ms exceeded.", "type": "TimeoutError"}
+        # 已取消的任务视为已处理，不会恢复为 pending，也不会重新投递
+        assert asyncio.run(RetryService().schedule_retry({"task_id": "t1", "attempt": 1}, error))
+        assert store.tasks.find_one({"task_id": "t1"})["status"] == "cancelled"
+    finally:
+        mongo._client, mongo._db = previous
+
+
+if __name__ == "__main__":
+    test_retryable_errors()
+    test_backoff_grows_and_is_capped()
+    test_cancelled_task_is_not_retried()
+    print("All retry service tests passed!")
@@ -0,0 +1,49 @@
+import os
+import sys
+from datetime import datetime
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from pydantic import ValidationError
+from app.core.cron import CronExpression
+from app.models.schedule import ScheduleCreate
+from app.services.scheduler_service import compute_next_run
+
+
+def test_cron_next_after():
+    now = datetime(2026, 10, 19, 10, 7, 30)  # 周一
+    assert CronExpression("*/15 * * * *").next_after(now) == datetime(2026, 10, 19, 10, 15)
+    assert CronExpression("0 9 * * 1-5").next_after(now) == datetime(2026, 10, 20, 9, 0)
+    assert CronExpression("0 12 * * 6,7").next_after(now) == datetime(2026, 10, 24, 12, 0)
+    assert CronExpression("0 0 29 2 *").next_after(now) == datetime(2028, 2, 29, 0, 0)
+
+    for expression in ["* * *", "61 * * * *", "*/0 * * * *", "a * * * *"]:
+        try:
+            CronExpression(expression)
+        except ValueError:
+            continue
+        raise AssertionError(f"{expression} should be rejected")
+
+
+def test_schedule_rejects_cron_that_never_fires():
+    ScheduleCreate(name="ok", urls=["https://example.com"], cron="0 0 29 2 *")
+    try:
+        ScheduleCreate(name="never", urls=["https://example.com"], cron="0 0 31 2 *")
+    except ValidationError:
+        return
+    raise AssertionError("0 0 31 2 * should be rejected")
+
+
+def test_compute_next_run_with_jitter():
+    now = datetime(2026, 10, 19, 10, 0, 0)
+    next_run = compute_next_run({"interval_seconds": 300, "jitter_seconds": 10}, now)
+    assert 300 <= (next_run - now).total_seconds() <= 310
+    assert compute_next_run({"cron": "30 * * * *"}, now) == datetime(2026, 10, 19, 10, 30)
+
+
+if __name__ == "__main__":
+    test_cron_next_after()
+    test_schedule_rejects_cron_that_never_fires()
+    test_compute_next_run_with_jitter()
+    print("All scheduler tests passed!")
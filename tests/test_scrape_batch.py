@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from pymongo.errors import BulkWriteError
+from app.api import scrape as scrape_api
+from app.db.async_mongo import amongo, _ThreadedDatabase
+from app.db.docstore import DocumentStore
+from app.models.task import BatchScrapeRequest, ScrapeRequest
+
+
+class RejectingDatabase(_ThreadedDatabase):
+    """insert_many 时拒绝指定位置文档的文档存储，模拟无序写入中的单条失败（如唯一索引冲突）"""
+
+    def __init__(self, store, rejected_indexes):
+        super().__init__(store)
+        self.rejected_indexes = rejected_indexes
+
+    def __getitem__(self, name):
+        collection = super().__getitem__(name)
+        rejected_indexes = self.rejected_indexes
+
+        async def insert_many(documents, ordered=True):
+            accepted = [doc for i, doc in enumerate(documents) if i not in rejected_indexes]
+            await asyncio.to_thread(self._store[name].insert_many, accepted)
+            raise BulkWriteError({
+                "writeErrors": [{"index": i, "code": 11000, "errmsg": "duplicate key"} for i in sorted(rejected_indexes)],
+                "nInserted": len(accepted),
+            })
+
+        collection.insert_many = insert_many
+        return collection
+
+
+class RecordingQueue:
+    """记录批量发布的任务，failed_positions 中位置的任务发布失败"""
+
+    def __init__(self, failed_positions=()):
+        self.failed_positions = set(failed_positions)
+        self.published = []
+
+    async def publish_tasks(self, tasks):
+        self.published = [task["task_id"] for task in tasks]
+        return [task["task_id"] for i, task in enumerate(tasks) if i in self.failed_positions]
+
+
+def _submit(rejected_indexes, failed_positions=()):
+    """提交 4 个任务的批量请求，返回响应、队列和文档存储"""
+    previous = (amongo._db, scrape_api.queue_service)
+    store = DocumentStore(":memory:")
+    queue = RecordingQueue(failed_positions)
+    amongo._db = RejectingDatabase(store, set(rejected_indexes))
+    scrape_api.queue_service = queue
+    try:
+        request = BatchScrapeRequest(tasks=[ScrapeRequest(url=f"http://example.com/{i}") for i in range(4)])
+        response = asyncio.run(scrape_api.scrape_batch(request, current_user={}))
+    finally:
+        amongo._db, scrape_api.queue_service = previous
+    return response, queue, store
+
+
+def test_batch_skips_tasks_that_failed_to_insert():
+    response, queue, store = _submit(rejected_indexes=[1, 3])
+
+    # 写入失败的任务既不入队也不返回，其余任务照常提交
+    stored = [task["task_id"] for task in store.tasks.find({}, sort=[("url", 1)])]
+    assert len(stored) == 2
+    assert queue.published == stored
+    assert response.task_ids == stored
+    assert [task["url"] for task in store.tasks.find({}, sort=[("url", 1)])] == [
+        "http://example.com/0", "http://example.com/2"
+    ]
+    assert all(task["batch_id"] == response.batch_id for task in store.tasks.find({}))
+
+
+def test_batch_marks_unpublished_tasks_failed():
+    response, queue, store = _submit(rejected_indexes=[0], failed_positions=[1])
+
+    assert len(response.task_ids) == 3
+    failed = store.tasks.find_one({"status": "failed"})
+    assert failed["task_id"] == queue.published[1]
+    assert failed["error"]["message"] == "Failed to queue task: queue connection issue"
+    assert store.tasks.count_documents({"status": "pending"}) == 2
+
+
+if __name__ == "__main__":
+    test_batch_skips_tasks_that_failed_to_insert()
+    test_batch_marks_unpublished_tasks_failed()
+    print("All scrape batch tests passed!")
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import sys
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.api.tasks import delete_task
+from app.db.async_mongo import amongo, _ThreadedDatabase
+from app.db.docstore import DocumentStore
+from app.db.local_redis import LocalRedis
+from app.db.mongo import mongo
+from app.db.redis import redis_client
+from app.services import singleflight_service as singleflight_module
+from app.services.singleflight_service import SingleflightService
+
+
+class RecordingQueue:
+    """记录投递任务的队列，publish_ok 为 False 时模拟投递失败"""
+
+    def __init__(self, publish_ok: bool = True):
+        self.publish_ok = publish_ok
+        self.published = []
+
+    async def publish_task(self, task_data: dict) -> bool:
+        self.published.append(task_data["task_id"])
+        return self.publish_ok
+
+
+def _with_backends(publish_ok: bool = True):
+    """将 MongoDB、队列 Redis 和任务队列临时替换为进程内实现"""
+    def decorator(test):
+        def wrapper():
+            previous = (mongo._client, mongo._db, amongo._db, redis_client._queue_client, singleflight_module.queue_service)
+            store = DocumentStore(":memory:")
+            queue = RecordingQueue(publish_ok)
+            mongo._client = mongo._db = store
+            amongo._db = _ThreadedDatabase(store)
+            redis_client._queue_client = LocalRedis()
+            singleflight_module.queue_service = queue
+            try:
+                test(store, queue)
+            finally:
+                (mongo._client, mongo._db, amongo._db, redis_client._queue_client,
+                 singleflight_module.queue_service) = previous
+        wrapper.__name__ = test.__name__
+        return wrapper
+    return decorator
+
+
+def _insert_tasks(store, leader_status: str = "processing", followers=("b", "c")):
+    store.tasks.insert_one({"task_id": "a", "url": "http://example.com", "status": leader_status, "cache_key": "k"})
+    store.tasks.insert_many([
+        {"task_id": task_id, "url": "http://example.com", "status": "pending", "cache_key": "k", "leader_task_id": "a"}
+        for task_id in followers
+    ])
+
+
+@_with_backends()
+def test_followers_receive_leader_result(store, queue):
+    service = SingleflightService()
+    _insert_tasks(store)
+
+    async def run():
+        assert await service.acquire("k", "a") is None
+        assert await service.acquire("k", "b") == "a"
+        await service.join("a", "b")
+        await service.join("a", "c")
+        # 领导任务仍在执行，跟随任务继续等待
+        assert store.tasks.count_documents({"status": "pending"}) == 2
+
+        store.tasks.update_one({"task_id": "a"}, {"$set": {"status": "success", "result": {"html": "<p>ok</p>"}}})
+        await service.complete("k", "a")
+        # 租约已释放，新的提交重新成为领导任务
+        assert await service.acquire("k", "d") is None
+
+    asyncio.run(run())
+    for task_id in ("b", "c"):
+        task = store.tasks.find_one({"task_id": task_id})
+        assert task["status"] == "success" and task["result"] == {"html": "<p>ok</p>"}
+    assert queue.published == []
+
+
+@_with_backends()
+def test_join_after_leader_finished_resolves_immediately(store, queue):
+    service = SingleflightService()
+    _insert_tasks(store, leader_status="failed", followers=("b",))
+    store.tasks.update_one({"task_id": "a"}, {"$set": {"error": {"message": "boom"}}})
+
+    asyncio.run(service.join("a", "b"))
+    task = store.tasks.find_one({"task_id": "b"})
+    assert task["status"] == "failed" and task["error"] == {"message": "boom"}
+
+
+@_with_backends()
+def test_cancelled_leader_hands_over_to_first_waiting_follower(store, queue):
+    service = SingleflightService()
+    _insert_tasks(store, leader_status="cancelled", followers=("b", "c", "d"))
+    store.tasks.update_one({"task_id": "b"}, {"$set": {"status": "cancelled"}})
+
+    async def run():
+        await service.acquire("k", "a")
+        await asyncio.to_thread(service._push_followers, "a", ["b", "c", "d"])
+        return await service.resolve("a")
+
+    assert asyncio.run(run()) == ["b", "c", "d"]
+    # 已取消的 b 被跳过，c 接替成为领导任务并入队，d 改挂到 c 上
+    assert queue.published == ["c"]
+    assert store.tasks.find_one({"task_id": "c"})["leader_task_id"] is None
+    assert store.tasks.find_one({"task_id": "d"})["leader_task_id"] == "c"
+    assert store.tasks.find_one({"task_id": "b"})["status"] == "cancelled"
+    assert redis_client.queue.get("inflight:k") == "c"
+    assert redis_client.queue.lrange("inflight:followers:c", 0, -1) == ["d"]
+
+
+@_with_backends(publish_ok=False)
+def test_hand_over_publish_failure_fails_new_leader_and_followers(store, queue):
+    service = SingleflightService()
+    _insert_tasks(store, leader_status="expired")
+
+    async def run():
+        await asyncio.to_thread(service._push_followers, "a", ["b", "c"])
+        await service.resolve("a")
+
+    asyncio.run(run())
+    # 新的领导任务入队失败时标记为失败，并将失败结果复制给剩余的跟随任务
+    assert queue.published == ["b"]
+    assert store.tasks.count_documents({"task_id": {"$in": ["b", "c"]}, "status": "failed"}) == 2
+    assert redis_client.queue.get("inflight:k") is None
+
+
+@_with_backends()
+def test_missing_leader_fails_followers(store, queue):
+    service = SingleflightService()
+    _insert_tasks(store)
+    store.tasks.delete_one({"task_id": "a"})
+
+    asyncio.run(service.join("a", "b"))
+    task = store.tasks.find_one({"task_id": "b"})
+    assert task["status"] == "failed" and task["error"]["type"] == "CoalescedLeaderMissing"
+
+
+@_with_backends()
+def test_deleting_leader_releases_followers(store, queue):
+    service = SingleflightService()
+    _insert_tasks(store, leader_status="pending")
+
+    async def run():
+        await service.acquire("k", "a")
+        await service.join("a", "b")
+        await delete_task("a")
+        return await service.acquire("k", "e")
+
+    # 删除领导任务后租约被释放，跟随任务不再一直等待
+    assert asyncio.run(run()) is None
+    task = store.tasks.find_one({"task_id": "b"})
+    assert task["status"] == "failed" and task["error"]["type"] == "CoalescedLeaderMissing"
+    assert store.tasks.find_one({"task_id": "c"})["status"] == "pending"
+
+
+if __name__ == "__main__":
+    test_followers_receive_leader_result()
+    test_join_after_leader_finished_resolves_immediately()
+    test_cancelled_leader_hands_over_to_first_waiting_follower()
+    test_hand_over_publish_failure_fails_new_leader_and_followers()
+    test_missing_leader_fails_followers()
+    test_deleting_leader_releases_followers()
+    print("All singleflight tests passed!")
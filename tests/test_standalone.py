@@ -0,0 +1,154 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from pymongo import ReturnDocument
+from app.db.docstore import DocumentStore
+from app.db.local_redis import LocalRedis
+from app.services.cancel_service import TaskCancelService
+from app.services.memory_queue_service import MemoryQueueService
+from app.services.task_event_service import TaskEventStream
+
+
+def test_document_store_queries_and_updates():
+    db = DocumentStore(":memory:")
+    now = datetime.now()
+    for i in range(4):
+        db.tasks.insert_one({"task_id": f"t{i}", "status": "success" if i % 2 else "failed", "created_at": now})
+
+    assert db.tasks.count_documents({"status": "success"}) == 2
+    assert db.tasks.find_one({"task_id": "t1"}, {"status": 1, "_id": 0}) == {"status": "success"}
+    assert [doc["task_id"] for doc in db.tasks.find({"status": {"$in": ["failed"]}}).sort("task_id", -1)] == ["t2", "t0"]
+
+    doc = db.tasks.find_one_and_update(
+        {"task_id": "t0"},
+        {"$set": {"status": "pending"}, "$inc": {"retry_count": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    assert doc["status"] == "pending" and doc["retry_count"] == 1
+
+    result = db.nodes.update_one({"node_id": "n1"}, {"$set": {"status": "running"}}, upsert=True)
+    assert result.upserted_id is not None
+    assert db.nodes.find_one({"node_id": "n1"})["status"] == "running"
+
+    stats = list(db.tasks.aggregate([
+        {"$match": {"created_at": {"$lte": now}}},
+        {"$group": {"_id": None, "total": {"$sum": 1}, "success": {"$sum": {"$cond": [{"$eq": ["$status", "success"]}, 1, 0]}}}}
+    ]))
+    assert stats == [{"_id": None, "total": 4, "success": 2}]
+
+
+def test_local_redis_lease_and_lru():
+    client = LocalRedis(max_entries=2)
+    assert client.set("lease", "a", nx=True, ex=60)
+    assert client.set("lease", "b", nx=True) is None
+    assert client.compare_and_delete("lease", "b") == 0
+    assert client.compare_and_delete("lease", "a") == 1
+
+    client.set("k1", "1")
+    client.set("k2", "2")
+    client.get("k1")
+    client.set("k3", "3")
+    assert client.get("k2") is None and client.get("k1") == "1"
+
+
+def test_memory_queue_priority_and_requeue():
+    queue = MemoryQueueService()
+    received = []
+
+    async def run():
+        await queue.publish_tasks([{"task_id": f"q{i}", "priority": i} for i in range(3)])
+        done = asyncio.Event()
+
+        async def on_task(task):
+            received.append(task["task_id"])
+            if received == ["q2"]:
+                raise RuntimeError("transient failure")
+            if len(received) == 4:
+                done.set()
+
+        consumer = asyncio.create_task(queue.consume_tasks(on_task, prefetch_count=1, should_stop=done.is_set))
+        await asyncio.wait_for(done.wait(), 5)
+        await consumer
+
+    asyncio.run(run())
+    assert received == ["q2", "q2", "q1", "q0"]
+
+
+def test_memory_queue_drain_requeues_unfinished():
+    queue = MemoryQueueService()
+    finished = []
+
+    async def run():
+        await queue.publish_tasks([{"task_id": "fast", "priority": 2}, {"task_id": "slow", "priority": 1}])
+        stop = asyncio.Event()
+
+        async def on_task(task):
+            if task["task_id"] == "fast":
+                stop.set()
+                await asyncio.sleep(0.1)
+            else:
+                await asyncio.sleep(10)
+            finished.append(task["task_id"])
+
+        await queue.consume_tasks(on_task, prefetch_count=2, should_stop=stop.is_set, drain_timeout=0.5)
+
+    asyncio.run(run())
+    # 期限内完成的任务保留结果，未完成的任务原样放回队列
+    assert finished == ["fast"]
+    assert asyncio.run(queue.get_queue_depth()) == 1
+    assert queue._queues[queue._queue_name()][0][2]["task_id"] == "slow"
+
+
+def test_cancel_service_cancels_running_task():
+    service = TaskCancelService()
+    outcome = []
+
+    async def run():
+        async def job():
+            service.register("c1")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                outcome.append(service.was_cancelled("c1"))
+            finally:
+                service.unregister("c1")
+
+        handler = asyncio.create_task(job())
+        await asyncio.sleep(0)
+        assert service.cancel_local("c1")
+        await asyncio.wait_for(handler, 1)
+
+    asyncio.run(run())
+    assert outcome == [True]
+    assert service.cancel_local("c1") is False
+
+
+def test_task_event_stream_coalesces_and_bounds_backlog():
+    async def run():
+        stream = TaskEventStream(task_ids={"a", "b", "c"}, max_pending=2)
+        assert not stream.matches({"task_id": "x", "status": "success"})
+        stream.offer({"task_id": "a", "status": "processing"})
+        stream.offer({"task_id": "b", "status": "processing"})
+        stream.offer({"task_id": "a", "status": "success"})
+        stream.offer({"task_id": "c", "status": "processing"})
+        return await stream.get(1), stream.dropped, await stream.get(0.01)
+
+    events, dropped, empty = asyncio.run(run())
+    # 同一任务只保留最新状态，超出积压上限时丢弃最早的事件
+    assert events == [{"task_id": "a", "status": "success"}, {"task_id": "c", "status": "processing"}]
+    assert dropped == 1 and empty == []
+
+
+if __name__ == "__main__":
+    test_document_store_queries_and_updates()
+    test_local_redis_lease_and_lru()
+    test_memory_queue_priority_and_requeue()
+    test_memory_queue_drain_requeues_unfinished()
+    test_cancel_service_cancels_running_task()
+    test_task_event_stream_coalesces_and_bounds_backlog()
+    print("All standalone backend tests passed!")
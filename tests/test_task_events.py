@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.api import scrape as scrape_api
+from app.core.config import settings
+from app.db.async_mongo import amongo, _ThreadedDatabase
+from app.db.docstore import DocumentStore
+from app.db.local_redis import LocalRedis
+from app.db.redis import redis_client
+from app.models.task import ScrapeRequest
+from app.services.task_event_service import TaskEventService, task_event_service
+
+
+RESULT = {"html": "<p>ok</p>", "metadata": {"url": "http://example.com/", "load_time": 0.1}}
+
+
+class CompletingQueue:
+    """入队后模拟 Worker 在 delay 秒后完成任务，publish_event 为 False 时模拟事件丢失"""
+
+    def __init__(self, store, delay: float, publish_event: bool):
+        self.store, self.delay, self.publish_event = store, delay, publish_event
+
+    async def publish_task(self, task_data: dict) -> bool:
+        asyncio.get_running_loop().call_later(self.delay, self._complete, task_data["task_id"])
+        return True
+
+    def _complete(self, task_id: str):
+        now = datetime.now()
+        self.store.tasks.update_one(
+            {"task_id": task_id},
+            {"$set": {"status": "success", "result": RESULT, "updated_at": now, "completed_at": now}}
+        )
+        if self.publish_event:
+            task_event_service.publish("success", task_id)
+
+
+def _scrape(publish_event: bool, poll_interval: float):
+    """以同步模式提交一个任务，返回响应和耗时"""
+    previous = (amongo._db, redis_client._queue_client, scrape_api.queue_service, settings.sync_result_poll_interval)
+    store = DocumentStore(":memory:")
+    amongo._db = _ThreadedDatabase(store)
+    redis_client._queue_client = LocalRedis()
+    scrape_api.queue_service = CompletingQueue(store, 0.1, publish_event)
+    settings.sync_result_poll_interval = poll_interval
+    try:
+        request = ScrapeRequest(url="http://example.com", params={"timeout": 5000}, cache={"enabled": False})
+        started = time.monotonic()
+        response = asyncio.run(scrape_api.scrape(request, current_user={}))
+        return response, time.monotonic() - started
+    finally:
+        (amongo._db, redis_client._queue_client, scrape_api.queue_service,
+         settings.sync_result_poll_interval) = previous
+
+
+def test_sync_scrape_wakes_on_completion_event():
+    # 兜底查询间隔远大于任务耗时，只有完成事件能让请求及时返回
+    response, elapsed = _scrape(publish_event=True, poll_interval=30)
+    assert response.status == "success" and response.result.html == RESULT["html"]
+    assert elapsed < 1
+    assert task_event_service._waiters == {}
+
+
+def test_sync_scrape_falls_back_to_polling_without_event():
+    # 事件丢失时按兜底间隔重新查询数据库
+    response, elapsed = _scrape(publish_event=False, poll_interval=0.3)
+    assert response.status == "success"
+    assert 0.25 < elapsed < 2
+    assert task_event_service._waiters == {}
+
+
+def test_only_final_events_wake_waiters():
+    service = TaskEventService()
+    previous = redis_client._queue_client
+    redis_client._queue_client = LocalRedis()
+
+    async def run():
+        done = service.subscribe("t1")
+        stream = service.open_stream(task_ids={"t1"})
+        service.publish("processing", "t1")
+        await asyncio.sleep(0.01)
+        assert not done.done()
+        service.publish("success", "t1", "t2")
+        await asyncio.wait_for(done, 1)
+        # 事件流收到同一任务的全部状态变化，按任务合并为最新状态
+        events = await stream.get(1)
+        service.close_stream(stream)
+        return events
+
+    try:
+        events = asyncio.run(run())
+    finally:
+        redis_client._queue_client = previous
+    assert [(event["task_id"], event["status"]) for event in events] == [("t1", "success")]
+    assert service._waiters == {} and service._streams == set()
+
+
+if __name__ == "__main__":
+    test_sync_scrape_wakes_on_completion_event()
+    test_sync_scrape_falls_back_to_polling_without_event()
+    test_only_final_events_wake_waiters()
+    print("All task event tests passed!")
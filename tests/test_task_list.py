@@ -0,0 +1,70 @@
+import os
+import sys
+from datetime import datetime
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from bson import ObjectId
+from app.db.docstore import DocumentStore
+from app.api.tasks import _build_task_query, _decode_cursor, _encode_cursor
+from app.core.urls import url_search_fields
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 1, 2, 3, 4, 5, 678000)
+    _id = ObjectId()
+    condition = _decode_cursor(_encode_cursor({"created_at": created_at, "_id": _id}))
+    assert condition == {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": _id}}
+    ]}
+
+
+def test_url_search_uses_exact_or_prefix_match():
+    task_id = str(ObjectId())
+    assert _build_task_query(url=task_id) == {"task_id": task_id}
+    assert _build_task_query(url="https://a.com/x?y=1") == {"url": {"$regex": r"^https://a\.com/x\?y=1"}}
+    assert _build_task_query(url="Shop.Example") == {"url_tokens": {"$all": ["shop"], "$regex": "^example"}}
+    # 没有可用关键词时退回模糊匹配
+    assert "$or" in _build_task_query(url="-")
+
+
+def test_url_search_matches_prefixes():
+    store = DocumentStore(":memory:")
+    task_id = "65f1a2b3c4d5e6f708192a3b"
+    store.tasks.insert_one({"task_id": task_id, "url": "https://shop.example.com/a",
+                            **url_search_fields("https://shop.example.com/a")})
+    store.tasks.insert_one({"task_id": "65f1a2c0c4d5e6f708192a3c", "url": "https://other.org/b",
+                            **url_search_fields("https://other.org/b")})
+
+    def search(**params):
+        return [doc["task_id"] for doc in store.tasks.find(_build_task_query(**params))]
+
+    # 最后一个关键词按前缀匹配
+    assert search(url="exam") == [task_id]
+    assert search(url="shop exa") == [task_id]
+    assert search(url="exam", q="shop") == [task_id]
+    assert search(url="exam", q="other") == []
+    # 部分任务 ID 按前缀匹配
+    assert search(url=task_id[:10]) == [task_id]
+
+
+def test_url_search_fields_support_suffix_and_keywords():
+    fields = url_search_fields("https://WWW.Example.com:8443/Products/shoes?id=42#top")
+    assert fields["host"] == "www.example.com"
+    assert fields["host_rev"] == "com.example.www"
+    assert fields["path"] == "/Products/shoes"
+    assert fields["url_tokens"] == ["example", "com", "products", "shoes", "id", "42"]
+    assert url_search_fields("not a url") == {}
+    # 主机后缀匹配只命中该域名及其子域名
+    query = _build_task_query(host_suffix="example.com")
+    assert query == {"host_rev": {"$regex": r"^com\.example(\.|$)"}}
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_url_search_uses_exact_or_prefix_match()
+    test_url_search_matches_prefixes()
+    test_url_search_fields_support_suffix_and_keywords()
+    print("All task list tests passed!")
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from pymongo import UpdateOne, UpdateMany, InsertOne, DeleteOne
+from pymongo.errors import BulkWriteError
+from app.db.docstore import DocumentStore
+from app.db.mongo import mongo
+from app.services.task_write_service import TaskWriteBuffer
+
+
+def _with_store(test):
+    """将全局 mongo 临时指向内存文档存储"""
+    def wrapper():
+        previous = (mongo._client, mongo._db)
+        store = DocumentStore(":memory:")
+        mongo._client = mongo._db = store
+        try:
+            test(store)
+        finally:
+            mongo._client, mongo._db = previous
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+def test_document_store_bulk_write():
+    db = DocumentStore(":memory:")
+    result = db.tasks.bulk_write([
+        InsertOne({"task_id": "a", "status": "pending"}),
+        InsertOne({"task_id": "b", "status": "pending"}),
+        UpdateOne({"task_id": "a"}, {"$set": {"status": "success"}}),
+        UpdateMany({"status": "pending"}, {"$set": {"node_id": "n1"}}),
+        UpdateOne({"task_id": "c"}, {"$set": {"status": "failed"}}, upsert=True),
+        DeleteOne({"task_id": "b"}),
+    ], ordered=False)
+    assert (result.inserted_count, result.matched_count, result.upserted_count, result.deleted_count) == (2, 2, 1, 1)
+    assert db.tasks.find_one({"task_id": "a"})["status"] == "success"
+    assert db.tasks.find_one({"task_id": "c"})["status"] == "failed"
+    assert db.tasks.count_documents({}) == 2
+
+
+@_with_store
+def test_write_buffer_coalesces_concurrent_updates(store):
+    store.tasks.insert_many([{"task_id": f"t{i}", "status": "processing"} for i in range(10)])
+
+    async def run(batch_size):
+        buffer = TaskWriteBuffer(interval=0.05, batch_size=batch_size)
+        buffer.start()
+        await asyncio.gather(*(
+            buffer.update({"task_id": f"t{i}"}, {"$set": {"status": f"done-{batch_size}"}}) for i in range(10)
+        ))
+        await buffer.stop()
+        return buffer.flushes
+
+    # 并发任务的更新在一个窗口内合并为一次写入，调用方返回时更新已经落库
+    assert asyncio.run(run(500)) == 1
+    assert store.tasks.count_documents({"status": "done-500"}) == 10
+    # 超过单批上限时分批写入
+    assert asyncio.run(run(4)) == 3
+    assert store.tasks.count_documents({"status": "done-4"}) == 10
+
+
+@_with_store
+def test_write_buffer_writes_immediately_when_not_started(store):
+    store.tasks.insert_one({"task_id": "t1", "status": "processing"})
+
+    async def run():
+        buffer = TaskWriteBuffer()
+        await buffer.update({"task_id": "t1"}, {"$set": {"status": "failed"}})
+        return buffer.flushes
+
+    assert asyncio.run(run()) == 1
+    assert store.tasks.find_one({"task_id": "t1"})["status"] == "failed"
+
+
+@_with_store
+def test_write_buffer_fails_only_rejected_updates(store):
+    store.tasks.insert_many([{"task_id": f"t{i}", "status": "processing", "attempts": 1} for i in range(3)])
+    store.tasks.update_one({"task_id": "t1"}, {"$set": {"attempts": "bad"}})
+
+    async def run():
+        buffer = TaskWriteBuffer(interval=0.05)
+        buffer.start()
+        results = await asyncio.gather(*(
+            buffer.update({"task_id": f"t{i}"}, {"$inc": {"attempts": 1}, "$set": {"status": "success"}})
+            for i in range(3)
+        ), return_exceptions=True)
+        await buffer.stop()
+        return results, buffer.flushes
+
+    # 无序批量写入中一条更新失败时，只有对应的调用方收到异常，其余更新照常落库
+    results, flushes = asyncio.run(run())
+    assert flushes == 1
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], BulkWriteError)
+    assert [error["index"] for error in results[1].details["writeErrors"]] == [1]
+    assert store.tasks.count_documents({"status": "success"}) == 2
+    assert store.tasks.find_one({"task_id": "t1"})["status"] == "processing"
+
+
+if __name__ == "__main__":
+    test_document_store_bulk_write()
+    test_write_buffer_coalesces_concurrent_updates()
+    test_write_buffer_writes_immediately_when_not_started()
+    test_write_buffer_fails_only_rejected_updates()
+    print("All task write service tests passed!")
@@ -0,0 +1,66 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.db.async_mongo import amongo, _ThreadedDatabase
+from app.db.docstore import DocumentStore
+from app.services.webhook_service import WebhookService, sign_payload
+
+
+def test_signature_matches_receiver_check():
+    body = b'{"event": "task.completed"}'
+    expected = hmac.new(b"secret", b"1700000000." + body, hashlib.sha256).hexdigest()
+    assert sign_payload("secret", "1700000000", body) == f"sha256={expected}"
+    # 请求体或时间戳被篡改时签名不同
+    assert sign_payload("secret", "1700000001", body) != sign_payload("secret", "1700000000", body)
+
+
+def test_delivery_backoff_grows_and_is_capped():
+    service = WebhookService()
+    first = service.compute_delay(1)
+    assert settings.webhook_retry_delay * 0.8 <= first <= settings.webhook_retry_delay * 1.2
+    assert service.compute_delay(4) >= settings.webhook_retry_delay * 8 * 0.8
+    assert service.compute_delay(50) <= settings.webhook_retry_backoff_max * 1.2
+
+
+def test_collect_writes_each_task_once():
+    previous = amongo._db
+    store = DocumentStore(":memory:")
+    amongo._db = _ThreadedDatabase(store)
+    try:
+        completed_at = datetime.now() - timedelta(seconds=10)
+        for task_id in ("t1", "t2", "t3", "t4"):
+            store.tasks.insert_one({
+                "task_id": task_id, "status": "success", "callback_pending": True,
+                "callback_url": "http://hook", "completed_at": completed_at
+            })
+        # t1 的投递已写入但进程在清除标记前退出；t4 的投递属于重试之前的一次执行；t3 正被其他进程认领
+        store.webhook_deliveries.insert_many([
+            {"url": "http://hook", "task_ids": ["t1"], "status": "pending", "created_at": datetime.now()},
+            {"url": "http://hook", "task_ids": ["t4"], "status": "delivered", "created_at": completed_at - timedelta(hours=1)},
+        ])
+        store.tasks.update_one(
+            {"task_id": "t3"}, {"$set": {"callback_claimed_until": datetime.now() + timedelta(minutes=1)}}
+        )
+
+        service = WebhookService()
+        assert asyncio.run(service.collect_once()) == 2
+        assert asyncio.run(service.collect_once()) == 0
+        assert sorted(d["task_ids"] for d in store.webhook_deliveries.find({})) == [["t1"], ["t2"], ["t4"], ["t4"]]
+        assert [t["task_id"] for t in store.tasks.find({"callback_pending": True})] == ["t3"]
+    finally:
+        amongo._db = previous
+
+
+if __name__ == "__main__":
+    test_signature_matches_receiver_check()
+    test_delivery_backoff_grows_and_is_capped()
+    test_collect_writes_each_task_once()
+    print("All webhook service tests passed!")
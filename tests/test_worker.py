@@ -0,0 +1,153 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Setup path to import app modules
+sys.path.append(os.getcwd())
+
+from app.db.docstore import DocumentStore
+from app.db.local_redis import LocalRedis
+from app.db.mongo import mongo
+from app.db.redis import redis_client
+from app.services import worker as worker_module
+from app.services.queue_base import get_expiration
+from app.services.worker import ConcurrencyLimiter, Worker
+
+
+def _with_store(test):
+    """将全局 mongo 和队列 Redis 临时替换为进程内实现"""
+    def wrapper():
+        previous = (mongo._client, mongo._db, redis_client._queue_client)
+        store = DocumentStore(":memory:")
+        mongo._client = mongo._db = store
+        redis_client._queue_client = LocalRedis()
+        try:
+            test(store)
+        finally:
+            mongo._client, mongo._db, redis_client._queue_client = previous
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+def _recording_worker(limit: int = 1) -> Worker:
+    """创建只记录开始执行的任务、不启动浏览器的 Worker"""
+    worker = Worker(node_id="node-test")
+    worker.started = []
+
+    async def process(task_data, task_id, url, params, attempt):
+        worker.started.append(task_id)
+
+    worker._process_task = process
+    worker.concurrency._limit = limit
+    return worker
+
+
+def test_get_expiration():
+    assert get_expiration({}) is None
+    assert get_expiration({"expires_at": None}) is None
+    assert 59 < get_expiration({"expires_at": datetime.now() + timedelta(seconds=60)}) <= 60
+    # 队列消息中的期限为 ISO 格式字符串
+    assert get_expiration({"expires_at": (datetime.now() - timedelta(seconds=5)).isoformat()}) <= -5
+
+
+@_with_store
+def test_worker_skips_expired_task(store):
+    store.tasks.insert_many([
+        {"task_id": "t1", "status": "pending"},
+        {"task_id": "t2", "status": "pending"},
+    ])
+    worker = _recording_worker()
+
+    async def run():
+        await worker.process_task({"task_id": "t1", "expires_at": (datetime.now() - timedelta(seconds=1)).isoformat()})
+        await worker.process_task({"task_id": "t2", "expires_at": (datetime.now() + timedelta(minutes=1)).isoformat()})
+
+    asyncio.run(run())
+    assert worker.started == ["t2"]
+    task = store.tasks.find_one({"task_id": "t1"})
+    assert task["status"] == "expired" and task["error"]["type"] == "TaskExpired" and task["node_id"] == "node-test"
+
+
+@_with_store
+def test_worker_rechecks_expiry_after_waiting_for_concurrency(store):
+    store.tasks.insert_one({"task_id": "t1", "status": "pending"})
+    worker = _recording_worker(limit=1)
+
+    async def run():
+        # 并发许可被占满，任务在等待许可期间过期
+        await worker.concurrency.acquire()
+        pending = asyncio.create_task(worker.process_task({
+            "task_id": "t1", "expires_at": (datetime.now() + timedelta(seconds=0.1)).isoformat()
+        }))
+        await asyncio.sleep(0.2)
+        await worker.concurrency.release()
+        await pending
+
+    asyncio.run(run())
+    assert worker.started == []
+    assert store.tasks.find_one({"task_id": "t1"})["status"] == "expired"
+    assert worker.concurrency.active == 0
+
+
+def test_concurrency_limiter_resizes_live():
+    limiter = ConcurrencyLimiter(1)
+
+    async def run():
+        await limiter.acquire()
+        waiters = [asyncio.create_task(limiter.acquire()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert limiter.active == 1 and not any(waiter.done() for waiter in waiters)
+
+        # 调大上限立即放行等待中的任务
+        await limiter.resize(3)
+        await asyncio.sleep(0.05)
+        assert limiter.active == 3 and sum(waiter.done() for waiter in waiters) == 2
+
+        # 调小上限不影响正在处理的任务，新的许可要等活跃数降到上限以下
+        await limiter.resize(2)
+        await limiter.release()
+        await asyncio.sleep(0.05)
+        assert limiter.active == 2 and sum(waiter.done() for waiter in waiters) == 2
+        await limiter.release()
+        await asyncio.sleep(0.05)
+        assert limiter.active == 2 and all(waiter.done() for waiter in waiters)
+
+    asyncio.run(run())
+    assert limiter.limit == 2
+
+
+def test_set_concurrency_updates_limiter_and_prefetch():
+    class Queue:
+        prefetch = []
+
+        async def set_prefetch(self, prefetch_count):
+            self.prefetch.append(prefetch_count)
+            return True
+
+    previous = worker_module.queue_service
+    worker_module.queue_service = Queue()
+    try:
+        worker = Worker(node_id="node-test")
+        initial = worker.max_concurrent
+
+        async def run():
+            await worker.set_concurrency(worker.max_concurrent + 3)
+            await worker.set_concurrency(worker.max_concurrent)  # 未变化时不重复调整
+            await worker.set_concurrency(0)
+
+        asyncio.run(run())
+    finally:
+        worker_module.queue_service = previous
+
+    assert Queue.prefetch == [initial + 3, 1]
+    assert worker.max_concurrent == 1 and worker.concurrency.limit == 1
+
+
+if __name__ == "__main__":
+    test_get_expiration()
+    test_worker_skips_expired_task()
+    test_worker_rechecks_expiry_after_waiting_for_concurrency()
+    test_concurrency_limiter_resizes_live()
+    test_set_concurrency_updates_limiter_and_prefetch()
+    print("All worker tests passed!")